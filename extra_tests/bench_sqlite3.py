@@ -0,0 +1,40 @@
+""" Time Cursor.executemany() inserting many rows, in autocommit mode and
+inside a transaction:
+
+    pypy bench_sqlite3.py [rows]
+
+The default is 1000000 rows of (integer, float, text, NULL).
+"""
+
+import sys
+import time
+import _sqlite3
+
+
+def rows(count):
+    for i in xrange(count):
+        yield (i, i * 0.5, u'row %d' % i, None)
+
+def bench(count, isolation_level):
+    con = _sqlite3.connect(':memory:', isolation_level=isolation_level)
+    con.execute('CREATE TABLE t (a INTEGER, b REAL, c TEXT, d)')
+    t0 = time.time()
+    con.executemany('INSERT INTO t VALUES (?, ?, ?, ?)', rows(count))
+    con.commit()
+    t1 = time.time()
+    assert con.execute('SELECT count(*) FROM t').fetchone() == (count,)
+    con.close()
+    return t1 - t0
+
+def main(count):
+    for isolation_level in [None, '']:
+        t = bench(count, isolation_level)
+        print '%-12s %d rows in %.3f s (%.0f rows/s)' % (
+            'autocommit' if isolation_level is None else 'transaction',
+            count, t, count / t)
+
+if __name__ == '__main__':
+    count = 1000000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    main(count)
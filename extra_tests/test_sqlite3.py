@@ -322,3 +322,100 @@ def test_close_in_del_ordering():
     gc.collect()
     gc.collect()
     assert SQLiteBackend.success
+
+@pypy_only
+def test_statement_cache_pool():
+    con = _sqlite3.connect(':memory:', cached_statements=3)
+    con.execute('CREATE TABLE foo (bar INTEGER)')
+    con.executemany('INSERT INTO foo (bar) VALUES (?)', [(i,) for i in range(3)])
+    stats = con.statement_cache_stats
+    assert stats['misses'] == stats['prepares'] == 2
+    #
+    query = 'SELECT bar FROM foo ORDER BY bar'
+    result = []
+    for x, in con.execute(query):
+        # nested cursors over the same query need their own statements
+        result.append([y for y, in con.execute(query)])
+    assert result == [[0, 1, 2]] * 3
+    stats = con.statement_cache_stats
+    assert stats['misses'] == 3
+    assert stats['prepares'] == 4       # one for the outer cursor
+    assert stats['hits'] == 2           # the inner statement is reused
+    assert stats['size'] == 3
+    #
+    # both statements are reused, and 'query' is now the most recently used
+    con.execute(query).fetchall()
+    assert con.statement_cache_stats['hits'] == 3
+    con.execute('SELECT 1').fetchall()
+    assert con.statement_cache_stats['size'] == 3
+    # the oldest statement (CREATE TABLE) was dropped, not 'query'
+    con.execute(query).fetchall()
+    con.execute('SELECT 1').fetchall()
+    stats = con.statement_cache_stats
+    assert stats['hits'] == 5
+    assert stats['prepares'] == 5
+    con.close()
+
+def test_executemany_mixed_types(con):
+    con.execute('CREATE TABLE foo (a, b)')
+    rows = [(1, u'x'), (2.5, None), (None, 3), (2**40, 'y'), (u'\xe9', 1.5)]
+    con.executemany('INSERT INTO foo VALUES (?, ?)', rows)
+    assert con.execute('SELECT * FROM foo').fetchall() == [
+        (1, u'x'), (2.5, None), (None, 3), (2**40, u'y'), (u'\xe9', 1.5)]
+
+def test_executemany_adapter(con):
+    class MyInt(int):
+        pass
+    _sqlite3.register_adapter(MyInt, lambda x: u'my%d' % x)
+    try:
+        con.execute('CREATE TABLE foo (a)')
+        con.executemany('INSERT INTO foo VALUES (?)',
+                        [(1,), (MyInt(2),), (3,)])
+    finally:
+        del _sqlite3.adapters[(MyInt, _sqlite3.PrepareProtocol)]
+    assert con.execute('SELECT * FROM foo').fetchall() == [
+        (1,), (u'my2',), (3,)]
+
+def test_executemany_autocommit(tmpdir):
+    path = str(tmpdir.join('test.db'))
+    con = _sqlite3.connect(path, isolation_level=None)
+    con.execute('CREATE TABLE foo (a UNIQUE)')
+    with pytest.raises(_sqlite3.IntegrityError):
+        con.executemany('INSERT INTO foo VALUES (?)', [(1,), (2,), (1,)])
+    # the rows before the failing one are committed
+    con2 = _sqlite3.connect(path)
+    assert con2.execute('SELECT * FROM foo').fetchall() == [(1,), (2,)]
+    con2.close()
+    con.executemany('INSERT INTO foo VALUES (?)', [(3,), (4,)])
+    con2 = _sqlite3.connect(path)
+    assert con2.execute('SELECT count(*) FROM foo').fetchall() == [(4,)]
+    con2.close()
+    con.close()
+
+@pytest.mark.parametrize('insert', ['INSERT', 'INSERT OR ROLLBACK'])
+def test_executemany_autocommit_failing_row(tmpdir, insert):
+    # like one transaction per row: the rows before the failing one are
+    # kept, even when SQLite rolls back the whole transaction
+    path = str(tmpdir.join('test.db'))
+    con = _sqlite3.connect(path, isolation_level=None)
+    con.execute('CREATE TABLE foo (a UNIQUE)')
+    rows = [(i,) for i in range(2500)] + [(7,), (9999,)]
+    with pytest.raises(_sqlite3.IntegrityError):
+        con.executemany(insert + ' INTO foo VALUES (?)', rows)
+    con2 = _sqlite3.connect(path)
+    assert con2.execute('SELECT count(*), max(a) FROM foo').fetchall() == [
+        (2500, 2499)]
+    con2.close()
+    con.close()
+
+def test_executemany_autocommit_bind_error(tmpdir):
+    path = str(tmpdir.join('test.db'))
+    con = _sqlite3.connect(path, isolation_level=None)
+    con.execute('CREATE TABLE foo (a)')
+    with pytest.raises(_sqlite3.InterfaceError):
+        con.executemany('INSERT INTO foo VALUES (?)',
+                        [(1,), (2,), (object(),), (4,)])
+    con2 = _sqlite3.connect(path)
+    assert con2.execute('SELECT * FROM foo').fetchall() == [(1,), (2,)]
+    con2.close()
+    con.close()
@@ -298,6 +298,20 @@ class _socketobject(object):
         return self._sock.getsockopt(level, optname, buflen)
     getsockopt.__doc__ = _realsocket.getsockopt.__doc__
 
+    if hasattr(_realsocket, 'recvmmsg_into'):
+        def recvmmsg_into(self, buffer, itemsize, count=0, flags=0):
+            return self._sock.recvmmsg_into(buffer, itemsize, count, flags)
+        recvmmsg_into.__doc__ = _realsocket.recvmmsg_into.__doc__
+
+        def sendmmsg(self, messages, flags=0, address=None):
+            return self._sock.sendmmsg(messages, flags, address)
+        sendmmsg.__doc__ = _realsocket.sendmmsg.__doc__
+
+    if hasattr(_realsocket, 'sendfile'):
+        def sendfile(self, file, offset=0, count=None):
+            return self._sock.sendfile(file, offset, count)
+        sendfile.__doc__ = _realsocket.sendfile.__doc__
+
 socket = SocketType = _socketobject
 
 class _fileobject(object):
@@ -107,6 +107,10 @@ _STMT_TYPE_OTHER = 4
 _STMT_TYPE_SELECT = 5
 _STMT_TYPE_INVALID = 6
 
+# PyPy: the number of rows of an executemany() in autocommit mode that are
+# run in the same transaction; see Cursor.__execute()
+_EXECUTEMANY_BATCH = 1000
+
 
 class Error(StandardError):
     pass
@@ -174,25 +178,63 @@ else:
 
 
 class _StatementCache(object):
+    """LRU cache of prepared statements, keyed by the SQL text.  There can
+    be several statements for the same SQL text, e.g. for nested cursors
+    iterating over the same query; 'maxcount' is the total number of
+    statements kept.
+    """
     def __init__(self, connection, maxcount):
         self.connection = connection
         self.maxcount = maxcount
-        self.cache = OrderedDict()
+        self.cache = OrderedDict()    # sql -> list of Statements
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+        self.prepares = 0
 
     def get(self, sql):
         try:
-            stat = self.cache[sql]
+            stats = self.cache.pop(sql)
         except KeyError:
+            stats = []
+            self.misses += 1
+        self.cache[sql] = stats     # move to the end: most recently used
+        for stat in stats:
+            if not stat._in_use:
+                self.hits += 1
+                return stat
+        # no cached statement, or all of them are in use
+        try:
             stat = Statement(self.connection, sql)
-            self.cache[sql] = stat
-            if len(self.cache) > self.maxcount:
-                self.cache.popitem(0)
-        else:
-            if stat._in_use:
-                stat = Statement(self.connection, sql)
-                self.cache[sql] = stat
+        except:
+            if not stats:
+                del self.cache[sql]
+            raise
+        self.prepares += 1
+        stats.append(stat)
+        self.count += 1
+        while self.count > self.maxcount:
+            self._evict_one()
         return stat
 
+    def _evict_one(self):
+        # drop one statement for the least recently used SQL text; if it
+        # is in use, the cursor that uses it keeps it alive until it is
+        # done with it
+        sql = next(iter(self.cache))
+        stats = self.cache[sql]
+        del stats[0]
+        if not stats:
+            del self.cache[sql]
+        self.count -= 1
+
+    def get_stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'prepares': self.prepares,
+                'size': self.count,
+                'maxsize': self.maxcount}
+
 
 class Connection(object):
     __initialized = False
@@ -412,9 +454,11 @@ class Connection(object):
         from sqlite3.dump import _iterdump
         return _iterdump(self)
 
-    def _begin(self):
+    def _begin(self, begin_statement=None):
+        if begin_statement is None:
+            begin_statement = self.__begin_statement
         statement_star = _ffi.new('sqlite3_stmt **')
-        ret = _lib.sqlite3_prepare_v2(self._db, self.__begin_statement, -1,
+        ret = _lib.sqlite3_prepare_v2(self._db, begin_statement, -1,
                                       statement_star, _ffi.NULL)
         try:
             if ret != _lib.SQLITE_OK:
@@ -662,6 +706,11 @@ class Connection(object):
         return _lib.sqlite3_total_changes(self._db)
     total_changes = property(__get_total_changes)
 
+    def __get_statement_cache_stats(self):
+        # PyPy extension: how well the cache of prepared statements works
+        return self._statement_cache.get_stats()
+    statement_cache_stats = property(__get_statement_cache_stats)
+
     def __get_isolation_level(self):
         return self._isolation_level
 
@@ -809,6 +858,8 @@ class Cursor(object):
     def __execute(self, multiple, sql, many_params):
         self.__locked = True
         self._reset = False
+        implicit_transaction = False
+        batch_params = None
         try:
             del self.__next_row
         except AttributeError:
@@ -823,6 +874,22 @@ class Cursor(object):
             self.__rowcount = -1
             self.__statement = self.__connection._statement_cache.get(sql)
 
+            if multiple and (self.__connection._isolation_level is None and
+                             self.__statement._type in (
+                                 _STMT_TYPE_UPDATE,
+                                 _STMT_TYPE_DELETE,
+                                 _STMT_TYPE_INSERT,
+                                 _STMT_TYPE_REPLACE) and
+                             _lib.sqlite3_get_autocommit(
+                                 self.__connection._db)):
+                # PyPy: in autocommit mode, run the rows in transactions
+                # of _EXECUTEMANY_BATCH rows instead of one per row.  If
+                # a row fails, __end_implicit_transaction() keeps the rows
+                # before it, as they would have been.
+                self.__connection._begin(b"BEGIN")
+                implicit_transaction = True
+                batch_params = []
+
             if self.__connection._isolation_level is not None:
                 if self.__statement._type in (
                     _STMT_TYPE_UPDATE,
@@ -840,8 +907,11 @@ class Cursor(object):
                         raise ProgrammingError("You cannot execute SELECT "
                                                "statements in executemany().")
 
+            binders = None
             for params in many_params:
-                self.__statement._set_params(params)
+                if multiple and binders is None:
+                    binders = self.__statement._get_binders(params)
+                self.__statement._set_params(params, binders)
 
                 # Actually execute the SQL statement
 
@@ -885,12 +955,58 @@ class Cursor(object):
 
                 if multiple:
                     self.__statement._reset()
+                    if implicit_transaction:
+                        batch_params.append(params)
+                        if len(batch_params) >= _EXECUTEMANY_BATCH:
+                            self.__connection.commit()
+                            del batch_params[:]
+                            self.__connection._begin(b"BEGIN")
+            if implicit_transaction:
+                self.__connection.commit()
+                implicit_transaction = False
+        except:
+            if not implicit_transaction:
+                raise
+            exc_info = sys.exc_info()
+            self.__end_implicit_transaction(batch_params)
+            raise exc_info[0], exc_info[1], exc_info[2]
         finally:
             self.__connection._in_transaction = \
                 not _lib.sqlite3_get_autocommit(self.__connection._db)
             self.__locked = False
         return self
 
+    def __end_implicit_transaction(self, batch_params):
+        # executemany() failed in the transaction that it started in
+        # autocommit mode.  Keep the rows of 'batch_params', which were
+        # run before the failure, like one transaction per row would have.
+        # This raises nothing: the caller raises the original error again.
+        con = self.__connection
+        if not _lib.sqlite3_get_autocommit(con._db):
+            try:
+                con.commit()
+                return
+            except Error:
+                pass
+            try:
+                con.rollback()
+            except Error:
+                return
+        # SQLite rolled the transaction back, e.g. because of an
+        # "OR ROLLBACK" conflict or SQLITE_FULL: run the rows again, each
+        # in its own transaction
+        statement = self.__statement
+        statement._reset()
+        for params in batch_params:
+            try:
+                statement._set_params(params)
+            except Exception:
+                break
+            ret = _lib.sqlite3_step(statement._statement)
+            statement._reset()
+            if ret != _lib.SQLITE_DONE:
+                break
+
     @__check_cursor_wrap
     def execute(self, sql, params=[]):
         return self.__execute(False, sql, [params])
@@ -1137,11 +1253,51 @@ class Statement(object):
             rc = -1
         return rc
 
-    def _set_params(self, params):
+    def __bind_str(self, statement, idx, param):
+        self.__check_decodable(param)
+        return _lib.sqlite3_bind_text(statement, idx, param, len(param),
+                                      _SQLITE_TRANSIENT)
+
+    def _get_binders(self, params):
+        """For executemany(): pick a function to bind each parameter,
+        from the types of the parameters of the first row.  Returns a list
+        of (type, function) pairs, or an empty list if the parameters are
+        not a tuple or list.
+        """
+        if type(params) not in (tuple, list):
+            return []
+        if (len(params) !=
+                _lib.sqlite3_bind_parameter_count(self._statement)):
+            return []     # _set_params() will complain
+        binders = []
+        for param in params:
+            typ = type(param)
+            bind = _binders.get(typ)
+            if sys.version_info[0] < 3 and typ is str:
+                bind = self.__bind_str
+            if typ in converters or (typ, PrepareProtocol) in adapters:
+                bind = None     # the user registered an adapter
+            binders.append((typ, bind))
+        return binders
+
+    def _set_params(self, params, binders=None):
         self._in_use = True
 
         num_params_needed = _lib.sqlite3_bind_parameter_count(self._statement)
-        if isinstance(params, (tuple, list)) or \
+        if (binders and type(params) in (tuple, list) and
+                len(params) == len(binders)):
+            # fast path: the types are often the same in every row
+            for i in range(len(params)):
+                param = params[i]
+                typ, bind = binders[i]
+                if bind is not None and type(param) is typ:
+                    rc = bind(self._statement, i + 1, param)
+                else:
+                    rc = self.__set_param(i + 1, param)
+                if rc != _lib.SQLITE_OK:
+                    raise InterfaceError("Error binding parameter %d - "
+                                         "probably unsupported type." % i)
+        elif isinstance(params, (tuple, list)) or \
                 not isinstance(params, dict) and \
                 hasattr(params, '__getitem__'):
             try:
@@ -1196,6 +1352,30 @@ class Statement(object):
         return desc
 
 
+def _bind_null(statement, idx, param):
+    return _lib.sqlite3_bind_null(statement, idx)
+
+def _bind_int64(statement, idx, param):
+    return _lib.sqlite3_bind_int64(statement, idx, param)
+
+def _bind_double(statement, idx, param):
+    return _lib.sqlite3_bind_double(statement, idx, param)
+
+def _bind_unicode(statement, idx, param):
+    param = param.encode("utf-8")
+    return _lib.sqlite3_bind_text(statement, idx, param, len(param),
+                                  _SQLITE_TRANSIENT)
+
+# the types for which executemany() can skip the generic __set_param()
+_binders = {
+    type(None): _bind_null,
+    int: _bind_int64,
+    long: _bind_int64,
+    float: _bind_double,
+    unicode: _bind_unicode,
+}
+
+
 class Row(object):
     def __init__(self, cursor, values):
         if not (type(cursor) is Cursor or issubclass(type(cursor), Cursor)):
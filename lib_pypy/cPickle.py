@@ -625,3 +625,48 @@ def load(f):
 def loads(str):
     f = StringIO(str)
     return Unpickler(f).load()
+
+# ____________________________________________________________
+# Use the RPython Pickler and Unpickler of the _pypypickle module when it
+# is available; the pure Python versions above are the fallback.
+
+try:
+    import _pypypickle
+except ImportError:
+    _pypypickle = None
+
+if _pypypickle is not None:
+    PythonUnpickler = Unpickler
+
+    class Pickler(_pypypickle.Pickler):
+        def __init__(self, file=None, protocol=None):
+            if isinstance(file, int) and protocol is None:
+                # Pickler(protocol): the pickle is kept for getvalue()
+                file, protocol = None, file
+            _pypypickle.Pickler.__init__(self, protocol or 0)
+            if file is not None:
+                self.__write = file.write
+            else:
+                self.__write = None
+
+        def dump(self, obj):
+            _pypypickle.Pickler.dump(self, obj)
+            if self.__write is not None:
+                self.__write(self.getvalue())
+            return self
+
+    class Unpickler(_pypypickle.Unpickler):
+        pass
+
+    @builtinify
+    def dumps(obj, protocol=None):
+        if protocol > HIGHEST_PROTOCOL:
+            # use cPickle error message, not pickle.py one
+            raise ValueError("pickle protocol %d asked for; "
+                         "the highest available protocol is %d" % (
+                         protocol, HIGHEST_PROTOCOL))
+        return Pickler(None, protocol).dump(obj).getvalue()
+
+    @builtinify
+    def loads(str):
+        return _pypypickle.loads(Unpickler, str)
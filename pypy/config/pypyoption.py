@@ -36,7 +36,7 @@ working_modules.update([
     "cStringIO", "thread", "itertools", "pyexpat", "cpyext", "array",
     "binascii", "_multiprocessing", '_warnings', "_collections",
     "_multibytecodec", "micronumpy", "_continuation", "_cffi_backend",
-    "_csv", "_cppyy", "_pypyjson", "_jitlog",
+    "_csv", "_cppyy", "_pypyjson", "_pypypickle", "_jitlog",
     # "_hashlib", "crypt"
 ])
 
@@ -45,6 +45,10 @@ if rpython.rlib.rvmprof.cintf.IS_SUPPORTED:
     working_modules.add('_vmprof')
     working_modules.add('faulthandler')
 
+import rpython.rlib.rio_uring
+if rpython.rlib.rio_uring.IS_SUPPORTED:
+    working_modules.add('_io_uring')
+
 translation_modules = default_modules.copy()
 translation_modules.update([
     "fcntl", "time", "select", "signal", "_rawffi", "zlib", "struct", "_md5",
@@ -45,6 +45,8 @@ PYTHONIOENCODING: Encoding[:errors] used for stdin/stdout/stderr.
 PYPY_IRC_TOPIC: if set to a non-empty value, print a random #pypy IRC
                topic at startup of interactive mode.
 PYPYLOG: If set to a non-empty value, enable logging.
+PYPY_JIT_WARMUP_PROFILE: file that records the loops compiled by the JIT,
+               and makes the next runs compile them immediately.
 """
 
 try:
@@ -597,6 +599,13 @@ def run_command_line(interactive,
     mainmodule = type(sys)('__main__')
     sys.modules['__main__'] = mainmodule
 
+    # before 'import site', so that the profile applies to its code objects
+    warmup_profile = not ignore_environment and os.getenv(
+        'PYPY_JIT_WARMUP_PROFILE')
+    if warmup_profile and 'pypyjit' in sys.builtin_module_names:
+        import pypyjit
+        pypyjit.warmup_profile(warmup_profile)
+
     if not no_site:
         try:
             import site
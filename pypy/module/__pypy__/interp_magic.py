@@ -226,6 +226,47 @@ def pyos_inputhook(space):
     from pypy.module.cpyext.api import invoke_pyos_inputhook
     invoke_pyos_inputhook(space)
 
+@unwrap_spec(reset=bool)
+def cpyext_stats(space, reset=False):
+    """Return the counters of cpyext_stats_enable() as a dict
+    {module name: {counter name: value}}, where 'api_calls' is itself a
+    dict {C API function: number of calls}.  If 'reset' is True, the
+    counters are cleared afterwards."""
+    if not space.config.objspace.usemodules.cpyext:
+        return space.newdict()
+    from pypy.module.cpyext.stats import CpyextStats
+    stats = space.fromcache(CpyextStats)
+    w_result = stats.wrap()
+    if reset:
+        stats.reset()
+    return w_result
+
+@unwrap_spec(enabled=bool)
+def cpyext_stats_enable(space, enabled):
+    """Start or stop counting the calls to the C API functions, and the
+    PyObjects allocated, realized, linked and freed by cpyext.  The counts
+    are attributed to the extension module whose function is running."""
+    if not space.config.objspace.usemodules.cpyext:
+        raise oefmt(space.w_RuntimeError, "cpyext is not enabled")
+    from pypy.module.cpyext.stats import CpyextStats
+    space.fromcache(CpyextStats).enabled = enabled
+
+def mmap_read(space, w_file):
+    """Make a file opened with open(path, 'rb') or open(path, 'r') read
+    through a memory mapping of the whole file, instead of read() system
+    calls into its buffer.  Returns True if it worked, and False if the file
+    can't be mapped, e.g. if it is not a regular file or if the buffer is
+    not a plain BufferedReader.  The file must not be changed while it is
+    mapped."""
+    from pypy.module._io.interp_bufferedio import W_BufferedReader
+    from pypy.module._io.interp_textio import W_TextIOWrapper
+    if isinstance(w_file, W_TextIOWrapper):
+        w_file._check_attached(space)
+        w_file = w_file.w_buffer
+    if not isinstance(w_file, W_BufferedReader):
+        return space.w_False
+    return space.newbool(w_file.use_mmap(space))
+
 def utf8content(space, w_u):
     """ Given a unicode string u, return it's internal byte representation.
     Useful for debugging only. """
@@ -117,6 +117,9 @@ class Module(MixedModule):
         'side_effects_ok'           : 'interp_magic.side_effects_ok',
         'stack_almost_full'         : 'interp_magic.stack_almost_full',
         'pyos_inputhook'            : 'interp_magic.pyos_inputhook',
+        'cpyext_stats'              : 'interp_magic.cpyext_stats',
+        'cpyext_stats_enable'       : 'interp_magic.cpyext_stats_enable',
+        'mmap_read'                 : 'interp_magic.mmap_read',
         'newmemoryview'             : 'interp_buffer.newmemoryview',
         'utf8content'               : 'interp_magic.utf8content',
     }
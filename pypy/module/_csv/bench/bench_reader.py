@@ -0,0 +1,73 @@
+""" Time csv.reader over a big file, row by row and with readcolumns():
+
+    pypy bench_reader.py [megabytes]
+
+The default is a 64 MB file of 8 unquoted columns, written in a temporary
+directory, plus the same data with every text field quoted.  Prints the
+throughput in MB/s.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+def make_file(path, size, quoting):
+    total = 0
+    i = 0
+    with open(path, 'wb') as f:
+        w = csv.writer(f, quoting=quoting)
+        while total < size:
+            row = [i, 'name%d' % (i,), i * 0.5, 'some text', i % 7, 'x',
+                   -i, 'end']
+            w.writerow(row)
+            total += 60
+            i += 1
+    return i
+
+def read_rows(path):
+    count = 0
+    with open(path, 'rb') as f:
+        for row in csv.reader(f):
+            count += 1
+    return count
+
+def read_columns(path):
+    count = 0
+    with open(path, 'rb') as f:
+        r = csv.reader(f)
+        while True:
+            columns = r.readcolumns(10000)
+            if not columns:
+                return count
+            count += len(columns[0])
+
+def main(megabytes):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'data.csv')
+    tests = [('rows', read_rows),
+             ('columns', read_columns)]
+    try:
+        for quoting in [csv.QUOTE_MINIMAL, csv.QUOTE_NONNUMERIC]:
+            nrows = make_file(path, megabytes * 1024 * 1024, quoting)
+            mb = os.path.getsize(path) / (1024.0 * 1024.0)
+            for name, func in tests:
+                func(path)    # warm-up
+                t0 = time.time()
+                count = func(path)
+                t1 = time.time()
+                assert count == nrows
+                print '%-8s %-8s %8.1f MB/s' % (
+                    'quoted' if quoting == csv.QUOTE_NONNUMERIC else 'plain',
+                    name, mb / (t1 - t0))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    megabytes = 64
+    if len(sys.argv) > 1:
+        megabytes = int(sys.argv[1])
+    main(megabytes)
@@ -1,4 +1,7 @@
 from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstring import ParseStringError, ParseStringOverflowError
+from rpython.rlib.rarithmetic import string_to_int
+from rpython.rlib.rfloat import string_to_float
 from rpython.rlib import objectmodel
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
@@ -22,6 +25,7 @@ class W_Reader(W_Root):
         self.dialect = dialect
         self.w_iter = w_iter
         self.line_num = 0
+        self.numeric_columns = False    # see readcolumns_w()
 
     def iter_w(self):
         return self
@@ -40,22 +44,83 @@ class W_Reader(W_Root):
         field_builder.append(c)
 
     def save_field(self, field_builder):
+        self.save_field_string(field_builder.build())
+
+    def save_field_string(self, field):
         space = self.space
-        field = field_builder.build()
         if self.numeric_field:
-            from rpython.rlib.rstring import ParseStringError
-            from rpython.rlib.rfloat import string_to_float
             self.numeric_field = False
-            try:
-                ff = string_to_float(field)
-            except ParseStringError as e:
-                raise wrap_parsestringerror(space, e, space.newtext(field))
-            w_obj = space.newfloat(ff)
+            w_obj = self.parse_number(field)
         else:
             w_obj = space.newtext(field)
         self.fields_w.append(w_obj)
 
+    def parse_number(self, field):
+        space = self.space
+        if self.numeric_columns:
+            try:
+                return space.newint(string_to_int(field))
+            except ParseStringOverflowError:
+                return space.call_function(space.w_int, space.newtext(field))
+            except ParseStringError:
+                pass    # try a float
+        try:
+            ff = string_to_float(field)
+        except ParseStringError as e:
+            raise wrap_parsestringerror(space, e, space.newtext(field))
+        return space.newfloat(ff)
+
+    def parse_simple_line(self, line):
+        """Fast path for a line that is a whole record of plain fields:
+        no quotes, escapes or NULL bytes, and no end of line except at the
+        end.  The fields are sliced out of the line instead of going char
+        by char through the state machine of next_fields().  Returns False,
+        having done nothing, if the line is not that simple."""
+        dialect = self.dialect
+        skipspace = dialect.skipinitialspace
+        delimiter = dialect.delimiter
+        if skipspace and delimiter == ' ':
+            return False
+        end = len(line)
+        if end > 0 and line[end - 1] == '\n':
+            end -= 1
+        if end > 0 and line[end - 1] == '\r':
+            end -= 1
+        if end == 0:
+            return False
+        quotechar = dialect.quotechar
+        if dialect.quoting == QUOTE_NONE:
+            quotechar = '\0'
+        escapechar = dialect.escapechar
+        for i in range(end):
+            c = line[i]
+            if (c == '\n' or c == '\r' or c == '\0' or c == quotechar or
+                    c == escapechar):
+                return False
+        numeric = (dialect.quoting == QUOTE_NONNUMERIC or
+                   self.numeric_columns)
+        start = 0
+        while True:
+            stop = line.find(delimiter, start, end)
+            if stop < 0:
+                stop = end
+            field_start = start
+            if skipspace:
+                while field_start < stop and line[field_start] == ' ':
+                    field_start += 1
+            assert field_start >= 0
+            if stop - field_start > field_limit.limit:
+                raise self.error("field larger than field limit")
+            self.numeric_field = numeric and field_start < stop
+            self.save_field_string(line[field_start:stop])
+            if stop == end:
+                return True
+            start = stop + 1
+
     def next_w(self):
+        return self.space.newlist(self.next_fields())
+
+    def next_fields(self):
         space = self.space
         dialect = self.dialect
         self.fields_w = []
@@ -80,6 +145,8 @@ class W_Reader(W_Root):
                 raise
             self.line_num += 1
             line = space.text_w(w_line)
+            if state == START_RECORD and self.parse_simple_line(line):
+                break
             for c in line:
                 if c == '\0':
                     raise self.error("line contains NULL byte")
@@ -114,7 +181,8 @@ class W_Reader(W_Root):
                         self.save_field(field_builder)
                     else:
                         # begin new unquoted field
-                        if dialect.quoting == QUOTE_NONNUMERIC:
+                        if (dialect.quoting == QUOTE_NONNUMERIC or
+                                self.numeric_columns):
                             self.numeric_field = True
                         self.add_char(field_builder, c)
                         state = IN_FIELD
@@ -209,9 +277,48 @@ class W_Reader(W_Root):
             else:
                 break
         #
-        w_result = space.newlist(self.fields_w)
+        fields_w = self.fields_w
         self.fields_w = None
-        return w_result
+        return fields_w
+
+    @unwrap_spec(maxrows=int, numeric=bool)
+    def readcolumns_w(self, maxrows=1000, numeric=False):
+        """readcolumns(maxrows=1000, numeric=False) -> list of columns
+
+        Read up to 'maxrows' rows, and return them as one list per column
+        instead of one list per row.  Empty rows are skipped; the other rows
+        must all have the same number of fields.  With 'numeric', each
+        unquoted field that is not empty is converted to an int, or else to
+        a float (ValueError if it is neither).  Returns an empty list at the
+        end of the input."""
+        space = self.space
+        if maxrows <= 0:
+            raise oefmt(space.w_ValueError, "maxrows must be positive")
+        columns = []
+        nrows = 0
+        self.numeric_columns = numeric
+        try:
+            while nrows < maxrows:
+                try:
+                    fields_w = self.next_fields()
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                if not fields_w:
+                    continue
+                if nrows == 0:
+                    columns = [[w_field] for w_field in fields_w]
+                elif len(fields_w) != len(columns):
+                    raise self.error("%d fields in a row, expected %d" % (
+                        len(fields_w), len(columns)))
+                else:
+                    for i in range(len(columns)):
+                        columns[i].append(fields_w[i])
+                nrows += 1
+        finally:
+            self.numeric_columns = False
+        return space.newlist([space.newlist(column) for column in columns])
 
 
 def csv_reader(space, w_iterator, w_dialect=None,
@@ -251,6 +358,7 @@ W_Reader.typedef = TypeDef(
             wrapfn="newint"),
         __iter__ = interp2app(W_Reader.iter_w),
         next = interp2app(W_Reader.next_w),
+        readcolumns = interp2app(W_Reader.readcolumns_w),
         __doc__ = """CSV reader
 
 Reader objects are responsible for reading and parsing tabular data
@@ -8,6 +8,9 @@ from pypy.module._csv.interp_csv import _build_dialect
 from pypy.module._csv.interp_csv import (QUOTE_MINIMAL, QUOTE_ALL,
                                          QUOTE_NONNUMERIC, QUOTE_NONE)
 
+# writerows() calls the file's write() with chunks of about this size
+WRITEROWS_CHUNK_SIZE = 64 * 1024
+
 
 class W_Writer(W_Root):
     def __init__(self, space, dialect, w_fileobj):
@@ -33,9 +36,17 @@ class W_Writer(W_Root):
         """Construct and write a CSV record from a sequence of fields.
         Non-string elements will be converted to string."""
         space = self.space
+        rec = StringBuilder(80)
+        self.build_row(rec, w_fields)
+        line = rec.build()
+        return space.call_function(self.w_filewrite, space.newtext(line))
+
+    def build_row(self, rec, w_fields):
+        """Append the CSV record of a sequence of fields, with its line
+        terminator, to the StringBuilder 'rec'."""
+        space = self.space
         fields_w = space.listview(w_fields)
         dialect = self.dialect
-        rec = StringBuilder(80)
         #
         for field_index in range(len(fields_w)):
             w_field = fields_w[field_index]
@@ -114,22 +125,40 @@ class W_Writer(W_Root):
         # Add line terminator
         rec.append(dialect.lineterminator)
 
-        line = rec.build()
-        return space.call_function(self.w_filewrite, space.newtext(line))
-
     def writerows(self, w_seqseq):
         """Construct and write a series of sequences to a csv file.
         Non-string elements will be converted to string."""
         space = self.space
         w_iter = space.iter(w_seqseq)
+        # the records are collected and written in chunks; if a row fails,
+        # the complete records before it are still written
+        rec = StringBuilder(WRITEROWS_CHUNK_SIZE)
+        complete = 0
         while True:
             try:
                 w_seq = space.next(w_iter)
+                self.build_row(rec, w_seq)
             except OperationError as e:
-                if e.match(space, space.w_StopIteration):
-                    break
-                raise
-            self.writerow(w_seq)
+                if not e.match(space, space.w_StopIteration):
+                    # but not if the error comes from writing a chunk
+                    self.write_chunk(rec, complete)
+                    raise
+                break
+            complete = rec.getlength()
+            if complete >= WRITEROWS_CHUNK_SIZE:
+                self.write_chunk(rec, complete)
+                rec = StringBuilder(WRITEROWS_CHUNK_SIZE)
+                complete = 0
+        self.write_chunk(rec, complete)
+
+    def write_chunk(self, rec, length):
+        # write the first 'length' characters of 'rec'
+        if length > 0:
+            chunk = rec.build()
+            if length < len(chunk):
+                chunk = chunk[:length]
+            space = self.space
+            space.call_function(self.w_filewrite, space.newtext(chunk))
 
 
 def csv_writer(space, w_fileobj, w_dialect=None,
@@ -104,3 +104,43 @@ class AppTestReader(object):
         self._read_test(['a,"'], 'Error', strict=True)
         self._read_test(['"a'], 'Error', strict=True)
         self._read_test(['^'], 'Error', escapechar='^', strict=True)
+
+    def test_read_simple_lines(self):
+        import _csv as csv
+        self._read_test(['a,b,c\r\n', '\n', ',x,\n', 'd,"e\n', 'f",g\n'],
+                        [['a', 'b', 'c'], [], ['', 'x', ''],
+                         ['d', 'e\nf', 'g']])
+        self._read_test(['a, b,  ,c'], [['a', 'b', '', 'c']],
+                        skipinitialspace=True)
+        self._read_test(['a  b  c'], [['a', '', 'b', '', 'c']],
+                        delimiter=' ')
+        self._read_test(['a  b  c'], [['a', 'b', 'c']],
+                        delimiter=' ', skipinitialspace=True)
+        self._read_test(['1,,2.5, 3\n'], [[1.0, '', 2.5, 3.0]],
+                        quoting=csv.QUOTE_NONNUMERIC)
+        self._read_test(['a,b\nc'], 'Error')
+        self._read_test(['a,b\rc'], 'Error')
+
+    def test_readcolumns(self):
+        import _csv as csv
+        r = csv.reader(['a,b,c\n', '1,2.5,x\n', '\n', '"3",4,\n', '5,6,7'])
+        assert r.readcolumns(2) == [['a', '1'], ['b', '2.5'], ['c', 'x']]
+        assert r.line_num == 2
+        assert r.readcolumns() == [['3', '5'], ['4', '6'], ['', '7']]
+        assert r.readcolumns() == []
+        raises(ValueError, r.readcolumns, 0)
+        #
+        r = csv.reader(['1,2.5,"3"', '-7, 1e3,', '%d,0,' % (2 ** 70,)])
+        columns = r.readcolumns(numeric=True)
+        assert columns == [[1, -7, 2 ** 70], [2.5, 1000.0, 0], ['3', '', '']]
+        assert type(columns[0][0]) is int
+        assert type(columns[1][2]) is int
+        r = csv.reader(['1,2', 'x,3'])
+        raises(ValueError, r.readcolumns, numeric=True)
+        r = csv.reader(['1,2', '1,2', '3'])
+        exc = raises(csv.Error, r.readcolumns)
+        assert str(exc.value) == "line 3: 1 fields in a row, expected 2"
+        r = csv.reader(['1,2'], quoting=csv.QUOTE_NONNUMERIC)
+        assert r.readcolumns(numeric=True) == [[1], [2]]
+        assert csv.reader(['1,2'], quoting=csv.QUOTE_NONNUMERIC).next() == [
+            1.0, 2.0]
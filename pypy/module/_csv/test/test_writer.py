@@ -85,3 +85,54 @@ class AppTestWriter(object):
 
     def test_writerows(self):
         self._write_test([['a'],['b','c']], 'a\r\nb,c')
+
+    def test_writerows_chunks(self):
+        import _csv as csv
+        writes = []
+        class File(object):
+            def write(self, s):
+                writes.append(s)
+        w = csv.writer(File(), lineterminator='\n')
+        w.writerows([['a', 1], ['b', 'c,d']] * 3)
+        assert writes == ['a,1\nb,"c,d"\n' * 3]
+        del writes[:]
+        w.writerows([])
+        w.writerows([[]] * 3)
+        assert writes == ['\n\n\n']
+        del writes[:]
+        rows = [[str(i) * 1000] for i in range(200)]
+        w.writerows(rows)
+        assert 1 < len(writes) < 10
+        assert ''.join(writes) == ''.join([row[0] + '\n' for row in rows])
+        #
+        class BadItem:
+            def __str__(self):
+                raise IOError
+        del writes[:]
+        raises(IOError, w.writerows, [['a'], ['b', BadItem()], ['c']])
+        assert writes == ['a\n']
+        del writes[:]
+        w2 = csv.writer(File(), lineterminator='\n', quoting=csv.QUOTE_NONE)
+        raises(csv.Error, w2.writerows, [['a'], ['b'], ['']])
+        assert writes == ['a\nb\n']
+        del writes[:]
+        def rows():
+            yield ['a']
+            yield ['b']
+            raise ValueError
+        raises(ValueError, w.writerows, rows())
+        assert writes == ['a\nb\n']
+        #
+        class FailingFile(object):
+            def write(self, s):
+                writes.append(s)
+                raise IOError("disk full")
+        del writes[:]
+        w3 = csv.writer(FailingFile(), lineterminator='\n')
+        rows = [[str(i) * 1000] for i in range(200)]
+        exc = raises(IOError, w3.writerows, rows)
+        assert str(exc.value) == "disk full"
+        # the rejected chunk is not written a second time
+        assert len(writes) == 1
+        assert writes[0] == ''.join([row[0] + '\n' for row in rows])[
+            :len(writes[0])]
@@ -0,0 +1,69 @@
+""" Time 'for line in open(path)' over a big text file:
+
+    pypy bench_lines.py [megabytes]
+
+The default is a 64 MB file of log-like lines, written in a temporary
+directory.  Each encoding is read twice: with errors='strict', which
+TextIOWrapper decodes itself from the buffer of the BufferedReader, and
+with errors='surrogateescape', which goes through the codec's incremental
+decoder.  Prints the throughput in MB/s.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from io import open
+
+TESTS = [
+    ('ascii', 'ascii', u''),
+    ('utf-8 ascii', 'utf-8', u''),
+    ('utf-8', 'utf-8', u' caf\xe9 \u20ac'),
+    ('latin-1', 'latin-1', u' caf\xe9'),
+]
+
+def make_file(path, size, encoding, extra):
+    line = (u'2026-10-18 12:00:00 INFO worker-3 request handled in 12 ms,'
+            u' status ok%s, user %%d\n' % (extra,))
+    total = 0
+    i = 0
+    with open(path, 'w', encoding=encoding) as f:
+        while total < size:
+            s = line % (i,)
+            f.write(s)
+            total += len(s)
+            i += 1
+    return i
+
+def read_lines(path, encoding, errors):
+    count = 0
+    with open(path, encoding=encoding, errors=errors) as f:
+        for line in f:
+            count += 1
+    return count
+
+def main(megabytes):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'lines.txt')
+    try:
+        for name, encoding, extra in TESTS:
+            nlines = make_file(path, megabytes * 1024 * 1024, encoding, extra)
+            mb = os.path.getsize(path) / (1024.0 * 1024.0)
+            for errors in ['strict', 'surrogateescape']:
+                read_lines(path, encoding, errors)    # warm-up
+                t0 = time.time()
+                count = read_lines(path, encoding, errors)
+                t1 = time.time()
+                assert count == nlines
+                print('%-12s %-16s %8.1f MB/s' % (name, errors,
+                                                  mb / (t1 - t0)))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    megabytes = 64
+    if len(sys.argv) > 1:
+        megabytes = int(sys.argv[1])
+    main(megabytes)
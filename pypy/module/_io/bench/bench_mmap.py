@@ -0,0 +1,83 @@
+""" Time reading a big binary file with and without __pypy__.mmap_read():
+
+    pypy bench_mmap.py [megabytes]
+
+The default is a 256 MB file of lines, written in a temporary directory.
+The file is read line by line, in blocks of 64 KB with read() and with
+readinto(), both ways.  Prints the throughput in MB/s.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import __pypy__
+
+BLOCK = 64 * 1024
+
+def make_file(path, size):
+    line = b'%08d some record data, separated by commas, 1.5, 2.5, 3.5\n'
+    total = 0
+    i = 0
+    with open(path, 'wb') as f:
+        while total < size:
+            s = line % (i,)
+            f.write(s)
+            total += len(s)
+            i += 1
+
+def read_lines(f):
+    count = 0
+    for line in f:
+        count += 1
+    return count
+
+def read_blocks(f):
+    count = 0
+    while True:
+        data = f.read(BLOCK)
+        if not data:
+            return count
+        count += len(data)
+
+def readinto_blocks(f):
+    count = 0
+    buf = bytearray(BLOCK)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            return count
+        count += n
+
+def run(path, func, mmap):
+    with open(path, 'rb') as f:
+        if mmap:
+            assert __pypy__.mmap_read(f)
+        return func(f)
+
+def main(megabytes):
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'data.bin')
+    try:
+        make_file(path, megabytes * 1024 * 1024)
+        mb = os.path.getsize(path) / (1024.0 * 1024.0)
+        for func in [read_lines, read_blocks, readinto_blocks]:
+            for mmap in [False, True]:
+                run(path, func, mmap)    # warm-up
+                t0 = time.time()
+                run(path, func, mmap)
+                t1 = time.time()
+                print('%-16s %-7s %8.1f MB/s' % (func.__name__,
+                                                 'mmap' if mmap else 'read',
+                                                 mb / (t1 - t0)))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    megabytes = 256
+    if len(sys.argv) > 1:
+        megabytes = int(sys.argv[1])
+    main(megabytes)
@@ -1,5 +1,7 @@
 from __future__ import with_statement
 
+import os, stat
+
 from rpython.rlib.signature import signature
 from rpython.rlib import types
 
@@ -9,15 +11,18 @@ from pypy.interpreter.typedef import (
 from pypy.interpreter.gateway import interp2app, unwrap_spec, WrappedDefault
 from pypy.interpreter.buffer import SimpleView
 
-from rpython.rlib.buffer import ByteBuffer, RawByteBuffer, SubBuffer
+from rpython.rlib.buffer import ByteBuffer, RawByteBuffer, RawBuffer, SubBuffer
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.rarithmetic import r_longlong, intmask
-from rpython.rlib import rposix
+from rpython.rlib.objectmodel import keepalive_until_here
+from rpython.rlib import rposix, rmmap
+from rpython.rtyper.lltypesystem import rffi
 from rpython.tool.sourcetools import func_renamer
 from pypy.module._io.interp_iobase import (
     W_IOBase, DEFAULT_BUFFER_SIZE, convert_size, trap_eintr,
     check_readable_w, check_writable_w, check_seekable_w)
 from pypy.module._io.interp_io import W_BlockingIOError
+from pypy.module._io.interp_fileio import W_FileIO
 from rpython.rlib import rthread
 
 STATE_ZERO, STATE_OK, STATE_DETACHED = range(3)
@@ -64,6 +69,29 @@ class TryLock(object):
 class BlockingIOError(Exception):
     pass
 
+class MMapReadBuffer(RawBuffer):
+    """The buffer of a BufferedReader in mmap read mode: the whole file,
+    mapped read-only."""
+    _immutable_ = True
+
+    def __init__(self, mmap):
+        self.mmap = mmap
+        self.readonly = True
+
+    def getlength(self):
+        return self.mmap.size
+
+    def getitem(self, index):
+        return self.mmap.data[index]
+
+    def getslice(self, start, step, size):
+        if step == 1:
+            return self.mmap.getslice(start, size)
+        return RawBuffer.getslice(self, start, step, size)
+
+    def get_raw_address(self):
+        return self.mmap.data
+
 class W_BufferedIOBase(W_IOBase):
     def _unsupportedoperation(self, space, message):
         w_exc = space.getattr(space.getbuiltinmodule('_io'),
@@ -137,6 +165,9 @@ class BufferedMixin:
 
         self.lock = None
 
+        self.mmap = None    # The rmmap.MMap in mmap read mode, see
+                            # W_BufferedReader.use_mmap()
+
         self.readable = False
         self.writable = False
 
@@ -152,15 +183,9 @@ class BufferedMixin:
             raise oefmt(space.w_ValueError,
                         "buffer size must be strictly positive")
 
-        if space.config.translation.split_gc_address_space:
-            # When using split GC address space, it is not possible to get the
-            # raw address of a GC buffer. Therefore we use a buffer backed by
-            # raw memory.
-            self.buffer = RawByteBuffer(self.buffer_size)
-        else:
-            # TODO: test whether using the raw buffer is faster
-            self.buffer = ByteBuffer(self.buffer_size)
-
+        if self.mmap is not None:
+            self._mmap_stop(space)
+        self.buffer = self._alloc_buffer(space)
         self.lock = TryLock(space)
 
         try:
@@ -168,6 +193,16 @@ class BufferedMixin:
         except OperationError:
             pass
 
+    def _alloc_buffer(self, space):
+        if space.config.translation.split_gc_address_space:
+            # When using split GC address space, it is not possible to get the
+            # raw address of a GC buffer. Therefore we use a buffer backed by
+            # raw memory.
+            return RawByteBuffer(self.buffer_size)
+        else:
+            # TODO: test whether using the raw buffer is faster
+            return ByteBuffer(self.buffer_size)
+
     def _check_init(self, space):
         if self.state == STATE_ZERO:
             raise oefmt(space.w_ValueError,
@@ -248,6 +283,8 @@ class BufferedMixin:
 
     def tell_w(self, space):
         self._check_init(space)
+        if self.mmap is not None:
+            return space.newint(self.pos)
         pos = self._raw_tell(space) - self._raw_offset()
         return space.newint(pos)
 
@@ -258,6 +295,20 @@ class BufferedMixin:
             raise oefmt(space.w_ValueError,
                         "whence must be between 0 and 2, not %d", whence)
         self._check_closed(space, "seek of closed file")
+        if self.mmap is not None:
+            if whence == 0:
+                target = pos
+            elif whence == 1:
+                target = self.pos + pos
+            else:
+                target = self.read_end + pos
+            if 0 <= target <= self.read_end:
+                self.pos = intmask(target)
+                return space.newint(target)
+            # out of the file: leave the mmap read mode, and let the raw
+            # stream complain or seek past the end
+            with self.lock:
+                self._mmap_leave(space)
         if whence != 2 and self.readable:
             # Check if seeking leaves us inside the current buffer, so as to
             # return quickly if possible. Also, we needn't take the lock in
@@ -313,6 +364,8 @@ class BufferedMixin:
             space.call_method(self, "flush")
         finally:
             with self.lock:
+                if self.mmap is not None:
+                    self._mmap_stop(space)
                 space.call_method(self.w_raw, "close")
 
     def simple_flush_w(self, space):
@@ -372,6 +425,9 @@ class BufferedMixin:
 
     def detach_w(self, space):
         self._check_init(space)
+        if self.mmap is not None:
+            with self.lock:
+                self._mmap_leave(space)
         space.call_method(self, "flush")
         w_raw = self.w_raw
         self.w_raw = None
@@ -386,6 +442,8 @@ class BufferedMixin:
     def truncate_w(self, space, w_size):
         self._check_init(space)
         with self.lock:
+            if self.mmap is not None:
+                self._mmap_leave(space)
             if self.writable:
                 self._flush_and_rewind_unlocked(space)
             # invalidate cached position
@@ -401,6 +459,8 @@ class BufferedMixin:
         self._check_closed(space, "read of closed file")
         size = convert_size(space, w_size)
 
+        if self.mmap is not None and size >= -1:
+            return space.newbytes(self._mmap_read(size))
         if size == -1:
             # read until the end of stream
             with self.lock:
@@ -429,6 +489,10 @@ class BufferedMixin:
             # Therefore, we either return `have` bytes (if > 0), or a full
             # buffer.
             have = self._readahead()
+            if self.mmap is not None:
+                # a buffer-sized view, not the rest of the file
+                have = min(have, self.buffer_size)
+                return space.newbytes(self.buffer[self.pos:self.pos+have])
             if have > 0:
                 data = self.buffer[self.pos:self.pos+have]
                 return space.newbytes(data)
@@ -452,6 +516,8 @@ class BufferedMixin:
             raise oefmt(space.w_ValueError, "read length must be positive")
         if size == 0:
             return space.newbytes("")
+        if self.mmap is not None:
+            return space.newbytes(self._mmap_read(size))
 
         with self.lock:
             # Return up to n bytes.  If at least one byte is buffered, we only
@@ -550,6 +616,32 @@ class BufferedMixin:
             self.read_end = self.raw_pos = start + size
         return size
 
+    def _fill_buffer_keep(self, space):
+        """Read more bytes from the raw stream after the ones that are
+        buffered and not read yet, which stay in self.buffer[self.pos:].
+        Returns the number of new bytes, 0 at EOF or if the raw stream
+        would block, and -1 if the buffer is full.  Used by TextIOWrapper,
+        which decodes directly from self.buffer."""
+        # Must run with the lock held!
+        if self.mmap is not None:
+            return 0     # self.buffer is the whole file already
+        have = self._readahead()
+        if have == self.buffer_size:
+            return -1
+        if have == 0:
+            self._reader_reset_buf()
+            self.pos = 0
+        elif self.read_end == self.buffer_size:
+            # no room left: move the unread bytes to the start
+            for i in range(have):
+                self.buffer.setitem(i, self.buffer.getitem(self.pos + i))
+            self.pos = 0
+            self.read_end = self.raw_pos = have
+        try:
+            return self._fill_buffer(space)
+        except BlockingIOError:
+            return 0
+
     def _read_generic(self, space, n):
         """Generic read function: read from the stream until enough bytes are
            read, or until an EOF occurs or until read() would block."""
@@ -647,7 +739,8 @@ class BufferedMixin:
             w_res = space.newbytes(self.buffer[self.pos:pos+1])
             self.pos = pos + 1
             return w_res
-        if have == limit:
+        if have == limit or self.mmap is not None:
+            # (in mmap read mode, a last line without '\n')
             w_res = space.newbytes(self.buffer[self.pos:self.pos+have])
             self.pos += have
             return w_res
@@ -826,6 +919,39 @@ class BufferedMixin:
             finally:
                 self._reader_reset_buf()
 
+    # ____________________________________________________
+    # mmap read mode, see W_BufferedReader.use_mmap()
+
+    def _mmap_read(self, size):
+        """Read up to 'size' bytes, or all the rest of the file if 'size'
+        is -1, from the mapping.  Like _read_fast(), this can run
+        unlocked."""
+        have = self._readahead()
+        if size < 0 or size > have:
+            size = have
+        endpos = self.pos + size
+        res = self.buffer[self.pos:endpos]
+        self.pos = endpos
+        return res
+
+    def _mmap_stop(self, space):
+        # Must run with the lock held, if there is one!
+        mmap = self.mmap
+        self.mmap = None
+        self.buffer = self._alloc_buffer(space)
+        self._reader_reset_buf()
+        self.pos = 0
+        self.raw_pos = 0
+        mmap.close()
+
+    def _mmap_leave(self, space):
+        """Go back to reading with system calls, from the current
+        position."""
+        # Must run with the lock held!
+        pos = self.pos
+        self._mmap_stop(space)
+        self._raw_seek(space, pos, 0)
+
 class W_BufferedReader(BufferedMixin, W_BufferedIOBase):
     @unwrap_spec(buffer_size=int)
     def descr_init(self, space, w_raw, buffer_size=DEFAULT_BUFFER_SIZE):
@@ -840,6 +966,69 @@ class W_BufferedReader(BufferedMixin, W_BufferedIOBase):
         self._reader_reset_buf()
         self.state = STATE_OK
 
+    def use_mmap(self, space):
+        """Switch to the mmap read mode: the whole file is mapped in memory,
+        and read(), read1(), readinto(), readline() and peek() copy from the
+        mapping, without system calls.  Only possible on a regular file,
+        opened with FileIO for reading only.  Returns False, and changes
+        nothing, if the file can't be mapped.
+
+        The file should not be modified while it is mapped: the reads don't
+        see new data, and truncating it can crash the process (SIGBUS)."""
+        self._check_closed(space, "mmap of closed file")
+        if self.mmap is not None:
+            return True
+        w_raw = self.w_raw
+        if (type(self) is not W_BufferedReader or
+                type(w_raw) is not W_FileIO or
+                not w_raw.readable or w_raw.writable or w_raw.fd < 0):
+            return False
+        try:
+            st = os.fstat(w_raw.fd)
+        except OSError:
+            return False
+        if not stat.S_ISREG(st.st_mode) or st.st_size <= 0:
+            return False
+        with self.lock:
+            pos = self._raw_tell(space) - self._raw_offset()
+            try:
+                mmap = rmmap.mmap(w_raw.fd, 0, access=rmmap.ACCESS_READ)
+            except (OSError, rmmap.RMMapError):
+                return False
+            size = mmap.size
+            if pos > size:
+                mmap.close()
+                return False
+            # the raw stream stays at the end of the mapping
+            try:
+                self._raw_seek(space, size, 0)
+            except OperationError:
+                mmap.close()
+                raise
+            self.mmap = mmap
+            self.buffer = MMapReadBuffer(mmap)
+            self.pos = intmask(pos)
+            self.read_end = self.raw_pos = size
+        return True
+
+    def readinto_w(self, space, w_buffer):
+        if self.mmap is None:
+            return W_BufferedIOBase.readinto_w(self, space, w_buffer)
+        self._check_closed(space, "readinto of closed file")
+        rwbuffer = space.writebuf_w(w_buffer)
+        length = min(rwbuffer.getlength(), self._readahead())
+        try:
+            target = rwbuffer.get_raw_address()
+        except ValueError:
+            self.output_slice(space, rwbuffer, 0, self._mmap_read(length))
+        else:
+            rffi.c_memcpy(rffi.cast(rffi.VOIDP, target),
+                          rffi.cast(rffi.VOIDP, self.mmap.getptr(self.pos)),
+                          length)
+            keepalive_until_here(rwbuffer)
+            self.pos += length
+        return space.newint(length)
+
 W_BufferedReader.typedef = TypeDef(
     '_io.BufferedReader', W_BufferedIOBase.typedef,
     __new__ = generic_new_descr(W_BufferedReader),
@@ -848,6 +1037,7 @@ W_BufferedReader.typedef = TypeDef(
     read = interp2app(W_BufferedReader.read_w),
     peek = interp2app(W_BufferedReader.peek_w),
     read1 = interp2app(W_BufferedReader.read1_w),
+    readinto = interp2app(W_BufferedReader.readinto_w),
     raw = interp_attrproperty_w("w_raw", cls=W_BufferedReader),
     readline = interp2app(W_BufferedReader.readline_w),
 
@@ -6,18 +6,41 @@ from pypy.interpreter.gateway import WrappedDefault, interp2app, unwrap_spec
 from pypy.interpreter.typedef import (
     GetSetProperty, TypeDef, generic_new_descr, interp_attrproperty,
     interp_attrproperty_w)
+from pypy.interpreter.unicodehelper import (
+    str_decode_ascii, str_decode_latin_1, str_decode_utf8)
 from pypy.module._codecs import interp_codecs
 from pypy.module._io.interp_iobase import W_IOBase, convert_size, trap_eintr
 from rpython.rlib.rarithmetic import intmask, r_uint, r_ulonglong
 from rpython.rlib.rbigint import rbigint
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib.rutf8 import (check_utf8, next_codepoint_pos,
+from rpython.rlib.rutf8 import (CheckError, check_utf8, next_codepoint_pos,
                                 codepoints_in_utf8, codepoints_in_utf8,
                                 Utf8StringBuilder)
 
 
 STATE_ZERO, STATE_OK, STATE_DETACHED = range(3)
 
+# The encodings that W_TextIOWrapper decodes itself, straight from the
+# buffer of a BufferedReader (see _read_chunk_raw())
+RAWDECODE_NONE, RAWDECODE_UTF8, RAWDECODE_LATIN1, RAWDECODE_ASCII = range(4)
+rawdecode_codecs = {
+    'utf-8': RAWDECODE_UTF8,
+    'iso8859-1': RAWDECODE_LATIN1,
+    'ascii': RAWDECODE_ASCII,
+}
+
+def _ascii_text_w(space, w_obj):
+    # the value of a str or unicode object, or '' for anything else; the
+    # codec names and error handlers are str on PyPy2, but may be unicode
+    if not space.isinstance_w(w_obj, space.w_basestring):
+        return ''
+    try:
+        return space.text_w(w_obj)
+    except OperationError as e:
+        if not e.match(space, space.w_UnicodeError):
+            raise
+        return ''
+
 SEEN_CR   = 1
 SEEN_LF   = 2
 SEEN_CRLF = 4
@@ -101,8 +124,14 @@ class W_IncrementalNewlineDecoder(W_Root):
         if output_len == 0:
             return space.newutf8("", 0)
 
+        output = self.translate_newlines(output)
+        lgt = check_utf8(output, True)
+        return space.newutf8(output, lgt)
+
+    def translate_newlines(self, output):
         # Record which newlines are read and do newline translation if
-        # desired, all in one pass.
+        # desired, all in one pass.  'output' is utf-8; W_TextIOWrapper
+        # also calls this for the text it decodes without self.w_decoder.
         seennl = self.seennl
 
         if output.find('\r') < 0:
@@ -131,7 +160,7 @@ class W_IncrementalNewlineDecoder(W_Root):
             # Translate!
             builder = StringBuilder(len(output))
             i = 0
-            while i < output_len:
+            while i < len(output):
                 c = output[i]
                 i += 1
                 if c == '\n':
@@ -148,8 +177,7 @@ class W_IncrementalNewlineDecoder(W_Root):
             output = builder.build()
 
         self.seennl |= seennl
-        lgt = check_utf8(output, True)
-        return space.newutf8(output, lgt)
+        return output
 
     def reset_w(self, space):
         self.seennl = 0
@@ -304,8 +332,12 @@ class DecodeBuffer(object):
 
     def set(self, space, w_decoded):
         check_decoded(space, w_decoded)
-        self.ulen = space.len_w(w_decoded)
-        self.text = space.utf8_w(w_decoded)
+        self.set_utf8(space.utf8_w(w_decoded), space.len_w(w_decoded))
+
+    def set_utf8(self, text, ulen):
+        assert ulen >= 0
+        self.text = text
+        self.ulen = ulen
         self.pos = 0
         self.upos = 0
 
@@ -390,8 +422,13 @@ class DecodeBuffer(object):
                 if scanned >= limit:
                     return False
                 if self.exhausted():
-                    # don't split potential \r\n
-                    return False
+                    # This \r is a line ending on its own only because a
+                    # \r at the end of a chunk is held back until the next
+                    # chunk or EOF: by W_IncrementalNewlineDecoder
+                    # (pendingcr) and by _rawdecode_stop().  A decoder
+                    # that returns a final \r would make this split a
+                    # \r\n into two lines.
+                    return True
                 ch = self.text[self.pos]
                 if ch == '\n':
                     self._advance_codepoint()
@@ -444,9 +481,21 @@ class DecodeBuffer(object):
                 return False
 
         if limit < 0:
-            limit = sys.maxint
-        # XXX it might be better to search for the marker quickly, then compute
-        # the new upos afterwards.
+            # search for the marker quickly, then compute the new upos:
+            # in utf-8, an ascii byte is never part of a larger char
+            start = self.pos
+            assert start >= 0
+            pos = self.text.find(marker, start)
+            if pos >= 0:
+                end = pos + 1
+                found = True
+            else:
+                end = len(self.text)
+                found = False
+            self.upos += codepoints_in_utf8(self.text, start, end)
+            self.pos = end
+            return found
+
         scanned = 0
         while scanned < limit:
             # don't use next_char here, since that computes a slice etc
@@ -489,6 +538,11 @@ class W_TextIOWrapper(W_TextIOBase):
         self.readtranslate = False
         self.readnl = None
 
+        self.rawdecode = RAWDECODE_NONE # Not NONE if _read_chunk() can decode
+                                        # the bytes without self.w_decoder
+        self.decoder_empty = True # False once self.w_decoder may hold some
+                                  # state (see _read_chunk_raw())
+
         self.encodefunc = None # Specialized encoding func (see below)
         self.encoding_start_of_stream = False # Whether or not it's the start
                                               # of the stream
@@ -530,6 +584,7 @@ class W_TextIOWrapper(W_TextIOBase):
             self.writenl = None
 
         # build the decoder object
+        self.rawdecode = RAWDECODE_NONE
         if space.is_true(space.call_method(w_buffer, "readable")):
             w_codec = interp_codecs.lookup_codec(space,
                                                  space.text_w(self.w_encoding))
@@ -539,6 +594,8 @@ class W_TextIOWrapper(W_TextIOBase):
                 self.w_decoder = space.call_function(
                     space.gettypeobject(W_IncrementalNewlineDecoder.typedef),
                     self.w_decoder, space.newbool(self.readtranslate))
+            self.rawdecode = self._get_rawdecode(space, w_codec, w_errors)
+            self.decoder_empty = True
 
         # build the encoder object
         if space.is_true(space.call_method(w_buffer, "writable")):
@@ -560,6 +617,20 @@ class W_TextIOWrapper(W_TextIOBase):
 
         self.state = STATE_OK
 
+    def _get_rawdecode(self, space, w_codec, w_errors):
+        # utf-8, latin-1 and ascii with strict errors are decoded by
+        # _read_chunk_raw(), if the bytes come from a plain BufferedReader
+        from pypy.module._io.interp_bufferedio import W_BufferedReader
+        if type(self.w_buffer) is not W_BufferedReader:
+            return RAWDECODE_NONE
+        if _ascii_text_w(space, w_errors) != 'strict':
+            return RAWDECODE_NONE
+        w_name = space.findattr(w_codec, space.newtext("name"))
+        if w_name is None:
+            return RAWDECODE_NONE
+        return rawdecode_codecs.get(_ascii_text_w(space, w_name),
+                                    RAWDECODE_NONE)
+
     def _check_init(self, space):
         if self.state == STATE_ZERO:
             raise oefmt(space.w_ValueError,
@@ -658,6 +729,10 @@ class W_TextIOWrapper(W_TextIOBase):
         if not self.w_decoder:
             raise oefmt(space.w_IOError, "not readable")
 
+        if self.rawdecode != RAWDECODE_NONE and self.decoder_empty:
+            return self._read_chunk_raw(space)
+        self.decoder_empty = False
+
         if self.telling:
             # To prepare for tell(), we need to snapshot a point in the file
             # where the decoder's input buffer is empty.
@@ -695,6 +770,109 @@ class W_TextIOWrapper(W_TextIOBase):
 
         return not eof
 
+    def _read_chunk_raw(self, space):
+        """Like _read_chunk(), when self.rawdecode says that we can decode
+        the bytes ourselves and self.w_decoder has nothing buffered.  The
+        bytes are taken directly from the buffer of the BufferedReader, up
+        to the last end of line in it, and decoded in one go with rutf8.
+        The decoder is not called at all, and so stays empty: the snapshot
+        for tell() is simply (0, bytes)."""
+        from pypy.module._io.interp_bufferedio import W_BufferedReader
+        w_reader = self.w_buffer
+        assert isinstance(w_reader, W_BufferedReader)
+        w_reader._check_closed(space, "read of closed file")
+        final = False
+        with w_reader.lock:
+            while True:
+                start = w_reader.pos
+                end = start + w_reader._readahead()
+                if final:
+                    stop = end
+                    break
+                # at most about chunk_size bytes, because in mmap read mode
+                # the buffer is the whole file.  The 4 extra bytes are
+                # enough for _rawdecode_stop() to keep at least one char.
+                limit = min(end, start + self.chunk_size + 4)
+                stop = self._rawdecode_stop(w_reader.buffer, start, limit)
+                if stop > start:
+                    break
+                # nothing that can be decoded now: read more
+                size = w_reader._fill_buffer_keep(space)
+                if size < 0:
+                    break
+                final = size == 0
+            if stop > start or final:
+                input = w_reader.buffer[start:stop]
+                w_reader.pos = stop
+            else:
+                input = None
+        if input is None:
+            # a tiny buffer, full with the start of a char: let the decoder
+            # keep it
+            self.decoder_empty = False
+            return self._read_chunk(space)
+
+        state = space.fromcache(interp_codecs.CodecState)
+        if self.rawdecode == RAWDECODE_UTF8:
+            text = input
+            try:
+                lgt = check_utf8(input, True)
+            except CheckError:
+                # raises the UnicodeDecodeError
+                text, _, lgt = str_decode_utf8(input, 'strict', True,
+                                               state.decode_error_handler)
+        elif self.rawdecode == RAWDECODE_LATIN1:
+            text, _, lgt = str_decode_latin_1(input, 'strict', True,
+                                              state.decode_error_handler)
+        else:
+            text, _, lgt = str_decode_ascii(input, 'strict', True,
+                                            state.decode_error_handler)
+        if self.readuniversal:
+            w_decoder = space.interp_w(W_IncrementalNewlineDecoder,
+                                       self.w_decoder)
+            translated = w_decoder.translate_newlines(text)
+            # every \r\n became \n
+            lgt -= len(text) - len(translated)
+            text = translated
+        self.decoded.set_utf8(text, lgt)
+
+        if self.telling:
+            self.snapshot = PositionSnapshot(0, input)
+        return len(input) > 0
+
+    def _rawdecode_stop(self, buffer, start, end):
+        # Where to stop decoding buffer[start:end]: after the last \n, or
+        # else before an incomplete utf-8 char at the end, and before a
+        # final \r that could be the start of a \r\n
+        stop = end
+        while stop > start:
+            if buffer.getitem(stop - 1) == '\n':
+                return stop
+            stop -= 1
+        stop = end
+        if self.rawdecode == RAWDECODE_UTF8:
+            # find the first byte of the last char
+            i = end - 1
+            while (i >= start and i > end - 4 and
+                   ord(buffer.getitem(i)) & 0xC0 == 0x80):
+                i -= 1
+            if i >= start:
+                lead = ord(buffer.getitem(i))
+                if lead >= 0xF0:
+                    size = 4
+                elif lead >= 0xE0:
+                    size = 3
+                elif lead >= 0xC0:
+                    size = 2
+                else:
+                    size = 1
+                if i + size > end:
+                    stop = i
+        if (self.readuniversal and stop > start and
+                buffer.getitem(stop - 1) == '\r'):
+            stop -= 1
+        return stop
+
     def _ensure_data(self, space):
         while not self.decoded.has_data():
             try:
@@ -731,6 +909,7 @@ class W_TextIOWrapper(W_TextIOBase):
             # Read everything
             w_bytes = space.call_method(self.w_buffer, "read")
             w_decoded = space.call_method(self.w_decoder, "decode", w_bytes, space.w_True)
+            self.decoder_empty = False
             check_decoded(space, w_decoded)
             chars, lgt = self.decoded.get_chars(-1)
             w_result = space.newutf8(chars, lgt)
@@ -752,15 +931,14 @@ class W_TextIOWrapper(W_TextIOBase):
         return space.newutf8(builder.build(), builder.getlength())
 
     def _scan_line_ending(self, limit):
-        if self.readuniversal:
+        if self.readtranslate:
+            # Newlines are already translated, only search for \n
+            return self.decoded.find_char('\n', limit)
+        elif self.readuniversal:
             return self.decoded.find_newline_universal(limit)
         else:
-            if self.readtranslate:
-                # Newlines are already translated, only search for \n
-                newline = '\n'
-            else:
-                # Non-universal mode.
-                newline = self.readnl
+            # Non-universal mode.
+            newline = self.readnl
             if newline == '\r\n':
                 return self.decoded.find_crlf(limit)
             else:
@@ -816,6 +994,10 @@ class W_TextIOWrapper(W_TextIOBase):
             found = self._scan_line_ending(remaining)
             end_scan = self.decoded.pos
             uend_scan = self.decoded.upos
+            if found and builder.getlength() == 0:
+                # the whole line is in self.decoded, don't copy it twice
+                assert end_scan >= 0
+                return (self.decoded.text[start:end_scan], uend_scan - ustart)
             if end_scan > start:
                 builder.append_utf8_slice(self.decoded.text, start, end_scan, uend_scan - ustart)
 
@@ -970,6 +1152,7 @@ class W_TextIOWrapper(W_TextIOBase):
             self.snapshot = None
             if self.w_decoder:
                 space.call_method(self.w_decoder, "reset")
+                self.decoder_empty = True
             return space.call_method(self.w_buffer, "seek",
                                      w_pos, space.newint(whence))
 
@@ -997,6 +1180,7 @@ class W_TextIOWrapper(W_TextIOBase):
         # Restore the decoder to its state from the safe start point.
         if self.w_decoder:
             self._decoder_setstate(space, cookie)
+            self.decoder_empty = cookie.dec_flags == 0
 
         if cookie.chars_to_skip:
             # Just like _read_chunk, feed the decoder and save a snapshot.
@@ -1010,6 +1194,7 @@ class W_TextIOWrapper(W_TextIOBase):
             self.snapshot = PositionSnapshot(cookie.dec_flags,
                                              space.bytes_w(w_chunk))
 
+            self.decoder_empty = False
             w_decoded = space.call_method(self.w_decoder, "decode",
                                           w_chunk, space.newbool(bool(cookie.need_eof)))
             w_decoded = check_decoded(space, w_decoded)
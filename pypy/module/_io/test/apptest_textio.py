@@ -1,6 +1,12 @@
 #encoding: utf-8
 # spaceconfig = {"usemodules": ["_locale"]}
 import _io
+import pytest
+
+@pytest.fixture
+def tempfile(tmpdir):
+    tempfile = (tmpdir / 'tempfile').ensure()
+    return str(tempfile)
 
 def test_constructor():
     r = _io.BytesIO(b"\xc3\xa9\n\n")
@@ -369,3 +375,89 @@ def test_newlines2():
     for ch in msg:
         decoded += decoder.decode(ch)
     assert set(decoder.newlines) == {"\r", "\n", "\r\n"}
+
+def test_bufferedreader_lines():
+    # utf-8, latin-1 and ascii are decoded straight from the buffer of a
+    # BufferedReader: lines and chars cut by the end of the buffer
+    tests = [
+        ('utf-8', u"h\xe9llo\n€\r\nx\U0001f600y\rz\xe9\r\rlast\xe9"),
+        ('latin-1', u"h\xe9llo\n\xff\r\nabc\rz\xe9\r\rlast\xe9"),
+        ('ascii', u"hello\nworld\r\nabc\rz\r\rlast"),
+    ]
+    for encoding, text in tests:
+        data = text.encode(encoding)
+        translated = text.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+        for bufsize in range(1, 12):
+            bufio = _io.BufferedReader(_io.BytesIO(data), bufsize)
+            t = _io.TextIOWrapper(bufio, encoding=encoding)
+            assert list(t) == translated.splitlines(True)
+            assert t.newlines == (u'\r', u'\n', u'\r\n')
+            bufio = _io.BufferedReader(_io.BytesIO(data), bufsize)
+            t = _io.TextIOWrapper(bufio, encoding=encoding, newline='')
+            assert list(t) == text.splitlines(True)
+            bufio = _io.BufferedReader(_io.BytesIO(data), bufsize)
+            t = _io.TextIOWrapper(bufio, encoding=encoding, newline='\n')
+            assert t.read(3) == text[:3]
+            assert t.readline() == text[3:text.index(u'\n') + 1]
+            assert t.read() == text[text.index(u'\n') + 1:]
+
+def test_bufferedreader_tell_seek():
+    data = u"\xe9t\xe9\n€\r\n\nabc\n".encode('utf-8')
+    bufio = _io.BufferedReader(_io.BytesIO(data), 4)
+    t = _io.TextIOWrapper(bufio, encoding='utf-8')
+    positions = []
+    lines = []
+    while True:
+        positions.append(t.tell())
+        line = t.readline()
+        if not line:
+            break
+        lines.append(line)
+    assert lines == [u"\xe9t\xe9\n", u"€\n", u"\n", u"abc\n"]
+    for pos, line in reversed(list(zip(positions, lines))):
+        t.seek(pos)
+        assert t.readline() == line
+    t.seek(0)
+    assert t.read(2) == u"\xe9t"
+    pos = t.tell()
+    assert t.readline() == u"\xe9\n"
+    t.seek(pos)
+    assert t.read() == u"\xe9\n€\n\nabc\n"
+
+def test_bufferedreader_decode_error():
+    for encoding, data in [('utf-8', b"abc\n\xff\n"),
+                           ('utf-8', b"abc\n\xc3"),
+                           ('ascii', b"abc\n\x80\n")]:
+        bufio = _io.BufferedReader(_io.BytesIO(data), 4)
+        t = _io.TextIOWrapper(bufio, encoding=encoding)
+        assert t.readline() == u"abc\n"
+        raises(UnicodeDecodeError, t.readline)
+    bufio = _io.BufferedReader(_io.BytesIO(b"abc\n\xff\n"), 4)
+    t = _io.TextIOWrapper(bufio, encoding='utf-8', errors='replace')
+    assert list(t) == [u"abc\n", u"�\n"]
+
+def test_open_lines_tell_seek(tempfile):
+    # a file opened in text mode, read straight from the BufferedReader
+    text = u''.join([u'line %d \xe9\u20ac\U0001f600\r\n' % i
+                     for i in range(40)])
+    with _io.open(tempfile, 'wb') as f:
+        f.write(text.encode('utf-8'))
+    expected = text.replace(u'\r\n', u'\n').splitlines(True)
+    for buffering in [7, 64, 8192]:
+        with _io.open(tempfile, 'r', encoding='utf-8',
+                      buffering=buffering) as t:
+            positions = []
+            lines = []
+            while True:
+                positions.append(t.tell())
+                line = t.readline()
+                if not line:
+                    break
+                lines.append(line)
+            assert lines == expected
+            for i in [20, 0, 39, 7]:
+                t.seek(positions[i])
+                assert t.readline() == expected[i]
+                assert t.read(5) == u''.join(expected[i + 1:])[:5]
+            t.seek(0)
+            assert t.read() == u''.join(expected)
@@ -272,6 +272,103 @@ class AppTestBufferedReaderWithThreads(AppTestBufferedReader):
         assert f.readinto(a) == 10
         assert a == 'abcdefghij'
 
+class AppTestBufferedReaderMMap:
+    spaceconfig = dict(usemodules=['_io'])
+
+    def setup_class(cls):
+        tmpfile = udir.join('mmaptmpfile')
+        tmpfile.write("hello\nworld\n" + "x" * 10000 + "\nlast", mode='wb')
+        cls.w_tmpfile = cls.space.wrap(str(tmpfile))
+        emptyfile = udir.join('mmapemptyfile')
+        emptyfile.write("", mode='wb')
+        cls.w_emptyfile = cls.space.wrap(str(emptyfile))
+
+    def test_read(self):
+        import _io, __pypy__
+        f = _io.BufferedReader(_io.FileIO(self.tmpfile), buffer_size=16)
+        assert f.read(2) == "he"
+        assert __pypy__.mmap_read(f)
+        assert __pypy__.mmap_read(f)
+        assert f.tell() == 2
+        assert f.peek() == "llo\nworld\nxxxxxx"
+        assert f.read1(4) == "llo\n"
+        assert f.readline() == "world\n"
+        assert f.tell() == 12
+        assert f.readline(3) == "xxx"
+        assert len(f.readline()) == 9998
+        a = bytearray(b'.' * 6)
+        assert f.readinto(a) == 4
+        assert a == "last.."
+        assert f.readline() == ""
+        assert f.read(3) == ""
+        assert f.read1(3) == ""
+        assert f.peek() == ""
+        assert f.readinto(a) == 0
+        assert f.seek(-4, 1) == 10013
+        assert f.read() == "last"
+        assert f.seek(0) == 0
+        assert list(f)[:2] == ["hello\n", "world\n"]
+        f.close()
+        raises(ValueError, f.read)
+
+    def test_seek_out_of_the_mapping(self):
+        import _io, __pypy__
+        f = _io.BufferedReader(_io.FileIO(self.tmpfile))
+        assert __pypy__.mmap_read(f)
+        assert f.seek(-2, 2) == 10015
+        assert f.seek(10, 2) == 10027
+        assert f.read() == ""
+        assert f.seek(3) == 3
+        assert f.read(3) == "lo\n"
+        assert f.tell() == 6
+        raises(IOError, f.seek, -1)
+        f.close()
+
+    def test_not_possible(self):
+        import _io, os, __pypy__
+        f = _io.BufferedReader(_io.FileIO(self.emptyfile))
+        assert not __pypy__.mmap_read(f)
+        f.close()
+        raises(ValueError, __pypy__.mmap_read, f)
+        f = _io.BufferedRandom(_io.FileIO(self.tmpfile, 'r+'))
+        assert not __pypy__.mmap_read(f)
+        f.close()
+        r, w = os.pipe()
+        f = _io.BufferedReader(_io.FileIO(r))
+        assert not __pypy__.mmap_read(f)
+        f.close()
+        os.close(w)
+        class MyReader(_io.BufferedReader):
+            pass
+        f = MyReader(_io.FileIO(self.tmpfile))
+        assert not __pypy__.mmap_read(f)
+        f.close()
+        assert not __pypy__.mmap_read(_io.BytesIO(b"abc"))
+
+    def test_text(self):
+        import _io, __pypy__
+        f = _io.open(self.tmpfile, 'r', encoding='utf-8')
+        assert f.readline() == u"hello\n"
+        assert __pypy__.mmap_read(f)
+        pos = f.tell()
+        lines = list(f)
+        assert lines[0] == u"world\n"
+        assert lines[-1] == u"last"
+        assert len(lines) == 3
+        f.seek(pos)
+        assert f.readline() == u"world\n"
+        f.close()
+
+    def test_detach(self):
+        import _io, __pypy__
+        f = _io.BufferedReader(_io.FileIO(self.tmpfile))
+        assert __pypy__.mmap_read(f)
+        assert f.read(3) == "hel"
+        raw = f.detach()
+        assert raw.tell() == 3
+        assert raw.read(3) == "lo\n"
+        raw.close()
+
 @py.test.yield_fixture
 def forbid_nonmoving_raw_ptr_for_resizable_list(space):
     orig_nonmoving_raw_ptr_for_resizable_list = rlib.buffer.nonmoving_raw_ptr_for_resizable_list
@@ -5,7 +5,10 @@ except ImportError:
     pytest.skip("hypothesis required")
 import os
 from pypy.module._io.interp_bytesio import W_BytesIO
-from pypy.module._io.interp_textio import W_TextIOWrapper, DecodeBuffer
+from pypy.module._io.interp_bufferedio import W_BufferedReader
+from pypy.module._io.interp_textio import (
+    W_TextIOWrapper, DecodeBuffer, RAWDECODE_NONE, RAWDECODE_UTF8,
+    RAWDECODE_LATIN1, RAWDECODE_ASCII)
 
 # workaround suggestion for slowness by David McIver:
 # force hypothesis to initialize some lazy stuff
@@ -57,6 +60,105 @@ def test_readline(space, data, mode):
             break
     assert txt.startswith(u''.join(lines))
 
+@given(data=st_readline(),
+       mode=st.sampled_from([None, '\r', '\n', '\r\n', '']),
+       bufsize=st.integers(min_value=1, max_value=10))
+@settings(deadline=None, database=None)
+@example(data=(u'\xe9\r\n\U0001f600\n', [-1, -1]), mode=None, bufsize=2)
+def test_readline_bufferedreader(space, data, mode, bufsize):
+    # strict utf-8 on top of a BufferedReader: decoded from the buffer
+    txt, limits = data
+    txt = u''.join(c for c in txt if not u'\ud800' <= c <= u'\udfff')
+    w_stream = W_BytesIO(space)
+    w_stream.descr_init(space, space.newbytes(txt.encode('utf-8')))
+    w_reader = W_BufferedReader(space)
+    w_reader.descr_init(space, w_stream, bufsize)
+    w_textio = W_TextIOWrapper(space)
+    if mode is None:
+        w_newline = None
+        expected = txt.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+    else:
+        w_newline = space.newtext(mode)
+        expected = txt
+    w_textio.descr_init(space, w_reader, encoding='utf-8',
+                        w_newline=w_newline)
+    assert w_textio.rawdecode == RAWDECODE_UTF8
+    lines = []
+    for limit in limits:
+        w_line = w_textio.readline_w(space, space.newint(limit))
+        line = space.utf8_w(w_line).decode('utf-8')
+        assert space.len_w(w_line) == len(line)
+        if limit >= 0:
+            assert len(line) <= limit
+        lines.append(line)
+    w_rest = w_textio.read_w(space)
+    lines.append(space.utf8_w(w_rest).decode('utf-8'))
+    assert u''.join(lines) == expected
+
+@pytest.mark.parametrize('encoding, expected', [
+    ('utf-8', RAWDECODE_UTF8), ('UTF8', RAWDECODE_UTF8),
+    ('latin-1', RAWDECODE_LATIN1), ('iso-8859-1', RAWDECODE_LATIN1),
+    ('ascii', RAWDECODE_ASCII), ('utf-16', RAWDECODE_NONE)])
+@pytest.mark.parametrize('errors', [None, 'strict', u'strict', 'replace',
+                                    u'ignore', 'surrogateescape'])
+def test_rawdecode(space, encoding, expected, errors):
+    # the codec names and the error handlers are usually str, not unicode
+    w_stream = W_BytesIO(space)
+    w_stream.descr_init(space, space.newbytes(u'abc\n'.encode(encoding)))
+    w_reader = W_BufferedReader(space)
+    w_reader.descr_init(space, w_stream)
+    w_textio = W_TextIOWrapper(space)
+    w_textio.descr_init(space, w_reader, encoding=encoding,
+                        w_errors=space.wrap(errors))
+    if errors is not None and errors != 'strict':
+        expected = RAWDECODE_NONE
+    assert w_textio.rawdecode == expected
+    assert space.utf8_w(w_textio.read_w(space)) == 'abc\n'
+
+def test_rawdecode_mmap_chunks(space, tmpdir):
+    # in mmap read mode the reader's buffer is the whole file, but it is
+    # still decoded in chunks of about chunk_size bytes, ending at a line
+    # boundary when there is one
+    text = (u''.join([u'line %d \xe9\u20ac\U0001f600\r\n' % i
+                      for i in range(40)]) +
+            u'\u20ac' * 100 + u'\n' + u'last line without newline')
+    data = text.encode('utf-8')
+    path = tmpdir.join('test_rawdecode_mmap_chunks')
+    path.write_binary(data)
+    w_f = space.appexec([space.newtext(str(path))], """(path):
+        import _io, __pypy__
+        f = _io.open(path, 'r', encoding='utf-8', buffering=16)
+        assert __pypy__.mmap_read(f)
+        return f""")
+    w_textio = space.interp_w(W_TextIOWrapper, w_f)
+    assert w_textio.w_buffer.mmap is not None
+    assert w_textio.rawdecode == RAWDECODE_UTF8
+    w_textio.chunk_size = 64
+    chunks = []
+    while w_textio._read_chunk(space):
+        chunk = w_textio.snapshot.input
+        assert 0 < len(chunk) <= 64 + 4
+        chunks.append(chunk)
+        w_textio.decoded.reset()
+    assert b''.join(chunks) == data
+    # the chunks end with a line, except in the middle of the long line
+    # (where they end with a complete char) and for the last one
+    for chunk in chunks[:-1]:
+        if b'\n' in chunk:
+            assert chunk.endswith(b'\n')
+        else:
+            chunk.decode('utf-8')
+            assert chunk.startswith(b'\xe2\x82\xac')
+    assert chunks[-1] == b'last line without newline'
+    assert w_textio.w_buffer.mmap is not None
+    # and readlines() gives the same result as without the mapping
+    space.call_method(w_f, 'seek', space.newint(0))
+    w_lines = space.call_method(w_f, 'readlines')
+    lines = [space.utf8_w(w_line).decode('utf-8')
+             for w_line in space.unpackiterable(w_lines)]
+    assert lines == text.replace(u'\r\n', u'\n').splitlines(True)
+    space.call_method(w_f, 'close')
+
 @given(st.text())
 def test_read_buffer(text):
     buf = DecodeBuffer(text.encode('utf8'), len(text))
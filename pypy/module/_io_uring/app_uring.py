@@ -0,0 +1,78 @@
+from _io_uring import Ring
+
+
+class Dispatcher(object):
+    """Runs a callback for each completed operation of a Ring.
+
+    The operations are queued with read(), write(), recv(), send() and
+    accept(), which take a callback(result, data) in place of user_data.
+    To plug it into an event loop, register fileno() for reading (with
+    select.epoll, or add_reader() of a selector-based loop), call flush()
+    before the loop waits, and handle_events() when fileno() is readable.
+    run_once() does it all without an event loop.
+    """
+
+    def __init__(self, ring=None):
+        if ring is None:
+            ring = Ring()
+        self.ring = ring
+        # create the eventfd now: it is only signalled by the completions
+        # which happen after it is registered
+        ring.fileno()
+
+    def read(self, fd, size, callback, offset=-1):
+        self.ring.read(fd, size, offset, callback)
+
+    def write(self, fd, data, callback, offset=-1):
+        self.ring.write(fd, data, offset, callback)
+
+    def recv(self, fd, size, callback, flags=0):
+        self.ring.recv(fd, size, flags, callback)
+
+    def send(self, fd, data, callback, flags=0):
+        self.ring.send(fd, data, flags, callback)
+
+    def accept(self, fd, callback, flags=0):
+        self.ring.accept(fd, flags, callback)
+
+    def fileno(self):
+        return self.ring.fileno()
+
+    def flush(self):
+        """Submit the queued operations, without waiting."""
+        self.ring.submit()
+
+    def handle_events(self):
+        """Run the callbacks of the completed operations.  Returns their
+        number.  If callbacks raise, the others still run, and the first
+        exception is raised again at the end."""
+        return self._run_callbacks(self.ring.reap())
+
+    def run_once(self, timeout=None):
+        """Submit the queued operations, wait up to 'timeout' seconds (or
+        forever) for at least one to complete, and run the callbacks."""
+        if timeout is None:
+            return self._run_callbacks(
+                self.ring.wait(1 if self.ring.pending else 0))
+        import select
+        self.ring.submit()
+        completions = self.ring.reap()
+        if not completions:
+            select.select([self.ring.fileno()], [], [], timeout)
+            completions = self.ring.reap()
+        return self._run_callbacks(completions)
+
+    def _run_callbacks(self, completions):
+        first_error = None
+        for callback, result, data in completions:
+            try:
+                callback(result, data)
+            except BaseException as e:
+                if first_error is None:
+                    first_error = e
+        if first_error is not None:
+            raise first_error
+        return len(completions)
+
+    def close(self):
+        self.ring.close()
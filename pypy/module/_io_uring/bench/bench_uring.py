@@ -0,0 +1,99 @@
+""" Time an echo server over many connections, written with select.epoll
+and non-blocking sockets, against the same one written with _io_uring:
+
+    pypy bench_uring.py [connections] [rounds]
+
+The default is 1000 socket pairs and 200 rounds; in each round every client
+sends 64 bytes and reads back the echo.  Prints the messages per second.
+Linux only.
+"""
+
+import select
+import socket
+import sys
+import time
+
+import _io_uring
+
+MESSAGE = b'x' * 64
+
+def make_pairs(count):
+    serv = socket.socket()
+    serv.bind(('127.0.0.1', 0))
+    serv.listen(128)
+    pairs = []
+    for i in range(count):
+        cli = socket.socket()
+        cli.connect(serv.getsockname())
+        conn, addr = serv.accept()
+        conn.setblocking(False)
+        pairs.append((cli, conn))
+    serv.close()
+    return pairs
+
+def echo_epoll(pairs, rounds):
+    ep = select.epoll()
+    conns = {}
+    for cli, conn in pairs:
+        ep.register(conn.fileno(), select.EPOLLIN)
+        conns[conn.fileno()] = conn
+    for i in range(rounds):
+        for cli, conn in pairs:
+            cli.send(MESSAGE)
+        done = 0
+        while done < len(pairs):
+            for fd, events in ep.poll():
+                conn = conns[fd]
+                conn.send(conn.recv(4096))
+                done += 1
+        for cli, conn in pairs:
+            cli.recv(4096)
+    ep.close()
+
+def echo_uring(pairs, rounds):
+    ring = _io_uring.Ring(4096)
+    conns = [conn.fileno() for cli, conn in pairs]
+    for i in range(rounds):
+        for fd in conns:
+            ring.recv(fd, 4096, 0, fd)
+        ring.submit()
+        for cli, conn in pairs:
+            cli.send(MESSAGE)
+        done = 0
+        while done < len(pairs):
+            for fd, result, data in ring.wait(1):
+                if fd == -1:     # a send submitted along with the wait
+                    continue
+                ring.send(fd, data, 0, -1)
+                done += 1
+        ring.submit()
+        for cli, conn in pairs:
+            cli.recv(4096)
+        while ring.pending:
+            ring.wait(ring.pending)
+    ring.close()
+
+def main(count, rounds):
+    pairs = make_pairs(count)
+    try:
+        for name, func in [('epoll', echo_epoll),
+                           ('io_uring', echo_uring)]:
+            func(pairs, max(rounds // 10, 1))    # warm-up
+            t0 = time.time()
+            func(pairs, rounds)
+            t1 = time.time()
+            print '%-10s %10.0f messages/s' % (name,
+                                               count * rounds / (t1 - t0))
+    finally:
+        for cli, conn in pairs:
+            cli.close()
+            conn.close()
+
+if __name__ == '__main__':
+    count = 1000
+    rounds = 200
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        rounds = int(sys.argv[2])
+    main(count, rounds)
@@ -0,0 +1,288 @@
+from rpython.rlib import rio_uring
+from rpython.rlib.rarithmetic import r_longlong
+from rpython.rtyper.lltypesystem import lltype, rffi
+
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt, wrap_oserror
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+
+
+# the user_data of the IORING_OP_ASYNC_CANCEL operations queued by close();
+# the operations queued by the user have ids >= 0
+CANCEL_ID = -1
+
+
+class Operation(object):
+    """An operation submitted to the ring and not reaped yet.  'buf' is the
+    raw memory given to the kernel, freed when the operation completes."""
+
+    def __init__(self, w_user_data, buf, returns_data):
+        self.w_user_data = w_user_data
+        self.buf = buf
+        self.returns_data = returns_data
+
+
+class W_Ring(W_Root):
+    def __init__(self, space, uring):
+        self.space = space
+        self.uring = uring
+        self.pending = {}
+        self.next_id = 0
+        # number of threads which released the GIL inside the ring;
+        # close() waits for them to be done before freeing it
+        self.busy = 0
+        self.close_requested = False
+        self.register_finalizer(space)
+
+    @unwrap_spec(entries=int)
+    def descr__new__(space, w_subtype, entries=256):
+        if entries <= 0:
+            raise oefmt(space.w_ValueError,
+                        "entries must be greater than zero, got %d", entries)
+        try:
+            uring = rio_uring.IOUring(entries)
+        except OSError as e:
+            raise wrap_oserror(space, e)
+        return W_Ring(space, uring)
+
+    def _finalize_(self):
+        self.close()
+
+    def get_closed(self):
+        return self.uring is None or self.close_requested
+
+    def check_closed(self, space):
+        if self.get_closed():
+            raise oefmt(space.w_ValueError, "I/O operation on closed ring")
+
+    def close(self):
+        if self.uring is None:
+            return
+        if self.busy > 0:
+            # another thread waits in the ring: cancel the operations, which
+            # wakes it up, and let it free the ring when it leaves
+            if not self.close_requested:
+                self.close_requested = True
+                self.enter()
+                try:
+                    self.cancel_pending()
+                    self.uring.submit(0)
+                except OSError:
+                    pass
+                finally:
+                    self.leave()
+            return
+        if self.pending:
+            try:
+                self.cancel_pending()
+                self.wait_pending()
+            except OSError:
+                # the kernel may still write into the buffers of the
+                # operations left: they are not freed
+                self.pending.clear()
+        self.uring.close()
+        self.uring = None
+        self.may_unregister_rpython_finalizer(self.space)
+
+    def cancel_pending(self):
+        for op_id in self.pending.keys():
+            self.uring.prep(rio_uring.IORING_OP_ASYNC_CANCEL, -1,
+                            rffi.cast(rffi.CCHARP, op_id), 0, 0, 0,
+                            CANCEL_ID)
+
+    def wait_pending(self):
+        # reap until all the operations are done, cancelled or not, and
+        # free their buffers
+        uring = self.uring
+        while True:
+            n = uring.reap()
+            for i in range(n):
+                op = self.pending.pop(uring.get_user_data(i), None)
+                if op is not None and op.buf:
+                    lltype.free(op.buf, flavor='raw')
+            if not self.pending:
+                break
+            if n < uring.cq_entries:
+                uring.submit(1)
+
+    def enter(self):
+        self.busy += 1
+
+    def leave(self):
+        self.busy -= 1
+        if self.busy == 0 and self.close_requested:
+            self.close()
+
+    def queue(self, space, opcode, fd, buf, length, offset, op_flags,
+              w_user_data, returns_data):
+        op_id = self.next_id
+        self.enter()
+        try:
+            self.uring.prep(opcode, fd, buf, length, offset, op_flags, op_id)
+        except OSError as e:
+            if buf:
+                lltype.free(buf, flavor='raw')
+            raise wrap_oserror(space, e)
+        finally:
+            self.leave()
+        self.next_id = op_id + 1
+        self.pending[op_id] = Operation(w_user_data, buf, returns_data)
+        return space.newint(op_id)
+
+    def alloc_buffer(self, space, size):
+        if size < 0:
+            raise oefmt(space.w_ValueError, "negative size")
+        return lltype.malloc(rffi.CCHARP.TO, size, flavor='raw')
+
+    @unwrap_spec(size=int, offset=r_longlong)
+    def descr_read(self, space, w_fd, size, offset=-1, w_user_data=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        buf = self.alloc_buffer(space, size)
+        return self.queue(space, rio_uring.IORING_OP_READ, fd, buf, size,
+                          offset, 0, w_user_data, True)
+
+    @unwrap_spec(data='bufferstr', offset=r_longlong)
+    def descr_write(self, space, w_fd, data, offset=-1, w_user_data=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        buf = rffi.str2charp(data)
+        return self.queue(space, rio_uring.IORING_OP_WRITE, fd, buf,
+                          len(data), offset, 0, w_user_data, False)
+
+    @unwrap_spec(size=int, flags=int)
+    def descr_recv(self, space, w_fd, size, flags=0, w_user_data=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        buf = self.alloc_buffer(space, size)
+        return self.queue(space, rio_uring.IORING_OP_RECV, fd, buf, size,
+                          0, flags, w_user_data, True)
+
+    @unwrap_spec(data='bufferstr', flags=int)
+    def descr_send(self, space, w_fd, data, flags=0, w_user_data=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        buf = rffi.str2charp(data)
+        return self.queue(space, rio_uring.IORING_OP_SEND, fd, buf,
+                          len(data), 0, flags, w_user_data, False)
+
+    @unwrap_spec(flags=int)
+    def descr_accept(self, space, w_fd, flags=0, w_user_data=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        return self.queue(space, rio_uring.IORING_OP_ACCEPT, fd,
+                          lltype.nullptr(rffi.CCHARP.TO), 0, 0, flags,
+                          w_user_data, False)
+
+    def descr_nop(self, space, w_user_data=None):
+        self.check_closed(space)
+        return self.queue(space, rio_uring.IORING_OP_NOP, -1,
+                          lltype.nullptr(rffi.CCHARP.TO), 0, 0, 0,
+                          w_user_data, False)
+
+    def submit(self, space, min_complete):
+        if min_complete < 0:
+            raise oefmt(space.w_ValueError, "min_complete must be >= 0")
+        if min_complete > len(self.pending):
+            raise oefmt(space.w_ValueError,
+                        "waiting for %d operations, but only %d are pending",
+                        min_complete, len(self.pending))
+        self.enter()
+        try:
+            return self.uring.submit(
+                min_complete, space.getexecutioncontext().checksignals)
+        except OSError as e:
+            raise wrap_oserror(space, e)
+        finally:
+            self.leave()
+
+    def reap(self, space):
+        uring = self.uring
+        result_w = []
+        while True:
+            n = uring.reap()
+            for i in range(n):
+                op_id = uring.get_user_data(i)
+                res = uring.get_result(i)
+                op = self.pending.pop(op_id, None)
+                if op is None:
+                    continue
+                w_data = space.w_None
+                if op.buf:
+                    if op.returns_data and res >= 0:
+                        w_data = space.newbytes(
+                            rffi.charpsize2str(op.buf, res))
+                    lltype.free(op.buf, flavor='raw')
+                w_user_data = op.w_user_data
+                if w_user_data is None:
+                    w_user_data = space.newint(op_id)
+                result_w.append(space.newtuple(
+                    [w_user_data, space.newint(res), w_data]))
+            if n < uring.cq_entries:
+                break
+        return space.newlist(result_w)
+
+    @unwrap_spec(min_complete=int)
+    def descr_submit(self, space, min_complete=0):
+        self.check_closed(space)
+        return space.newint(self.submit(space, min_complete))
+
+    def descr_reap(self, space):
+        self.check_closed(space)
+        return self.reap(space)
+
+    @unwrap_spec(min_complete=int)
+    def descr_wait(self, space, min_complete=1):
+        self.check_closed(space)
+        self.submit(space, min_complete)
+        self.check_closed(space)
+        return self.reap(space)
+
+    def descr_fileno(self, space):
+        self.check_closed(space)
+        try:
+            return space.newint(self.uring.eventfd())
+        except OSError as e:
+            raise wrap_oserror(space, e)
+
+    def descr_close(self, space):
+        self.close()
+
+    def descr_get_closed(self, space):
+        return space.newbool(self.get_closed())
+
+    def descr_get_pending(self, space):
+        return space.newint(len(self.pending))
+
+
+W_Ring.typedef = TypeDef("_io_uring.Ring",
+    __doc__ = """Ring(entries=256)
+
+A Linux io_uring.  read(), write(), recv(), send(), accept() and nop()
+queue an operation and return its id; submit() hands all the queued
+operations to the kernel with a single system call, and reap() returns
+the completed ones as a list of (user_data, result, data) tuples without
+a system call.  'user_data' is the one given when queuing the operation,
+or its id; 'result' is what the system call returned, or -errno; 'data'
+is the string read for read() and recv(), and None otherwise.  wait(n)
+submits and waits for at least n completions, releasing the GIL.
+fileno() returns a file descriptor which becomes readable when
+operations complete, for use with select() or epoll.  close() cancels
+the pending operations and waits for them to be done.""",
+    __new__ = interp2app(W_Ring.descr__new__.im_func),
+    read = interp2app(W_Ring.descr_read),
+    write = interp2app(W_Ring.descr_write),
+    recv = interp2app(W_Ring.descr_recv),
+    send = interp2app(W_Ring.descr_send),
+    accept = interp2app(W_Ring.descr_accept),
+    nop = interp2app(W_Ring.descr_nop),
+    submit = interp2app(W_Ring.descr_submit),
+    reap = interp2app(W_Ring.descr_reap),
+    wait = interp2app(W_Ring.descr_wait),
+    fileno = interp2app(W_Ring.descr_fileno),
+    close = interp2app(W_Ring.descr_close),
+    closed = GetSetProperty(W_Ring.descr_get_closed),
+    pending = GetSetProperty(W_Ring.descr_get_pending),
+)
+W_Ring.typedef.acceptable_as_base_class = False
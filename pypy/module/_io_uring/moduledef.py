@@ -0,0 +1,12 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """Asynchronous file and socket I/O with the Linux io_uring interface"""
+
+    appleveldefs = {
+        'Dispatcher' : 'app_uring.Dispatcher',
+        }
+
+    interpleveldefs = {
+        'Ring' : 'interp_uring.W_Ring',
+        }
@@ -0,0 +1,213 @@
+import pytest
+
+from rpython.rlib import rio_uring
+from rpython.tool.udir import udir
+
+if not rio_uring.IS_SUPPORTED:
+    pytest.skip("io_uring is Linux only, with headers from Linux 5.6 or later")
+
+try:
+    rio_uring.IOUring(1).close()
+except OSError as e:
+    pytest.skip("io_uring not available: %s" % (e,))
+
+
+class AppTestRing(object):
+    spaceconfig = {
+        "usemodules": ["_io_uring", "_socket", "select", "posix", "time"],
+    }
+
+    def setup_class(cls):
+        cls.w_tmpfile = cls.space.wrap(str(udir.join('test_io_uring')))
+
+    def w_socket_pair(self):
+        import socket
+        serv = socket.socket()
+        serv.bind(('127.0.0.1', 0))
+        serv.listen(1)
+        cli = socket.socket()
+        cli.connect(serv.getsockname())
+        conn, addr = serv.accept()
+        serv.close()
+        return cli, conn
+
+    def test_create(self):
+        import _io_uring
+        ring = _io_uring.Ring(8)
+        assert not ring.closed
+        assert ring.pending == 0
+        ring.close()
+        assert ring.closed
+        ring.close()
+        raises(ValueError, ring.nop)
+        raises(ValueError, ring.submit)
+        raises(ValueError, _io_uring.Ring, 0)
+
+    def test_nop(self):
+        import _io_uring
+        ring = _io_uring.Ring(4)
+        id1 = ring.nop()
+        id2 = ring.nop('two')
+        assert id1 != id2
+        assert ring.pending == 2
+        assert ring.reap() == []
+        assert ring.submit() == 2
+        got = ring.wait(2)
+        got.sort()
+        assert got == [(id1, 0, None), ('two', 0, None)]
+        assert ring.pending == 0
+        raises(ValueError, ring.wait, 1)
+        ring.close()
+
+    def test_file(self):
+        import _io_uring
+        ring = _io_uring.Ring()
+        with open(self.tmpfile, 'w+b') as f:
+            ring.write(f, b'hello world', 0, 'w')
+            assert ring.wait(1) == [('w', 11, None)]
+            ring.read(f.fileno(), 5, 6, 'r1')
+            ring.read(f.fileno(), 100, 0, 'r2')
+            ring.read(9999, 10, -1, 'bad')
+            got = []
+            while len(got) < 3:
+                got += ring.wait(1)
+            got.sort()
+            assert got == [('bad', -9, None),
+                           ('r1', 5, b'world'),
+                           ('r2', 11, b'hello world')]
+            raises(ValueError, ring.read, f, -1)
+        ring.close()
+
+    def test_socket(self):
+        import _io_uring, socket, select, os
+        cli, conn = self.socket_pair()
+        ring = _io_uring.Ring(16)
+        ring.recv(conn, 100, 0, 'recv')
+        ring.submit()
+        assert select.select([ring.fileno()], [], [], 0)[0] == []
+        cli.send(b'ping')
+        assert select.select([ring.fileno()], [], [], 5)[0] == [
+            ring.fileno()]
+        assert ring.reap() == [('recv', 4, b'ping')]
+        assert select.select([ring.fileno()], [], [], 0)[0] == []
+        ring.send(conn, memoryview(b'pong'), 0, 'send')
+        assert ring.wait(1) == [('send', 4, None)]
+        assert cli.recv(100) == b'pong'
+
+        serv = socket.socket()
+        serv.bind(('127.0.0.1', 0))
+        serv.listen(1)
+        ring.accept(serv, 0, 'accept')
+        ring.submit()
+        cli2 = socket.socket()
+        cli2.connect(serv.getsockname())
+        [(name, fd, data)] = ring.wait(1)
+        assert name == 'accept' and fd >= 0
+        conn2 = socket.fromfd(fd, socket.AF_INET, socket.SOCK_STREAM)
+        os.close(fd)
+        conn2.send(b'hi')
+        assert cli2.recv(10) == b'hi'
+        for s in [cli, conn, cli2, conn2, serv]:
+            s.close()
+        ring.close()
+
+    def test_close_pending(self):
+        import _io_uring
+        cli, conn = self.socket_pair()
+        ring = _io_uring.Ring(4)
+        # cancelled by close(), which frees their buffers
+        ring.recv(conn, 100)
+        ring.recv(cli, 100)
+        ring.submit()
+        ring.recv(conn, 100)
+        assert ring.pending == 3
+        ring.close()
+        assert ring.closed
+        assert ring.pending == 0
+        cli.close()
+        conn.close()
+
+    def test_dispatcher(self):
+        import _io_uring
+        cli, conn = self.socket_pair()
+        d = _io_uring.Dispatcher(_io_uring.Ring(8))
+        log = []
+        def on_recv(result, data):
+            log.append(('recv', result, data))
+            d.send(conn, data.upper(), on_send)
+        def on_send(result, data):
+            log.append(('send', result, data))
+        d.recv(conn, 100, on_recv)
+        assert d.run_once(0.01) == 0
+        cli.send(b'abc')
+        while len(log) < 2:
+            d.run_once()
+        assert log == [('recv', 3, b'abc'), ('send', 3, None)]
+        assert cli.recv(10) == b'ABC'
+        d.close()
+        cli.close()
+        conn.close()
+
+
+    def test_dispatcher_completed_before(self):
+        import _io_uring, time
+        ring = _io_uring.Ring(4)
+        log = []
+        ring.nop(lambda result, data: log.append(result))
+        ring.submit()
+        # already completed when the Dispatcher creates the eventfd
+        d = _io_uring.Dispatcher(ring)
+        t0 = time.time()
+        assert d.run_once(10) == 1
+        assert time.time() - t0 < 5
+        assert log == [0]
+        d.close()
+
+    def test_dispatcher_callback_raises(self):
+        import _io_uring
+        d = _io_uring.Dispatcher(_io_uring.Ring(4))
+        log = []
+        def fail(result, data):
+            log.append('fail')
+            raise KeyError(len(log))
+        def ok(result, data):
+            log.append('ok')
+        d.ring.nop(fail)
+        d.ring.nop(ok)
+        d.ring.nop(fail)
+        d.ring.submit(3)
+        e = raises(KeyError, d.handle_events)
+        assert e.value.args == (1,)
+        assert sorted(log) == ['fail', 'fail', 'ok']
+        assert d.ring.reap() == []
+        d.close()
+
+class AppTestRingThreads(object):
+    spaceconfig = {
+        "usemodules": ["_io_uring", "_socket", "thread", "time"],
+    }
+
+    def test_close_while_waiting(self):
+        import _io_uring, _socket, thread, time
+        cli, conn = _socket.socketpair()
+        ring = _io_uring.Ring(4)
+        ring.recv(conn, 100)
+        done = []
+        def waiter():
+            try:
+                ring.wait(1)
+            except ValueError as e:
+                done.append(str(e))
+        thread.start_new_thread(waiter, ())
+        time.sleep(0.2)
+        assert not done
+        ring.close()
+        assert ring.closed
+        for i in range(500):
+            if done:
+                break
+            time.sleep(0.01)
+        assert done == ["I/O operation on closed ring"]
+        assert ring.pending == 0
+        cli.close()
+        conn.close()
@@ -0,0 +1,10 @@
+import pytest
+
+from rpython.rlib import rio_uring
+from pypy.objspace.fake.checkmodule import checkmodule
+
+if not rio_uring.IS_SUPPORTED:
+    pytest.skip("io_uring is Linux only, with headers from Linux 5.6 or later")
+
+def test_io_uring_translates():
+    checkmodule('_io_uring')
@@ -72,20 +72,15 @@ class JSONDecoder(W_Root):
     # don't make arbitrarily huge maps
     MAX_MAP_SIZE = 100
 
+    # when decoding a stream of documents, drop the string caches once they
+    # have more entries than this
+    MAX_STRING_CACHE_ENTRIES = 10000
+
 
     def __init__(self, space, s):
         self.space = space
         self.w_empty_string = space.newutf8("", 0)
 
-        self.s = s
-
-        # we put our string in a raw buffer so:
-        # 1) we automatically get the '\0' sentinel at the end of the string,
-        #    which means that we never have to check for the "end of string"
-        # 2) we can pass the buffer directly to strtod
-        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
-        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
-        self.pos = 0
         self.intcache = space.fromcache(IntCache)
 
         # two caches, one for keys, one for general strings. they both have the
@@ -105,22 +100,76 @@ class JSONDecoder(W_Root):
 
         # keep a list of objects that are created with maps that aren't clearly
         # useful. If they turn out to be useful in the end we are good,
-        # otherwise convert them to dicts (see .close())
+        # otherwise convert them to dicts (see .close_buffer())
         self.unclear_objects = []
 
         # this is a freelist of lists that store the decoded value of an
         # object, before they get copied into the eventual dict
         self.scratch = [[None] * self.DEFAULT_SIZE_SCRATCH]
 
+        # the total size of all the strings decoded so far. When the decoder
+        # is used for a stream of documents, the caches above are kept from
+        # one document to the next, so this is what decides whether caching
+        # strings is worth it
+        self.bytes_seen = 0
+        self.buffer_open = False
+        self.open_buffer(s)
+
+    def open_buffer(self, s):
+        """ Start decoding the string s, keeping the caches. """
+        assert not self.buffer_open
+        self.s = s
+        # we put our string in a raw buffer so:
+        # 1) we automatically get the '\0' sentinel at the end of the string,
+        #    which means that we never have to check for the "end of string"
+        # 2) we can pass the buffer directly to strtod
+        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
+        self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
+        self.buffer_open = True
+        self.pos = 0
+        self.bytes_seen += len(s)
 
-    def close(self):
+    def close_buffer(self):
         rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
         lltype.free(self.end_ptr, flavor='raw')
+        self.buffer_open = False
         # clean up objects that are instances of now blocked maps
         for w_obj in self.unclear_objects:
             jsonmap = self._get_jsonmap_from_dict(w_obj)
             if jsonmap.is_state_blocked():
                 self._devolve_jsonmap_dict(w_obj)
+        self.unclear_objects = []
+
+    def close(self):
+        if self.buffer_open:
+            self.close_buffer()
+
+    def decode_document(self, s):
+        """ Decode the complete JSON document s. The decoder can be used for
+        many documents in a row, which share the string caches. """
+        self.open_buffer(s)
+        try:
+            return self.decode_toplevel()
+        finally:
+            self.close_buffer()
+
+    def decode_toplevel(self):
+        w_res = self.decode_any(0)
+        i = self.skip_whitespace(self.pos)
+        if i < len(self.s):
+            start = i
+            end = len(self.s) - 1
+            raise oefmt(self.space.w_ValueError,
+                        "Extra data: char %d - %d", start, end)
+        return w_res
+
+    def trim_caches(self):
+        """ Called between documents of a stream: forget the cached strings
+        if there are too many of them, to keep the memory bounded. """
+        if len(self.cache_values) > self.MAX_STRING_CACHE_ENTRIES:
+            self.cache_values = {}
+        if len(self.cache_keys) > self.MAX_STRING_CACHE_ENTRIES:
+            self.cache_keys = {}
 
     def getslice(self, start, end):
         assert start >= 0
@@ -566,7 +615,7 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if self.bytes_seen < self.MIN_SIZE_FOR_STRING_CACHE:
             cache = False
 
         if not cache:
@@ -1181,14 +1230,7 @@ def loads(space, w_s):
     s = space.bytes_w(w_s)
     decoder = JSONDecoder(space, s)
     try:
-        w_res = decoder.decode_any(0)
-        i = decoder.skip_whitespace(decoder.pos)
-        if i < len(s):
-            start = i
-            end = len(s) - 1
-            raise oefmt(space.w_ValueError,
-                        "Extra data: char %d - %d", start, end)
-        return w_res
+        return decoder.decode_toplevel()
     finally:
         decoder.close()
 
@@ -1,6 +1,10 @@
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib import rutf8
-from pypy.interpreter import unicodehelper
+from rpython.rlib import rutf8, jit
+from rpython.rlib.rfloat import isfinite
+from pypy.interpreter import unicodehelper, gateway
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.floatobject import float2string
 
 
 HEX = '0123456789abcdef'
@@ -45,6 +49,16 @@ def raw_encode_basestring_ascii(space, w_string):
         sb = StringBuilder(len(s))
         first = 0
 
+    escape_ascii(sb, s, first)
+
+    res = sb.build()
+    return space.newtext(res)
+
+
+def escape_ascii(sb, s, first):
+    """ Append the utf-8 string s to sb, escaping everything that is not
+    printable ascii. The first 'first' characters need no escaping and
+    were already appended by the caller. """
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +91,314 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
-    return space.newtext(res)
+
+
+def escape_control(sb, s):
+    """ Append the string s to sb, escaping only the control characters,
+    the quote and the backslash (json.encoder.raw_encode_basestring). """
+    start = 0
+    for i in range(len(s)):
+        c = s[i]
+        if c < ' ' or c == '"' or c == '\\':
+            sb.append_slice(s, start, i)
+            if c < ' ':
+                sb.append(ESCAPE_BEFORE_SPACE[ord(c)])
+            else:
+                sb.append('\\')
+                sb.append(c)
+            start = i + 1
+    sb.append_slice(s, start, len(s))
+
+
+app = gateway.applevel("""
+    def sorted_items(d):
+        return sorted(d.items(), key=lambda kv: kv[0])
+""", filename=__file__)
+
+sorted_items = app.interphook("sorted_items")
+
+
+class JSONEncoder(object):
+    """ The interp-level version of json.encoder.JSONEncoder.encode(): it
+    walks the builtin types directly and writes into one StringBuilder.
+    Only the objects that are not JSON types go back to app-level, through
+    the 'default' function. """
+
+    def __init__(self, space, ensure_ascii, check_circular, allow_nan,
+                 sort_keys, skipkeys, indent, item_separator, key_separator,
+                 w_default):
+        self.space = space
+        self.ensure_ascii = ensure_ascii
+        self.check_circular = check_circular
+        self.allow_nan = allow_nan
+        self.sort_keys = sort_keys
+        self.skipkeys = skipkeys
+        self.indent = indent        # -1 for None
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.w_default = w_default
+        self.builder = StringBuilder()
+        self.markers = {}
+        # with ensure_ascii=False, the result is unicode as soon as one
+        # unicode string was encoded; the str parts must then be ascii
+        self.is_unicode = False
+        self.w_nonascii_bytes = None
+
+    def build_result(self):
+        space = self.space
+        s = self.builder.build()
+        if not self.is_unicode:
+            return space.newbytes(s)
+        if self.w_nonascii_bytes is not None:
+            # raise the UnicodeDecodeError of the app-level version
+            space.call_method(self.w_nonascii_bytes, 'decode',
+                              space.newtext('ascii'))
+        return space.newutf8(s, rutf8.codepoints_in_utf8(s))
+
+    # ____________________________________________________________
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            if w_obj in self.markers:
+                raise oefmt(self.space.w_ValueError,
+                            "Circular reference detected")
+            self.markers[w_obj] = None
+
+    def unmark(self, w_obj):
+        if self.check_circular:
+            del self.markers[w_obj]
+
+    def emit_indent(self, level):
+        """ Start a nested list or dict. Return the new level and the
+        separator to use between its items. """
+        if self.indent < 0:
+            return level, self.item_separator
+        level += 1
+        newline_indent = '\n' + ' ' * (self.indent * level)
+        self.builder.append(newline_indent)
+        return level, self.item_separator + newline_indent
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * (level - 1)))
+
+    def floatstr(self, x):
+        if isfinite(x):
+            return float2string(x, 'r', 0)
+        if x != x:
+            text = 'NaN'
+        elif x > 0.0:
+            text = 'Infinity'
+        else:
+            text = '-Infinity'
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float2string(x, 'r', 0))
+        return text
+
+    # ____________________________________________________________
+
+    def encode_string(self, w_string):
+        space = self.space
+        sb = self.builder
+        sb.append('"')
+        if space.isinstance_w(w_string, space.w_bytes):
+            s = space.bytes_w(w_string)
+            if self.ensure_ascii:
+                unicodehelper.check_utf8_or_raise(space, s)
+                escape_ascii(sb, s, 0)
+            else:
+                if (self.w_nonascii_bytes is None and
+                        rutf8.first_non_ascii_char(s) >= 0):
+                    self.w_nonascii_bytes = w_string
+                escape_control(sb, s)
+        else:
+            s = space.utf8_w(w_string)
+            if self.ensure_ascii:
+                escape_ascii(sb, s, 0)
+            else:
+                self.is_unicode = True
+                escape_control(sb, s)
+        sb.append('"')
+
+    def encode(self, w_obj, level):
+        space = self.space
+        sb = self.builder
+        w_type = space.type(w_obj)
+        # the exact builtin types first
+        if space.is_w(w_type, space.w_bytes) or space.is_w(w_type,
+                                                           space.w_unicode):
+            self.encode_string(w_obj)
+        elif w_obj is space.w_None:
+            sb.append('null')
+        elif w_obj is space.w_True:
+            sb.append('true')
+        elif w_obj is space.w_False:
+            sb.append('false')
+        elif space.is_w(w_type, space.w_int):
+            sb.append(str(space.int_w(w_obj)))
+        elif space.is_w(w_type, space.w_float):
+            sb.append(self.floatstr(space.float_w(w_obj)))
+        elif space.is_w(w_type, space.w_dict):
+            self.encode_dict(w_obj, level)
+        elif space.is_w(w_type, space.w_list):
+            self.encode_list(w_obj, level)
+        elif space.is_w(w_type, space.w_tuple):
+            self.encode_items(w_obj, space.fixedview(w_obj), level)
+        else:
+            self.encode_other(w_obj, level)
+
+    def encode_other(self, w_obj, level):
+        """ Subclasses of the builtin types, and the other objects. This
+        follows the order of the isinstance() checks of json.encoder. """
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_basestring):
+            self.encode_string(w_obj)
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            self.builder.append(space.text_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+              space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_items(w_obj, space.unpackiterable(w_obj), level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj, level)
+        else:
+            self.mark(w_obj)
+            w_res = space.call_function(self.w_default, w_obj)
+            self.encode(w_res, level)
+            self.unmark(w_obj)
+
+    def encode_list(self, w_list, level):
+        from pypy.objspace.std.listobject import W_ListObject
+        assert isinstance(w_list, W_ListObject)
+        if w_list.length() == 0:
+            self.builder.append('[]')
+            return
+        self.mark(w_list)
+        self.builder.append('[')
+        level, separator = self.emit_indent(level)
+        # the list may change while its items are encoded
+        i = 0
+        while i < w_list.length():
+            if i > 0:
+                self.builder.append(separator)
+            self.encode(w_list.getitem(i), level)
+            i += 1
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_list)
+
+    def encode_items(self, w_seq, items_w, level):
+        if not items_w:
+            self.builder.append('[]')
+            return
+        self.mark(w_seq)
+        self.builder.append('[')
+        level, separator = self.emit_indent(level)
+        for i in range(len(items_w)):
+            if i > 0:
+                self.builder.append(separator)
+            self.encode(items_w[i], level)
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_seq)
+
+    def encode_dict(self, w_dict, level):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        space = self.space
+        if not space.is_true(w_dict):
+            self.builder.append('{}')
+            return
+        self.mark(w_dict)
+        self.builder.append('{')
+        level, separator = self.emit_indent(level)
+        first = True
+        if (not self.sort_keys and isinstance(w_dict, W_DictMultiObject) and
+                space.is_w(space.type(w_dict), space.w_dict)):
+            # iterate with the iterator of the dict's strategy
+            iterator = w_dict.iteritems()
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                if self.encode_item(w_key, w_value, first, separator, level):
+                    first = False
+        else:
+            if self.sort_keys:
+                w_items = sorted_items(space, w_dict)
+            else:
+                w_items = space.call_method(w_dict, 'iteritems')
+            w_iter = space.iter(w_items)
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview_unroll(w_item, 2)
+                if self.encode_item(w_key, w_value, first, separator, level):
+                    first = False
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_item(self, w_key, w_value, first, separator, level):
+        """ Encode one 'key: value' of a dict. Return False if the key was
+        skipped. """
+        space = self.space
+        sb = self.builder
+        key = None
+        if space.isinstance_w(w_key, space.w_basestring):
+            pass
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self.floatstr(space.float_w(w_key))
+        elif w_key is space.w_True:
+            key = 'true'
+        elif w_key is space.w_False:
+            key = 'false'
+        elif w_key is space.w_None:
+            key = 'null'
+        elif (space.isinstance_w(w_key, space.w_int) or
+              space.isinstance_w(w_key, space.w_long)):
+            key = space.text_w(space.str(w_key))
+        elif self.skipkeys:
+            return False
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            sb.append(separator)
+        if key is None:
+            self.encode_string(w_key)
+        else:
+            sb.append('"')
+            sb.append(key)
+            sb.append('"')
+        sb.append(self.key_separator)
+        self.encode(w_value, level)
+        return True
+
+
+@jit.dont_look_inside
+@unwrap_spec(ensure_ascii=bool, check_circular=bool, allow_nan=bool,
+             sort_keys=bool, skipkeys=bool, item_separator='bytes',
+             key_separator='bytes')
+def encode(space, w_obj, ensure_ascii, check_circular, allow_nan, sort_keys,
+           skipkeys, w_indent, item_separator, key_separator, w_default):
+    """ encode(obj, ensure_ascii, check_circular, allow_nan, sort_keys,
+    skipkeys, indent, item_separator, key_separator, default)
+
+    The same as json.JSONEncoder(...).encode(obj) with encoding='utf-8'. """
+    if space.is_none(w_indent):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    encoder = JSONEncoder(space, ensure_ascii, check_circular, allow_nan,
+                          sort_keys, skipkeys, indent, item_separator,
+                          key_separator, w_default)
+    encoder.encode(w_obj, 0)
+    return encoder.build_result()
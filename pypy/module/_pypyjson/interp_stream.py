@@ -0,0 +1,250 @@
+from rpython.rlib import jit
+from rpython.rlib.rstring import StringBuilder
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# states of the top-level array, in array mode
+ARRAY_START = 0     # before the '['
+ARRAY_FIRST = 1     # after the '[', before the first item or the ']'
+ARRAY_ITEM = 2      # after a ',', before an item
+ARRAY_SEP = 3       # after an item, before the ',' or ']'
+ARRAY_END = 4       # after the ']'
+
+
+class W_JSONStreamDecoder(W_Root):
+    """ Split a stream of bytes into JSON documents and decode them one by
+    one. The documents are either whitespace-separated values (e.g.
+    newline-delimited JSON), or, in array mode, the items of one big
+    top-level array.
+
+    All the documents are decoded with the same JSONDecoder, so the string
+    caches warm up across documents, and the JSONMaps are shared anyway.
+    Only the bytes of the current document are kept in memory. """
+
+    def __init__(self, space, w_file, array, chunksize):
+        self.space = space
+        self.w_file = w_file
+        self.array = array
+        self.chunksize = chunksize
+        self.decoder = JSONDecoder(space, '')
+        self.decoder.close()
+        self.finished = False
+
+        # the complete documents that were not decoded yet
+        self.ready = []
+        self.ready_index = 0
+
+        # the bytes of the current, incomplete document
+        self.pending = StringBuilder()
+        self.pending_length = 0
+
+        # the state of the scanner that finds the end of the documents
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.in_value = False
+        self.array_state = ARRAY_START
+
+    def _raise(self, msg):
+        raise OperationError(self.space.w_ValueError, self.space.newtext(msg))
+
+    # ____________________________________________________________
+    # splitting the input into documents
+
+    @jit.dont_look_inside
+    def feed(self, data):
+        """ Scan data, and move the documents that end in it to self.ready.
+        The scanner only looks at the nesting of brackets and strings; the
+        documents are properly parsed by the decoder later. """
+        start = 0
+        i = 0
+        end = len(data)
+        while i < end:
+            ch = data[i]
+            i += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._add_document(data, start, i)
+                continue
+            if not self.in_value:
+                # between two documents
+                if is_whitespace(ch):
+                    start = i
+                    continue
+                if self.array and not self._array_punctuation(ch):
+                    start = i
+                    continue
+                self.in_value = True
+                start = i - 1
+            elif self.depth == 0:
+                # inside a top-level number or constant
+                if is_whitespace(ch) or (self.array and (ch == ',' or
+                                                         ch == ']')):
+                    self._add_document(data, start, i - 1)
+                    start = i - 1
+                    i -= 1
+                    continue
+            if ch == '"':
+                self.in_string = True
+            elif ch == '[' or ch == '{':
+                self.depth += 1
+            elif ch == ']' or ch == '}':
+                self.depth -= 1
+                if self.depth <= 0:
+                    # a negative depth is an error that the decoder reports
+                    self.depth = 0
+                    self._add_document(data, start, i)
+        if self.in_value and start < end:
+            assert start >= 0
+            self.pending.append_slice(data, start, end)
+            self.pending_length += end - start
+
+    def _array_punctuation(self, ch):
+        """ In array mode, handle the character ch found between two items.
+        Return True if ch starts an item. """
+        state = self.array_state
+        if state == ARRAY_START:
+            if ch != '[':
+                self._raise("Expected '[' at the start of the array")
+            self.array_state = ARRAY_FIRST
+            return False
+        if state == ARRAY_SEP:
+            if ch == ',':
+                self.array_state = ARRAY_ITEM
+            elif ch == ']':
+                self.array_state = ARRAY_END
+            else:
+                self._raise("Expected ',' or ']' between array items")
+            return False
+        if state == ARRAY_END:
+            self._raise("Extra data after the end of the array")
+        if ch == ']' and state == ARRAY_FIRST:
+            self.array_state = ARRAY_END
+            return False
+        if ch == ',' or ch == ']':
+            self._raise("Expected an array item")
+        return True
+
+    def _add_document(self, data, start, stop):
+        assert start >= 0
+        assert stop >= start
+        if self.pending_length:
+            self.pending.append_slice(data, start, stop)
+            document = self.pending.build()
+            self.pending = StringBuilder()
+            self.pending_length = 0
+        else:
+            document = data[start:stop]
+        self.ready.append(document)
+        self.in_value = False
+        if self.array:
+            self.array_state = ARRAY_SEP
+
+    def finish(self):
+        """ The end of the input was reached. """
+        if self.finished:
+            return
+        self.finished = True
+        if self.in_value:
+            # a number or a constant at the very end, or an unterminated
+            # document that the decoder will complain about
+            self._add_document('', 0, 0)
+        if self.array and self.array_state != ARRAY_END:
+            self._raise("Unterminated array")
+
+    # ____________________________________________________________
+    # decoding
+
+    @jit.dont_look_inside
+    def next_document(self):
+        """ Return the next decoded document, or None if no complete
+        document is available (yet). """
+        while self.ready_index == len(self.ready):
+            self.ready = []
+            self.ready_index = 0
+            if self.w_file is None or self.finished:
+                return None
+            self.read_chunk()
+        document = self.ready[self.ready_index]
+        self.ready[self.ready_index] = ''
+        self.ready_index += 1
+        decoder = self.decoder
+        decoder.trim_caches()
+        return decoder.decode_document(document)
+
+    def read_chunk(self):
+        space = self.space
+        w_data = space.call_method(self.w_file, 'read',
+                                   space.newint(self.chunksize))
+        data = space.bytes_w(w_data)
+        if data:
+            self.feed(data)
+        else:
+            self.finish()
+
+    def descr_feed(self, space, w_data):
+        """ feed(data)
+
+        Add more bytes of the stream. The documents that are complete can
+        then be fetched by iterating over the decoder. """
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        if self.finished:
+            raise oefmt(space.w_ValueError, "feed() after close()")
+        self.feed(space.bytes_w(w_data))
+
+    def descr_close(self, space):
+        """ close()
+
+        Mark the end of the stream. The last document may be a number that
+        was not followed by whitespace yet. """
+        self.finish()
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        w_res = self.next_document()
+        if w_res is None:
+            raise OperationError(space.w_StopIteration, space.w_None)
+        return w_res
+
+
+@unwrap_spec(array=bool, chunksize=int)
+def descr_new_stream_decoder(space, w_subtype, w_file=None, array=False,
+                             chunksize=DEFAULT_CHUNK_SIZE):
+    """ JSONStreamDecoder(file=None, array=False, chunksize=65536)
+
+    Decode a stream of JSON documents. Iterating over the decoder returns
+    the documents. If 'file' is given, the bytes are read from it in chunks
+    of 'chunksize', otherwise they are given to feed(). With 'array' set,
+    the stream is a single top-level array and the documents are its
+    items. """
+    if space.is_none(w_file):
+        w_file = None
+    if chunksize <= 0:
+        raise oefmt(space.w_ValueError, "chunksize must be positive")
+    w_obj = space.allocate_instance(W_JSONStreamDecoder, w_subtype)
+    W_JSONStreamDecoder.__init__(w_obj, space, w_file, array, chunksize)
+    return w_obj
+
+W_JSONStreamDecoder.typedef = TypeDef(
+    '_pypyjson.JSONStreamDecoder',
+    __new__ = interp2app(descr_new_stream_decoder),
+    __iter__ = interp2app(W_JSONStreamDecoder.descr_iter),
+    next = interp2app(W_JSONStreamDecoder.descr_next),
+    feed = interp2app(W_JSONStreamDecoder.descr_feed),
+    close = interp2app(W_JSONStreamDecoder.descr_close),
+)
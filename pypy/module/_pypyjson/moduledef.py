@@ -7,6 +7,8 @@ class Module(MixedModule):
 
     interpleveldefs = {
         'loads' : 'interp_decoder.loads',
+        'JSONStreamDecoder' : 'interp_stream.W_JSONStreamDecoder',
         'raw_encode_basestring_ascii':
             'interp_encoder.raw_encode_basestring_ascii',
+        'encode' : 'interp_encoder.encode',
         }
@@ -272,6 +272,22 @@ class TestJson(object):
         assert m2.instantiation_count == 2
         dec.close()
 
+    def test_decode_document_keeps_caches(self):
+        space = self.space
+        dec = JSONDecoder(space, '')
+        dec.close()
+        w_res = dec.decode_document('{"abc": 1}')
+        assert dec.cache_keys
+        entry, = dec.cache_keys.values()
+        w_res2 = dec.decode_document(' {"abc": 2} ')
+        assert dec.cache_keys.values() == [entry]
+        w_abc = space.newutf8("abc", 3)
+        assert space.int_w(space.getitem(w_res, w_abc)) == 1
+        assert space.int_w(space.getitem(w_res2, w_abc)) == 2
+        assert dec.bytes_seen == len('{"abc": 1}') + len(' {"abc": 2} ')
+        assert not dec.buffer_open
+        dec.close()
+
 
 class AppTest(object):
     spaceconfig = {"objspace.usemodules._pypyjson": True}
@@ -538,3 +554,187 @@ class AppTest(object):
         a = '{"abc": "4", "k": 1, "k": 1.5, "c": null, "k": 2}'
         d = _pypyjson.loads(a)
         assert d == {u"abc": u"4", u"c": None, u"k": 2}
+
+    def test_stream_decoder_feed(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder()
+        assert list(dec) == []
+        dec.feed('{"a": [1, "}"]}\n{"a"')
+        assert list(dec) == [{u'a': [1, u'}']}]
+        dec.feed(': 2}\n"x\\"y" 12')
+        assert list(dec) == [{u'a': 2}, u'x"y']
+        dec.feed('3 true')
+        assert list(dec) == [123]
+        dec.close()
+        assert list(dec) == [True]
+        raises(ValueError, dec.feed, '1')
+
+    def test_stream_decoder_bytewise(self):
+        import _pypyjson
+        s = '{"a": [1, 2.5, "\\u20ac"]} [] "s" null -1.5e3 {"b": {}}\n'
+        expected = [{u'a': [1, 2.5, u'\u20ac']}, [], u's', None, -1.5e3,
+                    {u'b': {}}]
+        dec = _pypyjson.JSONStreamDecoder()
+        res = []
+        for c in s:
+            dec.feed(c)
+            res.extend(dec)
+        dec.close()
+        res.extend(dec)
+        assert res == expected
+
+    def test_stream_decoder_errors(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder()
+        dec.feed('{"a": 1} {"a": } 3 ')
+        assert dec.next() == {u'a': 1}
+        exc = raises(ValueError, dec.next)
+        assert 'char' in str(exc.value)
+        assert dec.next() == 3
+        dec.feed('[1, 2')
+        dec.close()
+        exc = raises(ValueError, dec.next)
+        assert str(exc.value) == 'Unterminated array starting at char 1'
+
+    def test_stream_decoder_array(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder(array=True)
+        dec.feed(' [ 1, {"a": [2, 3]}, "x,]"')
+        assert list(dec) == [1, {u'a': [2, 3]}, u'x,]']
+        dec.feed(' , 4.5')
+        assert list(dec) == []
+        dec.feed(']\n')
+        dec.close()
+        assert list(dec) == [4.5]
+        #
+        dec = _pypyjson.JSONStreamDecoder(array=True)
+        dec.feed('[]')
+        dec.close()
+        assert list(dec) == []
+        for bad in ['{}', '[1 2]', '[1,,2]', '[,1]', '[1] 2', '[1,]']:
+            dec = _pypyjson.JSONStreamDecoder(array=True)
+            def f():
+                dec.feed(bad)
+                dec.close()
+                return list(dec)
+            raises(ValueError, f)
+        dec = _pypyjson.JSONStreamDecoder(array=True)
+        dec.feed('[1, 2')
+        raises(ValueError, dec.close)
+
+    def test_stream_decoder_file(self):
+        import _pypyjson, StringIO
+        lines = ['{"id": %d, "name": "n%d", "tags": ["a", "b"]}' % (i, i)
+                 for i in range(100)]
+        for chunksize in [1, 7, 4096]:
+            f = StringIO.StringIO('\n'.join(lines) + '\n')
+            res = list(_pypyjson.JSONStreamDecoder(f, chunksize=chunksize))
+            assert res == [{u'id': i, u'name': u'n%d' % i,
+                            u'tags': [u'a', u'b']} for i in range(100)]
+            f = StringIO.StringIO('[' + ','.join(lines) + ']')
+            dec = _pypyjson.JSONStreamDecoder(f, array=True,
+                                              chunksize=chunksize)
+            assert [d[u'id'] for d in dec] == range(100)
+        raises(ValueError, _pypyjson.JSONStreamDecoder, f, chunksize=0)
+        raises(TypeError, _pypyjson.JSONStreamDecoder().feed, u'1')
+
+    def test_encode(self):
+        import _pypyjson
+        def encode(obj, ensure_ascii=True, check_circular=True,
+                   allow_nan=True, sort_keys=False, skipkeys=False,
+                   indent=None, separators=(', ', ': '), default=None):
+            if default is None:
+                def default(o):
+                    raise TypeError(repr(o) + " is not JSON serializable")
+            return _pypyjson.encode(obj, ensure_ascii, check_circular,
+                                    allow_nan, sort_keys, skipkeys, indent,
+                                    separators[0], separators[1], default)
+        assert encode(None) == 'null'
+        assert encode([True, False, 1, -2L, 2**70, 1.5, 1e100]) == (
+            '[true, false, 1, -2, 1180591620717411303424, 1.5, 1e+100]')
+        assert encode(('a', u'\xe9', '\xc3\xa9', '"\n')) == (
+            '["a", "\\u00e9", "\\u00e9", "\\"\\n"]')
+        assert encode({'a': [1, {}], 'b': ()}, sort_keys=True) == (
+            '{"a": [1, {}], "b": []}')
+        assert encode({1: 2, 1.5: 3, None: 4, True: 5}, sort_keys=True) == (
+            '{"null": 4, "1": 5, "1.5": 3}')
+        res = encode({'a': [1, 2], 'b': {}}, sort_keys=True, indent=2,
+                     separators=(',', ': '))
+        assert res == '{\n  "a": [\n    1,\n    2\n  ],\n  "b": {}\n}'
+        d = dict.fromkeys(range(100))
+        assert _pypyjson.loads(encode(d)) == dict([(unicode(i), None)
+                                                   for i in range(100)])
+
+    def test_encode_errors(self):
+        import _pypyjson
+        def encode(obj, skipkeys=False, allow_nan=True, check_circular=True):
+            def default(o):
+                raise TypeError(repr(o) + " is not JSON serializable")
+            return _pypyjson.encode(obj, True, check_circular, allow_nan,
+                                    False, skipkeys, None, ',', ':', default)
+        l = [1]
+        l.append(l)
+        raises(ValueError, encode, l)
+        d = {}
+        d['d'] = d
+        raises(ValueError, encode, d)
+        raises(RuntimeError, encode, l, check_circular=False)
+        assert encode(l[:1] * 3) == '[1,1,1]'
+        raises(TypeError, encode, {(1, 2): 3})
+        assert encode({(1, 2): 3, 'a': 4}, skipkeys=True) == '{"a":4}'
+        assert encode(float('nan')) == 'NaN'
+        assert encode([float('inf'), float('-inf')]) == '[Infinity,-Infinity]'
+        raises(ValueError, encode, float('nan'), allow_nan=False)
+        raises(TypeError, encode, object())
+        raises(UnicodeDecodeError, encode, '\xff')
+
+    def test_encode_not_ascii(self):
+        import _pypyjson
+        def encode(obj):
+            return _pypyjson.encode(obj, False, True, True, False, False,
+                                    None, ', ', ': ', None)
+        res = encode(['\xc3\xa9', '\x01"'])
+        assert type(res) is str
+        assert res == '["\xc3\xa9", "\\u0001\\""]'
+        res = encode([u'\xe9', 'a'])
+        assert type(res) is unicode
+        assert res == u'["\xe9", "a"]'
+        raises(UnicodeDecodeError, encode, [u'\xe9', '\xc3\xa9'])
+
+    def test_encode_subclasses_and_default(self):
+        import _pypyjson
+        class MyInt(int):
+            def __str__(self):
+                return '42'
+        class MyList(list):
+            def __iter__(self):
+                return iter([1, 2])
+        class MyDict(dict):
+            def iteritems(self):
+                return iter([('k', 'v')])
+        class Point(object):
+            def __init__(self, x):
+                self.x = x
+        def default(o):
+            if isinstance(o, Point):
+                return {'x': o.x}
+            raise TypeError
+        res = _pypyjson.encode([MyInt(5), MyList(), MyDict(a=1),
+                                Point(Point(1))], True, True, True, False,
+                               False, None, ',', ':', default)
+        assert res == '[42,[1,2],{"k":"v"},{"x":{"x":1}}]'
+
+
+class AppTestJSONModule(object):
+    spaceconfig = {"usemodules": ['_pypyjson', 'struct']}
+
+    def test_json_module_uses_encode(self):
+        import json
+        d = {'b': [1, 2.5, None], 'a': u'\u1234'}
+        assert json.dumps(d['b']) == '[1, 2.5, null]'
+        assert json.dumps(d, sort_keys=True, indent=1) == (
+            '{\n "a": "\\u1234", \n "b": [\n  1, \n  2.5, \n  null\n ]\n}')
+        assert json.dumps(d, sort_keys=True, ensure_ascii=False) == (
+            u'{"a": "\u1234", "b": [1, 2.5, null]}')
+        assert json.dumps(set([1]), default=list) == '[1]'
+        assert json.dumps({'a': 1}, separators=(u',', u':')) == '{"a":1}'
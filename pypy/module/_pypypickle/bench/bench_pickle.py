@@ -0,0 +1,67 @@
+""" dumps() and loads() of nested dicts, lists and instances, with the
+cPickle module and with the pure Python pickle module.  Run it on a
+translated pypy:
+
+    pypy bench_pickle.py [size] [repeat]
+"""
+
+import sys
+import time
+import pickle
+import cPickle
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+class Task(object):
+    def __init__(self, name, args, points):
+        self.name = name
+        self.args = args
+        self.points = points
+
+def make_payload(n):
+    import random
+    random.seed(n)
+    payload = []
+    for i in range(n):
+        points = [Point(random.random(), random.randrange(1000))
+                  for j in range(10)]
+        payload.append({
+            'id': i,
+            'name': 'task-%d' % i,
+            'uname': u't\xe2che-%d' % i,
+            'tags': ['a', 'b', 'c', str(i % 7)],
+            'big': 2 ** 70 + i,
+            'task': Task('task-%d' % i, (i, i * 1.5, None, True), points),
+            'deps': dict.fromkeys(range(i % 20), 0.5),
+        })
+    return payload
+
+def timeit(func, arg, r):
+    best = sys.float_info.max
+    for i in range(r):
+        t0 = time.time()
+        result = func(arg)
+        best = min(best, time.time() - t0)
+    return best, result
+
+def main(n, r):
+    payload = make_payload(n)
+    for proto in range(3):
+        for name, mod in [('pickle', pickle), ('cPickle', cPickle)]:
+            t_dump, data = timeit(lambda x: mod.dumps(x, proto), payload, r)
+            t_load, _ = timeit(mod.loads, data, r)
+            print '%-8s protocol %d: dumps %.4f s, loads %.4f s, %d bytes' % (
+                name, proto, t_dump, t_load, len(data))
+
+if __name__ == '__main__':
+    n = 10000
+    r = 5
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        r = int(sys.argv[2])
+    main(n, r)
@@ -0,0 +1,834 @@
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstruct import ieee
+from rpython.rlib.rarithmetic import intmask
+
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.gateway import interp2app, unwrap_spec, WrappedDefault
+from pypy.interpreter.function import Function, BuiltinFunction
+from pypy.module.__builtin__.interp_classobj import (
+    W_ClassObject, W_InstanceObject)
+from pypy.module._pypypickle.state import get_state, import_module
+
+
+HIGHEST_PROTOCOL = 2
+BATCHSIZE = 1000    # keep in sync with pickle.Pickler._BATCHSIZE
+
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+PERSID          = 'P'
+BINPERSID       = 'Q'
+REDUCE          = 'R'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+BUILD           = 'b'
+GLOBAL          = 'c'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+INST            = 'i'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+OBJ             = 'o'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+TRUE            = 'I01\n'
+FALSE           = 'I00\n'
+PROTO           = '\x80'
+NEWOBJ          = '\x81'
+EXT1            = '\x82'
+EXT2            = '\x83'
+EXT4            = '\x84'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+_tuplesize2code = [EMPTY_TUPLE, TUPLE1, TUPLE2, TUPLE3]
+
+
+def pack_int32(builder, i):
+    builder.append(chr(i & 0xff))
+    builder.append(chr((i >> 8) & 0xff))
+    builder.append(chr((i >> 16) & 0xff))
+    builder.append(chr((i >> 24) & 0xff))
+
+def encode_long(bigint):
+    """Two's complement little-endian encoding, as pickle.encode_long()."""
+    if bigint.sign == 0:
+        return ''
+    nbytes = (bigint.abs().bit_length() >> 3) + 1
+    data = bigint.tobytes(nbytes, 'little', True)
+    last = nbytes - 1
+    if (bigint.sign < 0 and last > 0 and data[last] == '\xff' and
+            ord(data[last - 1]) & 0x80):
+        data = data[:last]
+    return data
+
+
+class W_Pickler(W_Root):
+    """Interp-level part of cPickle.Pickler: writes pickles into an
+    internal buffer, keeping the memo as an identity dictionary."""
+
+    def __init__(self, space):
+        self.space = space
+        self.proto = 0
+        self.bin = False
+        self.fast = False
+        self.memo = {}
+        self.keep_alive = []
+        self.builder = StringBuilder()
+        self.w_persistent_id = None
+
+    @unwrap_spec(protocol=int)
+    def descr_init(self, space, protocol=0):
+        if protocol < 0:
+            protocol = HIGHEST_PROTOCOL
+        elif protocol > HIGHEST_PROTOCOL:
+            raise oefmt(space.w_ValueError,
+                        "pickle protocol %d asked for; the highest available "
+                        "protocol is %d", protocol, HIGHEST_PROTOCOL)
+        self.proto = protocol
+        self.bin = protocol >= 1
+
+    def write(self, s):
+        self.builder.append(s)
+
+    def descr_write(self, space, w_data):
+        self.builder.append(space.bytes_w(w_data))
+
+    def descr_getvalue(self, space):
+        """Return the pickled data written so far and clear the buffer."""
+        data = self.builder.build()
+        self.builder = StringBuilder()
+        return space.newbytes(data)
+
+    def descr_clear_memo(self, space):
+        self.memo.clear()
+        self.keep_alive = []
+
+    def descr_dump(self, space, w_obj):
+        """Write a pickled representation of obj to the buffer."""
+        self.w_persistent_id = space.findattr(self,
+                                              space.newtext('persistent_id'))
+        if self.proto >= 2:
+            self.write(PROTO)
+            self.write(chr(self.proto))
+        self.save(w_obj)
+        self.write(STOP)
+
+    def descr_save(self, space, w_obj):
+        self.save(w_obj)
+
+    def descr_memoize(self, space, w_obj):
+        self.memoize(w_obj)
+
+    # ____________________________________________________________
+    # memo
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        # cPickle starts counting at one
+        index = len(self.memo) + 1
+        self.write_put(index)
+        self.memo[w_obj] = index
+
+    def write_put(self, i):
+        if self.bin:
+            if i < 256:
+                self.write(BINPUT)
+                self.write(chr(i))
+            else:
+                self.write(LONG_BINPUT)
+                pack_int32(self.builder, i)
+        else:
+            self.write(PUT)
+            self.write(str(i))
+            self.write('\n')
+
+    def write_get(self, i):
+        if self.bin:
+            if i < 256:
+                self.write(BINGET)
+                self.write(chr(i))
+            else:
+                self.write(LONG_BINGET)
+                pack_int32(self.builder, i)
+        else:
+            self.write(GET)
+            self.write(str(i))
+            self.write('\n')
+
+    def memo_get(self, w_obj):
+        return self.memo.get(w_obj, 0)
+
+    # ____________________________________________________________
+    # the main dispatch
+
+    def save(self, w_obj, pers_save=False):
+        space = self.space
+        if self.w_persistent_id is not None and not pers_save:
+            w_pid = space.call_function(self.w_persistent_id, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+
+        if w_obj is space.w_None:
+            self.write(NONE)
+            return
+        w_type = space.type(w_obj)
+        if space.is_w(w_type, space.w_int):
+            self.save_int(space.int_w(w_obj))
+            return
+        if space.is_w(w_type, space.w_float):
+            self.save_float(w_obj)
+            return
+        if space.is_w(w_type, space.w_bool):
+            self.save_bool(space.is_true(w_obj))
+            return
+        if space.is_w(w_type, space.w_long):
+            self.save_long(w_obj)
+            return
+
+        index = self.memo_get(w_obj)
+        if index:
+            self.write_get(index)
+            return
+
+        if space.is_w(w_type, space.w_bytes):
+            self.save_string(w_obj)
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_unicode(w_obj)
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list):
+            self.save_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.save_dict(w_obj)
+        elif isinstance(w_obj, W_InstanceObject):
+            self.save_inst(w_obj)
+        elif (isinstance(w_obj, W_ClassObject) or
+              space.is_w(w_type, space.w_type) or
+              space.is_w(w_type, space.gettypeobject(BuiltinFunction.typedef))):
+            self.save_global(w_obj)
+        elif space.is_w(w_type, space.gettypeobject(Function.typedef)):
+            self.save_function(w_obj)
+        else:
+            self.save_by_reduce(w_obj, w_type)
+
+    def save_pers(self, w_pid):
+        space = self.space
+        if self.bin:
+            self.save(w_pid, pers_save=True)
+            self.write(BINPERSID)
+        else:
+            self.write(PERSID)
+            self.write(space.bytes_w(space.str(w_pid)))
+            self.write('\n')
+
+    # ____________________________________________________________
+    # atomic types
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.write(NEWTRUE if value else NEWFALSE)
+        else:
+            self.write(TRUE if value else FALSE)
+
+    def save_int(self, value):
+        if self.bin:
+            if value >= 0:
+                if value <= 0xff:
+                    self.write(BININT1)
+                    self.write(chr(value))
+                    return
+                if value <= 0xffff:
+                    self.write(BININT2)
+                    self.write(chr(value & 0xff))
+                    self.write(chr(value >> 8))
+                    return
+            high_bits = value >> 31
+            if high_bits == 0 or high_bits == -1:
+                self.write(BININT)
+                pack_int32(self.builder, value)
+                return
+        self.write(INT)
+        self.write(str(value))
+        self.write('\n')
+
+    def save_long(self, w_obj):
+        space = self.space
+        if self.proto >= 2:
+            data = encode_long(space.bigint_w(w_obj))
+            n = len(data)
+            if n < 256:
+                self.write(LONG1)
+                self.write(chr(n))
+            else:
+                self.write(LONG4)
+                pack_int32(self.builder, n)
+            self.write(data)
+            return
+        self.write(LONG)
+        self.write(space.text_w(space.repr(w_obj)))
+        self.write('\n')
+
+    def save_float(self, w_obj):
+        space = self.space
+        if self.bin:
+            self.write(BINFLOAT)
+            value = ieee.float_pack(space.float_w(w_obj), 8)
+            for i in range(7, -1, -1):
+                self.write(chr(intmask(value >> (i * 8)) & 0xff))
+        else:
+            self.write(FLOAT)
+            self.write(space.text_w(space.repr(w_obj)))
+            self.write('\n')
+
+    def save_string(self, w_obj):
+        space = self.space
+        if self.bin:
+            s = space.bytes_w(w_obj)
+            n = len(s)
+            if n < 256:
+                self.write(SHORT_BINSTRING)
+                self.write(chr(n))
+            else:
+                self.write(BINSTRING)
+                pack_int32(self.builder, n)
+            self.write(s)
+        else:
+            self.write(STRING)
+            self.write(space.text_w(space.repr(w_obj)))
+            self.write('\n')
+        self.memoize(w_obj)
+
+    def save_unicode(self, w_obj):
+        space = self.space
+        if self.bin:
+            s = space.utf8_w(w_obj)
+            self.write(BINUNICODE)
+            pack_int32(self.builder, len(s))
+            self.write(s)
+        else:
+            w_u = space.call_method(w_obj, 'replace', space.newtext('\\'),
+                                    space.newtext('\\u005c'))
+            w_u = space.call_method(w_u, 'replace', space.newtext('\n'),
+                                    space.newtext('\\u000a'))
+            w_s = space.call_method(w_u, 'encode',
+                                    space.newtext('raw-unicode-escape'))
+            self.write(UNICODE)
+            self.write(space.bytes_w(w_s))
+            self.write('\n')
+        self.memoize(w_obj)
+
+    # ____________________________________________________________
+    # containers
+
+    def save_tuple(self, w_obj):
+        space = self.space
+        items_w = space.fixedview(w_obj)
+        n = len(items_w)
+        if n == 0:
+            if self.proto:
+                self.write(EMPTY_TUPLE)
+            else:
+                self.write(MARK)
+                self.write(TUPLE)
+            return
+
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            # the tuple is recursive if saving its items memoized it
+            index = self.memo_get(w_obj)
+            if index:
+                for i in range(n):
+                    self.write(POP)
+                self.write_get(index)
+            else:
+                self.write(_tuplesize2code[n])
+                self.memoize(w_obj)
+            return
+
+        self.write(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        index = self.memo_get(w_obj)
+        if index:
+            if self.proto:
+                self.write(POP_MARK)
+            else:
+                for i in range(n + 1):
+                    self.write(POP)
+            self.write_get(index)
+            return
+        self.write(TUPLE)
+        self.memoize(w_obj)
+
+    def save_list(self, w_list):
+        from pypy.objspace.std.listobject import W_ListObject
+        assert isinstance(w_list, W_ListObject)
+        if self.bin:
+            self.write(EMPTY_LIST)
+        else:
+            self.write(MARK)
+            self.write(LIST)
+        self.memoize(w_list)
+
+        # the list may change size while its items are saved, so the
+        # length is checked again for every item
+        i = 0
+        if not self.bin:
+            while i < w_list.length():
+                self.save(w_list.getitem(i))
+                self.write(APPEND)
+                i += 1
+            return
+        while i < w_list.length():
+            stop = min(i + BATCHSIZE, w_list.length())
+            if stop - i > 1:
+                self.write(MARK)
+                while i < stop and i < w_list.length():
+                    self.save(w_list.getitem(i))
+                    i += 1
+                self.write(APPENDS)
+            else:
+                self.save(w_list.getitem(i))
+                self.write(APPEND)
+                i += 1
+
+    def save_dict(self, w_dict):
+        from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+        assert isinstance(w_dict, W_DictMultiObject)
+        if self.save_maybe_moduledict(w_dict):
+            return
+        if self.bin:
+            self.write(EMPTY_DICT)
+        else:
+            self.write(MARK)
+            self.write(DICT)
+        self.memoize(w_dict)
+
+        iterator = w_dict.iteritems()
+        if not self.bin:
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            return
+        while True:
+            w_key, w_value = iterator.next_item()
+            if w_key is None:
+                break
+            w_key2, w_value2 = iterator.next_item()
+            if w_key2 is None:
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+                break
+            self.write(MARK)
+            self.save(w_key)
+            self.save(w_value)
+            self.save(w_key2)
+            self.save(w_value2)
+            n = 2
+            while n < BATCHSIZE:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                self.save(w_key)
+                self.save(w_value)
+                n += 1
+            self.write(SETITEMS)
+            if n < BATCHSIZE:
+                break
+
+    def save_maybe_moduledict(self, w_dict):
+        # save module dictionary as "getattr(module, '__dict__')"
+        space = self.space
+        w_name = w_dict.getitem_str('__name__')
+        if w_name is None or not space.is_w(space.type(w_name), space.w_bytes):
+            return False
+        w_modules = space.sys.get('modules')
+        w_module = space.finditem(w_modules, w_name)
+        if w_module is None:
+            return False
+        from pypy.interpreter.module import Module
+        if not isinstance(w_module, Module):
+            return False
+        if not space.is_w(space.findattr(w_module, space.newtext('__dict__')),
+                          w_dict):
+            return False
+        w_getattr = space.builtin.get('getattr')
+        self.save_reduce(w_getattr, space.newtuple(
+            [w_module, space.newtext('__dict__')]))
+        return True
+
+    def batch_appends(self, w_iter):
+        space = self.space
+        if not self.bin:
+            while True:
+                w_item = self.next_item(w_iter)
+                if w_item is None:
+                    break
+                self.save(w_item)
+                self.write(APPEND)
+            return
+        while True:
+            items_w = self._next_batch(w_iter)
+            n = len(items_w)
+            if n > 1:
+                self.write(MARK)
+                for w_item in items_w:
+                    self.save(w_item)
+                self.write(APPENDS)
+            elif n:
+                self.save(items_w[0])
+                self.write(APPEND)
+            if n < BATCHSIZE:
+                break
+
+    def batch_setitems(self, w_iter):
+        space = self.space
+        if not self.bin:
+            while True:
+                w_item = self.next_item(w_iter)
+                if w_item is None:
+                    break
+                w_key, w_value = space.fixedview_unroll(w_item, 2)
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            return
+        while True:
+            items_w = self._next_batch(w_iter)
+            n = len(items_w)
+            if n > 1:
+                self.write(MARK)
+                for w_item in items_w:
+                    w_key, w_value = space.fixedview_unroll(w_item, 2)
+                    self.save(w_key)
+                    self.save(w_value)
+                self.write(SETITEMS)
+            elif n:
+                w_key, w_value = space.fixedview_unroll(items_w[0], 2)
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            if n < BATCHSIZE:
+                break
+
+    def next_item(self, w_iter):
+        space = self.space
+        try:
+            return space.next(w_iter)
+        except OperationError as e:
+            if not e.match(space, space.w_StopIteration):
+                raise
+            return None
+
+    def _next_batch(self, w_iter):
+        space = self.space
+        items_w = []
+        while len(items_w) < BATCHSIZE:
+            w_item = self.next_item(w_iter)
+            if w_item is None:
+                break
+            items_w.append(w_item)
+        return items_w
+
+    # ____________________________________________________________
+    # objects saved by reference or through the reduce protocol
+
+    def save_global(self, w_obj, w_name=None):
+        space = self.space
+        state = get_state(space)
+        if w_name is None:
+            w_name = space.getattr(w_obj, space.newtext('__name__'))
+        w_module = space.findattr(w_obj, space.newtext('__module__'))
+        if w_module is None or space.is_w(w_module, space.w_None):
+            w_module = space.call_function(state.w_whichmodule, w_obj, w_name)
+        module = space.text_w(w_module)
+        name = space.text_w(w_name)
+        try:
+            import_module(space, w_module)
+            w_mod = space.getitem(space.sys.get('modules'), w_module)
+            w_klass = space.getattr(w_mod, w_name)
+        except OperationError as e:
+            if not (e.match(space, space.w_ImportError) or
+                    e.match(space, space.w_KeyError) or
+                    e.match(space, space.w_AttributeError)):
+                raise
+            raise oefmt(state.w_PicklingError,
+                        "Can't pickle %R: it's not found as %s.%s",
+                        w_obj, module, name)
+        if not space.is_w(w_klass, w_obj):
+            raise oefmt(state.w_PicklingError,
+                        "Can't pickle %R: it's not the same object as %s.%s",
+                        w_obj, module, name)
+
+        if self.proto >= 2:
+            w_code = space.finditem(state.w_extension_registry,
+                                    space.newtuple([w_module, w_name]))
+            if w_code is not None and space.is_true(w_code):
+                code = space.int_w(w_code)
+                assert code > 0
+                if code <= 0xff:
+                    self.write(EXT1)
+                    self.write(chr(code))
+                elif code <= 0xffff:
+                    self.write(EXT2)
+                    self.write(chr(code & 0xff))
+                    self.write(chr(code >> 8))
+                else:
+                    self.write(EXT4)
+                    pack_int32(self.builder, code)
+                return
+
+        self.write(GLOBAL)
+        self.write(module)
+        self.write('\n')
+        self.write(name)
+        self.write('\n')
+        self.memoize(w_obj)
+
+    def save_function(self, w_obj):
+        space = self.space
+        try:
+            self.save_global(w_obj)
+            return
+        except OperationError as e:
+            if not e.match(space, get_state(space).w_PicklingError):
+                raise
+            w_rv = self.call_reduce(w_obj, space.type(w_obj))
+            if w_rv is None:
+                raise
+        self.save_reduce_value(w_obj, w_rv)
+
+    def save_inst(self, w_obj):
+        space = self.space
+        w_cls = space.getattr(w_obj, space.newtext('__class__'))
+        w_getinitargs = space.findattr(w_obj, space.newtext('__getinitargs__'))
+        if w_getinitargs is not None:
+            w_args = space.call_function(w_getinitargs)
+            args_w = space.fixedview(w_args)
+            self.keep_alive.append(w_args)
+        else:
+            args_w = []
+
+        self.write(MARK)
+        if self.bin:
+            self.save(w_cls)
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(OBJ)
+        else:
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(INST)
+            self.write(space.text_w(
+                space.getattr(w_cls, space.newtext('__module__'))))
+            self.write('\n')
+            self.write(space.text_w(
+                space.getattr(w_cls, space.newtext('__name__'))))
+            self.write('\n')
+        self.memoize(w_obj)
+
+        w_getstate = space.findattr(w_obj, space.newtext('__getstate__'))
+        if w_getstate is None:
+            w_stuff = space.getattr(w_obj, space.newtext('__dict__'))
+        else:
+            w_stuff = space.call_function(w_getstate)
+            self.keep_alive.append(w_stuff)
+        self.save(w_stuff)
+        self.write(BUILD)
+
+    def call_reduce(self, w_obj, w_type):
+        """Return the result of reducing w_obj with copy_reg.dispatch_table,
+        __reduce_ex__ or __reduce__, or None if there is no way to."""
+        space = self.space
+        w_reduce = space.finditem(get_state(space).w_dispatch_table, w_type)
+        if w_reduce is not None:
+            return space.call_function(w_reduce, w_obj)
+        w_reduce = space.findattr(w_obj, space.newtext('__reduce_ex__'))
+        if w_reduce is not None:
+            return space.call_function(w_reduce, space.newint(self.proto))
+        w_reduce = space.findattr(w_obj, space.newtext('__reduce__'))
+        if w_reduce is not None:
+            return space.call_function(w_reduce)
+        return None
+
+    def save_by_reduce(self, w_obj, w_type):
+        space = self.space
+        if space.finditem(get_state(space).w_dispatch_table, w_type) is None:
+            # a class with a custom metaclass is saved as a regular class
+            if space.issubtype_w(w_type, space.w_type):
+                self.save_global(w_obj)
+                return
+        w_rv = self.call_reduce(w_obj, w_type)
+        if w_rv is None:
+            raise oefmt(get_state(space).w_PicklingError,
+                        "Can't pickle %N object: %R", w_type, w_obj)
+        self.save_reduce_value(w_obj, w_rv)
+
+    def save_reduce_value(self, w_obj, w_rv):
+        space = self.space
+        state = get_state(space)
+        # a string returned by reduce() means "save as global"
+        if space.is_w(space.type(w_rv), space.w_bytes):
+            self.save_global(w_obj, w_rv)
+            return
+        if not space.is_w(space.type(w_rv), space.w_tuple):
+            raise oefmt(state.w_PicklingError,
+                        "__reduce__ must return string or tuple")
+        rv_w = space.fixedview(w_rv)
+        n = len(rv_w)
+        if not (2 <= n <= 5):
+            raise oefmt(state.w_PicklingError,
+                        "Tuple returned by __reduce__ must have two to five "
+                        "elements")
+        w_state = rv_w[2] if n > 2 else None
+        w_listitems = rv_w[3] if n > 3 else None
+        w_dictitems = rv_w[4] if n > 4 else None
+        self.save_reduce(rv_w[0], rv_w[1], w_state, w_listitems, w_dictitems,
+                         w_obj)
+
+    def save_reduce(self, w_func, w_args, w_state=None, w_listitems=None,
+                    w_dictitems=None, w_obj=None):
+        space = self.space
+        state = get_state(space)
+        if not space.isinstance_w(w_args, space.w_tuple):
+            raise oefmt(state.w_PicklingError,
+                        "args from reduce() should be a tuple")
+        if space.findattr(w_func, space.newtext('__call__')) is None:
+            raise oefmt(state.w_PicklingError,
+                        "func from reduce should be callable")
+
+        w_funcname = None
+        if self.proto >= 2:
+            w_funcname = space.findattr(w_func, space.newtext('__name__'))
+        if (w_funcname is not None and
+                space.isinstance_w(w_funcname, space.w_bytes) and
+                space.bytes_w(w_funcname) == '__newobj__'):
+            args_w = space.fixedview(w_args)
+            if len(args_w) == 0:
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+            w_cls = args_w[0]
+            if space.findattr(w_cls, space.newtext('__new__')) is None:
+                raise oefmt(state.w_PicklingError,
+                            "args[0] from __newobj__ args has no __new__")
+            if w_obj is not None and not space.is_w(
+                    w_cls, space.getattr(w_obj, space.newtext('__class__'))):
+                raise oefmt(state.w_PicklingError,
+                            "args[0] from __newobj__ args has the wrong class")
+            self.save(w_cls)
+            self.save(space.newtuple(args_w[1:]))
+            self.write(NEWOBJ)
+        else:
+            self.save(w_func)
+            self.save(w_args)
+            self.write(REDUCE)
+
+        if w_obj is not None:
+            # if the object is already in the memo, it is recursive: throw
+            # away everything we put on the stack, and fetch it from there
+            index = self.memo_get(w_obj)
+            if index:
+                self.write(POP)
+                self.write_get(index)
+            else:
+                self.memoize(w_obj)
+
+        if w_listitems is not None and not space.is_w(w_listitems, space.w_None):
+            self.batch_appends(space.iter(w_listitems))
+        if w_dictitems is not None and not space.is_w(w_dictitems, space.w_None):
+            self.batch_setitems(space.iter(w_dictitems))
+        if w_state is not None and not space.is_w(w_state, space.w_None):
+            self.save(w_state)
+            self.write(BUILD)
+
+    # the memo, visible as a dict {id(obj): (index, obj)} like in CPython
+
+    def fget_memo(self, space):
+        w_memo = space.newdict()
+        for w_obj, index in self.memo.items():
+            space.setitem(w_memo, space.id(w_obj),
+                          space.newtuple([space.newint(index), w_obj]))
+        return w_memo
+
+    def fset_memo(self, space, w_memo):
+        memo = {}
+        w_iter = space.iter(space.call_method(w_memo, 'values'))
+        while True:
+            w_item = self.next_item(w_iter)
+            if w_item is None:
+                break
+            w_index, w_obj = space.fixedview_unroll(w_item, 2)
+            memo[w_obj] = space.int_w(w_index)
+        self.memo = memo
+
+    def fget_proto(self, space):
+        return space.newint(self.proto)
+
+    def fget_binary(self, space):
+        return space.newbool(self.bin)
+
+    def fget_fast(self, space):
+        return space.newbool(self.fast)
+
+    def fset_fast(self, space, w_value):
+        self.fast = space.is_true(w_value)
+
+
+def descr_pickler_new(space, w_subtype, __args__):
+    w_pickler = space.allocate_instance(W_Pickler, w_subtype)
+    W_Pickler.__init__(w_pickler, space)
+    return w_pickler
+
+W_Pickler.typedef = TypeDef(
+    '_pypypickle.Pickler',
+    __new__ = interp2app(descr_pickler_new),
+    __init__ = interp2app(W_Pickler.descr_init),
+    dump = interp2app(W_Pickler.descr_dump),
+    save = interp2app(W_Pickler.descr_save),
+    memoize = interp2app(W_Pickler.descr_memoize),
+    write = interp2app(W_Pickler.descr_write),
+    getvalue = interp2app(W_Pickler.descr_getvalue),
+    clear_memo = interp2app(W_Pickler.descr_clear_memo),
+    proto = GetSetProperty(W_Pickler.fget_proto),
+    binary = GetSetProperty(W_Pickler.fget_binary),
+    fast = GetSetProperty(W_Pickler.fget_fast, W_Pickler.fset_fast),
+    memo = GetSetProperty(W_Pickler.fget_memo, W_Pickler.fset_memo),
+)
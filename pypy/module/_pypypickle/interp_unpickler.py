@@ -0,0 +1,545 @@
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstruct import ieee
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib import rutf8
+from rpython.rlib.rstring import strip_spaces
+
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.gateway import interp2app
+from pypy.module.__builtin__.interp_classobj import W_ClassObject
+from pypy.module._pypypickle.state import get_state, import_module
+from pypy.module._pypypickle import interp_pickler as op
+
+
+HIGHEST_PROTOCOL = op.HIGHEST_PROTOCOL
+
+
+def unpack_int32(s, pos):
+    x = (ord(s[pos]) | (ord(s[pos + 1]) << 8) | (ord(s[pos + 2]) << 16) |
+         (ord(s[pos + 3]) << 24))
+    # sign-extend from 32 bits
+    return intmask(x) - ((x & 0x80000000) << 1)
+
+
+class W_Unpickler(W_Root):
+    """Interp-level part of cPickle.Unpickler.  The pickle is read either
+    from a string given to loads(), or through the read() and readline()
+    methods of a file-like object."""
+
+    def __init__(self, space):
+        self.space = space
+        self.w_read = None
+        self.w_readline = None
+        self.data = ''
+        self.pos = 0
+        self.stack_w = []
+        self.marks = []
+        self.memo = {}
+        self.w_find_global = None
+        self.w_persistent_load = None
+
+    def descr_init(self, space, w_file):
+        self.w_read = space.getattr(w_file, space.newtext('read'))
+        self.w_readline = space.getattr(w_file, space.newtext('readline'))
+
+    def set_data(self, data):
+        self.w_read = None
+        self.w_readline = None
+        self.data = data
+        self.pos = 0
+
+    # ____________________________________________________________
+    # input
+
+    def read(self, n):
+        if self.w_read is not None:
+            space = self.space
+            s = space.bytes_w(space.call_function(self.w_read,
+                                                  space.newint(n)))
+            if len(s) < n:
+                raise OperationError(space.w_EOFError, space.w_None)
+            return s
+        pos = self.pos
+        end = pos + n
+        if end > len(self.data):
+            raise OperationError(self.space.w_EOFError, self.space.w_None)
+        self.pos = end
+        assert pos >= 0
+        return self.data[pos:end]
+
+    def read1(self):
+        if self.w_read is not None:
+            return ord(self.read(1)[0])
+        pos = self.pos
+        if pos >= len(self.data):
+            raise OperationError(self.space.w_EOFError, self.space.w_None)
+        self.pos = pos + 1
+        return ord(self.data[pos])
+
+    def readline(self):
+        """Return the next line, without the trailing newline.  Like the
+        pure Python unpickler, a truncated line loses its last character."""
+        if self.w_readline is not None:
+            space = self.space
+            s = space.bytes_w(space.call_function(self.w_readline))
+        else:
+            pos = self.pos
+            end = self.data.find('\n', pos)
+            if end < 0:
+                end = len(self.data)
+            else:
+                end += 1
+            self.pos = end
+            assert pos >= 0
+            s = self.data[pos:end]
+        if not s:
+            raise OperationError(self.space.w_EOFError, self.space.w_None)
+        stop = len(s) - 1
+        assert stop >= 0
+        return s[:stop]
+
+    def read_int32(self):
+        return unpack_int32(self.read(4), 0)
+
+    def read_size(self):
+        n = self.read_int32()
+        if n < 0:
+            raise oefmt(get_state(self.space).w_UnpicklingError,
+                        "BINSTRING pickle has negative byte count")
+        return n
+
+    # ____________________________________________________________
+    # stack
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) <= self.top_mark():
+            raise oefmt(get_state(self.space).w_UnpicklingError,
+                        "unpickling stack underflow")
+        return self.stack_w.pop()
+
+    def top(self):
+        if len(self.stack_w) <= self.top_mark():
+            raise oefmt(get_state(self.space).w_UnpicklingError,
+                        "unpickling stack underflow")
+        return self.stack_w[-1]
+
+    def top_mark(self):
+        if self.marks:
+            return self.marks[-1]
+        return 0
+
+    def pop_mark(self):
+        if not self.marks:
+            raise oefmt(get_state(self.space).w_UnpicklingError,
+                        "could not find MARK")
+        return self.marks.pop()
+
+    def pop_to_mark(self):
+        k = self.pop_mark()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    def pop_n(self, n):
+        k = len(self.stack_w) - n
+        if k < self.top_mark():
+            raise oefmt(get_state(self.space).w_UnpicklingError,
+                        "unpickling stack underflow")
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    # ____________________________________________________________
+    # the main loop
+
+    def descr_load(self, space):
+        """Read a pickled object representation from the file and return
+        the reconstituted object hierarchy."""
+        return self.load()
+
+    def load(self):
+        space = self.space
+        self.w_find_global = space.findattr(self, space.newtext('find_global'))
+        self.w_persistent_load = space.findattr(
+            self, space.newtext('persistent_load'))
+        self.stack_w = []
+        self.marks = []
+        while True:
+            key = chr(self.read1())
+            if key == op.STOP:
+                break
+            self.dispatch(key)
+        w_result = self.pop()
+        self.stack_w = []
+        return w_result
+
+    def dispatch(self, key):
+        space = self.space
+        if key == op.MARK:
+            self.marks.append(len(self.stack_w))
+        elif key == op.BININT1:
+            self.push(space.newint(self.read1()))
+        elif key == op.BININT2:
+            lo = self.read1()
+            self.push(space.newint(lo | (self.read1() << 8)))
+        elif key == op.BININT:
+            self.push(space.newint(self.read_int32()))
+        elif key == op.SHORT_BINSTRING:
+            self.push(space.newbytes(self.read(self.read1())))
+        elif key == op.BINSTRING:
+            self.push(space.newbytes(self.read(self.read_size())))
+        elif key == op.BINUNICODE:
+            self.load_binunicode()
+        elif key == op.BINFLOAT:
+            self.push(space.newfloat(ieee.unpack_float(self.read(8), True)))
+        elif key == op.NONE:
+            self.push(space.w_None)
+        elif key == op.NEWTRUE:
+            self.push(space.w_True)
+        elif key == op.NEWFALSE:
+            self.push(space.w_False)
+        elif key == op.BINPUT:
+            self.memo[self.read1()] = self.top()
+        elif key == op.LONG_BINPUT:
+            i = self.read_int32()
+            if i < 0:
+                raise oefmt(space.w_ValueError, "negative LONG_BINPUT argument")
+            self.memo[i] = self.top()
+        elif key == op.PUT:
+            self.memo[self.parse_int(self.readline())] = self.top()
+        elif key == op.BINGET:
+            self.load_get(self.read1())
+        elif key == op.LONG_BINGET:
+            self.load_get(self.read_int32())
+        elif key == op.GET:
+            self.load_get(self.parse_int(self.readline()))
+        elif key == op.EMPTY_LIST:
+            self.push(space.newlist([]))
+        elif key == op.EMPTY_DICT:
+            self.push(space.newdict())
+        elif key == op.EMPTY_TUPLE:
+            self.push(space.newtuple([]))
+        elif key == op.TUPLE1:
+            self.push(space.newtuple(self.pop_n(1)))
+        elif key == op.TUPLE2:
+            self.push(space.newtuple(self.pop_n(2)))
+        elif key == op.TUPLE3:
+            self.push(space.newtuple(self.pop_n(3)))
+        elif key == op.TUPLE:
+            self.push(space.newtuple(self.pop_to_mark()))
+        elif key == op.LIST:
+            self.push(space.newlist(self.pop_to_mark()))
+        elif key == op.DICT:
+            items_w = self.pop_to_mark()
+            w_dict = space.newdict()
+            self.setitems(w_dict, items_w)
+            self.push(w_dict)
+        elif key == op.APPEND:
+            w_value = self.pop()
+            space.call_method(self.top(), 'append', w_value)
+        elif key == op.APPENDS:
+            items_w = self.pop_to_mark()
+            w_list = self.top()
+            if space.is_w(space.type(w_list), space.w_list):
+                space.call_method(w_list, 'extend', space.newlist(items_w))
+            else:
+                w_append = space.getattr(w_list, space.newtext('append'))
+                for w_item in items_w:
+                    space.call_function(w_append, w_item)
+        elif key == op.SETITEM:
+            w_value = self.pop()
+            w_key = self.pop()
+            space.setitem(self.top(), w_key, w_value)
+        elif key == op.SETITEMS:
+            items_w = self.pop_to_mark()
+            self.setitems(self.top(), items_w)
+        elif key == op.LONG1:
+            self.load_long_bytes(self.read1())
+        elif key == op.LONG4:
+            self.load_long_bytes(self.read_size())
+        elif key == op.BUILD:
+            w_state = self.pop()
+            self.build(self.top(), w_state)
+        elif key == op.REDUCE:
+            w_args = self.pop()
+            w_func = self.pop()
+            self.push(space.call(w_func, w_args))
+        elif key == op.NEWOBJ:
+            w_args = self.pop()
+            w_cls = self.pop()
+            w_new = space.getattr(w_cls, space.newtext('__new__'))
+            args_w = [w_cls] + space.fixedview(w_args)
+            self.push(space.call(w_new, space.newtuple(args_w)))
+        elif key == op.GLOBAL:
+            module = self.readline()
+            name = self.readline()
+            self.push(self.find_class(module, name))
+        elif key == op.EXT1:
+            self.get_extension(self.read1())
+        elif key == op.EXT2:
+            lo = self.read1()
+            self.get_extension(lo | (self.read1() << 8))
+        elif key == op.EXT4:
+            self.get_extension(self.read_int32())
+        elif key == op.OBJ:
+            args_w = self.pop_to_mark()
+            if not args_w:
+                raise oefmt(get_state(space).w_UnpicklingError,
+                            "unpickling stack underflow")
+            self.instantiate(args_w[0], args_w[1:])
+        elif key == op.INST:
+            module = self.readline()
+            name = self.readline()
+            w_klass = self.find_class(module, name)
+            self.instantiate(w_klass, self.pop_to_mark())
+        elif key == op.PROTO:
+            proto = self.read1()
+            if proto > HIGHEST_PROTOCOL:
+                raise oefmt(space.w_ValueError,
+                            "unsupported pickle protocol: %d", proto)
+        elif key == op.POP:
+            if self.marks and self.marks[-1] == len(self.stack_w):
+                self.marks.pop()
+            else:
+                self.pop()
+        elif key == op.POP_MARK:
+            self.pop_to_mark()
+        elif key == op.DUP:
+            self.push(self.top())
+        elif key == op.INT:
+            self.load_int(self.readline())
+        elif key == op.LONG:
+            self.load_long(self.readline())
+        elif key == op.FLOAT:
+            self.push(space.call_function(space.w_float,
+                                          space.newbytes(self.readline())))
+        elif key == op.STRING:
+            self.load_string(self.readline())
+        elif key == op.UNICODE:
+            w_s = space.newbytes(self.readline())
+            self.push(space.call_method(w_s, 'decode',
+                                        space.newtext('raw-unicode-escape')))
+        elif key == op.PERSID:
+            self.persistent_load(space.newbytes(self.readline()))
+        elif key == op.BINPERSID:
+            self.persistent_load(self.pop())
+        else:
+            raise oefmt(get_state(space).w_UnpicklingError,
+                        "invalid load key, '%s'.", key)
+
+    # ____________________________________________________________
+    # opcodes that need more than a few lines
+
+    def parse_int(self, s):
+        try:
+            return int(strip_spaces(s))
+        except ValueError:
+            raise oefmt(self.space.w_ValueError,
+                        "invalid literal for int() with base 10: '%s'", s)
+
+    def load_get(self, i):
+        space = self.space
+        try:
+            w_obj = self.memo[i]
+        except KeyError:
+            raise OperationError(space.w_KeyError, space.newint(i))
+        self.push(w_obj)
+
+    def load_int(self, s):
+        space = self.space
+        if s == '01':
+            self.push(space.w_True)
+        elif s == '00':
+            self.push(space.w_False)
+        else:
+            self.push(space.call_function(space.w_int, space.newbytes(s)))
+
+    def load_long(self, s):
+        # the repr of a long ends with 'L'
+        space = self.space
+        stop = len(s) - 1
+        if stop >= 0 and s[stop] == 'L':
+            s = s[:stop]
+        self.push(space.call_function(space.w_long, space.newbytes(s),
+                                      space.newint(0)))
+
+    def load_long_bytes(self, n):
+        space = self.space
+        data = self.read(n)
+        self.push(space.newlong_from_rbigint(
+            rbigint.frombytes(data, 'little', True)))
+
+    def load_string(self, rep):
+        space = self.space
+        stop = len(rep) - 1
+        if stop < 1 or rep[0] != rep[stop] or (rep[0] != "'" and
+                                               rep[0] != '"'):
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        w_s = space.newbytes(rep[1:stop])
+        self.push(space.call_method(w_s, 'decode',
+                                    space.newtext('string-escape')))
+
+    def load_binunicode(self):
+        space = self.space
+        s = self.read(self.read_size())
+        try:
+            length = rutf8.check_utf8(s, allow_surrogates=True)
+        except rutf8.CheckError:
+            # let the codec produce the proper UnicodeDecodeError
+            self.push(space.call_method(space.newbytes(s), 'decode',
+                                        space.newtext('utf-8')))
+            return
+        self.push(space.newutf8(s, length))
+
+    def setitems(self, w_dict, items_w):
+        space = self.space
+        if len(items_w) & 1:
+            raise oefmt(get_state(space).w_UnpicklingError,
+                        "odd number of items for SETITEMS")
+        for i in range(0, len(items_w), 2):
+            space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+    def build(self, w_inst, w_state):
+        space = self.space
+        w_setstate = space.findattr(w_inst, space.newtext('__setstate__'))
+        if w_setstate is not None:
+            space.call_function(w_setstate, w_state)
+            return
+        w_slotstate = None
+        if (space.isinstance_w(w_state, space.w_tuple) and
+                space.len_w(w_state) == 2):
+            w_state, w_slotstate = space.fixedview_unroll(w_state, 2)
+        if space.is_true(w_state):
+            w_dict = space.getattr(w_inst, space.newtext('__dict__'))
+            w_iter = space.iter(space.call_method(w_state, 'iteritems'))
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview_unroll(w_item, 2)
+                if space.is_w(space.type(w_key), space.w_bytes):
+                    w_key = space.new_interned_w_str(w_key)
+                space.setitem(w_dict, w_key, w_value)
+        if w_slotstate is not None and space.is_true(w_slotstate):
+            w_iter = space.iter(space.call_method(w_slotstate, 'items'))
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview_unroll(w_item, 2)
+                space.setattr(w_inst, w_key, w_value)
+
+    def instantiate(self, w_klass, args_w):
+        space = self.space
+        if (not args_w and isinstance(w_klass, W_ClassObject) and
+                w_klass.lookup(space, '__getinitargs__') is None):
+            self.push(w_klass.instantiate(space))
+            return
+        try:
+            w_value = space.call(w_klass, space.newtuple(args_w))
+        except OperationError as e:
+            if not e.match(space, space.w_TypeError):
+                raise
+            name = space.text_w(space.str(
+                space.getattr(w_klass, space.newtext('__name__'))))
+            message = space.text_w(space.str(e.get_w_value(space)))
+            raise oefmt(space.w_TypeError, "in constructor for %s: %s",
+                        name, message)
+        self.push(w_value)
+
+    def find_class(self, module, name):
+        space = self.space
+        w_module = space.newtext(module)
+        w_name = space.newtext(name)
+        if self.w_find_global is not None:
+            if space.is_w(self.w_find_global, space.w_None):
+                raise oefmt(get_state(space).w_UnpicklingError,
+                            "Global and instance pickles are not supported.")
+            return space.call_function(self.w_find_global, w_module, w_name)
+        import_module(space, w_module)
+        w_mod = space.getitem(space.sys.get('modules'), w_module)
+        return space.getattr(w_mod, w_name)
+
+    def get_extension(self, code):
+        space = self.space
+        state = get_state(space)
+        w_code = space.newint(code)
+        w_obj = space.finditem(state.w_extension_cache, w_code)
+        if w_obj is not None:
+            self.push(w_obj)
+            return
+        w_key = space.finditem(state.w_inverted_registry, w_code)
+        if w_key is None or not space.is_true(w_key):
+            raise oefmt(space.w_ValueError,
+                        "unregistered extension code %d", code)
+        w_module, w_name = space.fixedview_unroll(w_key, 2)
+        w_obj = self.find_class(space.text_w(w_module), space.text_w(w_name))
+        space.setitem(state.w_extension_cache, w_code, w_obj)
+        self.push(w_obj)
+
+    def persistent_load(self, w_pid):
+        space = self.space
+        if self.w_persistent_load is None:
+            raise oefmt(get_state(space).w_UnpicklingError,
+                        "A load persistent id instruction was encountered,\n"
+                        "but no persistent_load function was specified.")
+        self.push(space.call_function(self.w_persistent_load, w_pid))
+
+    # ____________________________________________________________
+    # the memo, visible as a dict {index: object}
+
+    def fget_memo(self, space):
+        w_memo = space.newdict()
+        for i, w_obj in self.memo.items():
+            space.setitem(w_memo, space.newint(i), w_obj)
+        return w_memo
+
+    def fset_memo(self, space, w_memo):
+        memo = {}
+        w_iter = space.iter(space.call_method(w_memo, 'items'))
+        while True:
+            try:
+                w_item = space.next(w_iter)
+            except OperationError as e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            w_key, w_value = space.fixedview_unroll(w_item, 2)
+            memo[space.int_w(w_key)] = w_value
+        self.memo = memo
+
+
+def descr_unpickler_new(space, w_subtype, __args__):
+    w_unpickler = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(w_unpickler, space)
+    return w_unpickler
+
+W_Unpickler.typedef = TypeDef(
+    '_pypypickle.Unpickler',
+    __new__ = interp2app(descr_unpickler_new),
+    __init__ = interp2app(W_Unpickler.descr_init),
+    load = interp2app(W_Unpickler.descr_load),
+    memo = GetSetProperty(W_Unpickler.fget_memo, W_Unpickler.fset_memo),
+)
+
+def loads(space, w_subtype, w_data):
+    """loads(cls, string) -> object
+
+    Unpickle an object from a string, using a fresh instance of the
+    Unpickler subclass 'cls'; the string is read without any file object
+    in between."""
+    w_unpickler = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(w_unpickler, space)
+    w_unpickler.set_data(space.bytes_w(w_data))
+    return w_unpickler.load()
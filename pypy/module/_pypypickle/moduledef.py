@@ -0,0 +1,13 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """RPython implementation of the pickler and unpickler of cPickle"""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'Pickler' : 'interp_pickler.W_Pickler',
+        'Unpickler' : 'interp_unpickler.W_Unpickler',
+        'loads' : 'interp_unpickler.loads',
+        'HIGHEST_PROTOCOL' : 'space.newint(2)',
+        }
@@ -0,0 +1,35 @@
+class State(object):
+    """The app-level objects of pickle and copy_reg used by the pickler
+    and the unpickler.  They are imported lazily, on first use."""
+
+    def __init__(self, space):
+        self.initialized = False
+
+    def init(self, space):
+        w_pickle = import_module(space, space.newtext('pickle'))
+        self.w_PicklingError = space.getattr(
+            w_pickle, space.newtext('PicklingError'))
+        self.w_UnpicklingError = space.getattr(
+            w_pickle, space.newtext('UnpicklingError'))
+        self.w_whichmodule = space.getattr(
+            w_pickle, space.newtext('whichmodule'))
+        w_copy_reg = import_module(space, space.newtext('copy_reg'))
+        self.w_dispatch_table = space.getattr(
+            w_copy_reg, space.newtext('dispatch_table'))
+        self.w_extension_registry = space.getattr(
+            w_copy_reg, space.newtext('_extension_registry'))
+        self.w_inverted_registry = space.getattr(
+            w_copy_reg, space.newtext('_inverted_registry'))
+        self.w_extension_cache = space.getattr(
+            w_copy_reg, space.newtext('_extension_cache'))
+        self.initialized = True
+
+def get_state(space):
+    state = space.fromcache(State)
+    if not state.initialized:
+        state.init(space)
+    return state
+
+def import_module(space, w_name):
+    w_builtins = space.getbuiltinmodule('__builtin__')
+    return space.call_method(w_builtins, '__import__', w_name)
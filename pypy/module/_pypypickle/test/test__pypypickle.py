@@ -0,0 +1,214 @@
+# -*- encoding: utf-8 -*-
+from pypy.module._pypypickle.interp_pickler import encode_long
+from rpython.rlib.rbigint import rbigint
+
+
+def test_encode_long():
+    import pickle
+    for x in [0, 1, -1, 127, 128, 255, 256, -128, -129, -256, -32768,
+              2**63, -2**63, 2**64 - 1, 3**200, -3**200]:
+        assert encode_long(rbigint.fromlong(x)) == pickle.encode_long(x)
+
+
+class AppTest(object):
+    spaceconfig = {"usemodules": ['_pypypickle', 'struct', 'binascii']}
+
+    def setup_class(cls):
+        cls.w_dumps = cls.space.appexec([], """():
+            import _pypypickle
+            def dumps(obj, proto=0):
+                p = _pypypickle.Pickler(proto)
+                p.dump(obj)
+                return p.getvalue()
+            return dumps
+        """)
+        cls.w_loads = cls.space.appexec([], """():
+            import _pypypickle
+            def loads(s):
+                return _pypypickle.loads(_pypypickle.Unpickler, s)
+            return loads
+        """)
+
+    def test_atoms(self):
+        import pickle
+        values = [None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                  -2**31, 2**31 - 1, 2**31, -2**31 - 1, 2**62, -2**63,
+                  0L, 1L, -1L, 2**100, -2**100, 0.0, -1.5, 1e300,
+                  float('inf'), '', 'abc', 'x' * 300, '\x00\n\\\'"',
+                  u'', u'abc', u'€\n\\', u'\U0001f600']
+        for proto in range(3):
+            for x in values:
+                s = self.dumps(x, proto)
+                assert s.endswith('.')
+                for y in [self.loads(s), pickle.loads(s)]:
+                    assert y == x
+                    assert type(y) is type(x)
+
+    def test_protocol_header(self):
+        assert self.dumps(1, 2) == '\x80\x02K\x01.'
+        assert self.dumps(True, 2) == '\x80\x02\x88.'
+        assert self.dumps(True, 1) == 'I01\n.'
+        assert self.dumps(None, 0) == 'N.'
+
+    def test_bad_protocol(self):
+        import _pypypickle
+        raises(ValueError, _pypypickle.Pickler, 3)
+        assert _pypypickle.Pickler(-1).proto == 2
+
+    def test_containers(self):
+        import pickle
+        x = {'a': [1, 2, (3, 4.5)], 'b': (), (1, 2): {}, 'c': range(2500),
+             'd': dict.fromkeys(range(1500)), 'e': (1, 2, 3, 4, 5)}
+        for proto in range(3):
+            s = self.dumps(x, proto)
+            assert self.loads(s) == x
+            assert pickle.loads(s) == x
+            assert self.loads(pickle.dumps(x, proto)) == x
+
+    def test_shared_and_recursive(self):
+        l = [1]
+        x = [l, l, (l,)]
+        x.append(x)
+        d = {}
+        d['self'] = d
+        for proto in range(3):
+            y = self.loads(self.dumps(x, proto))
+            assert y[0] is y[1] is y[2][0]
+            assert y[3] is y
+            e = self.loads(self.dumps(d, proto))
+            assert e['self'] is e
+
+    def test_recursive_tuple(self):
+        l = []
+        t = (l,)
+        l.append(t)
+        for proto in range(3):
+            u = self.loads(self.dumps(t, proto))
+            assert u[0][0] is u
+
+    def test_memo_counts_from_one(self):
+        s = self.dumps(['abc'], 1)
+        assert s == ']q\x01U\x03abcq\x02a.'
+
+    def test_instances(self):
+        import pickle
+        class Old:
+            def __init__(self, x):
+                self.x = x
+            def __eq__(self, other):
+                return self.__dict__ == other.__dict__
+        class New(object):
+            def __init__(self, x):
+                self.x = x
+            def __eq__(self, other):
+                return self.__dict__ == other.__dict__
+        class Slots(object):
+            __slots__ = ('a', 'b')
+        import sys
+        mod = type(sys)('test_pypypickle_classes')
+        sys.modules[mod.__name__] = mod
+        for cls in [Old, New, Slots]:
+            cls.__module__ = mod.__name__
+            setattr(mod, cls.__name__, cls)
+        try:
+            sl = Slots()
+            sl.a = 5
+            x = [Old(1), New([2]), Old(New(3))]
+            for proto in range(3):
+                s = self.dumps(x, proto)
+                y = self.loads(s)
+                assert y == x
+                assert y[0].__class__ is Old and type(y[1]) is New
+                assert pickle.loads(s) == x
+                if proto == 2:
+                    z = self.loads(self.dumps(sl, proto))
+                    assert z.a == 5 and not hasattr(z, 'b')
+        finally:
+            del sys.modules[mod.__name__]
+
+    def test_globals(self):
+        import os
+        for proto in range(3):
+            assert self.loads(self.dumps(len, proto)) is len
+            assert self.loads(self.dumps(dict, proto)) is dict
+            assert self.loads(self.dumps(os.path.join, proto)) is os.path.join
+
+    def test_unpicklable(self):
+        import pickle
+        class Local(object):
+            pass
+        class BadReduce(object):
+            def __reduce__(self):
+                return 42
+        raises(pickle.PicklingError, self.dumps, Local)
+        exc = raises(pickle.PicklingError, self.dumps, BadReduce())
+        assert 'must return string or tuple' in str(exc.value)
+
+    def test_persistent_id(self):
+        import _pypypickle
+        class P(_pypypickle.Pickler):
+            def persistent_id(self, obj):
+                if obj == 42:
+                    return 'the answer'
+        class U(_pypypickle.Unpickler):
+            def persistent_load(self, pid):
+                assert pid == 'the answer'
+                return 43
+        for proto in range(3):
+            p = P(proto)
+            p.dump([1, 42])
+            assert _pypypickle.loads(U, p.getvalue()) == [1, 43]
+
+    def test_find_global(self):
+        import _pypypickle, pickle, StringIO
+        s = self.dumps(len)
+        u = _pypypickle.Unpickler(StringIO.StringIO(s))
+        class U(_pypypickle.Unpickler):
+            find_global = None
+        exc = raises(pickle.UnpicklingError, _pypypickle.loads, U, s)
+        assert 'not supported' in str(exc.value)
+        class U2(_pypypickle.Unpickler):
+            def find_global(self, module, name):
+                return (module, name)
+        assert _pypypickle.loads(U2, s) == ('__builtin__', 'len')
+
+    def test_file_unpickler(self):
+        import _pypypickle, StringIO
+        f = StringIO.StringIO(self.dumps([1, 'a'], 1) + self.dumps(u'b', 0))
+        u = _pypypickle.Unpickler(f)
+        assert u.load() == [1, 'a']
+        assert u.load() == u'b'
+        raises(EOFError, u.load)
+
+    def test_errors(self):
+        import pickle
+        raises(EOFError, self.loads, '')
+        raises(EOFError, self.loads, 'N')
+        raises(EOFError, self.loads, 'U\x03ab')
+        raises(KeyError, self.loads, 'h\x00q\x00')
+        raises(pickle.UnpicklingError, self.loads, '0')
+        raises(pickle.UnpicklingError, self.loads, 't')
+        raises(pickle.UnpicklingError, self.loads, '\xff')
+        raises(ValueError, self.loads, '\x80\x03N.')
+        raises(ValueError, self.loads, "S'abc\n.")
+
+    def test_memo_attribute(self):
+        import _pypypickle
+        p = _pypypickle.Pickler(1)
+        x = ['abc']
+        p.dump(x)
+        memo = p.memo
+        assert memo[id(x)] == (1, x)
+        p2 = _pypypickle.Pickler(1)
+        p2.memo = memo
+        p2.dump(x)
+        assert p2.getvalue() == 'h\x01.'
+        p.clear_memo()
+        assert p.memo == {}
+
+    def test_fast(self):
+        import _pypypickle
+        p = _pypypickle.Pickler(1)
+        p.fast = 1
+        p.dump(['abc'])
+        assert p.getvalue() == ']U\x03abca.'
@@ -0,0 +1,66 @@
+""" Time sending and receiving small UDP datagrams over the loopback, one
+per system call with sendto()/recvfrom_into() and in batches with
+sendmmsg()/recvmmsg_into():
+
+    pypy bench_mmsg.py [datagrams]
+
+The default is 1000000 datagrams of 64 bytes, in batches of 64.  Prints the
+datagrams per second.  Linux only.
+"""
+
+import socket
+import sys
+import time
+
+SIZE = 64
+BATCH = 64
+
+def one_by_one(cli, serv, addr, count):
+    data = b'x' * SIZE
+    buf = bytearray(SIZE)
+    received = 0
+    for i in range(count // BATCH):
+        for j in range(BATCH):
+            cli.sendto(data, addr)
+        for j in range(BATCH):
+            serv.recvfrom_into(buf)
+            received += 1
+    return received
+
+def batched(cli, serv, addr, count):
+    messages = [b'x' * SIZE] * BATCH
+    buf = bytearray(SIZE * BATCH)
+    received = 0
+    for i in range(count // BATCH):
+        sent = 0
+        while sent < BATCH:
+            sent += cli.sendmmsg(messages[sent:], 0, addr)
+        got = 0
+        while got < BATCH:
+            got += len(serv.recvmmsg_into(buf, SIZE, BATCH - got))
+        received += got
+    return received
+
+def main(count):
+    serv = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    serv.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+    serv.bind(('127.0.0.1', 0))
+    cli = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    addr = serv.getsockname()
+    try:
+        for name, func in [('sendto/recvfrom_into', one_by_one),
+                           ('sendmmsg/recvmmsg_into', batched)]:
+            func(cli, serv, addr, count // 10)    # warm-up
+            t0 = time.time()
+            received = func(cli, serv, addr, count)
+            t1 = time.time()
+            print '%-24s %10.0f datagrams/s' % (name, received / (t1 - t0))
+    finally:
+        cli.close()
+        serv.close()
+
+if __name__ == '__main__':
+    count = 1000000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    main(count)
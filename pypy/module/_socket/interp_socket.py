@@ -1,6 +1,6 @@
 import sys
 from rpython.rlib import rsocket, rweaklist
-from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rarithmetic import intmask, r_longlong
 from rpython.rlib.rsocket import (
     RSocket, AF_INET, SOCK_STREAM, SocketError, SocketErrorWithErrno,
     RSocketError
@@ -530,6 +530,92 @@ class W_Socket(W_Root):
         except SocketError as e:
             raise converted_error(space, e)
 
+    @unwrap_spec(itemsize=int, count=int, flags=int)
+    def recvmmsg_into_w(self, space, w_buffer, itemsize, count=0, flags=0):
+        """recvmmsg_into(buffer, itemsize[, count[, flags]]) -> list
+
+        Receive up to count datagrams with a single system call, the i-th one
+        into buffer[i * itemsize:(i + 1) * itemsize].  If count is not
+        specified (or 0), it is len(buffer) // itemsize.  Only waits for the
+        first datagram.  Returns a list of (offset, nbytes, address) tuples,
+        one per datagram received; longer datagrams are truncated to itemsize.
+        """
+        rwbuffer = space.getarg_w('w*', w_buffer)
+        if itemsize <= 0:
+            raise oefmt(space.w_ValueError, "itemsize must be positive")
+        maxcount = rwbuffer.getlength() // itemsize
+        if count == 0:
+            count = maxcount
+        elif count < 0 or count > maxcount:
+            raise oefmt(space.w_ValueError,
+                        "count is greater than the number of items in the "
+                        "buffer")
+        if count == 0:
+            raise oefmt(space.w_ValueError, "buffer is smaller than itemsize")
+        try:
+            result = self.sock.recvmmsg_into(rwbuffer, itemsize, count, flags)
+        except SocketError as e:
+            raise converted_error(space, e)
+        result_w = []
+        for i in range(len(result)):
+            nbytes, addr = result[i]
+            if addr:
+                w_addr = addr_as_object(addr, self.sock.fd, space)
+            else:
+                w_addr = space.w_None
+            result_w.append(space.newtuple([space.newint(i * itemsize),
+                                            space.newint(nbytes), w_addr]))
+        return space.newlist(result_w)
+
+    @unwrap_spec(flags=int)
+    def sendmmsg_w(self, space, w_messages, flags=0, w_address=None):
+        """sendmmsg(messages[, flags[, address]]) -> count
+
+        Send each string of the sequence messages as one datagram, with a
+        single system call, to address or else to the connected peer.  Returns
+        the number of datagrams sent, which may be less than len(messages).
+        """
+        messages = [space.bufferstr_w(w_message)
+                    for w_message in space.listview(w_messages)]
+        try:
+            if w_address is None or space.is_w(w_address, space.w_None):
+                addr = None
+            else:
+                addr = self.addr_from_object(space, w_address)
+            count = self.sock.sendmmsg(messages, flags, addr)
+        except SocketError as e:
+            raise converted_error(space, e)
+        return space.newint(count)
+
+    @unwrap_spec(offset=r_longlong)
+    def sendfile_w(self, space, w_file, offset=0, w_count=None):
+        """sendfile(file[, offset[, count]]) -> nbytes
+
+        Send a file, given as a file object or a file descriptor, to a stream
+        socket with the sendfile() system call: the data is not copied through
+        user space.  Starts at offset and sends count bytes, or up to the end
+        of the file if count is None.  Returns the number of bytes sent.  The
+        position of a file object is moved after the last byte sent.
+        """
+        if offset < 0:
+            raise oefmt(space.w_ValueError, "offset must be non-negative")
+        if w_count is None or space.is_w(w_count, space.w_None):
+            count = -1
+        else:
+            count = space.int_w(w_count)
+            if count < 0:
+                raise oefmt(space.w_ValueError, "count must be non-negative")
+        fd = space.c_filedescriptor_w(w_file)
+        try:
+            total = self.sock.sendfile(
+                fd, offset, count, space.getexecutioncontext().checksignals)
+        except SocketError as e:
+            raise converted_error(space, e)
+        if (not space.isinstance_w(w_file, space.w_int) and
+                space.findattr(w_file, space.newtext('seek')) is not None):
+            space.call_method(w_file, 'seek', space.newint(offset + total))
+        return space.newint(total)
+
     @unwrap_spec(cmd=int)
     def ioctl_w(self, space, cmd, w_option):
         from rpython.rtyper.lltypesystem import rffi, lltype
@@ -727,6 +813,10 @@ for name in ('dup',):
         socketmethodnames.remove(name)
 if hasattr(rsocket._c, 'WSAIoctl'):
     socketmethodnames.append('ioctl')
+if rsocket._c.HAVE_MMSG:
+    socketmethodnames += ['recvmmsg_into', 'sendmmsg']
+if rsocket._c.HAVE_SENDFILE:
+    socketmethodnames.append('sendfile')
 
 socketmethods = {}
 for methodname in socketmethodnames:
@@ -762,9 +852,12 @@ listen(n) -- start listening for incoming connections
 makefile([mode, [bufsize]]) -- return a file object for the socket [*]
 recv(buflen[, flags]) -- receive data
 recvfrom(buflen[, flags]) -- receive data and sender's address
+recvmmsg_into(buffer, itemsize[, count[, flags]]) -- receive many datagrams [*]
 sendall(data[, flags]) -- send all data
 send(data[, flags]) -- send data, may not send all of it
 sendto(data[, flags], addr) -- send data to a given address
+sendmmsg(messages[, flags[, addr]]) -- send many datagrams [*]
+sendfile(file[, offset[, count]]) -- send a file [*]
 setblocking(0 | 1) -- set or clear the blocking I/O flag
 setsockopt(level, optname, value) -- set socket options
 settimeout(None | float) -- set or clear the timeout
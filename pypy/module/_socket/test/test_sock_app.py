@@ -657,6 +657,32 @@ class AppTestSocket:
         s.sendto(buffer(''), ('localhost', 9))  # Send to discard port.
         s.close()
 
+    def test_mmsg(self):
+        import _socket
+        if not hasattr(_socket.socket, 'recvmmsg_into'):
+            skip('no recvmmsg() on this platform')
+        serv = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM)
+        serv.bind(('127.0.0.1', 0))
+        cli = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM)
+        cli.bind(('127.0.0.1', 0))
+        messages = [b'one', b'two', b'three' * 10, b'']
+        assert cli.sendmmsg(messages, 0, serv.getsockname()) == 4
+        buf = bytearray(32)
+        result = serv.recvmmsg_into(buf, 16, 2)
+        assert len(result) == 2
+        assert result[0] == (0, 3, cli.getsockname())
+        assert result[1] == (16, 3, cli.getsockname())
+        assert buf[:3] == b'one' and buf[16:19] == b'two'
+        result = serv.recvmmsg_into(buf, 8)
+        assert [(offset, nbytes) for offset, nbytes, addr in result] == [
+            (0, 8), (8, 0)]
+        assert buf[:8] == b'threethr'
+        raises(ValueError, serv.recvmmsg_into, buf, 0)
+        raises(ValueError, serv.recvmmsg_into, buf, 16, 3)
+        raises(ValueError, serv.recvmmsg_into, bytearray(4), 16)
+        serv.close()
+        cli.close()
+
     def test_unix_socket_connect(self):
         import _socket, os
         if not hasattr(_socket, 'AF_UNIX'):
@@ -744,6 +770,7 @@ class AppTestSocketTCP:
             serv.listen(1)
             return serv
             ''')
+        self.w_tmpfile = self.space.wrap(str(udir.join('test_sendfile')))
 
     def teardown_method(self, method):
         if hasattr(self, 'w_serv'):
@@ -856,6 +883,28 @@ class AppTestSocketTCP:
         exc = raises(ValueError, cli.recvfrom_into, buf, 1024)
         assert str(exc.value) == "nbytes is greater than the length of the buffer"
 
+    def test_sendfile(self):
+        import socket
+        if not hasattr(socket.socket, 'sendfile'):
+            skip('no sendfile() on this platform')
+        data = b''.join([b'%05d' % i for i in range(2000)])
+        with open(self.tmpfile, 'wb') as f:
+            f.write(data)
+        cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cli.connect(self.serv.getsockname())
+        conn, addr = self.serv.accept()
+        with open(self.tmpfile, 'rb') as f:
+            assert conn.sendfile(f, 10, 100) == 100
+            assert f.tell() == 110
+            assert conn.sendfile(f.fileno(), 9990) == 10
+            raises(ValueError, conn.sendfile, f, -1)
+        got = b''
+        while len(got) < 110:
+            got += cli.recv(1024)
+        assert got == data[10:110] + data[9990:]
+        conn.close()
+        cli.close()
+
     def test_family(self):
         import socket
         cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
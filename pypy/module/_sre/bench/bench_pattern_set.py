@@ -0,0 +1,64 @@
+""" Compare _sre.compile_set() with a loop over the compiled patterns, for
+a router-like list of patterns tested against every line of a log:
+
+    pypy bench_pattern_set.py [patterns] [lines]
+
+The default is 200 patterns and 20000 lines.
+"""
+
+import re
+import sys
+import time
+import _sre
+
+def make_patterns(count):
+    patterns = []
+    for i in range(count):
+        if i % 4 == 3:
+            patterns.append(r'[A-Z]+ /v%d/\w+' % i)      # no literal prefix
+        else:
+            patterns.append(r'GET /api/item%d/(\d+)' % i)
+    return [re.compile(p) for p in patterns]
+
+def make_lines(count, num_patterns):
+    return ['127.0.0.1 - GET /api/item%d/%d HTTP/1.1 200' % (
+                (i * 7) % (num_patterns * 2), i)
+            for i in range(count)]
+
+def naive(patterns, lines):
+    result = 0
+    for line in lines:
+        for i, pattern in enumerate(patterns):
+            if pattern.search(line):
+                result += i
+    return result
+
+def with_set(patterns, lines):
+    patternset = _sre.compile_set(patterns)
+    result = 0
+    for line in lines:
+        for i in patternset.search(line):
+            result += i
+    return result
+
+def main(num_patterns, num_lines):
+    patterns = make_patterns(num_patterns)
+    lines = make_lines(num_lines, num_patterns)
+    results = []
+    for func in [naive, with_set]:
+        func(patterns, lines[:100])      # warm-up
+        t0 = time.time()
+        results.append(func(patterns, lines))
+        t1 = time.time()
+        print '%-10s %d patterns x %d lines in %.3f s' % (
+            func.__name__, num_patterns, num_lines, t1 - t0)
+    assert results[0] == results[1]
+
+if __name__ == '__main__':
+    num_patterns = 200
+    num_lines = 20000
+    if len(sys.argv) > 1:
+        num_patterns = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        num_lines = int(sys.argv[2])
+    main(num_patterns, num_lines)
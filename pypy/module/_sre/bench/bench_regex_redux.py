@@ -0,0 +1,65 @@
+""" The regex-redux benchmark of the Computer Language Benchmarks Game, on a
+random DNA sequence instead of the fasta output:
+
+    pypy bench_regex_redux.py [length]
+
+The default length is 5000000 characters.  The patterns with alternatives
+are the ones that use the lazy DFA of rsre_dfa.py.
+"""
+
+import re
+import sys
+import time
+import random
+
+VARIANTS = [
+    'agggtaaa|tttaccct',
+    '[cgt]gggtaaa|tttaccc[acg]',
+    'a[act]ggtaaa|tttacc[agt]t',
+    'ag[act]gtaaa|tttac[agt]ct',
+    'agg[act]taaa|ttta[agt]cct',
+    'aggg[acg]aaa|ttt[cgt]ccct',
+    'agggt[cgt]aa|tt[acg]accct',
+    'agggta[cgt]a|t[acg]taccct',
+    'agggtaa[cgt]|[acg]ttaccct',
+]
+
+SUBST = [
+    ('tHa[Nt]', '<4>'),
+    ('aND|caN|Ha[DS]|WaS', '<3>'),
+    ('a[NSt]|BY', '<2>'),
+    ('<[^>]*>', '|'),
+    ('\\|[^|][^|]*\\|', '-'),
+]
+
+def make_sequence(length):
+    rnd = random.Random(42)
+    lines = []
+    for i in range(0, length, 60):
+        lines.append('>ONE Homo sapiens alu\n' if i % 6000 == 0 else '')
+        lines.append(''.join([rnd.choice('acgtacgtacgtNtBaDHSWY')
+                              for j in range(60)]))
+        lines.append('\n')
+    return ''.join(lines)
+
+def main(length):
+    seq = make_sequence(length)
+    t0 = time.time()
+    seq = re.sub('>.*\n|\n', '', seq)
+    t1 = time.time()
+    for variant in VARIANTS:
+        print '%s %d' % (variant, len(re.findall(variant, seq)))
+    t2 = time.time()
+    for pattern, replacement in SUBST:
+        seq = re.sub(pattern, replacement, seq)
+    t3 = time.time()
+    print
+    print 'strip headers %.3f s' % (t1 - t0)
+    print 'variants      %.3f s' % (t2 - t1)
+    print 'substitutions %.3f s' % (t3 - t2)
+
+if __name__ == '__main__':
+    length = 5000000
+    if len(sys.argv) > 1:
+        length = int(sys.argv[1])
+    main(length)
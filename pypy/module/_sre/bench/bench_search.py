@@ -0,0 +1,57 @@
+""" Time re.finditer() over a large byte string for the different ways
+search_context() can skip to the next possible match:
+
+    pypy bench_search.py [megabytes]
+
+The default is 16 MB of log-like lines.  Prints the throughput in MB/s
+for each class of pattern.
+"""
+
+import re
+import sys
+import time
+
+PATTERNS = [
+    ('literal prefix', r'ERROR: (\w+)'),
+    ('literal char', r'#(\d+)'),
+    ('charset', r'[A-Z]{4,}\d'),
+    ('no prefix', r'(?:x|yy)z'),
+]
+
+def make_log(size):
+    line = ('2026-10-18 12:00:00 INFO worker-3 request handled in 12 ms, '
+            'status ok, user %d\n')
+    special = 'ERROR: timeout for job #%d WARNX1\n'
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        if i % 1000 == 999:
+            s = special % i
+        else:
+            s = line % i
+        lines.append(s)
+        total += len(s)
+        i += 1
+    return ''.join(lines)
+
+def main(megabytes):
+    data = make_log(megabytes * 1024 * 1024)
+    mb = len(data) / (1024.0 * 1024.0)
+    for name, pattern in PATTERNS:
+        r = re.compile(pattern)
+        count = 0
+        for m in r.finditer(data):    # warm-up
+            count += 1
+        t0 = time.time()
+        for m in r.finditer(data):
+            count -= 1
+        t1 = time.time()
+        assert count == 0
+        print '%-15s %-15s %8.1f MB/s' % (name, pattern, mb / (t1 - t0))
+
+if __name__ == '__main__':
+    megabytes = 16
+    if len(sys.argv) > 1:
+        megabytes = int(sys.argv[1])
+    main(megabytes)
@@ -13,7 +13,7 @@ from rpython.rlib.rstring import StringBuilder
 #
 # Constants and exposed functions
 
-from rpython.rlib.rsre import rsre_core, rsre_utf8
+from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_dfa, rsre_set
 from rpython.rlib.rsre.rsre_char import CODESIZE, MAXREPEAT, getlower, set_unicode_db
 
 
@@ -89,14 +89,18 @@ def import_re(space):
     w_import = space.getattr(w_builtin, space.newtext("__import__"))
     return space.call_function(w_import, space.newtext("re"))
 
-def matchcontext(space, ctx, pattern):
+def matchcontext(space, ctx, pattern, dfa=None):
     try:
+        if dfa is not None:
+            return rsre_dfa.match_context(ctx, pattern, dfa)
         return rsre_core.match_context(ctx, pattern)
     except rsre_core.Error as e:
         raise OperationError(space.w_RuntimeError, space.newtext(e.msg))
 
-def searchcontext(space, ctx, pattern):
+def searchcontext(space, ctx, pattern, dfa=None):
     try:
+        if dfa is not None:
+            return rsre_dfa.search_context(ctx, pattern, dfa)
         return rsre_core.search_context(ctx, pattern)
     except rsre_core.Error as e:
         raise OperationError(space.w_RuntimeError, space.newtext(e.msg))
@@ -106,7 +110,9 @@ def searchcontext(space, ctx, pattern):
 # SRE_Pattern class
 
 class W_SRE_Pattern(W_Root):
-    _immutable_fields_ = ["code", "flags", "num_groups", "w_groupindex"]
+    _immutable_fields_ = ["code", "dfa", "flags", "num_groups",
+                          "w_groupindex"]
+    dfa = None
 
     def cannot_copy_w(self):
         space = self.space
@@ -195,12 +201,14 @@ class W_SRE_Pattern(W_Root):
     @unwrap_spec(pos=int, endpos=int)
     def match_w(self, w_string, pos=0, endpos=sys.maxint):
         ctx = self.make_ctx(w_string, pos, endpos)
-        return self.getmatch(ctx, matchcontext(self.space, ctx, self.code))
+        return self.getmatch(ctx, matchcontext(self.space, ctx, self.code,
+                                               self.dfa))
 
     @unwrap_spec(pos=int, endpos=int)
     def search_w(self, w_string, pos=0, endpos=sys.maxint):
         ctx = self.make_ctx(w_string, pos, endpos)
-        return self.getmatch(ctx, searchcontext(self.space, ctx, self.code))
+        return self.getmatch(ctx, searchcontext(self.space, ctx, self.code,
+                                                self.dfa))
 
     @unwrap_spec(pos=int, endpos=int)
     def findall_w(self, w_string, pos=0, endpos=sys.maxint):
@@ -208,7 +216,7 @@ class W_SRE_Pattern(W_Root):
         matchlist_w = []
         ctx = self.make_ctx(w_string, pos, endpos)
         while True:
-            if not searchcontext(space, ctx, self.code):
+            if not searchcontext(space, ctx, self.code, self.dfa):
                 break
             num_groups = self.num_groups
             w_emptystr = space.newtext("")
@@ -248,7 +256,7 @@ class W_SRE_Pattern(W_Root):
         ctx = self.make_ctx(w_string)
         last = ctx.ZERO
         while not maxsplit or n < maxsplit:
-            if not searchcontext(space, ctx, self.code):
+            if not searchcontext(space, ctx, self.code, self.dfa):
                 break
             if ctx.match_start == ctx.match_end:     # zero-width match
                 if ctx.match_start == ctx.end:       # or end of string
@@ -343,7 +351,7 @@ class W_SRE_Pattern(W_Root):
                 n=n, last_pos=last_pos, sublist_w=sublist_w
                 )
             space = self.space
-            if not searchcontext(space, ctx, pattern):
+            if not searchcontext(space, ctx, pattern, self.dfa):
                 break
             if last_pos < ctx.match_start:
                 _sub_append_slice(
@@ -455,6 +463,9 @@ def SRE_Pattern__new__(space, w_subtype, w_pattern, flags, w_code,
     # objects all the time would be bad for the JIT, which relies on the
     # identity of the CompiledPattern() object.
     srepat.code = rsre_core.CompiledPattern(code, flags)
+    # patterns that could backtrack a lot get a lazy DFA, which finds
+    # where the matches start without backtracking (see rsre_dfa.py)
+    srepat.dfa = rsre_dfa.compile_dfa(srepat.code)
     srepat.num_groups = groups
     srepat.w_groupindex = w_groupindex
     srepat.w_indexgroup = w_indexgroup
@@ -713,19 +724,22 @@ class W_SRE_Scanner(W_Root):
     def next_w(self):
         if self.ctx is None:
             raise OperationError(self.space.w_StopIteration, self.space.w_None)
-        if not searchcontext(self.space, self.ctx, self.code):
+        if not searchcontext(self.space, self.ctx, self.code,
+                             self.srepat.dfa):
             raise OperationError(self.space.w_StopIteration, self.space.w_None)
         return self.getmatch(True)
 
     def match_w(self):
         if self.ctx is None:
             return self.space.w_None
-        return self.getmatch(matchcontext(self.space, self.ctx, self.code))
+        return self.getmatch(matchcontext(self.space, self.ctx, self.code,
+                                          self.srepat.dfa))
 
     def search_w(self):
         if self.ctx is None:
             return self.space.w_None
-        return self.getmatch(searchcontext(self.space, self.ctx, self.code))
+        return self.getmatch(searchcontext(self.space, self.ctx, self.code,
+                                           self.srepat.dfa))
 
     def getmatch(self, found):
         ctx = self.ctx
@@ -762,3 +776,73 @@ W_SRE_Scanner.typedef = TypeDef(
     pattern  = interp_attrproperty_w('srepat', W_SRE_Scanner),
 )
 W_SRE_Scanner.typedef.acceptable_as_base_class = False
+
+# ____________________________________________________________
+#
+# SRE_PatternSet class
+
+class W_SRE_PatternSet(W_Root):
+    """A list of patterns that are searched together, in one scan over
+    the string for the patterns that start with a literal prefix."""
+
+    def wrap_found(self, found):
+        space = self.space
+        return space.newlist([space.newint(i) for i in range(len(found))
+                                              if found[i]])
+
+    @unwrap_spec(pos=int, endpos=int)
+    def search_w(self, w_string, pos=0, endpos=sys.maxint):
+        """Return the sorted list of the indexes of the patterns that
+        match somewhere in the string."""
+        if not self.patterns_w:
+            return self.space.newlist([])
+        ctx = self.patterns_w[0].make_ctx(w_string, pos, endpos)
+        try:
+            found = rsre_set.search(ctx, self.patternset)
+        except rsre_core.Error as e:
+            raise OperationError(self.space.w_RuntimeError,
+                                 self.space.newtext(e.msg))
+        return self.wrap_found(found)
+
+    @unwrap_spec(pos=int, endpos=int)
+    def match_w(self, w_string, pos=0, endpos=sys.maxint):
+        """Return the sorted list of the indexes of the patterns that
+        match at the start of the string."""
+        if not self.patterns_w:
+            return self.space.newlist([])
+        ctx = self.patterns_w[0].make_ctx(w_string, pos, endpos)
+        try:
+            found = rsre_set.match(ctx, self.patternset)
+        except rsre_core.Error as e:
+            raise OperationError(self.space.w_RuntimeError,
+                                 self.space.newtext(e.msg))
+        return self.wrap_found(found)
+
+    def len_w(self):
+        return self.space.newint(len(self.patterns_w))
+
+    def get_patterns(self, space):
+        return space.newlist(self.patterns_w[:])
+
+
+def SRE_PatternSet__new__(space, w_subtype, w_patterns):
+    patterns_w = [space.interp_w(W_SRE_Pattern, w_srepat)
+                  for w_srepat in space.listview(w_patterns)]
+    w_patternset = space.allocate_instance(W_SRE_PatternSet, w_subtype)
+    patternset = space.interp_w(W_SRE_PatternSet, w_patternset)
+    patternset.space = space
+    patternset.patterns_w = patterns_w
+    patternset.patternset = rsre_set.PatternSet(
+        [w_srepat.code for w_srepat in patterns_w],
+        [w_srepat.dfa for w_srepat in patterns_w])
+    return w_patternset
+
+W_SRE_PatternSet.typedef = TypeDef(
+    'SRE_PatternSet',
+    __new__  = interp2app(SRE_PatternSet__new__),
+    __len__  = interp2app(W_SRE_PatternSet.len_w),
+    match    = interp2app(W_SRE_PatternSet.match_w),
+    search   = interp2app(W_SRE_PatternSet.search_w),
+    patterns = GetSetProperty(W_SRE_PatternSet.get_patterns),
+)
+W_SRE_PatternSet.typedef.acceptable_as_base_class = False
@@ -1062,6 +1062,57 @@ class AppTestOptimizations:
         assert re.search(".+ab", "wowowowawoabwowo")
         assert None == re.search(".+ab", "wowowaowowo")
 
+    def test_lazy_dfa(self):
+        import re
+        # exponential with backtracking alone
+        assert re.search("(a|aa)*b", "a" * 500) is None
+        assert re.match("(?:x+x+)+y", "x" * 500) is None
+        m = re.search("(a|aa)*b", "xx" + "a" * 500 + "b")
+        assert m.span() == (2, 503)
+        assert m.group(1) == "a"
+        assert re.findall("aND|caN|Ha[DS]|WaS", "tHaN caN WaS HaD") == [
+            "caN", "WaS", "HaD"]
+        assert re.sub("(ab|c)+d", "-", "xabcd abd cc y") == "x- - cc y"
+        assert re.match("(ab|a)(bc|c)*$", "abcbc").groups() == ("ab", "bc")
+        assert re.match("(ab|a)(bc|c)*x", "abcbc") is None
+        assert [m.span() for m in re.finditer(u"(?:\xe9|\xfc)+\\w",
+                                              u"a \xe9\xe9x \xfcy")] == [
+            (2, 5), (6, 8)]
+
+
+class AppTestPatternSet:
+    def test_search(self):
+        import _sre, re
+        patterns = [re.compile(p) for p in [
+            r'GET /api/\w+', r'POST /api/(\d+)', r'ERROR', r'(?i)warn',
+            r'[A-Z]{3} /', r'\d\d:\d\d']]
+        s = _sre.compile_set(patterns)
+        assert len(s) == 6
+        assert s.patterns == patterns
+        assert s.search("GET /api/users") == [0, 4]
+        assert s.search("POST /api/42 12:30") == [1, 4, 5]
+        assert s.search("Warning: ERROR") == [2, 3]
+        assert s.search("GET /api/users", 1) == []
+        assert s.search("x ERROR y", 0, 6) == []
+        assert s.search(u"GET /api/t\xe9") == [0, 4]
+        assert s.search(buffer("ERROR")) == [2]
+        assert s.search("nothing") == []
+
+    def test_match(self):
+        import _sre, re
+        s = _sre.compile_set([re.compile('ab'), re.compile('a(b|c)+'),
+                              re.compile('b')])
+        assert s.match("abc") == [0, 1]
+        assert s.match("abc", 1) == [2]
+        assert s.match("xabc") == []
+
+    def test_empty_and_errors(self):
+        import _sre, re
+        s = _sre.compile_set([])
+        assert s.search("abc") == []
+        assert s.match("abc") == []
+        raises(TypeError, _sre.compile_set, ["abc"])
+
 
 class AppTestUnicodeExtra:
     def test_string_attribute(self):
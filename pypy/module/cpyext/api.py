@@ -19,6 +19,7 @@ from rpython.translator.tool.cbuild import ExternalCompilationInfo
 from rpython.translator.gensupp import NameManager
 from rpython.tool.udir import udir
 from pypy.module.cpyext.state import State
+from pypy.module.cpyext.stats import CpyextStats
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.gateway import unwrap_spec
@@ -633,7 +634,8 @@ SYMBOLS_C = [
     '_PyObject_New', '_PyObject_NewVar',
     '_PyObject_GC_Malloc', '_PyObject_GC_New', '_PyObject_GC_NewVar',
     'PyObject_Init', 'PyObject_InitVar', 'PyInt_FromLong',
-    'PyTuple_New', '_Py_Dealloc',
+    'PyTuple_New', '_Py_Dealloc', 'PyFloat_FromDouble',
+    'PyInt_ClearFreeList', 'PyFloat_ClearFreeList', 'PyTuple_ClearFreeList',
 ]
 TYPES = {}
 FORWARD_DECLS = []
@@ -1001,6 +1003,9 @@ def make_wrapper_second_level(space, argtypesw, restype,
         boxed_args = ()
         tb = None
         state = space.fromcache(State)
+        stats = space.fromcache(CpyextStats)
+        if stats.enabled:
+            stats.count_api_call(_unpack_name(pname))
         try:
             if not we_are_translated() and DEBUG_WRAPPER:
                 print >>sys.stderr, callable,
@@ -1141,6 +1146,14 @@ def attach_c_functions(space, eci, prefix):
     state.C._PyPy_int_dealloc = rffi.llexternal(
         '_PyPy_int_dealloc', [PyObject], lltype.Void,
         compilation_info=eci, _nowrapper=True)
+    state.C.PyFloat_FromDouble = rffi.llexternal(
+        mangle_name(prefix, 'PyFloat_FromDouble'),
+        [rffi.DOUBLE], PyObject,
+        compilation_info=eci,
+        _nowrapper=True)
+    state.C._PyPy_float_dealloc = rffi.llexternal(
+        '_PyPy_float_dealloc', [PyObject], lltype.Void,
+        compilation_info=eci, _nowrapper=True)
     state.C.PyTuple_New = rffi.llexternal(
         mangle_name(prefix, 'PyTuple_New'),
         [Py_ssize_t], PyObject,
@@ -1165,6 +1178,15 @@ def attach_c_functions(space, eci, prefix):
     state.C.tuple_new = rffi.llexternal(
         '_PyPy_tuple_new', [PyTypeObjectPtr, PyObject, PyObject], PyObject,
         compilation_info=eci, _nowrapper=True)
+    for name in ['Int', 'Float', 'Tuple']:
+        setattr(state.C, 'Py%s_ClearFreeList' % name, rffi.llexternal(
+            mangle_name(prefix, 'Py%s_ClearFreeList' % name),
+            [], rffi.INT_real,
+            compilation_info=eci, _nowrapper=True))
+        lower = name.lower()
+        setattr(state.C, '_PyPy_%s_freelist_stats' % lower, rffi.llexternal(
+            '_PyPy_%s_freelist_stats' % lower, [Py_ssize_tP],
+            lltype.Void, compilation_info=eci, _nowrapper=True))
 
 def init_function(func):
     INIT_FUNCTIONS.append(func)
@@ -1477,6 +1499,7 @@ separate_module_files = [source_dir / "varargwrapper.c",
                          source_dir / "object.c",
                          source_dir / "typeobject.c",
                          source_dir / "intobject.c",
+                         source_dir / "floatobject.c",
                          source_dir / "tupleobject.c",
                          ]
 if WIN32:
@@ -1699,11 +1722,14 @@ def load_cpyext_module(space, name, path, dll, initptr):
         return w_mod
     old_context = state.package_context
     state.package_context = name, path
+    stats = space.fromcache(CpyextStats)
+    previous = stats.enter(name)
     try:
         initfunc = rffi.cast(initfunctype, initptr)
         generic_cpy_call(space, initfunc)
         state.check_and_raise_exception()
     finally:
+        stats.leave(previous)
         state.package_context = old_context
     w_mod = state.fixup_extension(name, path)
     return w_mod
@@ -0,0 +1,96 @@
+""" Time a C extension loop over a big list of ints or floats, when the
+list is also changed from Python between the calls:
+
+    pypy bench_list.py [items] [calls]
+
+The default is a list of 1000000 items and 50 calls.  The extension
+module is compiled with distutils in a temporary directory.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+C_SOURCE = r'''
+#include <Python.h>
+
+static PyObject *
+sum_items(PyObject *self, PyObject *arg)
+{
+    PyObject *seq, **items;
+    Py_ssize_t i, n;
+    double total = 0.0;
+
+    seq = PySequence_Fast(arg, "expected a sequence");
+    if (seq == NULL)
+        return NULL;
+    n = PySequence_Fast_GET_SIZE(seq);
+    items = PySequence_Fast_ITEMS(seq);
+    for (i = 0; i < n; i++)
+        total += PyFloat_AsDouble(items[i]);
+    Py_DECREF(seq);
+    return PyFloat_FromDouble(total);
+}
+
+static PyMethodDef methods[] = {
+    {"sum_items", sum_items, METH_O, NULL},
+    {NULL, NULL, 0, NULL}
+};
+
+PyMODINIT_FUNC
+initbench_list_ext(void)
+{
+    Py_InitModule("bench_list_ext", methods);
+}
+'''
+
+def build_extension(tmpdir):
+    from distutils.core import Distribution, Extension
+    from distutils.command.build_ext import build_ext
+    c_file = os.path.join(tmpdir, 'bench_list_ext.c')
+    with open(c_file, 'w') as f:
+        f.write(C_SOURCE)
+    dist = Distribution({'ext_modules': [
+        Extension('bench_list_ext', [c_file])]})
+    cmd = build_ext(dist)
+    cmd.build_lib = tmpdir
+    cmd.build_temp = tmpdir
+    cmd.ensure_finalized()
+    cmd.run()
+    sys.path.insert(0, tmpdir)
+    import bench_list_ext
+    return bench_list_ext
+
+def run(ext, name, lst, calls, mutate=True):
+    expected = float(sum(lst))
+    ext.sum_items(lst)      # warm-up, and first conversion
+    t0 = time.time()
+    for i in range(calls):
+        assert ext.sum_items(lst) == expected
+        if mutate:
+            lst.append(i)    # changed from Python between the calls
+            lst.pop()
+    t1 = time.time()
+    print '%-8s %d items: %.3f ms per call' % (
+        name, len(lst), (t1 - t0) * 1000.0 / calls)
+
+def main(items, calls):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        ext = build_extension(tmpdir)
+        run(ext, 'ints', range(items), calls)
+        run(ext, 'floats', [float(i) for i in range(items)], calls)
+        run(ext, 'tuple', tuple(range(items)), calls, mutate=False)
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    items = 1000000
+    calls = 50
+    if len(sys.argv) > 1:
+        items = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        calls = int(sys.argv[2])
+    main(items, calls)
@@ -3,7 +3,8 @@ from pypy.module.cpyext.api import (PyObjectFields, bootstrap_function,
     cpython_struct,
     CANNOT_FAIL, cpython_api, PyObject, CONST_STRING)
 from pypy.module.cpyext.pyobject import (
-    make_typedescr, track_reference, from_ref)
+    make_typedescr, track_reference, from_ref, BaseCpyTypedescr)
+from pypy.module.cpyext.state import State
 from pypy.interpreter.error import OperationError
 from rpython.rlib.rstruct import runpack
 from pypy.objspace.std.floatobject import W_FloatObject
@@ -17,11 +18,23 @@ cpython_struct("PyFloatObject", PyFloatObjectFields, PyFloatObjectStruct)
 @bootstrap_function
 def init_floatobject(space):
     "Type description of PyFloatObject"
+    state = space.fromcache(State)
     make_typedescr(space.w_float.layout.typedef,
                    basestruct=PyFloatObject.TO,
                    attach=float_attach,
+                   alloc=float_alloc,
+                   dealloc=state.C._PyPy_float_dealloc,
                    realize=float_realize)
 
+def float_alloc(typedescr, space, w_type, itemcount):
+    state = space.fromcache(State)
+    if w_type is space.w_float:
+        # allocate from the free list in floatobject.c; float_attach()
+        # fills the real value
+        return state.ccall("PyFloat_FromDouble", 0.0)
+    else:
+        return BaseCpyTypedescr.allocate(typedescr, space, w_type, itemcount)
+
 def float_attach(space, py_obj, w_obj, w_userdata=None):
     """
     Fills a newly allocated PyFloatObject with the given float object. The
@@ -38,10 +51,6 @@ def float_realize(space, obj):
     track_reference(space, obj, w_obj)
     return w_obj
 
-@cpython_api([lltype.Float], PyObject)
-def PyFloat_FromDouble(space, value):
-    return space.newfloat(value)
-
 @cpython_api([PyObject], lltype.Float, error=-1)
 def PyFloat_AsDouble(space, w_obj):
     return space.float_w(space.float(w_obj))
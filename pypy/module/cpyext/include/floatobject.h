@@ -36,6 +36,11 @@ typedef struct {
 		 _PyPy_Type_FastSubclass(Py_TYPE(op), Py_TPPYPYFLAGS_FLOAT_SUBCLASS)
 #define PyFloat_CheckExact(op) (Py_TYPE(op) == &PyFloat_Type)
 
+PyAPI_FUNC(PyObject *) PyFloat_FromDouble(double);
+PyAPI_FUNC(void) _PyPy_float_dealloc(PyObject *);
+PyAPI_FUNC(int) PyFloat_ClearFreeList(void);
+PyAPI_FUNC(void) _PyPy_float_freelist_stats(Py_ssize_t *);
+
 
 #ifdef __cplusplus
 }
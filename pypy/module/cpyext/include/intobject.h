@@ -18,6 +18,8 @@ typedef struct {
 
 PyAPI_FUNC(PyObject *) PyInt_FromLong(long);
 PyAPI_FUNC(void) _PyPy_int_dealloc(PyObject *);
+PyAPI_FUNC(int) PyInt_ClearFreeList(void);
+PyAPI_FUNC(void) _PyPy_int_freelist_stats(Py_ssize_t *);
 
 #ifdef __cplusplus
 }
@@ -1,4 +1,37 @@
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rlib.unroll import unrolling_iterable
+from .api import Py_ssize_tP
 from .methodobject import W_PyCFunctionObject
+from .state import State
 
 def is_cpyext_function(space, w_arg):
     return space.newbool(isinstance(w_arg, W_PyCFunctionObject))
+
+FREELIST_STATS = ['allocations', 'mallocs', 'free', 'retained_bytes']
+FREELIST_TYPES = unrolling_iterable(['int', 'float', 'tuple'])
+
+def freelist_stats(space):
+    """Return a dict {'int'|'float'|'tuple': {counter: value}} about the
+    free lists used to allocate the corresponding PyObjects: how many
+    were handed out, how many blocks (or tuples) were malloc()ed, the
+    length of the free list, and the memory it currently retains."""
+    state = space.fromcache(State)
+    w_result = space.newdict()
+    with lltype.scoped_alloc(Py_ssize_tP.TO, len(FREELIST_STATS)) as stats:
+        for name in FREELIST_TYPES:
+            state.ccall('_PyPy_%s_freelist_stats' % name, stats)
+            w_stats = space.newdict()
+            for i in range(len(FREELIST_STATS)):
+                space.setitem_str(w_stats, FREELIST_STATS[i],
+                                  space.newint(stats[i]))
+            space.setitem_str(w_result, name, w_stats)
+    return w_result
+
+def clear_freelists(space):
+    """Give the memory of the free lists of ints, floats and tuples back
+    to the system, as far as possible.  This is done automatically when
+    the free lists become large."""
+    state = space.fromcache(State)
+    state.ccall('PyInt_ClearFreeList')
+    state.ccall('PyFloat_ClearFreeList')
+    state.ccall('PyTuple_ClearFreeList')
@@ -16,6 +16,7 @@ from pypy.module.cpyext.api import (
 from pypy.module.cpyext.pyobject import (
     decref, from_ref, make_ref, as_pyobj, make_typedescr)
 from pypy.module.cpyext.state import State
+from pypy.module.cpyext.stats import CpyextStats
 from pypy.module.cpyext.tupleobject import tuple_from_args_w
 
 PyMethodDef = cts.gettype('PyMethodDef')
@@ -71,6 +72,20 @@ class W_PyCFunctionObject(W_Root):
         return self.call(space, self.w_self, __args__)
 
     def call(self, space, w_self, __args__):
+        stats = space.fromcache(CpyextStats)
+        if stats.enabled:
+            previous = stats.enter_w(self.get_stats_module(space))
+            try:
+                return self._call(space, w_self, __args__)
+            finally:
+                stats.leave(previous)
+        return self._call(space, w_self, __args__)
+
+    def get_stats_module(self, space):
+        # the module to which the cpyext_stats() counters are attributed
+        return self.w_module
+
+    def _call(self, space, w_self, __args__):
         flags = self.flags & ~(METH_CLASS | METH_STATIC | METH_COEXIST)
         length = len(__args__.arguments_w)
         if not flags & METH_KEYWORDS and __args__.keywords:
@@ -189,6 +204,11 @@ class W_PyCMethodObject(W_PyCFunctionObject):
         __args__ = __args__.replace_arguments(__args__.arguments_w[1:])
         return self.call(space, w_instance, __args__)
 
+    def get_stats_module(self, space):
+        w_objclass = self.w_objclass
+        assert isinstance(w_objclass, W_TypeObject)
+        return w_objclass.get_module()
+
 # PyPy addition, for Cython
 _, _ = build_type_checkers("MethodDescr", W_PyCMethodObject)
 
@@ -222,6 +242,11 @@ class W_PyCClassMethodObject(W_PyCFunctionObject):
         __args__ = __args__.replace_arguments(__args__.arguments_w[1:])
         return self.call(space, w_instance, __args__)
 
+    def get_stats_module(self, space):
+        w_objclass = self.w_objclass
+        assert isinstance(w_objclass, W_TypeObject)
+        return w_objclass.get_module()
+
     def descr_method_repr(self):
         return self.getrepr(self.space,
                             "built-in method '%s' of '%s' object" %
@@ -246,6 +271,13 @@ class W_PyCWrapperObject(W_Root):
         self.w_objclass = w_type
 
     def descr_call(self, space, w_self, __args__):
+        stats = space.fromcache(CpyextStats)
+        if stats.enabled:
+            previous = stats.enter_w(self.w_objclass.get_module())
+            try:
+                return self.call(space, w_self, __args__)
+            finally:
+                stats.leave(previous)
         return self.call(space, w_self, __args__)
 
     def call(self, space, w_self, __args__):
@@ -6,6 +6,8 @@ class Module(MixedModule):
     interpleveldefs = {
         'load_module': 'api.load_extension_module',
         'is_cpyext_function': 'interp_cpyext.is_cpyext_function',
+        'freelist_stats': 'interp_cpyext.freelist_stats',
+        'clear_freelists': 'interp_cpyext.clear_freelists',
         'FunctionType': 'methodobject.W_PyCFunctionObject',
     }
 
@@ -9,6 +9,7 @@ from pypy.module.cpyext.api import (
     CANNOT_FAIL, Py_TPFLAGS_HEAPTYPE, PyTypeObjectPtr, is_PyObject,
     PyVarObject, Py_ssize_t, init_function, cts)
 from pypy.module.cpyext.state import State
+from pypy.module.cpyext.stats import CpyextStats
 from pypy.objspace.std.typeobject import W_TypeObject
 from pypy.objspace.std.noneobject import W_NoneObject
 from pypy.objspace.std.boolobject import W_BoolObject
@@ -222,6 +223,9 @@ def create_ref(space, w_obj, w_userdata=None, immortal=False):
     else:
         itemcount = 0
     py_obj = typedescr.allocate(space, w_type, itemcount=itemcount, immortal=immortal)
+    stats = space.fromcache(CpyextStats)
+    if stats.enabled:
+        stats.counters().allocations += 1
     track_reference(space, py_obj, w_obj)
     #
     # py_obj.c_ob_refcnt should be exactly REFCNT_FROM_PYPY + 1 here,
@@ -244,6 +248,9 @@ def track_reference(space, py_obj, w_obj):
     assert py_obj.c_ob_refcnt < rawrefcount.REFCNT_FROM_PYPY
     py_obj.c_ob_refcnt += rawrefcount.REFCNT_FROM_PYPY
     w_obj._cpyext_attach_pyobj(space, py_obj)
+    stats = space.fromcache(CpyextStats)
+    if stats.enabled:
+        stats.counters().links += 1
 
 
 w_marker_deallocating = W_Root()
@@ -257,6 +264,9 @@ def from_ref(space, ref):
     assert is_pyobj(ref)
     if not ref:
         return None
+    stats = space.fromcache(CpyextStats)
+    if stats.enabled:
+        stats.counters().from_ref += 1
     w_obj = rawrefcount.to_obj(W_Root, ref)
     if w_obj is not None:
         if w_obj is not w_marker_deallocating:
@@ -286,6 +296,8 @@ def from_ref(space, ref):
         raise InvalidPointerException(str(ref))
     w_type = from_ref(space, ref_type)
     assert isinstance(w_type, W_TypeObject)
+    if stats.enabled:
+        stats.counters().realizations += 1
     return get_typedescr(w_type.layout.typedef).realize(space, ref)
 
 @jit.dont_look_inside
@@ -358,6 +370,9 @@ def make_ref(space, w_obj, w_userdata=None, immortal=False):
     same PyObject for the same W_Root; for example, integers.
     """
     assert not is_pyobj(w_obj)
+    stats = space.fromcache(CpyextStats)
+    if stats.enabled:
+        stats.counters().make_ref += 1
     if w_obj is not None and space.type(w_obj) is space.w_int:
         state = space.fromcache(State)
         intval = space.int_w(w_obj)
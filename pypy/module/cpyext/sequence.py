@@ -3,7 +3,8 @@ from rpython.rlib import rerased, jit
 from rpython.rlib.objectmodel import keepalive_until_here
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.objspace.std.listobject import (
-    ListStrategy, UNROLL_CUTOFF, W_ListObject, ObjectListStrategy)
+    ListStrategy, UNROLL_CUTOFF, W_ListObject, ObjectListStrategy,
+    get_strategy_from_list_objects)
 from pypy.module.cpyext.api import (
     cpython_api, CANNOT_FAIL, CONST_STRING, Py_ssize_t, PyObject, PyObjectP,
     generic_cpy_call)
@@ -277,6 +278,14 @@ def PySequence_Index(space, w_seq, w_obj):
     raise oefmt(space.w_ValueError, "sequence.index(x): x not in sequence")
 
 class CPyListStrategy(ListStrategy):
+    """The strategy of the lists that C code looked at: the items are
+    stored in a raw array of PyObject pointers, which is what PyList_GET_ITEM()
+    and PySequence_Fast_ITEMS() return.  The common operations are done
+    directly on that array, so that a list used alternatively from Python
+    and from C is not converted again and again.  The other operations
+    switch back to the best regular strategy for the items, e.g.
+    IntegerListStrategy for a list of ints.
+    """
     erase, unerase = rerased.new_erasing_pair("cpylist")
     erase = staticmethod(erase)
     unerase = staticmethod(unerase)
@@ -288,6 +297,12 @@ class CPyListStrategy(ListStrategy):
             raise IndexError
         return index
 
+    def _switch_to_regular_strategy(self, w_list):
+        list_w = self.getitems(w_list)
+        strategy = get_strategy_from_list_objects(self.space, list_w, -1)
+        w_list.strategy = strategy
+        strategy.init_from_list_w(w_list, list_w)
+
     def getitem(self, w_list, index):
         storage = self.unerase(w_list.lstorage)
         index = self._check_index(index, storage._length)
@@ -305,8 +320,12 @@ class CPyListStrategy(ListStrategy):
         return storage._length
 
     def getslice(self, w_list, start, stop, step, length):
-        w_list.switch_to_object_strategy()
-        return w_list.strategy.getslice(w_list, start, stop, step, length)
+        storage = self.unerase(w_list.lstorage)
+        subitems_w = [None] * length
+        for i in range(length):
+            subitems_w[i] = from_ref(w_list.space, storage._elems[start])
+            start += step
+        return w_list.space.newlist(subitems_w)
 
     def getitems(self, w_list):
         # called when switching list strategy, so convert storage
@@ -348,64 +367,71 @@ class CPyListStrategy(ListStrategy):
         return self.erase(CPyListStorage(w_list.space, lst))
 
     #------------------------------------------
-    # all these methods fail or switch strategy and then call ListObjectStrategy's method
-
-    def setslice(self, w_list, start, stop, step, length):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.setslice(w_list, start, stop, step, length)
-
-    def init_from_list_w(self, w_list, list_w):
-        raise NotImplementedError
+    # these methods keep the items in the raw array
 
     def _resize_hint(self, w_list, hint):
-        pass
-
-    def find(self, w_list, w_item, start, stop):
-        w_list.switch_to_object_strategy()
-        return w_list.strategy.find(w_list, w_item, start, stop)
+        storage = self.unerase(w_list.lstorage)
+        if hint > storage._allocated:
+            storage.resize(hint)
 
     def append(self, w_list, w_item):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.append(w_list, w_item)
+        storage = self.unerase(w_list.lstorage)
+        storage.append(make_ref(w_list.space, w_item))
 
-    def inplace_mul(self, w_list, times):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.inplace_mul(w_list, times)
+    def insert(self, w_list, index, w_item):
+        storage = self.unerase(w_list.lstorage)
+        storage.insert(index, make_ref(w_list.space, w_item))
 
-    def deleteslice(self, w_list, start, step, slicelength):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.deleteslice(w_list, start, step, slicelength)
+    def pop_end(self, w_list):
+        storage = self.unerase(w_list.lstorage)
+        return self.pop(w_list, storage._length - 1)
 
     def pop(self, w_list, index):
-        w_list.switch_to_object_strategy()
-        return w_list.strategy.pop(w_list, index)
+        storage = self.unerase(w_list.lstorage)
+        index = self._check_index(index, storage._length)
+        py_item = storage.pop(index)
+        w_item = from_ref(w_list.space, py_item)
+        decref(w_list.space, py_item)
+        return w_item
 
-    def pop_end(self, w_list):
-        w_list.switch_to_object_strategy()
-        return w_list.strategy.pop_end(w_list)
+    def _extend_from_list(self, w_list, w_other):
+        list_w = w_other.getitems()    # a copy, in case w_other is w_list
+        storage = self.unerase(w_list.lstorage)
+        storage.resize(storage._length + len(list_w))
+        for w_item in list_w:
+            storage.append(make_ref(w_list.space, w_item))
 
-    def insert(self, w_list, index, w_item):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.insert(w_list, index, w_item)
+    def reverse(self, w_list):
+        storage = self.unerase(w_list.lstorage)
+        i = 0
+        j = storage._length - 1
+        while i < j:
+            py_item = storage._elems[i]
+            storage._elems[i] = storage._elems[j]
+            storage._elems[j] = py_item
+            i += 1
+            j -= 1
 
-    def extend(self, w_list, w_any):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.extend(w_list, w_any)
+    #------------------------------------------
+    # all these methods switch strategy and then call the new strategy's method
 
-    def _extend_from_list(self, w_list, w_other):
-        w_list.switch_to_object_strategy()
-        w_list.strategy._extend_from_list(w_list, w_other)
+    def setslice(self, w_list, start, step, slicelength, sequence_w):
+        self._switch_to_regular_strategy(w_list)
+        w_list.strategy.setslice(w_list, start, step, slicelength, sequence_w)
 
-    def _extend_from_iterable(self, w_list, w_iterable):
-        w_list.switch_to_object_strategy()
-        w_list.strategy._extend_from_iterable(w_list, w_iterable)
+    def init_from_list_w(self, w_list, list_w):
+        raise NotImplementedError
 
-    def reverse(self, w_list):
-        w_list.switch_to_object_strategy()
-        w_list.strategy.reverse(w_list)
+    def inplace_mul(self, w_list, times):
+        self._switch_to_regular_strategy(w_list)
+        w_list.strategy.inplace_mul(w_list, times)
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        self._switch_to_regular_strategy(w_list)
+        w_list.strategy.deleteslice(w_list, start, step, slicelength)
 
     def sort(self, w_list, reverse):
-        w_list.switch_to_object_strategy()
+        self._switch_to_regular_strategy(w_list)
         w_list.descr_sort(w_list.space, reverse=reverse)
 
     def is_empty_strategy(self):
@@ -423,6 +449,48 @@ class CPyListStorage(object):
         for i, item in enumerate(lst):
             self._elems[i] = make_ref(space, lst[i])
 
+    def resize(self, newsize):
+        """Make room for at least 'newsize' items.  Like in CPython, this
+        may move the array: C code must not hold on to an old
+        PySequence_Fast_ITEMS() pointer across a change of the list."""
+        if newsize <= self._allocated:
+            return
+        # over-allocate like CPython's list_resize()
+        allocated = newsize + (newsize >> 3) + (3 if newsize < 9 else 6)
+        elems = lltype.malloc(PyObjectList.TO, allocated, flavor='raw')
+        for i in range(self._length):
+            elems[i] = self._elems[i]
+        lltype.free(self._elems, flavor='raw')
+        self._elems = elems
+        self._allocated = allocated
+
+    def append(self, py_item):
+        # steals the reference to 'py_item'
+        self.resize(self._length + 1)
+        self._elems[self._length] = py_item
+        self._length += 1
+
+    def insert(self, index, py_item):
+        # steals the reference to 'py_item'
+        length = self._length
+        assert 0 <= index <= length
+        self.resize(length + 1)
+        i = length
+        while i > index:
+            self._elems[i] = self._elems[i - 1]
+            i -= 1
+        self._elems[index] = py_item
+        self._length = length + 1
+
+    def pop(self, index):
+        # returns the reference that was held by the list
+        py_item = self._elems[index]
+        length = self._length - 1
+        for i in range(index, length):
+            self._elems[i] = self._elems[i + 1]
+        self._length = length
+        return py_item
+
     def __del__(self):
         for i in range(self._length):
             decref(self.space, self._elems[i])
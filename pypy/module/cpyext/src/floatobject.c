@@ -0,0 +1,164 @@
+
+/* Float object implementation -- copied&adapted from CPython */
+
+#include "Python.h"
+
+/* Like ints, floats are allocated from a dedicated free list, filled
+   when necessary with blocks of memory from malloc().  PyFloat_FromDouble()
+   does not create the interpreter-level float: it is only created if the
+   object is passed back to PyPy (see float_realize() in floatobject.py).
+
+   block_list is a singly-linked list of all PyFloatBlocks allocated,
+   linked via their next members.  PyFloatBlocks are returned to the
+   system by PyFloat_ClearFreeList(), which is also called automatically
+   when the free list grows above PyFloat_MAXFREELIST objects.
+
+   free_list is a singly-linked list of available PyFloatObjects, linked
+   via abuse of their ob_type members.
+*/
+
+#define BLOCK_SIZE      1000    /* 1K less typical malloc overhead */
+#define BHEAD_SIZE      8       /* Enough for a 64-bit pointer */
+#define N_FLOATOBJECTS  ((BLOCK_SIZE - BHEAD_SIZE) / sizeof(PyFloatObject))
+
+struct _floatblock {
+    struct _floatblock *next;
+    PyFloatObject objects[N_FLOATOBJECTS];
+};
+
+typedef struct _floatblock PyFloatBlock;
+
+static PyFloatBlock *block_list = NULL;
+static PyFloatObject *free_list = NULL;
+
+#ifndef PyFloat_MAXFREELIST
+#define PyFloat_MAXFREELIST (100 * N_FLOATOBJECTS)
+#endif
+
+/* statistics, see _PyPy_float_freelist_stats() */
+static Py_ssize_t numallocs = 0;     /* PyFloatObjects handed out */
+static Py_ssize_t numblocks = 0;     /* PyFloatBlocks currently allocated */
+static Py_ssize_t nummallocs = 0;    /* PyFloatBlocks ever allocated */
+static Py_ssize_t numfree = 0;       /* length of free_list */
+static Py_ssize_t clear_threshold = PyFloat_MAXFREELIST;
+
+static PyFloatObject *
+fill_free_list(void)
+{
+    PyFloatObject *p, *q;
+    /* Python's object allocator isn't appropriate for large blocks. */
+    p = (PyFloatObject *) PyMem_MALLOC(sizeof(PyFloatBlock));
+    if (p == NULL)
+        return (PyFloatObject *) PyErr_NoMemory();
+    ((PyFloatBlock *)p)->next = block_list;
+    block_list = (PyFloatBlock *)p;
+    numblocks++;
+    nummallocs++;
+    numfree += N_FLOATOBJECTS;
+    p = &((PyFloatBlock *)p)->objects[0];
+    q = p + N_FLOATOBJECTS;
+    while (--q > p)
+        Py_TYPE(q) = (struct _typeobject *)(q-1);
+    Py_TYPE(q) = NULL;
+    return p + N_FLOATOBJECTS - 1;
+}
+
+PyObject *
+PyFloat_FromDouble(double fval)
+{
+    register PyFloatObject *op;
+    if (free_list == NULL) {
+        if ((free_list = fill_free_list()) == NULL)
+            return NULL;
+    }
+    /* Inline PyObject_New */
+    op = free_list;
+    free_list = (PyFloatObject *)Py_TYPE(op);
+    numfree--;
+    numallocs++;
+    (void)PyObject_INIT(op, &PyFloat_Type);
+    op->ob_fval = fval;
+    return (PyObject *) op;
+}
+
+/* this is CPython's float_dealloc */
+void
+_PyPy_float_dealloc(PyObject *obj)
+{
+    PyFloatObject *op = (PyFloatObject *)obj;
+    if (PyFloat_CheckExact(op)) {
+        Py_TYPE(op) = (struct _typeobject *)free_list;
+        free_list = op;
+        if (++numfree > clear_threshold) {
+            /* give the empty blocks back; if that doesn't free enough,
+               wait until the free list doubles before trying again */
+            PyFloat_ClearFreeList();
+            clear_threshold = 2 * numfree;
+            if (clear_threshold < PyFloat_MAXFREELIST)
+                clear_threshold = PyFloat_MAXFREELIST;
+        }
+    }
+    else
+        Py_TYPE(op)->tp_free((PyObject *)op);
+}
+
+/* this is CPython's PyFloat_ClearFreeList */
+int
+PyFloat_ClearFreeList(void)
+{
+    PyFloatObject *p;
+    PyFloatBlock *list, *next;
+    int i;
+    int u;                      /* remaining unfreed floats per block */
+    int freelist_size = 0;
+
+    list = block_list;
+    block_list = NULL;
+    free_list = NULL;
+    numfree = 0;
+    while (list != NULL) {
+        u = 0;
+        for (i = 0, p = &list->objects[0];
+             i < N_FLOATOBJECTS;
+             i++, p++) {
+            if (PyFloat_CheckExact(p) && Py_REFCNT(p) != 0)
+                u++;
+        }
+        next = list->next;
+        if (u) {
+            list->next = block_list;
+            block_list = list;
+            for (i = 0, p = &list->objects[0];
+                 i < N_FLOATOBJECTS;
+                 i++, p++) {
+                if (!PyFloat_CheckExact(p) ||
+                    Py_REFCNT(p) == 0) {
+                    Py_TYPE(p) = (struct _typeobject *)
+                        free_list;
+                    free_list = p;
+                    numfree++;
+                }
+            }
+        }
+        else {
+            PyMem_FREE(list);
+            numblocks--;
+        }
+        freelist_size += u;
+        list = next;
+    }
+
+    return freelist_size;
+}
+
+/* PyPy addition: fills 'stats' with the number of objects handed out,
+   the number of blocks ever allocated, the length of the free list, and
+   the memory currently held by the blocks */
+void
+_PyPy_float_freelist_stats(Py_ssize_t *stats)
+{
+    stats[0] = numallocs;
+    stats[1] = nummallocs;
+    stats[2] = numfree;
+    stats[3] = numblocks * sizeof(PyFloatBlock);
+}
@@ -12,9 +12,11 @@
    overhead (in space and time) than straight malloc(): a simple
    dedicated free list, filled when necessary with memory from malloc().
 
-   block_list is a singly-linked list of all PyIntBlocks ever allocated,
-   linked via their next members.  PyIntBlocks are never returned to the
-   system before shutdown (PyInt_Fini).
+   block_list is a singly-linked list of all PyIntBlocks allocated,
+   linked via their next members.  PyIntBlocks are returned to the system
+   by PyInt_ClearFreeList(), which is also called automatically when the
+   free list grows above PyInt_MAXFREELIST objects (PyPy addition: in
+   CPython, only gc.collect() calls it).
 
    free_list is a singly-linked list of available PyIntObjects, linked
    via abuse of their ob_type members.
@@ -34,6 +36,17 @@ typedef struct _intblock PyIntBlock;
 static PyIntBlock *block_list = NULL;
 static PyIntObject *free_list = NULL;
 
+#ifndef PyInt_MAXFREELIST
+#define PyInt_MAXFREELIST   (100 * N_INTOBJECTS)
+#endif
+
+/* statistics, see _PyPy_int_freelist_stats() */
+static Py_ssize_t numallocs = 0;     /* PyIntObjects handed out */
+static Py_ssize_t numblocks = 0;     /* PyIntBlocks currently allocated */
+static Py_ssize_t nummallocs = 0;    /* PyIntBlocks ever allocated */
+static Py_ssize_t numfree = 0;       /* length of free_list */
+static Py_ssize_t clear_threshold = PyInt_MAXFREELIST;
+
 static PyIntObject *
 fill_free_list(void)
 {
@@ -44,6 +57,9 @@ fill_free_list(void)
         return (PyIntObject *) PyErr_NoMemory();
     ((PyIntBlock *)p)->next = block_list;
     block_list = (PyIntBlock *)p;
+    numblocks++;
+    nummallocs++;
+    numfree += N_INTOBJECTS;
     /* Link the int objects together, from rear to front, then return
        the address of the last int object in the block. */
     p = &((PyIntBlock *)p)->objects[0];
@@ -89,6 +105,8 @@ PyInt_FromLong(long ival)
     /* Inline PyObject_New */
     v = free_list;
     free_list = (PyIntObject *)Py_TYPE(v);
+    numfree--;
+    numallocs++;
     (void)PyObject_INIT(v, &PyInt_Type);
     v->ob_ival = ival;
     return (PyObject *) v;
@@ -102,7 +120,76 @@ _PyPy_int_dealloc(PyObject *obj)
     if (PyInt_CheckExact(v)) {
         Py_TYPE(v) = (struct _typeobject *)free_list;
         free_list = v;
+        if (++numfree > clear_threshold) {
+            /* give the empty blocks back; if that doesn't free enough,
+               wait until the free list doubles before trying again */
+            PyInt_ClearFreeList();
+            clear_threshold = 2 * numfree;
+            if (clear_threshold < PyInt_MAXFREELIST)
+                clear_threshold = PyInt_MAXFREELIST;
+        }
     }
     else
         Py_TYPE(v)->tp_free((PyObject *)v);
 }
+
+/* this is CPython's PyInt_ClearFreeList, without the small_ints */
+int
+PyInt_ClearFreeList(void)
+{
+    PyIntObject *p;
+    PyIntBlock *list, *next;
+    int i;
+    int u;                      /* remaining unfreed ints per block */
+    int freelist_size = 0;
+
+    list = block_list;
+    block_list = NULL;
+    free_list = NULL;
+    numfree = 0;
+    while (list != NULL) {
+        u = 0;
+        for (i = 0, p = &list->objects[0];
+             i < N_INTOBJECTS;
+             i++, p++) {
+            if (PyInt_CheckExact(p) && p->ob_refcnt != 0)
+                u++;
+        }
+        next = list->next;
+        if (u) {
+            list->next = block_list;
+            block_list = list;
+            for (i = 0, p = &list->objects[0];
+                 i < N_INTOBJECTS;
+                 i++, p++) {
+                if (!PyInt_CheckExact(p) ||
+                    p->ob_refcnt == 0) {
+                    Py_TYPE(p) = (struct _typeobject *)
+                        free_list;
+                    free_list = p;
+                    numfree++;
+                }
+            }
+        }
+        else {
+            PyMem_FREE(list);
+            numblocks--;
+        }
+        freelist_size += u;
+        list = next;
+    }
+
+    return freelist_size;
+}
+
+/* PyPy addition: fills 'stats' with the number of objects handed out,
+   the number of blocks ever allocated, the length of the free list, and
+   the memory currently held by the blocks */
+void
+_PyPy_int_freelist_stats(Py_ssize_t *stats)
+{
+    stats[0] = numallocs;
+    stats[1] = nummallocs;
+    stats[2] = numfree;
+    stats[3] = numblocks * sizeof(PyIntBlock);
+}
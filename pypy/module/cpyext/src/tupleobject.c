@@ -24,6 +24,10 @@ static PyTupleObject *free_list[PyTuple_MAXSAVESIZE];
 static int numfree[PyTuple_MAXSAVESIZE];
 #endif
 
+/* statistics, see _PyPy_tuple_freelist_stats() */
+static Py_ssize_t numallocs = 0;     /* PyTupleObjects handed out */
+static Py_ssize_t nummallocs = 0;    /* ... of which were not reused */
+
 PyObject *
 PyTuple_New(register Py_ssize_t size)
 {
@@ -53,7 +57,9 @@ PyTuple_New(register Py_ssize_t size)
         op = PyObject_GC_NewVar(PyTupleObject, &PyTuple_Type, size);
         if (op == NULL)
             return NULL;
+        nummallocs++;
     }
+    numallocs++;
     for (i=0; i < size; i++)
         op->ob_item[i] = NULL;
     _PyObject_GC_TRACK(op);
@@ -90,6 +96,50 @@ done:
     Py_TRASHCAN_SAFE_END(op)
 }
 
+/* this is CPython's PyTuple_ClearFreeList, which also clears the
+   empty tuples */
+int
+PyTuple_ClearFreeList(void)
+{
+    int freelist_size = 0;
+#if PyTuple_MAXSAVESIZE > 0
+    int i;
+    for (i = 0; i < PyTuple_MAXSAVESIZE; i++) {
+        PyTupleObject *p, *q;
+        p = free_list[i];
+        freelist_size += numfree[i];
+        free_list[i] = NULL;
+        numfree[i] = 0;
+        while (p) {
+            q = p;
+            p = (PyTupleObject *)(p->ob_item[0]);
+            PyObject_GC_Del(q);
+        }
+    }
+#endif
+    return freelist_size;
+}
+
+/* PyPy addition: fills 'stats' like _PyPy_int_freelist_stats(), with
+   the number of tuples allocated with malloc() instead of blocks */
+void
+_PyPy_tuple_freelist_stats(Py_ssize_t *stats)
+{
+    Py_ssize_t total = 0, size = 0;
+#if PyTuple_MAXSAVESIZE > 0
+    int i;
+    for (i = 0; i < PyTuple_MAXSAVESIZE; i++) {
+        total += numfree[i];
+        size += numfree[i] * (sizeof(PyTupleObject) +
+                              (i > 0 ? i - 1 : 0) * sizeof(PyObject *));
+    }
+#endif
+    stats[0] = numallocs;
+    stats[1] = nummallocs;
+    stats[2] = total;
+    stats[3] = size;
+}
+
 static PyObject *
 tuple_subtype_new(PyTypeObject *type, PyObject *args, PyObject *kwds);
 
@@ -85,12 +85,16 @@ class State:
         if not self.space.config.translating:
             def dealloc_trigger():
                 from pypy.module.cpyext.pyobject import PyObject, decref
+                from pypy.module.cpyext.stats import CpyextStats
                 print 'dealloc_trigger...'
+                stats = space.fromcache(CpyextStats)
                 while True:
                     ob = rawrefcount.next_dead(PyObject)
                     if not ob:
                         break
                     print 'deallocating PyObject', ob
+                    if stats.enabled:
+                        stats.counters().unlinks += 1
                     decref(space, ob)
                 print 'dealloc_trigger DONE'
                 return "RETRY"
@@ -205,10 +209,14 @@ class CNamespace:
 
 def _rawrefcount_perform(space):
     from pypy.module.cpyext.pyobject import PyObject, decref
+    from pypy.module.cpyext.stats import CpyextStats
+    stats = space.fromcache(CpyextStats)
     while True:
         py_obj = rawrefcount.next_dead(PyObject)
         if not py_obj:
             break
+        if stats.enabled:
+            stats.counters().unlinks += 1
         decref(space, py_obj)
 
 class PyObjDeallocAction(executioncontext.AsyncAction):
@@ -0,0 +1,94 @@
+"""
+Opt-in counters for the traffic across the cpyext boundary: calls to the
+C API functions, PyObjects allocated for W_Root objects, W_Root objects
+realized from PyObjects, and rawrefcount links created and broken.
+
+The counters are aggregated per "calling extension module": the module
+of the C function, method or slot that PyPy was calling when the event
+occurred.  Events outside any such call are counted under '?'.
+
+Enabled with __pypy__.cpyext_stats_enable(True) and read with
+__pypy__.cpyext_stats().
+"""
+
+UNKNOWN = '?'
+
+
+class ModuleCounters(object):
+    def __init__(self):
+        self.api_calls = {}     # {name of the C API function: count}
+        self.allocations = 0    # PyObjects made for W_Root objects
+        self.realizations = 0   # W_Root objects made for PyObjects
+        self.links = 0          # rawrefcount links created
+        self.unlinks = 0        # PyObjects released by the GC
+        self.make_ref = 0
+        self.from_ref = 0
+
+
+class CpyextStats(object):
+    _immutable_fields_ = ['enabled?']
+
+    def __init__(self, space):
+        self.space = space
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.current = UNKNOWN
+        self.modules = {}
+
+    def counters(self):
+        name = self.current
+        try:
+            return self.modules[name]
+        except KeyError:
+            counters = ModuleCounters()
+            self.modules[name] = counters
+            return counters
+
+    def enter(self, name):
+        """Attribute the next events to the module 'name'.  Returns the
+        previous module name, to pass to leave()."""
+        previous = self.current
+        self.current = name
+        return previous
+
+    def enter_w(self, w_module):
+        """Like enter(), with a wrapped module name (anything else than
+        a string counts as '?')."""
+        space = self.space
+        if w_module is not None and space.isinstance_w(w_module, space.w_text):
+            return self.enter(space.text_w(w_module))
+        return self.enter(UNKNOWN)
+
+    def leave(self, previous):
+        self.current = previous
+
+    def count_api_call(self, name):
+        api_calls = self.counters().api_calls
+        api_calls[name] = api_calls.get(name, 0) + 1
+
+    def wrap(self):
+        space = self.space
+        w_result = space.newdict()
+        for name, counters in self.modules.items():
+            w_counters = space.newdict()
+            w_api_calls = space.newdict()
+            for api_name, count in counters.api_calls.items():
+                space.setitem_str(w_api_calls, api_name, space.newint(count))
+            space.setitem_str(w_counters, 'api_calls', w_api_calls)
+            space.setitem_str(w_counters, 'allocations',
+                              space.newint(counters.allocations))
+            space.setitem_str(w_counters, 'realizations',
+                              space.newint(counters.realizations))
+            space.setitem_str(w_counters, 'links',
+                              space.newint(counters.links))
+            space.setitem_str(w_counters, 'unlinks',
+                              space.newint(counters.unlinks))
+            space.setitem_str(w_counters, 'make_ref',
+                              space.newint(counters.make_ref))
+            space.setitem_str(w_counters, 'from_ref',
+                              space.newint(counters.from_ref))
+            space.setitem_str(w_result, name, w_counters)
+        return w_result
+
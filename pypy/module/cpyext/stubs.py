@@ -487,13 +487,6 @@ def PyFloat_GetMin(space):
     """
     raise NotImplementedError
 
-@cpython_api([], rffi.INT_real, error=CANNOT_FAIL)
-def PyFloat_ClearFreeList(space):
-    """Clear the float free list. Return the number of items that could not
-    be freed.
-    """
-    raise NotImplementedError
-
 @cpython_api([rffi.CCHARP, PyFloatObject], lltype.Void)
 def PyFloat_AsString(space, buf, v):
     """Convert the argument v to a string, using the same rules as
@@ -1138,13 +1131,6 @@ def PyThreadState_Next(space, tstate):
     """
     raise NotImplementedError
 
-@cpython_api([], rffi.INT_real, error=CANNOT_FAIL)
-def PyInt_ClearFreeList(space):
-    """Clear the integer free list. Return the number of items that could not
-    be freed.
-    """
-    raise NotImplementedError
-
 @cpython_api([PyObject], rffi.INT_real, error=CANNOT_FAIL)
 def PySeqIter_Check(space, op):
     """Return true if the type of op is PySeqIter_Type.
@@ -1369,12 +1355,6 @@ def Py_Exit(space, status):
     standard C library function exit(status)."""
     raise NotImplementedError
 
-@cpython_api([], rffi.INT_real, error=CANNOT_FAIL)
-def PyTuple_ClearFreeList(space):
-    """Clear the free list. Return the total number of freed items.
-    """
-    raise NotImplementedError
-
 @cpython_api([], rffi.UINT, error=CANNOT_FAIL)
 def PyType_ClearCache(space):
     """Clear the internal lookup cache. Return the current version tag.
@@ -4,17 +4,39 @@ from pypy.module.cpyext.test.test_api import BaseApiTest
 from pypy.module.cpyext.test.test_cpyext import AppTestCpythonExtensionBase
 from rpython.rtyper.lltypesystem import rffi
 from pypy.module.cpyext.floatobject import (
-    PyFloat_FromDouble, PyFloat_AsDouble, PyFloat_AS_DOUBLE, PyNumber_Float,
+    PyFloat_AsDouble, PyFloat_AS_DOUBLE, PyNumber_Float,
     _PyFloat_Unpack4, _PyFloat_Unpack8)
+from pypy.module.cpyext.pyobject import decref, get_w_obj_and_decref
+from pypy.module.cpyext.state import State
 
 class TestFloatObject(BaseApiTest):
     def test_floatobject(self, space):
-        assert space.unwrap(PyFloat_FromDouble(space, 3.14)) == 3.14
+        state = space.fromcache(State)
+        py_x = state.C.PyFloat_FromDouble(3.14)
+        assert space.unwrap(get_w_obj_and_decref(space, py_x)) == 3.14
         assert PyFloat_AsDouble(space, space.wrap(23.45)) == 23.45
         assert PyFloat_AS_DOUBLE(space, space.wrap(23.45)) == 23.45
         with pytest.raises(OperationError):
             PyFloat_AsDouble(space, space.w_None)
 
+    def test_freelist_direct(self, space):
+        state = space.fromcache(State)
+        p_x = state.C.PyFloat_FromDouble(1.5)
+        decref(space, p_x)
+        p_y = state.C.PyFloat_FromDouble(2.5)
+        # check that the address is the same, i.e. that the freelist did its
+        # job
+        assert p_x == p_y
+        decref(space, p_y)
+
+    def test_clear_freelist(self, space):
+        state = space.fromcache(State)
+        p_x = state.C.PyFloat_FromDouble(1.5)
+        # only the block holding p_x is kept
+        assert state.C.PyFloat_ClearFreeList() == 1
+        decref(space, p_x)
+        assert state.C.PyFloat_ClearFreeList() == 0
+
     def test_coerce(self, space):
         assert space.type(PyNumber_Float(space, space.wrap(3))) is space.w_float
         assert space.type(PyNumber_Float(space, space.wrap("3"))) is space.w_float
@@ -50,6 +72,35 @@ class AppTestFloatObject(AppTestCpythonExtensionBase):
         assert module.from_string() == 1234.56
         assert type(module.from_string()) is float
 
+    def test_freelist_stats(self):
+        import cpyext
+        module = self.import_extension('foo', [
+            ("many_floats", "METH_O",
+             """
+                 long i, n = PyInt_AsLong(args);
+                 PyObject **keep = malloc(n * sizeof(PyObject *));
+                 double total = 0.0;
+                 for (i = 0; i < n; i++)
+                     keep[i] = PyFloat_FromDouble(i + 0.5);
+                 for (i = 0; i < n; i++) {
+                     /* not PyFloat_AS_DOUBLE(), which would attach a
+                        W_FloatObject and keep the object alive */
+                     total += ((PyFloatObject *)keep[i])->ob_fval;
+                     Py_DECREF(keep[i]);
+                 }
+                 free(keep);
+                 return PyFloat_FromDouble(total);
+             """),
+            ])
+        before = cpyext.freelist_stats()['float']
+        assert module.many_floats(2000) == 2000000.0
+        after = cpyext.freelist_stats()['float']
+        assert after['allocations'] >= before['allocations'] + 2001
+        assert after['mallocs'] > before['mallocs']
+        assert after['free'] >= 1999
+        assert after['retained_bytes'] > 0
+        assert sorted(cpyext.freelist_stats()) == ['float', 'int', 'tuple']
+
 class AppTestFloatMacros(AppTestCpythonExtensionBase):
     def test_return_nan(self):
         import math
@@ -270,6 +270,33 @@ class TestCPyListStrategy(BaseApiTest):
         space.setitem(w_l1, space.newslice(w(0), w(0), w(1)), w_l)
         assert map(space.unwrap, space.unpackiterable(w_l1)) == [1, 2, 3, 4]
 
+    def test_stays_in_cpy_strategy(self, space, api):
+        from pypy.module.cpyext.sequence import CPyListStrategy
+        w = space.wrap
+        w_l = w([1, 2, 3, 4])
+        api.PyList_GetItem(w_l, 0)   # converts to cpy strategy
+        cpy_strategy = space.fromcache(CPyListStrategy)
+        for i in range(20):
+            space.call_method(w_l, 'append', w(i + 5))
+        space.call_method(w_l, 'insert', w(0), w(0))
+        space.call_method(w_l, 'extend', w([-1, -2]))
+        space.call_method(w_l, 'extend', w_l)
+        assert space.unwrap(space.call_method(w_l, 'pop')) == -2
+        assert space.unwrap(space.call_method(w_l, 'pop', w(0))) == 0
+        space.call_method(w_l, 'remove', w(24))
+        space.call_method(w_l, 'reverse')
+        assert space.unwrap(space.call_method(w_l, 'index', w(3))) == 22
+        w_slice = space.getitem(w_l, space.newslice(w(1), w(30), w(3)))
+        assert w_l.strategy is cpy_strategy
+        expected = range(1, 24) + [-1, -2] + range(25) + [-1]
+        expected.reverse()
+        assert space.unwrap(w_l) == expected
+        assert space.unwrap(w_slice) == expected[1:30:3]
+        #
+        space.call_method(w_l, 'sort')
+        assert w_l.strategy.__class__.__name__ == 'IntegerListStrategy'
+        assert space.unwrap(w_l) == sorted(expected)
+
 
 class AppTestSequenceObject(AppTestCpythonExtensionBase):
     def test_fast(self):
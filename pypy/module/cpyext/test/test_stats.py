@@ -0,0 +1,58 @@
+from pypy.module.cpyext.test.test_cpyext import AppTestCpythonExtensionBase
+
+
+class AppTestCpyextStats(AppTestCpythonExtensionBase):
+
+    def test_counters(self):
+        import __pypy__
+        mod = self.import_extension('stats_mod', [
+            ('make_list', 'METH_O',
+             '''
+             long i, n = PyInt_AsLong(args);
+             PyObject *lst = PyList_New(0);
+             for (i = 0; i < n; i++) {
+                 PyObject *item = PyInt_FromLong(i);
+                 PyList_Append(lst, item);
+                 Py_DECREF(item);
+             }
+             return lst;
+             '''),
+            ('identity', 'METH_O',
+             '''
+             Py_INCREF(args);
+             return args;
+             '''),
+            ])
+        __pypy__.cpyext_stats(reset=True)
+        __pypy__.cpyext_stats_enable(True)
+        try:
+            assert mod.make_list(5) == [0, 1, 2, 3, 4]
+            mod.identity(object())
+        finally:
+            __pypy__.cpyext_stats_enable(False)
+        stats = __pypy__.cpyext_stats(reset=True)
+        counters = stats['stats_mod']
+        assert counters['api_calls']['PyList_Append'] == 5
+        assert counters['api_calls']['PyList_New'] == 1
+        assert counters['allocations'] >= 1     # the object()
+        assert counters['links'] >= counters['allocations']
+        assert counters['from_ref'] >= 5
+        assert sorted(counters) == ['allocations', 'api_calls', 'from_ref',
+                                    'links', 'make_ref', 'realizations',
+                                    'unlinks']
+        assert __pypy__.cpyext_stats() == {}
+        # disabled: nothing is counted
+        mod.make_list(3)
+        assert __pypy__.cpyext_stats() == {}
+
+    def test_method_attributed_to_module(self):
+        import __pypy__
+        module = self.import_module(name='foo')
+        obj = module.new()
+        __pypy__.cpyext_stats_enable(True)
+        try:
+            obj.copy()
+        finally:
+            __pypy__.cpyext_stats_enable(False)
+        stats = __pypy__.cpyext_stats(reset=True)
+        assert 'foo' in stats
@@ -65,6 +65,7 @@ class GcStats(object):
         self.memory_allocated_sum = self._format(self._s.total_allocated_memory + self._s.total_memory_pressure +
                                             self._s.jit_backend_allocated)
         self.total_gc_time = self._s.total_gc_time
+        self.nursery_resizes = self._s.nursery_resizes
 
     def _format(self, v):
         if v < 1000000:
@@ -96,6 +97,7 @@ class GcStats(object):
     Total:                   %s
 
     Total time spent in GC:  %s
+    Nursery resizes:         %d
     """ % (self.total_gc_memory, self.peak_memory,
               self.total_arena_memory,
               self.total_rawmalloced_memory,
@@ -111,7 +113,8 @@ class GcStats(object):
            self.jit_backend_allocated,
            extra,
            self.memory_allocated_sum,
-           self.total_gc_time / 1000.0)
+           self.total_gc_time / 1000.0,
+           self.nursery_resizes)
 
 
 def get_stats(memory_pressure=False):
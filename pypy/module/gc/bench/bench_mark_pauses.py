@@ -0,0 +1,81 @@
+""" Total and longest pauses of the major collection steps on a large object
+graph, without and with PYPY_GC_MARK_THREADS.  Run it on a translated pypy:
+
+    pypy bench_mark_pauses.py [threads [megabytes]]
+
+Each run builds a graph of about 'megabytes' MB of small objects, then
+allocates short-lived objects for a while, which runs several major
+collections over the graph.  The pauses are measured with the GC hooks.
+"""
+
+import os
+import sys
+import subprocess
+
+
+class Node(object):
+    def __init__(self, value, children):
+        self.value = value
+        self.children = children
+
+def build(count):
+    # a wide and deep graph: lists of small trees
+    nodes = []
+    for i in range(count // 8):
+        leaves = [Node(i, None) for j in range(6)]
+        nodes.append(Node(i, [Node(i, leaves[:3]), Node(i, leaves[3:])]))
+    return nodes
+
+class PauseHooks(object):
+    def __init__(self):
+        self.marking = 0.0
+        self.total = 0.0
+        self.longest = 0.0
+        self.steps = 0
+
+    def on_gc_collect_step(self, stats):
+        self.total += stats.duration
+        self.longest = max(self.longest, stats.duration_max)
+        self.steps += stats.count
+        if stats.oldstate == stats.STATE_MARKING:
+            self.marking += stats.duration
+
+def worker(megabytes):
+    import gc
+    graph = build(megabytes * 1024 * 1024 // 64)
+    hooks = PauseHooks()
+    gc.hooks.on_gc_collect_step = hooks.on_gc_collect_step
+    for i in range(5):
+        gc.collect()
+        for j in range(200000):
+            garbage = [Node(j, None), Node(j, None)]
+    gc.hooks.reset()
+    del graph
+    print '%f %f %f %d' % (hooks.total, hooks.marking, hooks.longest,
+                           hooks.steps)
+
+def run(threads, megabytes):
+    env = os.environ.copy()
+    env['PYPY_GC_MARK_THREADS'] = str(threads)
+    args = [sys.executable, __file__, '--worker', str(megabytes)]
+    output = subprocess.check_output(args, env=env)
+    total, marking, longest, steps = output.split()
+    print ('%2d threads: total %.3f s, marking %.3f s, longest %.4f s, '
+           '%s steps' % (threads, float(total), float(marking),
+                         float(longest), steps))
+
+def main(threads, megabytes):
+    run(0, megabytes)
+    run(threads, megabytes)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--worker':
+        worker(int(sys.argv[2]))
+    else:
+        threads = 4
+        megabytes = 500
+        if len(sys.argv) > 1:
+            threads = int(sys.argv[1])
+        if len(sys.argv) > 2:
+            megabytes = int(sys.argv[2])
+        main(threads, megabytes)
@@ -1,3 +1,9 @@
+""" Time numpy.dot on square matrices:
+
+    pypy dot.py [n [runs]]
+
+Without arguments, runs a few sizes for float64, float32 and int64.
+"""
 import sys
 import time
 
@@ -6,27 +12,33 @@ try:
 except ImportError:
     import numpy
 
-def get_matrix(n):
+def get_matrix(n, dtype=numpy.float64):
     import random
-    x = numpy.zeros((n,n), dtype=numpy.float64)
+    x = numpy.zeros((n,n), dtype=dtype)
     for i in range(n):
         for j in range(n):
-            x[i][j] = random.random()
+            x[i][j] = random.random() * 100
     return x
 
-def main(n, r):
-    x = get_matrix(n)
-    y = get_matrix(n)
+def main(n, r, dtype=numpy.float64):
+    x = get_matrix(n, dtype)
+    y = get_matrix(n, dtype)
     a = time.time()
     for _ in xrange(r):
         #z = numpy.dot(x, y)  # uses numpy possibly-blas-lib dot
         z = numpy.core.multiarray.dot(x, y)  # uses strictly numpy C dot
     b = time.time()
-    print '%d runs, %.2f seconds' % (r, b-a)
+    print '%-8s n=%-4d %d runs, %.2f seconds' % (
+        numpy.dtype(dtype).name, n, r, b-a)
 
-n = int(sys.argv[1])
-try:
-    r = int(sys.argv[2])
-except IndexError:
-    r = 1
-main(n, r)
+if len(sys.argv) > 1:
+    n = int(sys.argv[1])
+    try:
+        r = int(sys.argv[2])
+    except IndexError:
+        r = 1
+    main(n, r)
+else:
+    for dtype in [numpy.float64, numpy.float32, numpy.int64]:
+        for n, r in [(16, 10000), (64, 200), (256, 5), (512, 1)]:
+            main(n, r, dtype)
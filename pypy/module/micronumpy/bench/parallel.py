@@ -0,0 +1,50 @@
+""" Time add, multiply and sum on big float64 arrays with 1, 2, 4 and 8
+threads (see set_num_threads()):
+
+    pypy parallel.py [items [runs]]
+
+The default is 10000000 items and 10 runs.
+"""
+import sys
+import time
+
+try:
+    import numpypy as numpy
+except ImportError:
+    import numpy
+from _numpypy.multiarray import set_num_threads
+
+def bench(name, func, runs):
+    func()
+    a = time.time()
+    for _ in xrange(runs):
+        func()
+    b = time.time()
+    return (b - a) / runs
+
+def main(items, runs):
+    x = numpy.arange(items, dtype=numpy.float64)
+    y = numpy.arange(items, dtype=numpy.float64)
+    out = numpy.empty(items, dtype=numpy.float64)
+    tests = [('add', lambda: numpy.add(x, y, out=out)),
+             ('multiply', lambda: numpy.multiply(x, y, out=out)),
+             ('sum', lambda: x.sum())]
+    for name, func in tests:
+        base = None
+        for threads in [1, 2, 4, 8]:
+            set_num_threads(threads)
+            t = bench(name, func, runs)
+            if base is None:
+                base = t
+            print '%-9s %d threads: %7.2f ms  (x%.2f)' % (
+                name, threads, t * 1000.0, base / t)
+    set_num_threads(1)
+
+if __name__ == '__main__':
+    items = 10000000
+    runs = 10
+    if len(sys.argv) > 1:
+        items = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        runs = int(sys.argv[2])
+    main(items, runs)
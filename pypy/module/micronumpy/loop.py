@@ -5,16 +5,23 @@ over all the array elements.
 import py
 from pypy.interpreter.error import oefmt
 from rpython.rlib import jit
+from rpython.rlib.rawstorage import raw_storage_getitem_unaligned, \
+    raw_storage_setitem_unaligned
 from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.unroll import unrolling_iterable
 from rpython.rtyper.lltypesystem import lltype, rffi
-from pypy.module.micronumpy import support, constants as NPY
+from pypy.module.micronumpy import support, parallel, constants as NPY
 from pypy.module.micronumpy.base import W_NDimArray, convert_to_array
 from pypy.module.micronumpy.iterators import PureShapeIter, AxisIter, \
     AllButAxisIter, ArrayIter
+from pypy.module.micronumpy.strides import is_c_contiguous
 from pypy.interpreter.argument import Arguments
 
 
-def call2(space, shape, func, calc_dtype, w_lhs, w_rhs, out):
+def call2(space, shape, func, calc_dtype, w_lhs, w_rhs, out, parallel_op=0):
+    if parallel_op and parallel.call2(space, parallel_op, calc_dtype,
+                                      w_lhs, w_rhs, out):
+        return out
     if w_lhs.get_size() == 1:
         w_left = w_lhs.get_scalar_value().convert_to(space, calc_dtype)
         left_iter = left_state = None
@@ -133,7 +140,10 @@ call1_driver = jit.JitDriver(
     greens=['shapelen', 'share_iterator', 'func', 'calc_dtype', 'res_dtype'],
     reds='auto', vectorize=True)
 
-def call1(space, shape, func, calc_dtype, w_obj, w_ret):
+def call1(space, shape, func, calc_dtype, w_obj, w_ret, parallel_op=0):
+    if parallel_op and parallel.call1(space, parallel_op, calc_dtype,
+                                      w_obj, w_ret):
+        return w_ret
     obj_iter, obj_state = w_obj.create_iter(shape)
     obj_iter.track_index = False
     out_iter, out_state = w_ret.create_iter(shape)
@@ -329,7 +339,13 @@ reduce_flat_driver = jit.JitDriver(
     greens = ['shapelen', 'func', 'done_func', 'calc_dtype'], reds = 'auto',
     vectorize = True)
 
-def reduce_flat(space, func, w_arr, calc_dtype, done_func, identity):
+def reduce_flat(space, func, w_arr, calc_dtype, done_func, identity,
+                parallel_op=0):
+    if parallel_op and done_func is None:
+        w_res = parallel.reduce_flat(space, parallel_op, w_arr, calc_dtype,
+                                     identity)
+        if w_res is not None:
+            return w_res
     obj_iter, obj_state = w_arr.create_iter()
     if identity is None:
         cur_value = obj_iter.getitem(obj_state).convert_to(space, calc_dtype)
@@ -594,6 +610,8 @@ def multidim_dot(space, left, right, result, dtype, right_critical_dim):
     right_impl = right.implementation
     assert left_shape[-1] == right_shape[right_critical_dim]
     assert result.get_dtype() == dtype
+    if contiguous_dot(left, right, result, dtype):
+        return result
     outi, outs = result.create_iter()
     outi.track_index = False
     lefti = AllButAxisIter(left_impl, len(left_shape) - 1)
@@ -624,6 +642,158 @@ def multidim_dot(space, left, right, result, dtype, right_critical_dim):
         lefts = lefti.next(lefts)
     return result
 
+# block sizes for contiguous_dot(), in items: a block of rows of the
+# result, a block of the summed dimension and a block of columns
+DOT_BLOCK_ROWS = 32
+DOT_BLOCK_INNER = 128
+DOT_BLOCK_COLS = 512
+# a narrower right operand (other than a vector) goes through the generic
+# loop: a row that short is not worth vectorizing
+DOT_MIN_COLS = 8
+
+def _make_dot_kernel(name, TP, comp_type):
+    size = rffi.sizeof(TP)
+    driver = jit.JitDriver(name='numpy_dot_' + name,
+                           greens=['dtype'],
+                           reds='auto',
+                           vectorize=True)
+    vector_driver = jit.JitDriver(name='numpy_dot_vector_' + name,
+                                  greens=['dtype'],
+                                  reds='auto',
+                                  vectorize=True)
+
+    if comp_type == 'float':
+        def muladd(c, a, b):
+            # round the product and the sum to TP, like the itemtype's mul()
+            # and add(): float32 results are the same as the generic loop's
+            ab = rffi.cast(TP, float(a) * float(b))
+            return rffi.cast(TP, float(c) + float(ab))
+    else:
+        def muladd(c, a, b):
+            return rffi.cast(TP, c + a * b)
+
+    def matrix_vector(dtype, lstorage, lstart, rstorage, rstart, ostorage,
+                      ostart, m, n):
+        # one sum per row: the innermost loop is a reduction over two
+        # unit-stride rows
+        i = 0
+        while i < m:
+            l = lstart + i * n * size
+            r = rstart
+            rend = rstart + n * size
+            o = ostart + i * size
+            acc = raw_storage_getitem_unaligned(TP, ostorage, o)
+            while r < rend:
+                vector_driver.jit_merge_point(dtype=dtype)
+                a = raw_storage_getitem_unaligned(TP, lstorage, l)
+                b = raw_storage_getitem_unaligned(TP, rstorage, r)
+                acc = muladd(acc, a, b)
+                l += size
+                r += size
+            raw_storage_setitem_unaligned(ostorage, o, acc)
+            i += 1
+
+    def kernel(dtype, lstorage, lstart, rstorage, rstart, ostorage, ostart,
+               m, n, p):
+        ''' out[m, p] += left[m, n] * right[n, p], all three C-contiguous
+        with the native byte order.  The loops are tiled so that a block of
+        'right' stays in the cache while it is used for a block of rows, and
+        the innermost loop walks one row of 'right' and of 'out' with unit
+        stride, which the vectorizer can turn into packed mul/add.
+        '''
+        if p == 1:
+            matrix_vector(dtype, lstorage, lstart, rstorage, rstart,
+                          ostorage, ostart, m, n)
+            return
+        ii = 0
+        while ii < m:
+            iend = min(ii + DOT_BLOCK_ROWS, m)
+            kk = 0
+            while kk < n:
+                kend = min(kk + DOT_BLOCK_INNER, n)
+                jj = 0
+                while jj < p:
+                    jend = min(jj + DOT_BLOCK_COLS, p)
+                    i = ii
+                    while i < iend:
+                        k = kk
+                        while k < kend:
+                            a = raw_storage_getitem_unaligned(TP, lstorage,
+                                        lstart + (i * n + k) * size)
+                            r = rstart + (k * p + jj) * size
+                            o = ostart + (i * p + jj) * size
+                            oend = ostart + (i * p + jend) * size
+                            while o < oend:
+                                driver.jit_merge_point(dtype=dtype)
+                                b = raw_storage_getitem_unaligned(TP, rstorage,
+                                                                  r)
+                                c = raw_storage_getitem_unaligned(TP, ostorage,
+                                                                  o)
+                                raw_storage_setitem_unaligned(ostorage, o,
+                                                              muladd(c, a, b))
+                                r += size
+                                o += size
+                            k += 1
+                        i += 1
+                    jj = jend
+                kk = kend
+            ii = iend
+    kernel.func_name = 'dot_kernel_' + name
+    return kernel
+
+dot_kernels = unrolling_iterable([
+    (num, _make_dot_kernel(name, TP, comp_type))
+    for num, name, TP, comp_type in [
+        (NPY.DOUBLE, 'float64', rffi.DOUBLE, 'float'),
+        (NPY.FLOAT, 'float32', rffi.FLOAT, 'float'),
+        (NPY.LONGLONG, 'longlong', rffi.LONGLONG, 'int'),
+        (NPY.LONG, 'long', rffi.LONG, 'int')]])
+
+def contiguous_dot(left, right, result, dtype):
+    ''' fast path of multidim_dot for 1-d and 2-d C-contiguous arrays that
+    already have the result's dtype: works on the raw storage instead of
+    boxing every item.  Returns False if the arrays don't qualify.
+    '''
+    left_impl = left.implementation
+    right_impl = right.implementation
+    out_impl = result.implementation
+    if not (1 <= left.ndims() <= 2 and 1 <= right.ndims() <= 2):
+        return False
+    ldtype = left.get_dtype()
+    rdtype = right.get_dtype()
+    if (ldtype.num != dtype.num or rdtype.num != dtype.num or
+            not ldtype.is_native() or not rdtype.is_native() or
+            not dtype.is_native()):
+        return False
+    if not (is_c_contiguous(left_impl) and is_c_contiguous(right_impl) and
+            is_c_contiguous(out_impl)):
+        return False
+    if (out_impl.storage == left_impl.storage or
+            out_impl.storage == right_impl.storage):
+        return False    # dot(a, b, out=a)
+    left_shape = left.get_shape()
+    right_shape = right.get_shape()
+    m = 1
+    if len(left_shape) == 2:
+        m = left_shape[0]
+    n = left_shape[-1]
+    p = 1
+    if len(right_shape) == 2:
+        p = right_shape[1]
+    if 1 < p < DOT_MIN_COLS:
+        return False
+    num = dtype.num
+    for kernel_num, kernel in dot_kernels:
+        if num == kernel_num:
+            with left_impl as lstorage:
+                with right_impl as rstorage:
+                    with out_impl as ostorage:
+                        kernel(dtype, lstorage, left_impl.start,
+                               rstorage, right_impl.start,
+                               ostorage, out_impl.start, m, n, p)
+            return True
+    return False
+
 count_all_true_driver = jit.JitDriver(name = 'numpy_count',
                                       greens = ['shapelen', 'dtype'],
                                       reds = 'auto',
@@ -34,6 +34,9 @@ class MultiArrayModule(MixedModule):
         'nditer': 'nditer.W_NDIter',
         'broadcast': 'broadcast.W_Broadcast',
 
+        'set_num_threads': 'parallel.set_num_threads',
+        'get_num_threads': 'parallel.get_num_threads',
+
         'set_docstring': 'support.descr_set_docstring',
         'VisibleDeprecationWarning': 'support.W_VisibleDeprecationWarning',
     }
@@ -0,0 +1,220 @@
+"""
+Multi-threaded versions of a few element-wise loops, for big C-contiguous
+arrays of one native numeric type.  The work is done by src/parallel.c
+with the GIL released; it only reads and writes the raw array storage.
+
+The number of threads is a per-space setting, changed with
+set_num_threads().  The default of 1 keeps everything in the interpreted
+loops of loop.py.
+"""
+import py
+
+from rpython.rlib import jit
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.unroll import unrolling_iterable
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.translator import cdir
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.module.micronumpy import support, constants as NPY
+from pypy.module.micronumpy.strides import is_c_contiguous
+
+srcdir = py.path.local(__file__).dirpath()
+eci = ExternalCompilationInfo(
+    includes=[srcdir.join('src', 'parallel.h')],
+    include_dirs=[str(srcdir), cdir],
+    separate_module_files=[srcdir.join('src', 'parallel.c')])
+
+def llexternal(*args, **kwargs):
+    kwargs.setdefault('compilation_info', eci)
+    kwargs.setdefault('sandboxsafe', True)
+    # the loops can be long, and don't need the GIL
+    kwargs.setdefault('releasegil', True)
+    return rffi.llexternal(*args, **kwargs)
+
+c_binary = llexternal('pypy_np_parallel_binary',
+                      [rffi.INT, rffi.INT, rffi.CCHARP, rffi.CCHARP,
+                       rffi.CCHARP, rffi.LONG, rffi.INT], lltype.Void)
+c_unary = llexternal('pypy_np_parallel_unary',
+                     [rffi.INT, rffi.INT, rffi.CCHARP, rffi.CCHARP,
+                      rffi.LONG, rffi.INT], lltype.Void)
+c_reduce = llexternal('pypy_np_parallel_reduce',
+                      [rffi.INT, rffi.INT, rffi.CCHARP, rffi.CCHARP,
+                       rffi.LONG, rffi.INT], lltype.Void)
+
+# must match src/parallel.h
+OP_ADD = 1
+OP_SUBTRACT = 2
+OP_MULTIPLY = 3
+OP_NEGATIVE = 4
+OP_ABSOLUTE = 5
+
+ufunc_ops = {
+    'add': OP_ADD,
+    'subtract': OP_SUBTRACT,
+    'multiply': OP_MULTIPLY,
+    'negative': OP_NEGATIVE,
+    'absolute': OP_ABSOLUTE,
+}
+
+# (dtype num, type code for parallel.c, lltype of the items, box class)
+parallel_types = unrolling_iterable([
+    (NPY.DOUBLE, 0, rffi.DOUBLE, 'W_Float64Box'),
+    (NPY.FLOAT, 1, rffi.FLOAT, 'W_Float32Box'),
+    (NPY.LONGLONG, 2, rffi.LONGLONG, 'W_Int64Box'),
+    (NPY.LONG, 3, rffi.LONG, 'W_LongBox'),
+])
+
+MAX_THREADS = 64      # PYPY_NP_MAX_THREADS
+
+# arrays with fewer items are not worth starting threads for
+PARALLEL_MIN_SIZE = 1 << 17
+
+
+def ufunc_op(name):
+    """ The operation code for the ufunc 'name', or 0 if it has no
+    parallel version.
+    """
+    return ufunc_ops.get(name, 0)
+
+
+class ParallelState(object):
+    def __init__(self, space):
+        self.num_threads = 1
+
+def get_num_threads(space):
+    return space.newint(space.fromcache(ParallelState).num_threads)
+
+@unwrap_spec(num_threads=int)
+def set_num_threads(space, num_threads):
+    """ Set the number of threads used for element-wise operations on big
+    contiguous arrays: add, subtract, multiply, negative, absolute, and
+    the sum and product of the whole array.  1 turns this off.
+    """
+    if not 1 <= num_threads <= MAX_THREADS:
+        raise oefmt(space.w_ValueError,
+                    "number of threads must be between 1 and %d",
+                    MAX_THREADS)
+    space.fromcache(ParallelState).num_threads = num_threads
+
+
+def _type_code(dtype):
+    if not dtype.is_native():
+        return -1
+    num = dtype.num
+    for type_num, code, TP, box_name in parallel_types:
+        if num == type_num:
+            return code
+    return -1
+
+def _get_num_threads(space, size):
+    if size < PARALLEL_MIN_SIZE:
+        return 1
+    return space.fromcache(ParallelState).num_threads
+
+def _usable(w_arr, dtype, size):
+    # same dtype as the loop, C-contiguous, and not broadcast
+    arr_dtype = w_arr.get_dtype()
+    return (arr_dtype.num == dtype.num and arr_dtype.is_native() and
+            w_arr.get_size() == size and
+            is_c_contiguous(w_arr.implementation))
+
+def _overlaps(out, w_arr):
+    # a shifted view of the same memory: the chunks could see each
+    # other's results
+    impl = out.implementation
+    arr_impl = w_arr.implementation
+    return impl.storage == arr_impl.storage and impl.start != arr_impl.start
+
+def _as_charp(impl, storage):
+    return rffi.cast(rffi.CCHARP,
+                     support.get_storage_as_int(storage, impl.start))
+
+@jit.dont_look_inside
+def call2(space, op, calc_dtype, w_lhs, w_rhs, out):
+    """ out[:] = w_lhs <op> w_rhs with threads.  Returns False, without
+    doing anything, if the arrays don't qualify.
+    """
+    size = out.get_size()
+    nthreads = _get_num_threads(space, size)
+    if nthreads <= 1 or op == 0:
+        return False
+    code = _type_code(calc_dtype)
+    if (code < 0 or not _usable(out, calc_dtype, size) or
+            not _usable(w_lhs, calc_dtype, size) or
+            not _usable(w_rhs, calc_dtype, size) or
+            _overlaps(out, w_lhs) or _overlaps(out, w_rhs)):
+        return False
+    impl, limpl, rimpl = (out.implementation, w_lhs.implementation,
+                          w_rhs.implementation)
+    with impl as storage:
+        with limpl as lstorage:
+            with rimpl as rstorage:
+                c_binary(rffi.cast(rffi.INT, op), rffi.cast(rffi.INT, code),
+                         _as_charp(impl, storage),
+                         _as_charp(limpl, lstorage),
+                         _as_charp(rimpl, rstorage),
+                         size, rffi.cast(rffi.INT, nthreads))
+    return True
+
+@jit.dont_look_inside
+def call1(space, op, calc_dtype, w_obj, out):
+    """ out[:] = <op> w_obj with threads, or return False """
+    size = out.get_size()
+    nthreads = _get_num_threads(space, size)
+    if nthreads <= 1 or op == 0:
+        return False
+    code = _type_code(calc_dtype)
+    if (code < 0 or not _usable(out, calc_dtype, size) or
+            not _usable(w_obj, calc_dtype, size) or _overlaps(out, w_obj)):
+        return False
+    impl, oimpl = out.implementation, w_obj.implementation
+    with impl as storage:
+        with oimpl as ostorage:
+            c_unary(rffi.cast(rffi.INT, op), rffi.cast(rffi.INT, code),
+                    _as_charp(impl, storage), _as_charp(oimpl, ostorage),
+                    size, rffi.cast(rffi.INT, nthreads))
+    return True
+
+@jit.dont_look_inside
+def reduce_flat(space, op, w_arr, calc_dtype, identity):
+    """ Reduce the whole array with threads, starting from the identity
+    of the ufunc (0 or 1).  Returns the result as a box, or None if the
+    array doesn't qualify.
+    """
+    if op != OP_ADD and op != OP_MULTIPLY:
+        return None
+    size = w_arr.get_size()
+    nthreads = _get_num_threads(space, size)
+    if nthreads <= 1 or identity is None:
+        return None
+    code = _type_code(calc_dtype)
+    if code < 0 or not _usable(w_arr, calc_dtype, size):
+        return None
+    for type_num, type_code, TP, box_name in parallel_types:
+        if code == type_code:
+            return _reduce(TP, box_name, code, op, w_arr, size, nthreads)
+    return None
+
+@specialize.memo()
+def _box_class(box_name):
+    # boxes.py imports this module indirectly, through concrete.py
+    from pypy.module.micronumpy import boxes
+    return getattr(boxes, box_name)
+
+@specialize.arg(0, 1)
+def _reduce(TP, box_name, code, op, w_arr, size, nthreads):
+    impl = w_arr.implementation
+    with lltype.scoped_alloc(rffi.CArray(TP), 1) as result:
+        if op == OP_MULTIPLY:
+            result[0] = rffi.cast(TP, 1)
+        else:
+            result[0] = rffi.cast(TP, 0)
+        with impl as storage:
+            c_reduce(rffi.cast(rffi.INT, op), rffi.cast(rffi.INT, code),
+                     rffi.cast(rffi.CCHARP, result),
+                     _as_charp(impl, storage),
+                     size, rffi.cast(rffi.INT, nthreads))
+        return _box_class(box_name)(result[0])
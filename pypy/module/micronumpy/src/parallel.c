@@ -0,0 +1,253 @@
+/* Element-wise loops over contiguous arrays of one native numeric type.
+   The range of items is split into chunks that run on their own threads;
+   the caller (parallel.py) releases the GIL around these functions, so
+   they must not touch anything but the raw array memory.
+ */
+
+#include <math.h>
+#include "src/precommondefs.h"
+#include "parallel.h"
+
+#ifndef _WIN32
+#  include <pthread.h>
+#  define PYPY_NP_HAVE_THREADS
+#endif
+
+/* chunks are a multiple of this many items, so that two threads never
+   write to the same cache line of the result */
+#define CHUNK_ALIGN  16
+
+#define KIND_REDUCE  0
+#define KIND_UNARY   1
+#define KIND_BINARY  2
+
+typedef struct {
+    int kind, op, type;
+    char *out;
+    const char *a, *b;
+    long start, stop;
+    union {
+        double d;
+        float f;
+        long long q;
+        long l;
+    } partial;
+} chunk_t;
+
+/* integer arithmetic is done on the unsigned type, to wrap around on
+   overflow like the interpreted loops do */
+#define INT_ABS(T, UT, x)    ((x) < 0 ? (T)(-(UT)(x)) : (x))
+#define FLOAT_ABS(T, UT, x)  ((T)fabs(x))
+
+#define DEFINE_LOOPS(NAME, T, UT, ABS)                                  \
+static void                                                             \
+binary_##NAME(int op, T *out, const T *a, const T *b,                   \
+              long start, long stop)                                    \
+{                                                                       \
+    long i;                                                             \
+    switch (op) {                                                       \
+    case PYPY_NP_ADD:                                                   \
+        for (i = start; i < stop; i++)                                  \
+            out[i] = (T)((UT)a[i] + (UT)b[i]);                          \
+        break;                                                          \
+    case PYPY_NP_SUBTRACT:                                              \
+        for (i = start; i < stop; i++)                                  \
+            out[i] = (T)((UT)a[i] - (UT)b[i]);                          \
+        break;                                                          \
+    case PYPY_NP_MULTIPLY:                                              \
+        for (i = start; i < stop; i++)                                  \
+            out[i] = (T)((UT)a[i] * (UT)b[i]);                          \
+        break;                                                          \
+    }                                                                   \
+}                                                                       \
+                                                                        \
+static void                                                             \
+unary_##NAME(int op, T *out, const T *a, long start, long stop)         \
+{                                                                       \
+    long i;                                                             \
+    switch (op) {                                                       \
+    case PYPY_NP_NEGATIVE:                                              \
+        for (i = start; i < stop; i++)                                  \
+            out[i] = (T)(-(UT)a[i]);                                    \
+        break;                                                          \
+    case PYPY_NP_ABSOLUTE:                                              \
+        for (i = start; i < stop; i++)                                  \
+            out[i] = ABS(T, UT, a[i]);                                  \
+        break;                                                          \
+    }                                                                   \
+}                                                                       \
+                                                                        \
+static void                                                             \
+reduce_##NAME(int op, T *result, const T *a, long start, long stop)     \
+{                                                                       \
+    long i;                                                             \
+    UT acc = (UT)*result;                                               \
+    switch (op) {                                                       \
+    case PYPY_NP_ADD:                                                   \
+        for (i = start; i < stop; i++)                                  \
+            acc += (UT)a[i];                                            \
+        break;                                                          \
+    case PYPY_NP_MULTIPLY:                                              \
+        for (i = start; i < stop; i++)                                  \
+            acc *= (UT)a[i];                                            \
+        break;                                                          \
+    }                                                                   \
+    *result = (T)acc;                                                   \
+}
+
+DEFINE_LOOPS(double, double, double, FLOAT_ABS)
+DEFINE_LOOPS(float, float, float, FLOAT_ABS)
+DEFINE_LOOPS(longlong, long long, unsigned long long, INT_ABS)
+DEFINE_LOOPS(long, long, unsigned long, INT_ABS)
+
+#define RUN_CHUNK(CODE, NAME, T, FIELD)                                 \
+    case CODE:                                                          \
+        if (c->kind == KIND_BINARY)                                     \
+            binary_##NAME(c->op, (T *)c->out, (const T *)c->a,          \
+                          (const T *)c->b, c->start, c->stop);          \
+        else if (c->kind == KIND_UNARY)                                 \
+            unary_##NAME(c->op, (T *)c->out, (const T *)c->a,           \
+                         c->start, c->stop);                            \
+        else                                                            \
+            reduce_##NAME(c->op, &c->partial.FIELD, (const T *)c->a,    \
+                          c->start, c->stop);                           \
+        break;
+
+static void
+run_chunk(chunk_t *c)
+{
+    switch (c->type) {
+    RUN_CHUNK(PYPY_NP_DOUBLE, double, double, d)
+    RUN_CHUNK(PYPY_NP_FLOAT, float, float, f)
+    RUN_CHUNK(PYPY_NP_LONGLONG, longlong, long long, q)
+    RUN_CHUNK(PYPY_NP_LONG, long, long, l)
+    }
+}
+
+#ifdef PYPY_NP_HAVE_THREADS
+static void *
+chunk_thread(void *arg)
+{
+    run_chunk((chunk_t *)arg);
+    return NULL;
+}
+#endif
+
+/* Split [0, n) in at most 'nthreads' chunks, copying 'proto' for each of
+   them, and run them: the first one in the calling thread, the others in
+   new threads.  If a thread cannot be started, its chunk runs in the
+   calling thread.  Returns the number of chunks. */
+static int
+run_parallel(chunk_t *proto, chunk_t *chunks, long n, int nthreads)
+{
+    long per, start;
+    int i, count = 0;
+#ifdef PYPY_NP_HAVE_THREADS
+    pthread_t threads[PYPY_NP_MAX_THREADS];
+    int started[PYPY_NP_MAX_THREADS];
+#else
+    nthreads = 1;
+#endif
+
+    if (nthreads > PYPY_NP_MAX_THREADS)
+        nthreads = PYPY_NP_MAX_THREADS;
+    if (nthreads < 1)
+        nthreads = 1;
+    per = (n + nthreads - 1) / nthreads;
+    per = (per + CHUNK_ALIGN - 1) / CHUNK_ALIGN * CHUNK_ALIGN;
+    for (start = 0; start < n; start += per) {
+        chunks[count] = *proto;
+        chunks[count].start = start;
+        chunks[count].stop = (n - start > per) ? start + per : n;
+        count++;
+    }
+#ifdef PYPY_NP_HAVE_THREADS
+    for (i = 1; i < count; i++)
+        started[i] = pthread_create(&threads[i], NULL, chunk_thread,
+                                    &chunks[i]) == 0;
+    if (count > 0)
+        run_chunk(&chunks[0]);
+    for (i = 1; i < count; i++) {
+        if (started[i])
+            pthread_join(threads[i], NULL);
+        else
+            run_chunk(&chunks[i]);
+    }
+#else
+    for (i = 0; i < count; i++)
+        run_chunk(&chunks[i]);
+#endif
+    return count;
+}
+
+void
+pypy_np_parallel_binary(int op, int type, char *out, const char *a,
+                        const char *b, long n, int nthreads)
+{
+    chunk_t proto, chunks[PYPY_NP_MAX_THREADS];
+    proto.kind = KIND_BINARY;
+    proto.op = op;
+    proto.type = type;
+    proto.out = out;
+    proto.a = a;
+    proto.b = b;
+    run_parallel(&proto, chunks, n, nthreads);
+}
+
+void
+pypy_np_parallel_unary(int op, int type, char *out, const char *a,
+                       long n, int nthreads)
+{
+    chunk_t proto, chunks[PYPY_NP_MAX_THREADS];
+    proto.kind = KIND_UNARY;
+    proto.op = op;
+    proto.type = type;
+    proto.out = out;
+    proto.a = a;
+    proto.b = NULL;
+    run_parallel(&proto, chunks, n, nthreads);
+}
+
+#define SET_IDENTITY(T, FIELD)                                          \
+    proto.partial.FIELD = (T)(op == PYPY_NP_MULTIPLY ? 1 : 0)
+
+#define COMBINE(T, UT, FIELD)                                           \
+    for (i = 0; i < count; i++) {                                       \
+        if (op == PYPY_NP_MULTIPLY)                                     \
+            *(T *)result = (T)((UT)*(T *)result *                       \
+                               (UT)chunks[i].partial.FIELD);            \
+        else                                                            \
+            *(T *)result = (T)((UT)*(T *)result +                       \
+                               (UT)chunks[i].partial.FIELD);            \
+    }
+
+/* 'result' holds the start value on entry, and the result on exit.  Each
+   chunk is reduced separately, and the partial results are combined in
+   order: with floats, the result can differ in the last bits from a
+   single loop over all the items */
+void
+pypy_np_parallel_reduce(int op, int type, char *result, const char *a,
+                        long n, int nthreads)
+{
+    chunk_t proto, chunks[PYPY_NP_MAX_THREADS];
+    int i, count;
+    proto.kind = KIND_REDUCE;
+    proto.op = op;
+    proto.type = type;
+    proto.out = NULL;
+    proto.a = a;
+    proto.b = NULL;
+    switch (type) {
+    case PYPY_NP_DOUBLE:   SET_IDENTITY(double, d);    break;
+    case PYPY_NP_FLOAT:    SET_IDENTITY(float, f);     break;
+    case PYPY_NP_LONGLONG: SET_IDENTITY(long long, q); break;
+    case PYPY_NP_LONG:     SET_IDENTITY(long, l);      break;
+    }
+    count = run_parallel(&proto, chunks, n, nthreads);
+    switch (type) {
+    case PYPY_NP_DOUBLE:   COMBINE(double, double, d);                 break;
+    case PYPY_NP_FLOAT:    COMBINE(float, float, f);                   break;
+    case PYPY_NP_LONGLONG: COMBINE(long long, unsigned long long, q);  break;
+    case PYPY_NP_LONG:     COMBINE(long, unsigned long, l);            break;
+    }
+}
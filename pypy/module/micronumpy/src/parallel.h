@@ -0,0 +1,23 @@
+/* element-wise loops over contiguous arrays, split between threads;
+   see parallel.py */
+
+#define PYPY_NP_DOUBLE     0
+#define PYPY_NP_FLOAT      1
+#define PYPY_NP_LONGLONG   2
+#define PYPY_NP_LONG       3
+
+#define PYPY_NP_ADD        1
+#define PYPY_NP_SUBTRACT   2
+#define PYPY_NP_MULTIPLY   3
+#define PYPY_NP_NEGATIVE   4
+#define PYPY_NP_ABSOLUTE   5
+
+#define PYPY_NP_MAX_THREADS  64
+
+RPY_EXTERN void pypy_np_parallel_binary(int op, int type, char *out,
+                                        const char *a, const char *b,
+                                        long n, int nthreads);
+RPY_EXTERN void pypy_np_parallel_unary(int op, int type, char *out,
+                                       const char *a, long n, int nthreads);
+RPY_EXTERN void pypy_np_parallel_reduce(int op, int type, char *result,
+                                        const char *a, long n, int nthreads);
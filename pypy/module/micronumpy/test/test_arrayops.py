@@ -115,6 +115,43 @@ class AppTestNumSupport(BaseNumpyAppTest):
         assert dot(a, b)[2,0,1,2] == 1140
         assert (dot([[1,2],[3,4]],[5,6]) == [17, 39]).all()
 
+    def test_dot_contiguous(self):
+        from numpy import arange, dot
+        for dtype in ['float64', 'float32', 'int64', int]:
+            a = arange(6, dtype=dtype).reshape(2, 3)
+            b = arange(24, dtype=dtype).reshape(3, 8)
+            c = dot(a, b)
+            assert c.dtype == a.dtype
+            assert (c == [[40 + 3 * j for j in range(8)],
+                          [112 + 12 * j for j in range(8)]]).all()
+            assert (dot(a, b[:, 1].copy()) == [43, 124]).all()
+            assert (dot(a[1], b) == [112 + 12 * j for j in range(8)]).all()
+            # too narrow, done by the generic loop
+            assert (dot(a, a.T.copy()) == [[5, 14], [14, 50]]).all()
+        # bigger than one block of rows and of the summed dimension
+        m, n = 33, 129
+        a = (arange(m * n, dtype=float) % 7).reshape(m, n)
+        b = arange(n, dtype=float).reshape(n, 1) % 5
+        c = dot(a, b)
+        assert c.shape == (m, 1)
+        for i in [0, 32]:
+            assert c[i, 0] == sum([a[i, k] * b[k, 0] for k in range(n)])
+        # not contiguous
+        assert (dot(b.T, a.T) == c.T).all()
+
+    def test_dot_contiguous_float32(self):
+        from numpy import arange, dot, zeros
+        # the same rounding as the generic loop, which is used when the
+        # right operand is not contiguous
+        a = (arange(300, dtype='float32') / 7).reshape(3, 100)
+        b = (arange(1000, dtype='float32') / 3).reshape(100, 10)
+        b2 = zeros((100, 20), dtype='float32')[:, ::2]
+        b2[:] = b
+        c = dot(a, b)
+        assert c.dtype == 'float32'
+        assert (c == dot(a, b2)).all()
+        assert (dot(a, b[:, 3].copy()) == dot(a, b2[:, 3])).all()
+
     def test_dot_constant(self):
         from numpy import array, dot
         a = array(range(5))
@@ -0,0 +1,93 @@
+from pypy.module.micronumpy import parallel
+from pypy.module.micronumpy.test.test_base import BaseNumpyAppTest
+
+
+class AppTestParallel(BaseNumpyAppTest):
+    spaceconfig = dict(usemodules=['micronumpy'])
+
+    def setup_class(cls):
+        BaseNumpyAppTest.setup_class.im_func(cls)
+        # small enough for the arrays of the tests to be split in chunks
+        cls.old_min_size = parallel.PARALLEL_MIN_SIZE
+        parallel.PARALLEL_MIN_SIZE = 64
+
+    def teardown_class(cls):
+        parallel.PARALLEL_MIN_SIZE = cls.old_min_size
+
+    def teardown_method(self, meth):
+        self.space.appexec([], """():
+            from _numpypy.multiarray import set_num_threads
+            set_num_threads(1)
+        """)
+
+    def test_num_threads(self):
+        from _numpypy.multiarray import set_num_threads, get_num_threads
+        assert get_num_threads() == 1
+        set_num_threads(4)
+        assert get_num_threads() == 4
+        raises(ValueError, set_num_threads, 0)
+        raises(ValueError, set_num_threads, 100000)
+        assert get_num_threads() == 4
+
+    def test_binary(self):
+        from numpy import arange, add, subtract, multiply
+        from _numpypy.multiarray import set_num_threads
+        for dtype in ['float64', 'float32', 'int64', int]:
+            a = arange(1000, dtype=dtype)
+            b = arange(1000, dtype=dtype)[::-1].copy()
+            set_num_threads(1)
+            expected = [add(a, b), subtract(a, b), multiply(a, b)]
+            set_num_threads(3)
+            got = [add(a, b), subtract(a, b), multiply(a, b)]
+            for x, y in zip(expected, got):
+                assert x.dtype == y.dtype
+                assert (x == y).all()
+            # in place, and with 'out'
+            c = a.copy()
+            c += b
+            assert (c == expected[0]).all()
+            out = arange(1000, dtype=dtype)
+            multiply(a, b, out=out)
+            assert (out == expected[2]).all()
+        a = arange(1000, dtype='int64')
+        assert (a * a)[999] == 999 * 999
+
+    def test_unary(self):
+        from numpy import arange, negative, absolute
+        from _numpypy.multiarray import set_num_threads
+        set_num_threads(4)
+        for dtype in ['float64', 'float32', 'int64']:
+            a = arange(-500, 500, dtype=dtype)
+            assert ((-a)[::999] == [500, -499]).all()
+            assert (negative(a) == -a).all()
+            assert (absolute(a)[::999] == [500, 499]).all()
+        a = arange(-500.0, 500.0)
+        a[0] = -0.0
+        assert str(absolute(a)[0]) == '0.0'
+
+    def test_reduce(self):
+        from numpy import arange, ones
+        from _numpypy.multiarray import set_num_threads
+        set_num_threads(4)
+        a = arange(1000)
+        assert a.sum() == 499500
+        assert arange(1000.0).sum() == 499500.0
+        assert arange(1000, dtype='float32').sum() == 499500.0
+        assert abs((ones(1000) * 1.001).prod() - 1.001 ** 1000) < 1e-10
+        # axis reductions and 'max' still use the interpreted loops
+        assert a.reshape(10, 100).sum(axis=1)[1] == sum(range(100, 200))
+        assert a.max() == 999
+
+    def test_not_parallel(self):
+        from numpy import arange
+        from _numpypy.multiarray import set_num_threads
+        set_num_threads(4)
+        a = arange(1000.0)
+        # not contiguous, broadcast, mixed types or overlapping
+        assert (a[::2] + a[1::2])[1] == 2.0 + 3.0
+        assert (a + 1.0)[10] == 11.0
+        assert (a + arange(1000))[10] == 20.0
+        b = arange(1001.0)
+        from numpy import add
+        add(b[1:], b[:-1], out=b[1:])
+        assert b[2] == 3.0
@@ -810,6 +810,21 @@ class TestNumpyJit(LLJitMixin):
         self.check_trace_count(4)
         self.check_vectorized(1,1)
 
+    def define_dot_contiguous():
+        return """
+        a = reshape(|8|, [2, 4])
+        b = reshape(|64|, [4, 16])
+        c = dot(a, b)
+        c -> 1 -> 2
+        """
+
+    def test_dot_contiguous(self):
+        # the innermost loop of contiguous_dot() walks a row of 16 items
+        result = self.run("dot_contiguous")
+        assert result == 652
+        self.check_trace_count(4)
+        self.check_vectorized(1,1)
+
     def define_argsort():
         return """
         a = |30|
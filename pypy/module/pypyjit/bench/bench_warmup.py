@@ -0,0 +1,78 @@
+""" Time-to-peak of a short-lived process, cold and with a JIT warmup
+profile recorded by a previous run.  Run it on a translated pypy:
+
+    pypy bench_warmup.py [requests]
+
+Each run handles 'requests' small requests and prints how long each one
+took; the time-to-peak is the time until a request runs within 20% of the
+fastest one.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+
+def handle_request(i):
+    # a few different loops, as in a real worker
+    words = ['w%d' % (j % 97) for j in range(2000)]
+    counts = {}
+    for w in words:
+        counts[w] = counts.get(w, 0) + 1
+    total = 0
+    for j in range(3000):
+        total += (i * j) % 7
+    points = [(j * 0.5, j * 1.5) for j in range(1000)]
+    dist = 0.0
+    for x, y in points:
+        dist += (x * x + y * y) ** 0.5
+    return len(counts), total, dist
+
+def worker(n):
+    start = time.time()
+    for i in range(n):
+        t0 = time.time()
+        handle_request(i)
+        print '%f %f' % (t0 - start, time.time() - t0)
+
+def time_to_peak(output):
+    samples = [map(float, line.split()) for line in output.splitlines()]
+    best = min(duration for _, duration in samples)
+    for started, duration in samples:
+        if duration <= best * 1.2:
+            return started + duration, best
+
+def run(n, profile=None):
+    env = os.environ.copy()
+    env.pop('PYPY_JIT_WARMUP_PROFILE', None)
+    if profile is not None:
+        env['PYPY_JIT_WARMUP_PROFILE'] = profile
+    args = [sys.executable, __file__, '--worker', str(n)]
+    return subprocess.check_output(args, env=env)
+
+def main(n):
+    fd, profile = tempfile.mkstemp(suffix='.warmup')
+    os.close(fd)
+    os.unlink(profile)
+    try:
+        cold, best = time_to_peak(run(n))
+        print 'cold:   time-to-peak %.4f s (fastest request %.6f s)' % (
+            cold, best)
+        run(n, profile)       # records the profile
+        warm, best = time_to_peak(run(n, profile))
+        print 'warm:   time-to-peak %.4f s (fastest request %.6f s)' % (
+            warm, best)
+    finally:
+        if os.path.exists(profile):
+            os.unlink(profile)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--worker':
+        worker(int(sys.argv[2]))
+    else:
+        n = 200
+        if len(sys.argv) > 1:
+            n = int(sys.argv[1])
+        main(n)
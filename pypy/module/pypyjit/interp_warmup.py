@@ -0,0 +1,192 @@
+""" The JIT warmup profile: remember across processes which loops of which
+code objects got compiled, and make the JIT trace them again as soon as
+they are reached in the next process.
+
+The greenkeys contain the code objects themselves, so the profile stores
+(next_instr, co_firstlineno, co_name, co_filename) instead, one per line,
+and a code object that is created with the same firstlineno, name and
+filename is marked with trace_next_iteration() at these positions.
+"""
+
+import os
+
+from rpython.rlib import jit_hooks
+from rpython.rlib.rarithmetic import r_uint, string_to_int
+from rpython.rlib.rstring import StringBuilder, ParseStringError, split
+from rpython.rtyper.annlowlevel import (cast_instance_to_gcref,
+    cast_base_ptr_to_instance)
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.rclass import OBJECT
+from pypy.interpreter.error import oefmt, wrap_oserror2
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import PyCode, CodeHookCache
+
+HEADER = '# pypyjit warmup profile 1\n'
+
+
+def code_key(pycode):
+    return '%d\t%s\t%s' % (pycode.co_firstlineno, pycode.co_name,
+                           pycode.co_filename)
+
+def trace_code_at(pycode, next_instr):
+    ll_pycode = cast_instance_to_gcref(pycode)
+    jit_hooks.trace_next_iteration('pypyjit', r_uint(next_instr), 0,
+                                   ll_pycode)
+
+
+class WarmupProfile(object):
+    def __init__(self, space):
+        self.space = space
+        self.filename = None    # saved there at shutdown, if recording
+        self.recording = False
+        # code_key() -> the positions to trace in that code
+        self.replay = {}
+        # the lines of the profile, the loaded ones and the recorded ones
+        self.entries = {}
+
+    def enable(self, filename, record, replay):
+        self.filename = filename
+        self.recording = record
+        self.replay = {}
+        self.entries = {}
+        if replay:
+            self.load(filename)
+        cache = self.space.fromcache(CodeHookCache)
+        if self.replay:
+            cache._jit_warmup_profile = self
+        else:
+            cache._jit_warmup_profile = None
+
+    def load(self, filename):
+        try:
+            data = read_file(filename)
+        except OSError:
+            return      # no profile yet
+        for line in data.split('\n'):
+            if not line or line.startswith('#'):
+                continue
+            parts = split(line, '\t', 3)
+            if len(parts) != 4:
+                continue
+            try:
+                next_instr = string_to_int(parts[0])
+                string_to_int(parts[1])
+            except ParseStringError:
+                continue
+            key = '%s\t%s\t%s' % (parts[1], parts[2], parts[3])
+            self.entries[line] = None
+            positions = self.replay.get(key, None)
+            if positions is None:
+                positions = self.replay[key] = []
+            positions.append(next_instr)
+
+    def new_code(self, pycode):
+        """ Called for every new code object while replaying. """
+        positions = self.replay.get(code_key(pycode), None)
+        if positions is not None:
+            for next_instr in positions:
+                if 0 <= next_instr < len(pycode.co_code):
+                    trace_code_at(pycode, next_instr)
+
+    def record(self, jitdriver, greenkey):
+        """ Called when the JIT compiled a loop at 'greenkey'. """
+        if jitdriver.name != 'pypyjit' or greenkey is None:
+            return
+        if greenkey[1].getint():
+            return      # is_being_profiled
+        next_instr = greenkey[0].getint()
+        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                         greenkey[2].getref_base())
+        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        self.entries['%d\t%s' % (next_instr, code_key(pycode))] = None
+
+    def save(self, filename):
+        builder = StringBuilder()
+        builder.append(HEADER)
+        for line in self.entries:
+            builder.append(line)
+            builder.append('\n')
+        write_file(filename, builder.build())
+
+
+def read_file(filename):
+    fd = os.open(filename, os.O_RDONLY, 0)
+    try:
+        builder = StringBuilder()
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            builder.append(data)
+        return builder.build()
+    finally:
+        os.close(fd)
+
+def write_file(filename, data):
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+    try:
+        while data:
+            written = os.write(fd, data)
+            data = data[written:]
+    finally:
+        os.close(fd)
+
+
+@unwrap_spec(filename='fsencode', record=bool, replay=bool)
+def warmup_profile(space, filename, record=True, replay=True):
+    """ warmup_profile(filename, record=True, replay=True)
+
+    Use the JIT warmup profile stored in 'filename'.  With 'replay', the
+    loops that were compiled by the previous processes are traced as soon
+    as they are reached, instead of waiting for their counters to reach
+    the threshold.  Only the code objects created after this call are
+    affected.  With 'record', the loops compiled by this process are
+    added to the profile, which is written at exit.
+
+    The environment variable PYPY_JIT_WARMUP_PROFILE calls this function
+    at startup.
+    """
+    profile = space.fromcache(WarmupProfile)
+    profile.enable(filename, record, replay)
+
+@unwrap_spec(filename='fsencode_or_none')
+def warmup_profile_save(space, filename=None):
+    """ warmup_profile_save(filename=None)
+
+    Write the warmup profile now, e.g. in a process that exits with
+    os._exit().  The default filename is the one given to warmup_profile().
+    """
+    profile = space.fromcache(WarmupProfile)
+    if filename is None:
+        filename = profile.filename
+        if filename is None:
+            raise oefmt(space.w_ValueError, "no warmup profile enabled")
+    try:
+        profile.save(filename)
+    except OSError as e:
+        raise wrap_oserror2(space, e, space.newfilename(filename))
+
+def warmup_profile_keys(space):
+    """ warmup_profile_keys()
+
+    Return the loops of the warmup profile, as a list of tuples
+    (co_filename, co_name, co_firstlineno, next_instr).
+    """
+    profile = space.fromcache(WarmupProfile)
+    keys_w = []
+    for line in profile.entries:
+        parts = split(line, '\t', 3)
+        keys_w.append(space.newtuple([
+            space.newfilename(parts[3]),
+            space.newtext(parts[2]),
+            space.newint(string_to_int(parts[1])),
+            space.newint(string_to_int(parts[0]))]))
+    return space.newlist(keys_w)
+
+def shutdown(space):
+    profile = space.fromcache(WarmupProfile)
+    if profile.recording and profile.filename is not None:
+        try:
+            profile.save(profile.filename)
+        except OSError:
+            pass
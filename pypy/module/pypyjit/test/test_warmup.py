@@ -0,0 +1,108 @@
+import py
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.gateway import interp2app
+from rpython.jit.metainterp.history import ConstInt, ConstPtr, \
+     BasicFailDescr
+from rpython.rtyper.annlowlevel import cast_instance_to_base_ptr
+from rpython.rtyper.lltypesystem import lltype, llmemory
+from pypy.module.pypyjit import interp_warmup
+from pypy.module.pypyjit.interp_jit import pypyjitdriver
+from pypy.module.pypyjit.hooks import pypy_hooks
+from rpython.rlib.jit import JitDebugInfo
+
+
+class MockJitDriverSD(object):
+    jitdriver = pypyjitdriver
+
+
+class AppTestWarmupProfile(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("Can't run this test with -A")
+        space = cls.space
+        traced = []
+
+        def interp_on_compile(w_func, next_instr, is_bridge=False):
+            ll_code = cast_instance_to_base_ptr(w_func.code)
+            code_gcref = lltype.cast_opaque_ptr(llmemory.GCREF, ll_code)
+            greenkey = [ConstInt(next_instr), ConstInt(0),
+                        ConstPtr(code_gcref)]
+            if is_bridge:
+                di = JitDebugInfo(MockJitDriverSD, None, None, [], 'bridge',
+                                  fail_descr=BasicFailDescr())
+            else:
+                di = JitDebugInfo(MockJitDriverSD, None, None, [], 'loop',
+                                  greenkey)
+            if pypy_hooks.are_hooks_enabled():
+                if is_bridge:
+                    pypy_hooks.after_compile_bridge(di)
+                else:
+                    pypy_hooks.after_compile(di)
+
+        def interp_get_traced():
+            res = space.newlist([space.newtuple([space.newtext(code.co_name),
+                                                 space.newint(next_instr)])
+                                 for code, next_instr in traced])
+            del traced[:]
+            return res
+
+        def trace_code_at(pycode, next_instr):
+            traced.append((pycode, next_instr))
+
+        cls.orig_trace_code_at = interp_warmup.trace_code_at
+        interp_warmup.trace_code_at = trace_code_at
+        cls.w_on_compile = space.wrap(interp2app(interp_on_compile,
+                          unwrap_spec=[W_Root, int, bool]))
+        cls.w_get_traced = space.wrap(interp2app(interp_get_traced))
+        cls.w_tmpfile = space.wrap(str(py.test.ensuretemp(
+            'pypyjit_warmup').join('profile')))
+
+    def teardown_class(cls):
+        if not cls.runappdirect:
+            interp_warmup.trace_code_at = cls.orig_trace_code_at
+
+    def test_record_and_replay(self):
+        import pypyjit, os
+        if os.path.exists(self.tmpfile):
+            os.unlink(self.tmpfile)
+        src = 'def f():\n    pass\n\ndef g():\n    pass\n'
+        ns = {}
+        exec compile(src, 'warmup_test.py', 'exec') in ns
+        f = ns['f']
+        pypyjit.warmup_profile(self.tmpfile)
+        assert pypyjit.warmup_profile_keys() == []
+        self.on_compile(f, 3)
+        self.on_compile(f, 3)
+        self.on_compile(f, 1, True)      # bridges are not recorded
+        assert pypyjit.warmup_profile_keys() == [('warmup_test.py', 'f', 1, 3)]
+        pypyjit.warmup_profile_save()
+        #
+        # another "process": the same source compiled again
+        pypyjit.warmup_profile(self.tmpfile, record=False)
+        assert pypyjit.warmup_profile_keys() == [('warmup_test.py', 'f', 1, 3)]
+        ns = {}
+        exec compile(src, 'warmup_test.py', 'exec') in ns
+        assert self.get_traced() == [('f', 3)]
+        exec compile(src, 'other.py', 'exec') in ns
+        assert self.get_traced() == []
+        #
+        # not recording: nothing is added
+        self.on_compile(ns['g'], 3)
+        assert len(pypyjit.warmup_profile_keys()) == 1
+        pypyjit.warmup_profile(self.tmpfile, replay=False)
+        assert pypyjit.warmup_profile_keys() == []
+
+    def test_missing_and_bad_file(self):
+        import pypyjit, os
+        pypyjit.warmup_profile(self.tmpfile + '.missing')
+        assert pypyjit.warmup_profile_keys() == []
+        with open(self.tmpfile, 'w') as f:
+            f.write('# comment\nbad line\nx\t1\tf\tfoo.py\n'
+                    '7\t2\tname\tfile\twith\ttabs.py\n')
+        pypyjit.warmup_profile(self.tmpfile)
+        assert pypyjit.warmup_profile_keys() == [
+            ('file\twith\ttabs.py', 'name', 2, 7)]
+        raises(EnvironmentError, pypyjit.warmup_profile_save,
+               os.path.join(self.tmpfile, 'not_a_dir', 'x'))
@@ -0,0 +1,61 @@
+""" Time epoll.poll() against epoll.poll_into() with many ready fds:
+
+    pypy bench_epoll.py [fds] [iterations]
+
+The default is 1000 pipes, all readable and registered level-triggered,
+polled 10000 times.  Prints the events per second.  Linux only.
+"""
+
+import array
+import os
+import select
+import sys
+import time
+
+def with_poll(ep, nfds, iterations):
+    total = 0
+    for i in xrange(iterations):
+        for fd, events in ep.poll(0, nfds):
+            total += 1
+    return total
+
+def with_poll_into(ep, nfds, iterations):
+    buf = array.array('i', [0] * (2 * nfds))
+    total = 0
+    for i in xrange(iterations):
+        n = ep.poll_into(buf, 0)
+        for j in xrange(0, 2 * n, 2):
+            fd = buf[j]
+            events = buf[j + 1]
+            total += 1
+    return total
+
+def main(nfds, iterations):
+    pipes = [os.pipe() for i in range(nfds)]
+    ep = select.epoll()
+    try:
+        for r, w in pipes:
+            os.write(w, b'x')
+            ep.register(r, select.EPOLLIN)
+        for name, func in [('poll', with_poll),
+                           ('poll_into', with_poll_into)]:
+            func(ep, nfds, iterations // 10)    # warm-up
+            t0 = time.time()
+            total = func(ep, nfds, iterations)
+            t1 = time.time()
+            assert total == nfds * iterations
+            print '%-10s %12.0f events/s' % (name, total / (t1 - t0))
+    finally:
+        ep.close()
+        for r, w in pipes:
+            os.close(r)
+            os.close(w)
+
+if __name__ == '__main__':
+    nfds = 1000
+    iterations = 10000
+    if len(sys.argv) > 1:
+        nfds = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        iterations = int(sys.argv[2])
+    main(nfds, iterations)
@@ -1,6 +1,7 @@
 from __future__ import with_statement
 
 import errno
+import sys
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.gateway import interp2app, unwrap_spec
@@ -12,6 +13,7 @@ from rpython.rtyper.tool import rffi_platform
 from rpython.rlib._rsocket_rffi import socketclose, FD_SETSIZE
 from rpython.rlib.rposix import get_saved_errno
 from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.buffer import CannotWrite
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
 
 
@@ -68,19 +70,38 @@ epoll_ctl = rffi.llexternal(
     compilation_info=eci,
     save_err=rffi.RFFI_SAVE_ERRNO
 )
+EVENTS = rffi.CArray(epoll_event)
 epoll_wait = rffi.llexternal(
     "epoll_wait",
-    [rffi.INT, rffi.CArrayPtr(epoll_event), rffi.INT, rffi.INT],
+    [rffi.INT, lltype.Ptr(EVENTS), rffi.INT, rffi.INT],
     rffi.INT,
     compilation_info=eci,
     save_err=rffi.RFFI_SAVE_ERRNO
 )
 
+INT_SIZE = rffi.sizeof(rffi.INT)
+BIG_ENDIAN = sys.byteorder == 'big'
+
+def write_int(buf, offset, value):
+    try:
+        buf.typed_write(rffi.INT, offset, value)
+    except CannotWrite:
+        # misaligned, or not a raw or GC buffer: store the bytes one by one
+        for i in range(INT_SIZE):
+            if BIG_ENDIAN:
+                shift = 8 * (INT_SIZE - 1 - i)
+            else:
+                shift = 8 * i
+            buf.setitem(offset + i, chr((value >> shift) & 0xff))
+
 
 class W_Epoll(W_Root):
     def __init__(self, space, epfd):
         self.space = space
         self.epfd = epfd
+        # the array of events given to epoll_wait(), kept between calls
+        self.events = lltype.nullptr(EVENTS)
+        self.events_size = 0
         self.register_finalizer(space)
 
     @unwrap_spec(sizehint=int)
@@ -115,6 +136,39 @@ class W_Epoll(W_Root):
             socketclose(self.epfd)
             self.epfd = -1
             self.may_unregister_rpython_finalizer(self.space)
+        if self.events:
+            lltype.free(self.events, flavor='raw')
+            self.events = lltype.nullptr(EVENTS)
+            self.events_size = 0
+
+    def take_events(self, maxevents):
+        # Take the array of events out of 'self' while epoll_wait() runs
+        # without the GIL, so that another thread polling the same epoll
+        # object allocates its own and close() does not free it under us.
+        evs = self.events
+        if evs and self.events_size >= maxevents:
+            self.events = lltype.nullptr(EVENTS)
+            return evs, self.events_size
+        return lltype.malloc(EVENTS, maxevents, flavor='raw'), maxevents
+
+    def give_back_events(self, evs, size):
+        if self.get_closed() or (self.events and self.events_size >= size):
+            lltype.free(evs, flavor='raw')
+            return
+        if self.events:
+            lltype.free(self.events, flavor='raw')
+        self.events = evs
+        self.events_size = size
+
+    def wait(self, space, evs, maxevents, timeout):
+        if timeout < 0:
+            timeout = -1.0
+        else:
+            timeout *= 1000.0
+        nfds = epoll_wait(self.epfd, evs, maxevents, int(timeout))
+        if nfds < 0:
+            raise exception_from_saved_errno(space, space.w_IOError)
+        return nfds
 
     def epoll_ctl(self, space, ctl, w_fd, eventmask, ignore_ebadf=False):
         fd = space.c_filedescriptor_w(w_fd)
@@ -155,29 +209,52 @@ class W_Epoll(W_Root):
     @unwrap_spec(timeout=float, maxevents=int)
     def descr_poll(self, space, timeout=-1.0, maxevents=-1):
         self.check_closed(space)
-        if timeout < 0:
-            timeout = -1.0
-        else:
-            timeout *= 1000.0
-
         if maxevents == -1:
             maxevents = FD_SETSIZE - 1
         elif maxevents < 1:
             raise oefmt(space.w_ValueError,
                         "maxevents must be greater than 0, not %d", maxevents)
 
-        with lltype.scoped_alloc(rffi.CArray(epoll_event), maxevents) as evs:
-            nfds = epoll_wait(self.epfd, evs, maxevents, int(timeout))
-            if nfds < 0:
-                raise exception_from_saved_errno(space, space.w_IOError)
-
+        evs, size = self.take_events(maxevents)
+        try:
+            nfds = self.wait(space, evs, maxevents, timeout)
             elist_w = [None] * nfds
             for i in xrange(nfds):
                 event = evs[i]
                 elist_w[i] = space.newtuple(
                     [space.newint(event.c_data.c_fd), space.newint(event.c_events)]
                 )
-            return space.newlist(elist_w)
+        finally:
+            self.give_back_events(evs, size)
+        return space.newlist(elist_w)
+
+    @unwrap_spec(timeout=float, maxevents=int)
+    def descr_poll_into(self, space, w_buffer, timeout=-1.0, maxevents=-1):
+        self.check_closed(space)
+        buf = space.writebuf_w(w_buffer)
+        capacity = buf.getlength() // (2 * INT_SIZE)
+        if maxevents == -1:
+            maxevents = capacity
+        elif maxevents < 1:
+            raise oefmt(space.w_ValueError,
+                        "maxevents must be greater than 0, not %d", maxevents)
+        elif maxevents > capacity:
+            raise oefmt(space.w_ValueError,
+                        "buffer too small for %d events", maxevents)
+        if maxevents == 0:
+            raise oefmt(space.w_ValueError, "buffer too small for one event")
+
+        evs, size = self.take_events(maxevents)
+        try:
+            nfds = self.wait(space, evs, maxevents, timeout)
+            for i in xrange(nfds):
+                event = evs[i]
+                offset = i * 2 * INT_SIZE
+                write_int(buf, offset, intmask(event.c_data.c_fd))
+                write_int(buf, offset + INT_SIZE, intmask(event.c_events))
+        finally:
+            self.give_back_events(evs, size)
+        return space.newint(nfds)
 
 
 W_Epoll.typedef = TypeDef("select.epoll",
@@ -191,5 +268,6 @@ W_Epoll.typedef = TypeDef("select.epoll",
     unregister = interp2app(W_Epoll.descr_unregister),
     modify = interp2app(W_Epoll.descr_modify),
     poll = interp2app(W_Epoll.descr_poll),
+    poll_into = interp2app(W_Epoll.descr_poll_into),
 )
 W_Epoll.typedef.acceptable_as_base_class = False
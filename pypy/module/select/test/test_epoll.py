@@ -7,7 +7,7 @@ import platform
 
 class AppTestEpoll(object):
     spaceconfig = {
-        "usemodules": ["select", "_socket", "posix", "time"],
+        "usemodules": ["select", "_socket", "posix", "time", "array"],
     }
 
     def setup_class(cls):
@@ -179,6 +179,43 @@ class AppTestEpoll(object):
         expected = [(server.fileno(), select.EPOLLOUT)]
         assert events == expected
 
+    def test_poll_into(self):
+        import select
+        import array
+
+        client, server = self.socket_pair()
+
+        ep = select.epoll(16)
+        ep.register(server.fileno(), select.EPOLLIN | select.EPOLLET)
+        ep.register(client.fileno(), select.EPOLLIN | select.EPOLLET)
+        buf = array.array('i', [-1] * 8)
+        assert ep.poll_into(buf, 0) == 0
+        assert buf.tolist() == [-1] * 8
+
+        client.send("Hello!")
+        server.send("world!!!")
+        assert ep.poll_into(buf, 1) == 2
+        assert sorted([tuple(buf[0:2]), tuple(buf[2:4])]) == sorted([
+            (client.fileno(), select.EPOLLIN),
+            (server.fileno(), select.EPOLLIN)])
+        assert buf[4:] == array.array('i', [-1] * 4)
+        # edge-triggered: nothing new until more data arrives
+        assert ep.poll_into(buf, 0) == 0
+
+        client.send("again")
+        b = bytearray(9)     # room for one event only
+        assert ep.poll_into(b, 1) == 1
+        assert array.array('i', bytes(b[:8])).tolist() == [
+            server.fileno(), select.EPOLLIN]
+        assert ep.poll(0) == ep.poll(0, 16) == []
+
+        raises(ValueError, ep.poll_into, buf, 0, 5)
+        raises(ValueError, ep.poll_into, buf, 0, 0)
+        raises(ValueError, ep.poll_into, bytearray(7), 0)
+        raises(TypeError, ep.poll_into, "readonly", 0)
+        ep.close()
+        raises(ValueError, ep.poll_into, buf, 0)
+
     def test_errors(self):
         import select
 
@@ -9,6 +9,16 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
+ PYPY_GC_NURSERY_ADAPTIVE  If set to non-zero, the nursery size is adjusted
+                         between minor collections: it grows when many
+                         objects survive or when minor collections take a
+                         large fraction of the time, and shrinks when
+                         almost nothing survives.  The initial size is
+                         still given by PYPY_GC_NURSERY.
+
+ PYPY_GC_NURSERY_MIN     The bounds of the adaptive nursery size.  Default
+ PYPY_GC_NURSERY_MAX     to 1/4 and 8 times the initial nursery size.
+
  PYPY_GC_INCREMENT_STEP  The size of memory marked during the marking step.
                          Default is size of nursery * 2. If you mark it too high
                          your GC is not incremental at all. The minimum is set
@@ -67,12 +77,13 @@ from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, llgroup
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.lltypesystem.llmemory import raw_malloc_usage
 from rpython.memory.gc.base import GCBase, MovingGCBase
-from rpython.memory.gc import env
+from rpython.memory.gc import env, parallelmark
 from rpython.memory.support import mangle_hash
 from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
-from rpython.rlib.objectmodel import specialize
+from rpython.rlib.objectmodel import specialize, we_are_translated
+from rpython.rtyper.annlowlevel import llhelper
 from rpython.rlib import rgc
 from rpython.memory.gc.minimarkpage import out_of_memory
 
@@ -289,6 +300,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  growth_rate_max=2.5,   # for tests
                  card_page_indices=0,
                  large_object=8*WORD,
+                 adaptive_nursery=False,
+                 adaptive_nursery_min=0,
+                 adaptive_nursery_max=0,
+                 mark_threads=0,
                  ArenaCollectionClass=None,
                  **kwds):
         "NOT_RPYTHON"
@@ -296,16 +311,31 @@ class IncrementalMiniMarkGC(MovingGCBase):
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        self.adaptive_nursery = adaptive_nursery
+        self.adaptive_nursery_min = adaptive_nursery_min
+        self.adaptive_nursery_max = adaptive_nursery_max
+        self.nursery_resizes = 0
+        self.nursery_avg_survival = 0.0
+        self.nursery_avg_overhead = 0.0
+        self.nursery_adapt_countdown = 0
+        self.last_minor_collection_end = 0.0
+        self.mark_threads = mark_threads
+        self.parallel_marker = None
+        def parallel_mark_worker(index):
+            self._parallel_mark_worker(index)
+        self.parallel_mark_worker = parallel_mark_worker
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
         self.growth_rate_max = growth_rate_max
         self.num_major_collects = 0
         self.min_heap_size = 0.0
+        self.min_heap_size_from_env = False
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
         self.max_delta = float(r_uint(-1))
         self.max_number_of_pinned_objects = 0      # computed later
+        self.max_pinned_from_env = False
         #
         self.card_page_indices = card_page_indices
         if self.card_page_indices > 0:
@@ -444,6 +474,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.allocate_nursery()
             self.gc_increment_step = self.nursery_size * 4
             self.gc_nursery_debug = False
+            self._setup_adaptive_nursery()
+            self._setup_parallel_marker()
         else:
             #
             defaultsize = self.nursery_size
@@ -480,6 +512,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             min_heap_size = env.read_uint_from_env('PYPY_GC_MIN')
             if min_heap_size > 0:
                 self.min_heap_size = float(min_heap_size)
+                self.min_heap_size_from_env = True
             else:
                 # defaults to 8 times the nursery
                 self.min_heap_size = newsize * 8
@@ -509,6 +542,19 @@ class IncrementalMiniMarkGC(MovingGCBase):
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
             self.allocate_nursery()
+            #
+            if env.read_uint_from_env('PYPY_GC_NURSERY_ADAPTIVE') > 0:
+                self.adaptive_nursery = True
+                self.adaptive_nursery_min = env.read_from_env(
+                    'PYPY_GC_NURSERY_MIN')
+                self.adaptive_nursery_max = env.read_from_env(
+                    'PYPY_GC_NURSERY_MAX')
+            self._setup_adaptive_nursery()
+            #
+            mark_threads = env.read_from_env('PYPY_GC_MARK_THREADS')
+            if mark_threads > 0:
+                self.mark_threads = mark_threads
+            self._setup_parallel_marker()
         #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
         if env_max_number_of_pinned_objects:
@@ -519,10 +565,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             if env_max_number_of_pinned_objects >= 0: # 0 allows to disable pinning completely
                 self.max_number_of_pinned_objects = env_max_number_of_pinned_objects
+                self.max_pinned_from_env = True
         else:
-            # Estimate this number conservatively
-            bigobj = self.nonlarge_max + 1
-            self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
+            self.max_number_of_pinned_objects = self._default_max_pinned()
+
+    def _default_max_pinned(self):
+        # Estimate this number conservatively
+        bigobj = self.nonlarge_max + 1
+        return self.nursery_size / (bigobj * 2)
 
     def enable(self):
         self.enabled = True
@@ -569,6 +619,105 @@ class IncrementalMiniMarkGC(MovingGCBase):
         debug_stop("gc-set-nursery-size")
 
 
+    def _setup_parallel_marker(self):
+        # PYPY_GC_MARK_THREADS: see parallelmark.py
+        if self.mark_threads < 2 or not parallelmark.AVAILABLE:
+            return
+        nworkers = min(self.mark_threads, parallelmark.MAX_WORKERS)
+        self.parallel_marker = parallelmark.ParallelMarker(nworkers)
+        debug_start("gc-set-mark-threads")
+        debug_print("marking with", nworkers, "threads")
+        debug_stop("gc-set-mark-threads")
+
+    # The adaptive nursery: every NURSERY_ADAPT_PERIOD minor collections,
+    # double the nursery if the average fraction of it that survives is
+    # above NURSERY_GROW_SURVIVAL, or if the minor collections took more
+    # than NURSERY_GROW_OVERHEAD of the time; halve it if both are below
+    # the SHRINK values.
+    NURSERY_ADAPT_PERIOD = 8
+    NURSERY_GROW_SURVIVAL = 0.10
+    NURSERY_GROW_OVERHEAD = 0.05
+    NURSERY_SHRINK_SURVIVAL = 0.02
+    NURSERY_SHRINK_OVERHEAD = 0.01
+
+    def _setup_adaptive_nursery(self):
+        self.nursery_avg_survival = 0.0
+        self.nursery_avg_overhead = 0.0
+        self.nursery_adapt_countdown = self.NURSERY_ADAPT_PERIOD
+        self.last_minor_collection_end = time.time()
+        if not self.adaptive_nursery:
+            return
+        if self.debug_tiny_nursery >= 0 or self.gc_nursery_debug:
+            self.adaptive_nursery = False   # keep it simple when debugging
+            return
+        # the nursery can never be smaller than two large objects
+        minsize = 2 * (self.nonlarge_max + 1)
+        if self.adaptive_nursery_min <= 0:
+            self.adaptive_nursery_min = self.nursery_size // 4
+        if self.adaptive_nursery_max <= 0:
+            self.adaptive_nursery_max = self.nursery_size * 8
+        self.adaptive_nursery_min = max(self.adaptive_nursery_min, minsize)
+        self.adaptive_nursery_max = max(self.adaptive_nursery_max,
+                                        self.adaptive_nursery_min)
+        debug_start("gc-adaptive-nursery")
+        debug_print("nursery size between", self.adaptive_nursery_min,
+                    "and", self.adaptive_nursery_max)
+        debug_stop("gc-adaptive-nursery")
+
+    def _adapt_nursery_size(self, survival, overhead):
+        """Called at the end of a minor collection, when the nursery is
+        empty, with the fraction of the nursery that survived and the
+        fraction of the time spent in this minor collection."""
+        self.nursery_avg_survival = (self.nursery_avg_survival * 0.75 +
+                                     survival * 0.25)
+        self.nursery_avg_overhead = (self.nursery_avg_overhead * 0.75 +
+                                     overhead * 0.25)
+        self.nursery_adapt_countdown -= 1
+        if self.nursery_adapt_countdown > 0:
+            return
+        self.nursery_adapt_countdown = self.NURSERY_ADAPT_PERIOD
+        #
+        # the nursery can only be moved if there is nothing left in it,
+        # and PYPY_GC_DEBUG rotates between nurseries of the same size
+        if self.pinned_objects_in_nursery > 0 or self.debug_rotating_nurseries:
+            return
+        newsize = self.nursery_size
+        if (self.nursery_avg_survival > self.NURSERY_GROW_SURVIVAL or
+                self.nursery_avg_overhead > self.NURSERY_GROW_OVERHEAD):
+            newsize = min(newsize * 2, self.adaptive_nursery_max)
+        elif (self.nursery_avg_survival < self.NURSERY_SHRINK_SURVIVAL and
+                self.nursery_avg_overhead < self.NURSERY_SHRINK_OVERHEAD):
+            newsize = max(newsize // 2, self.adaptive_nursery_min)
+        newsize &= ~(WORD-1)
+        if newsize != self.nursery_size:
+            assert newsize > 0
+            self._resize_nursery(newsize)
+
+    def _resize_nursery(self, newsize):
+        debug_start("gc-set-nursery-size")
+        debug_print("adaptive nursery: from", self.nursery_size,
+                    "to", newsize, "survival",
+                    int(self.nursery_avg_survival * 1000), "per mille")
+        llarena.arena_free(self.nursery)
+        self.nursery_size = newsize
+        self.nursery = self._alloc_nursery()
+        self.nursery_free = self.nursery
+        self.nursery_top = self.nursery + self.nursery_size
+        self.nursery_resizes += 1
+        #
+        # the limits that setup() derives from the nursery size, unless
+        # they were given with PYPY_GC_MAX_PINNED and PYPY_GC_MIN.  After
+        # a shrink, the old limit of pinned objects could be more than the
+        # nursery can hold.
+        if not self.max_pinned_from_env:
+            self.max_number_of_pinned_objects = self._default_max_pinned()
+        if not self.min_heap_size_from_env:
+            min_heap_size = newsize * self.major_collection_threshold
+            if self.read_from_env:
+                min_heap_size = max(min_heap_size, float(newsize * 8))
+            self.min_heap_size = min_heap_size
+        debug_stop("gc-set-nursery-size")
+
     def set_major_threshold_from(self, threshold, reserving_size=0):
         # Set the next_major_collection_threshold.
         threshold_max = (self.next_major_collection_initial *
@@ -1908,8 +2057,18 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.root_walker.finished_minor_collection()
         #
         debug_stop("gc-minor")
-        duration = time.time() - start
+        end = time.time()
+        duration = end - start
         self.total_gc_time += duration
+        if self.adaptive_nursery:
+            survival = (float(self.nursery_surviving_size) /
+                        float(self.nursery_size))
+            elapsed = end - self.last_minor_collection_end
+            overhead = 0.0
+            if elapsed > 0.0:
+                overhead = duration / elapsed
+            self._adapt_nursery_size(survival, overhead)
+        self.last_minor_collection_end = end
         self.hooks.fire_gc_minor(
             duration=duration,
             total_memory_used=total_memory_used,
@@ -2689,10 +2848,25 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
     TEST_VISIT_SINGLE_STEP = False    # for tests
 
+    PARALLEL_MARK_MIN = 256    # enough gray objects to use the mark threads
+
     def visit_all_objects_step(self, size_to_track):
         # Objects can be added to pending by visit
         pending = self.objects_to_trace
+        countdown = 0
         while pending.non_empty():
+            if self.parallel_marker is not None:
+                # length() is not constant-time, so only check it from
+                # time to time
+                countdown -= 1
+                if countdown <= 0:
+                    if pending.length() >= self.PARALLEL_MARK_MIN:
+                        size_to_track = self.visit_objects_in_parallel(
+                                                            size_to_track)
+                        if size_to_track < 0:
+                            return 0
+                        continue
+                    countdown = self.PARALLEL_MARK_MIN
             obj = pending.pop()
             size_to_track -= self.visit(obj)
             if size_to_track < 0 or self.TEST_VISIT_SINGLE_STEP:
@@ -2737,6 +2911,82 @@ class IncrementalMiniMarkGC(MovingGCBase):
         totalsize = size_gc_header + self.get_size(obj)
         return raw_malloc_usage(totalsize)
 
+    def visit_objects_in_parallel(self, size_to_track):
+        # Move the objects of 'objects_to_trace' to the parallel marker
+        # and let the mark threads visit them, until there is nothing
+        # left or 'size_to_track' bytes have been marked.  Returns what
+        # is left of 'size_to_track', and puts the objects not visited
+        # yet back into 'objects_to_trace'.
+        marker = self.parallel_marker
+        pending = self.objects_to_trace
+        while pending.non_empty():
+            marker.add(pending.pop())
+        marker.start_round(size_to_track)
+        if we_are_translated():
+            marker.run(llhelper(parallelmark.WORKER_FUNC,
+                                self.parallel_mark_worker))
+        else:
+            while not marker.is_done():
+                i = 0
+                while i < marker.nworkers:
+                    self._parallel_mark_worker(i)
+                    i += 1
+        size_to_track = marker.end_round(pending)
+        #
+        # the objects with a custom tracer are traced in this thread
+        while True:
+            obj = marker.pop_deferred()
+            if not obj:
+                break
+            self.trace(obj, self._collect_ref_rec, None)
+        return size_to_track
+
+    def _parallel_mark_worker(self, index):
+        # Runs in the mark threads.  See parallelmark.py for what is
+        # allowed here.
+        marker = self.parallel_marker
+        worker = marker.get_worker(index)
+        count = 0
+        while True:
+            if not marker.has_work(worker):
+                if not marker.refill(worker):
+                    return
+            obj = marker.pop(worker)
+            if not marker.account(worker, self.visit_parallel(obj, worker)):
+                return
+            if not we_are_translated():
+                count += 1
+                if count >= parallelmark.BATCH_SIZE:
+                    return      # untranslated: let the next worker run
+
+    def visit_parallel(self, obj, worker):
+        # Like visit(), but called by the mark threads: the flags are set
+        # atomically, so that only one thread traces the object, and the
+        # referenced objects go to the worker's own stack.
+        hdr = self.header(obj)
+        if hdr.tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
+            return 0
+        oldtid = parallelmark.fetch_or_tid(hdr, GCFLAG_VISITED |
+                                                GCFLAG_TRACK_YOUNG_PTRS)
+        if oldtid & GCFLAG_VISITED:
+            return 0        # another thread was faster
+        typeid = self.get_type_id(obj)
+        if self.has_gcptr(typeid):
+            if self.has_custom_trace(typeid):
+                # custom tracers are not thread-safe in general
+                self.parallel_marker.defer(obj)
+            else:
+                self.trace(obj, self._collect_ref_parallel, worker)
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = size_gc_header + self.get_size(obj)
+        return raw_malloc_usage(totalsize)
+
+    def _collect_ref_parallel(self, root, worker):
+        obj = root.address[0]
+        # like _collect_obj(), ignore the pinned objects
+        if not self.is_in_nursery(obj):
+            self.parallel_marker.push(worker, obj)
+
     # ----------
     # id() and identityhash() support
 
@@ -3071,6 +3321,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
             return intmask(self.nursery_size)
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.NURSERY_RESIZES:
+            return self.nursery_resizes
         return 0
 
 
@@ -0,0 +1,435 @@
+"""
+Helper threads for the mark phase of incminimark, enabled with
+PYPY_GC_MARK_THREADS.
+
+The gray objects are split between the workers.  Each worker has its own
+small stack of objects to visit; when it is full, half of it is moved to a
+shared pool, and a worker whose stack is empty takes a batch of objects
+from the pool.  The marking stops when all the workers are idle at the
+same time, or when the budget of the incremental step is exhausted.  The
+objects that are left over are then given back to the GC, which continues
+with them in the next step.
+
+The workers must not allocate GC memory, raise, or call anything that is
+not thread-safe: they only read the objects, set their flags with an
+atomic 'or', and move addresses between raw arrays.  The shared pool is
+protected by a lock.
+
+When running untranslated there are no threads: the GC calls the workers
+one after the other, for a few objects each time, until they are done.
+"""
+import sys
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rtyper.lltypesystem.lloperation import llop
+from rpython.rlib.objectmodel import we_are_translated
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+AVAILABLE = sys.platform != 'win32'
+MAX_WORKERS = 64
+
+LOCAL_SIZE = 1024       # size of the stack of each worker
+BATCH_SIZE = 64         # number of objects taken from the pool at once
+BUDGET_CHUNK = 65536    # bytes marked before updating the shared budget
+
+ADDRARRAY = lltype.Array(llmemory.Address, hints={'nolength': True})
+
+ADDRLIST = lltype.Struct('gcmark_addrlist',
+                         ('items', lltype.Ptr(ADDRARRAY)),
+                         ('length', lltype.Signed),
+                         ('capacity', lltype.Signed))
+
+WORKER = lltype.Struct('gcmark_worker',
+                       ('stack', ADDRLIST),
+                       ('idle', lltype.Signed),
+                       ('unaccounted', lltype.Signed),
+                       # keep the workers on different cache lines
+                       ('padding', lltype.FixedSizeArray(lltype.Signed, 8)))
+WORKERARRAY = lltype.Array(WORKER, hints={'nolength': True})
+
+SHARED = lltype.Struct('gcmark_shared',
+                       ('budget', lltype.Signed),
+                       ('idle', lltype.Signed),
+                       ('done', lltype.Signed),
+                       ('pool', ADDRLIST),
+                       ('deferred', ADDRLIST))
+
+WORKER_FUNC = lltype.Ptr(lltype.FuncType([lltype.Signed], lltype.Void))
+
+
+eci = ExternalCompilationInfo(
+    includes=['pthread.h', 'sched.h', 'signal.h'],
+    post_include_bits=["""
+RPY_EXTERN long pypy_gcmark_start(long);
+RPY_EXTERN void pypy_gcmark_run(long, void (*)(long));
+RPY_EXTERN void pypy_gcmark_lock(void);
+RPY_EXTERN void pypy_gcmark_unlock(void);
+static long pypy_gcmark_fetch_or(long *p, long value) {
+    return __sync_fetch_and_or(p, value);
+}
+static long pypy_gcmark_fetch_add(long *p, long value) {
+    return __sync_fetch_and_add(p, value);
+}
+static void pypy_gcmark_yield(void) {
+    sched_yield();
+}
+"""],
+    separate_module_sources=["""
+#define GCMARK_MAX_WORKERS  %(MAX_WORKERS)d
+
+static pthread_mutex_t gcmark_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t gcmark_cond_start = PTHREAD_COND_INITIALIZER;
+static pthread_cond_t gcmark_cond_done = PTHREAD_COND_INITIALIZER;
+static pthread_mutex_t gcmark_pool_mutex = PTHREAD_MUTEX_INITIALIZER;
+static long gcmark_helpers;         /* number of helper threads started */
+static long gcmark_round;           /* incremented by pypy_gcmark_run() */
+static long gcmark_seen[GCMARK_MAX_WORKERS];
+static long gcmark_workers;         /* workers in the current round */
+static long gcmark_running;         /* helper threads still busy */
+static void (*gcmark_func)(long);
+static int gcmark_atfork_registered;
+
+static void *gcmark_helper(void *arg)
+{
+    long index = (long)arg;
+    void (*func)(long);
+
+    pthread_mutex_lock(&gcmark_mutex);
+    while (1) {
+        while (gcmark_seen[index] == gcmark_round)
+            pthread_cond_wait(&gcmark_cond_start, &gcmark_mutex);
+        gcmark_seen[index] = gcmark_round;
+        if (index < gcmark_workers) {
+            func = gcmark_func;
+            pthread_mutex_unlock(&gcmark_mutex);
+            func(index);
+            pthread_mutex_lock(&gcmark_mutex);
+            if (--gcmark_running == 0)
+                pthread_cond_signal(&gcmark_cond_done);
+        }
+    }
+    return NULL;
+}
+
+static void gcmark_after_fork_child(void)
+{
+    /* the helper threads don't exist in the child; start new ones
+       on the next major collection */
+    pthread_mutex_init(&gcmark_mutex, NULL);
+    pthread_cond_init(&gcmark_cond_start, NULL);
+    pthread_cond_init(&gcmark_cond_done, NULL);
+    pthread_mutex_init(&gcmark_pool_mutex, NULL);
+    gcmark_helpers = 0;
+    gcmark_running = 0;
+}
+
+long pypy_gcmark_start(long workers)
+{
+    /* Start the missing helper threads.  Returns the number of workers
+       available, including the calling thread, which may be less than
+       'workers' if the threads cannot be started. */
+    pthread_attr_t attr;
+    sigset_t all_signals, old_signals;
+
+    if (workers > GCMARK_MAX_WORKERS)
+        workers = GCMARK_MAX_WORKERS;
+    if (gcmark_helpers + 1 >= workers)
+        return workers;
+    if (!gcmark_atfork_registered) {
+        if (pthread_atfork(NULL, NULL, gcmark_after_fork_child) != 0)
+            return 1;
+        gcmark_atfork_registered = 1;
+    }
+    /* the signals must be handled by the interpreter's threads */
+    sigfillset(&all_signals);
+    pthread_sigmask(SIG_BLOCK, &all_signals, &old_signals);
+    pthread_attr_init(&attr);
+    pthread_attr_setdetachstate(&attr, PTHREAD_CREATE_DETACHED);
+    pthread_mutex_lock(&gcmark_mutex);
+    while (gcmark_helpers + 1 < workers) {
+        pthread_t th;
+        long index = gcmark_helpers + 1;
+        gcmark_seen[index] = gcmark_round;
+        if (pthread_create(&th, &attr, gcmark_helper, (void *)index) != 0)
+            break;
+        gcmark_helpers = index;
+    }
+    pthread_mutex_unlock(&gcmark_mutex);
+    pthread_attr_destroy(&attr);
+    pthread_sigmask(SIG_SETMASK, &old_signals, NULL);
+    return gcmark_helpers + 1;
+}
+
+void pypy_gcmark_run(long workers, void (*func)(long))
+{
+    /* Run func(0) in this thread and func(1)...func(workers-1) in the
+       helper threads, and wait until they all return. */
+    pthread_mutex_lock(&gcmark_mutex);
+    gcmark_func = func;
+    gcmark_workers = workers;
+    gcmark_running = workers - 1;
+    gcmark_round++;
+    pthread_cond_broadcast(&gcmark_cond_start);
+    pthread_mutex_unlock(&gcmark_mutex);
+
+    func(0);
+
+    pthread_mutex_lock(&gcmark_mutex);
+    while (gcmark_running > 0)
+        pthread_cond_wait(&gcmark_cond_done, &gcmark_mutex);
+    pthread_mutex_unlock(&gcmark_mutex);
+}
+
+void pypy_gcmark_lock(void)
+{
+    pthread_mutex_lock(&gcmark_pool_mutex);
+}
+
+void pypy_gcmark_unlock(void)
+{
+    pthread_mutex_unlock(&gcmark_pool_mutex);
+}
+""" % {'MAX_WORKERS': MAX_WORKERS}])
+
+
+def llexternal(name, args, result):
+    return rffi.llexternal(name, args, result, compilation_info=eci,
+                           _nowrapper=True, sandboxsafe=True)
+
+c_start = llexternal('pypy_gcmark_start', [lltype.Signed], lltype.Signed)
+c_run = llexternal('pypy_gcmark_run', [lltype.Signed, WORKER_FUNC],
+                   lltype.Void)
+c_lock = llexternal('pypy_gcmark_lock', [], lltype.Void)
+c_unlock = llexternal('pypy_gcmark_unlock', [], lltype.Void)
+c_yield = llexternal('pypy_gcmark_yield', [], lltype.Void)
+c_fetch_or = llexternal('pypy_gcmark_fetch_or',
+                        [rffi.SIGNEDP, lltype.Signed], lltype.Signed)
+c_fetch_add = llexternal('pypy_gcmark_fetch_add',
+                         [rffi.SIGNEDP, lltype.Signed], lltype.Signed)
+
+
+def fetch_or_tid(hdr, value):
+    """Atomically do 'hdr.tid |= value'.  Returns the old value."""
+    if we_are_translated():
+        adr = llmemory.cast_ptr_to_adr(hdr)
+        return c_fetch_or(llmemory.cast_adr_to_ptr(adr, rffi.SIGNEDP), value)
+    old = hdr.tid
+    hdr.tid = old | value
+    return old
+
+def fetch_add(adr, value):
+    """Atomically do 'adr.signed[0] += value'.  Returns the old value."""
+    if we_are_translated():
+        return c_fetch_add(llmemory.cast_adr_to_ptr(adr, rffi.SIGNEDP), value)
+    old = adr.signed[0]
+    adr.signed[0] = old + value
+    return old
+
+def lock():
+    if we_are_translated():
+        c_lock()
+
+def unlock():
+    if we_are_translated():
+        c_unlock()
+
+def out_of_memory():
+    llop.debug_fatalerror(lltype.Void, "out of memory in the GC mark threads")
+
+
+def addrlist_init(lst, capacity):
+    lst.items = lltype.malloc(ADDRARRAY, capacity, flavor='raw',
+                              track_allocation=False)
+    if not lst.items:
+        out_of_memory()
+    lst.length = 0
+    lst.capacity = capacity
+
+def addrlist_append(lst, addr):
+    if lst.length == lst.capacity:
+        addrlist_grow(lst)
+    lst.items[lst.length] = addr
+    lst.length += 1
+
+def addrlist_grow(lst):
+    newcapacity = lst.capacity * 2
+    newitems = lltype.malloc(ADDRARRAY, newcapacity, flavor='raw',
+                             track_allocation=False)
+    if not newitems:
+        out_of_memory()
+    i = 0
+    while i < lst.length:
+        newitems[i] = lst.items[i]
+        i += 1
+    lltype.free(lst.items, flavor='raw', track_allocation=False)
+    lst.items = newitems
+    lst.capacity = newcapacity
+addrlist_grow._dont_inline_ = True
+
+def addrlist_free(lst):
+    lltype.free(lst.items, flavor='raw', track_allocation=False)
+    lst.items = lltype.nullptr(ADDRARRAY)
+    lst.length = 0
+    lst.capacity = 0
+
+
+class ParallelMarker(object):
+    _alloc_flavor_ = "raw"
+
+    def __init__(self, nworkers):
+        self.requested = nworkers
+        self.nworkers = nworkers
+        self.shared = lltype.malloc(SHARED, flavor='raw',
+                                    track_allocation=False)
+        addrlist_init(self.shared.pool, LOCAL_SIZE)
+        addrlist_init(self.shared.deferred, 16)
+        self.workers = lltype.malloc(WORKERARRAY, nworkers, flavor='raw',
+                                     track_allocation=False)
+        i = 0
+        while i < nworkers:
+            addrlist_init(self.workers[i].stack, LOCAL_SIZE)
+            i += 1
+        self.budget_adr = (llmemory.cast_ptr_to_adr(self.shared) +
+                           llmemory.offsetof(SHARED, 'budget'))
+
+    def add(self, obj):
+        """Add a gray object to the shared pool (only between rounds)."""
+        addrlist_append(self.shared.pool, obj)
+
+    def start_round(self, budget):
+        if we_are_translated():
+            # cheap if the threads are already running; needed again
+            # in the child process after a fork()
+            self.nworkers = c_start(self.requested)
+        shared = self.shared
+        shared.budget = budget
+        shared.idle = 0
+        shared.done = 0
+        i = 0
+        while i < self.nworkers:
+            worker = self.workers[i]
+            worker.idle = 0
+            worker.unaccounted = 0
+            i += 1
+
+    def run(self, func):
+        """Run func(0) ... func(nworkers-1) in the mark threads."""
+        c_run(self.nworkers, func)
+
+    def is_done(self):
+        return self.shared.done != 0 or self.shared.budget < 0
+
+    def end_round(self, pending):
+        """Give the left-over objects back to the AddressStack 'pending',
+        and return what is left of the budget."""
+        budget = self.shared.budget
+        pool = self.shared.pool
+        while pool.length > 0:
+            pool.length -= 1
+            pending.append(pool.items[pool.length])
+        i = 0
+        while i < self.nworkers:
+            stack = self.workers[i].stack
+            while stack.length > 0:
+                stack.length -= 1
+                pending.append(stack.items[stack.length])
+            budget -= self.workers[i].unaccounted
+            i += 1
+        return budget
+
+    def get_worker(self, index):
+        return self.workers[index]
+
+    # ----------
+    # the methods below are called by the workers, in parallel
+
+    def push(self, worker, obj):
+        stack = worker.stack
+        if stack.length == stack.capacity:
+            self.donate(worker)
+        stack.items[stack.length] = obj
+        stack.length += 1
+
+    def pop(self, worker):
+        stack = worker.stack
+        stack.length -= 1
+        return stack.items[stack.length]
+
+    def has_work(self, worker):
+        return worker.stack.length > 0
+
+    def donate(self, worker):
+        """Move the bottom half of the worker's full stack to the pool."""
+        stack = worker.stack
+        half = stack.length // 2
+        lock()
+        i = 0
+        while i < half:
+            addrlist_append(self.shared.pool, stack.items[i])
+            i += 1
+        unlock()
+        i = half
+        while i < stack.length:
+            stack.items[i - half] = stack.items[i]
+            i += 1
+        stack.length -= half
+    donate._dont_inline_ = True
+
+    def refill(self, worker):
+        """Called when the worker's stack is empty.  Take objects from the
+        pool, waiting if needed for other workers to put some there.
+        Returns False when the marking is finished."""
+        shared = self.shared
+        pool = shared.pool
+        while True:
+            lock()
+            if shared.done or shared.budget < 0:
+                unlock()
+                return False
+            if pool.length > 0:
+                count = min(pool.length, BATCH_SIZE)
+                stack = worker.stack
+                while count > 0:
+                    pool.length -= 1
+                    stack.items[stack.length] = pool.items[pool.length]
+                    stack.length += 1
+                    count -= 1
+                if worker.idle:
+                    worker.idle = 0
+                    shared.idle -= 1
+                unlock()
+                return True
+            if not worker.idle:
+                worker.idle = 1
+                shared.idle += 1
+            if shared.idle == self.nworkers:
+                shared.done = 1     # everybody is waiting: finished
+            unlock()
+            if not we_are_translated():
+                return False        # let the next worker run
+            if shared.done:
+                return False
+            c_yield()
+    refill._dont_inline_ = True
+
+    def defer(self, obj):
+        """Leave 'obj' to be traced by the GC thread after the round."""
+        lock()
+        addrlist_append(self.shared.deferred, obj)
+        unlock()
+
+    def pop_deferred(self):
+        deferred = self.shared.deferred
+        if deferred.length == 0:
+            return llmemory.NULL
+        deferred.length -= 1
+        return deferred.items[deferred.length]
+
+    def account(self, worker, size):
+        """Count 'size' bytes marked by the worker.  Returns False if the
+        budget of this step is exhausted."""
+        worker.unaccounted += size
+        if worker.unaccounted < BUDGET_CHUNK:
+            return True
+        size = worker.unaccounted
+        worker.unaccounted = 0
+        return fetch_add(self.budget_adr, -size) - size >= 0
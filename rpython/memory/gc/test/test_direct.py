@@ -10,6 +10,7 @@ import py
 from rpython.rtyper.lltypesystem import lltype, llmemory
 from rpython.memory.gctypelayout import TypeLayoutBuilder, FIN_HANDLER_ARRAY
 from rpython.rlib.rarithmetic import LONG_BIT, is_valid_int
+from rpython.rlib import rgc
 from rpython.memory.gc import minimark, incminimark
 from rpython.memory.gctypelayout import zero_gc_pointers_inside, zero_gc_pointers
 from rpython.rlib.debug import debug_print
@@ -694,6 +695,102 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         assert adr4 == adr3
         assert obj3.x == 456     # it is populated now
 
+    def test_adaptive_nursery(self):
+        gc = self.gc
+        assert gc.nursery_size == 32*WORD
+        # everything survives: the nursery grows up to the maximum
+        for i in range(200):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        assert gc.nursery_size == 128*WORD
+        assert gc.nursery_resizes == 2
+        assert gc.get_stats(rgc.NURSERY_RESIZES) == 2
+        assert [p.x for p in self.stackroots] == range(200)
+        # nothing survives and the collections are cheap: it shrinks
+        del self.stackroots[:]
+        gc._minor_collection()
+        for i in range(6 * gc.NURSERY_ADAPT_PERIOD):
+            gc._adapt_nursery_size(0.0, 0.0)
+        assert gc.nursery_size == 16*WORD
+        for i in range(50):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        gc._minor_collection()
+        gc.debug_check_consistency()
+        assert [p.x for p in self.stackroots] == range(50)
+    test_adaptive_nursery.GC_PARAMS = {'adaptive_nursery': True,
+                                       'adaptive_nursery_min': 16*WORD,
+                                       'adaptive_nursery_max': 128*WORD}
+
+    def test_parallel_mark(self, monkeypatch):
+        from rpython.memory.gc import parallelmark
+        gc = self.gc
+        assert gc.mark_threads == 3
+        # small stacks and batches, to move objects between the workers
+        monkeypatch.setattr(parallelmark, 'LOCAL_SIZE', 4)
+        monkeypatch.setattr(parallelmark, 'BATCH_SIZE', 2)
+        monkeypatch.setattr(parallelmark, 'BUDGET_CHUNK', 1)
+        gc.parallel_marker = parallelmark.ParallelMarker(3)
+        gc.PARALLEL_MARK_MIN = 4
+        parallel_steps = []
+        orig_visit_objects_in_parallel = gc.visit_objects_in_parallel
+        def visit_objects_in_parallel(size_to_track):
+            parallel_steps.append(size_to_track)
+            return orig_visit_objects_in_parallel(size_to_track)
+        gc.visit_objects_in_parallel = visit_objects_in_parallel
+        busy_workers = []
+        orig_visit_parallel = gc.visit_parallel
+        def visit_parallel(obj, worker):
+            if not [w for w in busy_workers if w == worker]:
+                busy_workers.append(worker)
+            return orig_visit_parallel(obj, worker)
+        gc.visit_parallel = visit_parallel
+        # arrays of chains of objects, some of them shared, plus garbage
+        for i in range(8):
+            a = self.malloc(VAR, 10)
+            self.stackroots.append(a)
+            for j in range(10):
+                p = self.malloc(S)
+                p.x = i * 100 + j
+                self.writearray(self.stackroots[-1], j, p)
+                q = self.malloc(S)
+                q.x = -1
+                p = self.stackroots[-1][j]
+                self.write(p, 'next', q)
+                self.write(p, 'prev', self.stackroots[0][0])
+        for i in range(50):
+            self.malloc(S)
+        #
+        # with a small step, the major collection is done in many steps
+        gc.gc_increment_step = 10 * llmemory.raw_malloc_usage(
+            llmemory.sizeof(S))
+        gc.collect_step()
+        while gc.gc_state == incminimark.STATE_MARKING:
+            gc.collect_step()
+        assert len(parallel_steps) > 1
+        assert len(busy_workers) == 3
+        gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        gc._minor_collection()
+        gc.debug_check_consistency()
+        for i in range(8):
+            for j in range(10):
+                p = self.stackroots[i][j]
+                assert p.x == i * 100 + j
+                assert p.next.x == -1
+                assert p.prev == self.stackroots[0][0]
+        #
+        # all at once
+        del parallel_steps[:]
+        gc.collect()
+        assert parallel_steps
+        assert [self.stackroots[i][j].x for i in range(8)
+                for j in range(10)] == [i * 100 + j for i in range(8)
+                                        for j in range(10)]
+        assert self.stackroots[7][9].next.x == -1
+    test_parallel_mark.GC_PARAMS = {'mark_threads': 3}
+
 
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
@@ -872,6 +872,48 @@ class TestIncminimark(PinningGCTest):
             self.stackroots.append(ptr)
             self.gc.pin(adr)
 
+    def test_pinning_limit_adaptive_nursery(self):
+        gc = self.gc
+        # the default limit, which follows the size of the nursery
+        gc.max_number_of_pinned_objects = gc._default_max_pinned()
+        assert gc.max_number_of_pinned_objects == 8
+        ptr = self.malloc(T)
+        adr = llmemory.cast_ptr_to_adr(ptr)
+        self.stackroots.append(ptr)
+        assert gc.pin(adr)
+        # nothing survives and the collections are cheap, but the nursery
+        # cannot be resized while it contains a pinned object
+        for i in range(2 * gc.NURSERY_ADAPT_PERIOD):
+            gc._adapt_nursery_size(0.0, 0.0)
+        assert gc.nursery_size == 128*WORD
+        gc.unpin(adr)
+        del self.stackroots[:]
+        gc.minor_collection()     # empties the nursery
+        gc.nursery_avg_overhead = 0.0
+        gc.nursery_adapt_countdown = 1
+        gc._adapt_nursery_size(0.0, 0.0)
+        assert gc.nursery_size == 64*WORD
+        # the limits shrank with it
+        assert gc.max_number_of_pinned_objects == 4
+        assert gc.min_heap_size == 64*WORD * gc.major_collection_threshold
+        for instance_nr in xrange(4):
+            ptr = self.malloc(T)
+            adr = llmemory.cast_ptr_to_adr(ptr)
+            ptr.someInt = 100 + instance_nr
+            self.stackroots.append(ptr)
+            assert gc.pin(adr)
+        ptr = self.malloc(T)
+        self.stackroots.append(ptr)
+        assert not gc.pin(llmemory.cast_ptr_to_adr(ptr))
+        gc.minor_collection()
+        assert [ptr.someInt for ptr in self.stackroots[:4]] == [
+            100, 101, 102, 103]
+    test_pinning_limit_adaptive_nursery.GC_PARAMS = {
+        'nursery_size': 128*WORD,
+        'adaptive_nursery': True,
+        'adaptive_nursery_min': 32*WORD,
+        'adaptive_nursery_max': 128*WORD}
+
     def test_full_pinned_nursery_pin_fail(self):
         self.fill_nursery_with_pinned_objects()
         # nursery should be full now, at least no space for another `T`.
@@ -972,6 +972,107 @@ if HAVE_SENDMSG:
 else:
     compilation_info = eci
 
+# many datagrams with a single recvmmsg() or sendmmsg() call: Linux only
+HAVE_MMSG = sys.platform.startswith('linux')
+if HAVE_MMSG:
+    mmsg_compilation_info = eci.merge(ExternalCompilationInfo(
+        includes=['stdlib.h', 'errno.h'],
+        separate_module_sources=['''
+        #include <sys/socket.h>
+        #include <stdlib.h>
+        #include <errno.h>
+
+        /* Receive up to 'vlen' datagrams, the i-th one into
+           buffer[i * itemsize] and its sender's address into
+           addresses[i * addrsize].  Waits only for the first one. */
+        RPY_EXTERN
+        int pypy_recvmmsg_into(int fd, char *buffer, int itemsize, int vlen,
+                               int flags, char *addresses, int addrsize,
+                               int *lengths, int *addrlens)
+        {
+            struct mmsghdr *msgs;
+            struct iovec *iovs;
+            int i, n, saved_errno;
+
+            msgs = (struct mmsghdr *)calloc(vlen, sizeof(struct mmsghdr));
+            iovs = (struct iovec *)calloc(vlen, sizeof(struct iovec));
+            if (msgs == NULL || iovs == NULL) {
+                free(msgs);
+                free(iovs);
+                errno = ENOMEM;
+                return -1;
+            }
+            for (i = 0; i < vlen; i++) {
+                iovs[i].iov_base = buffer + (size_t)i * itemsize;
+                iovs[i].iov_len = itemsize;
+                msgs[i].msg_hdr.msg_iov = &iovs[i];
+                msgs[i].msg_hdr.msg_iovlen = 1;
+                msgs[i].msg_hdr.msg_name = addresses + (size_t)i * addrsize;
+                msgs[i].msg_hdr.msg_namelen = addrsize;
+            }
+        #ifdef MSG_WAITFORONE
+            flags |= MSG_WAITFORONE;
+        #endif
+            n = recvmmsg(fd, msgs, vlen, flags, NULL);
+            saved_errno = errno;
+            for (i = 0; i < n; i++) {
+                lengths[i] = msgs[i].msg_len;
+                addrlens[i] = msgs[i].msg_hdr.msg_namelen;
+            }
+            free(msgs);
+            free(iovs);
+            errno = saved_errno;
+            return n;
+        }
+
+        /* Send 'vlen' datagrams, the i-th one of lengths[i] bytes, which
+           follow each other in 'data'.  'address' may be NULL. */
+        RPY_EXTERN
+        int pypy_sendmmsg(int fd, char *data, long *lengths, int vlen,
+                          int flags, struct sockaddr *address,
+                          socklen_t addrlen)
+        {
+            struct mmsghdr *msgs;
+            struct iovec *iovs;
+            int i, n, saved_errno;
+
+            msgs = (struct mmsghdr *)calloc(vlen, sizeof(struct mmsghdr));
+            iovs = (struct iovec *)calloc(vlen, sizeof(struct iovec));
+            if (msgs == NULL || iovs == NULL) {
+                free(msgs);
+                free(iovs);
+                errno = ENOMEM;
+                return -1;
+            }
+            for (i = 0; i < vlen; i++) {
+                iovs[i].iov_base = data;
+                iovs[i].iov_len = lengths[i];
+                data += lengths[i];
+                msgs[i].msg_hdr.msg_iov = &iovs[i];
+                msgs[i].msg_hdr.msg_iovlen = 1;
+                msgs[i].msg_hdr.msg_name = address;
+                msgs[i].msg_hdr.msg_namelen = addrlen;
+            }
+            n = sendmmsg(fd, msgs, vlen, flags);
+            saved_errno = errno;
+            free(msgs);
+            free(iovs);
+            errno = saved_errno;
+            return n;
+        }
+        '''],
+        post_include_bits=[
+            "RPY_EXTERN "
+            "int pypy_recvmmsg_into(int fd, char *buffer, int itemsize, "
+            "int vlen, int flags, char *addresses, int addrsize, "
+            "int *lengths, int *addrlens);\n"
+            "RPY_EXTERN "
+            "int pypy_sendmmsg(int fd, char *data, long *lengths, int vlen, "
+            "int flags, struct sockaddr *address, socklen_t addrlen);\n"]))
+
+# sendfile() from a file to a socket: the Linux signature of rposix.sendfile
+HAVE_SENDFILE = sys.platform.startswith('linux')
+
 
 if _WIN32:
     CConfig.WSAEVENT = platform.SimpleType('WSAEVENT', rffi.VOIDP)
@@ -1274,6 +1375,18 @@ sendmsg = jit.dont_look_inside(rffi.llexternal("sendmsg_implementation",
 CMSG_SPACE = jit.dont_look_inside(rffi.llexternal("CMSG_SPACE_wrapper",[size_t], size_t, save_err=SAVE_ERR,compilation_info=compilation_info))
 CMSG_LEN = jit.dont_look_inside(rffi.llexternal("CMSG_LEN_wrapper",[size_t], size_t, save_err=SAVE_ERR,compilation_info=compilation_info))
 
+if HAVE_MMSG:
+    recvmmsg_into = jit.dont_look_inside(rffi.llexternal(
+        "pypy_recvmmsg_into",
+        [socketfd_type, rffi.CCHARP, rffi.INT, rffi.INT, rffi.INT,
+         rffi.CCHARP, rffi.INT, rffi.INTP, rffi.INTP], rffi.INT,
+        save_err=SAVE_ERR, compilation_info=mmsg_compilation_info))
+    sendmmsg = jit.dont_look_inside(rffi.llexternal(
+        "pypy_sendmmsg",
+        [socketfd_type, rffi.CCHARP, rffi.LONGP, rffi.INT, rffi.INT,
+         sockaddr_ptr, socklen_t], rffi.INT,
+        save_err=SAVE_ERR, compilation_info=mmsg_compilation_info))
+
 socketshutdown = external('shutdown', [socketfd_type, rffi.INT], rffi.INT,
                           save_err=SAVE_ERR)
 gethostname = external('gethostname', [rffi.CCHARP, rffi.INT], rffi.INT,
@@ -91,6 +91,30 @@ else:
 
 KARATSUBA_SQUARE_CUTOFF = 2 * KARATSUBA_CUTOFF
 
+# Toom-Cook 3-way is O(N**1.465), but its evaluation and interpolation
+# steps cost many additions and shifts, so it only beats Karatsuba when
+# both operands contain more than TOOM_COOK_CUTOFF digits.
+
+USE_TOOM_COOK = True # set to False for comparison
+
+TOOM_COOK_CUTOFF = 8 * KARATSUBA_CUTOFF
+TOOM_COOK_SQUARE_CUTOFF = 2 * TOOM_COOK_CUTOFF
+
+# For long division, use the O(N**2) school algorithm unless both the
+# divisor and the quotient contain more than BURNIKEL_ZIEGLER_CUTOFF
+# digits.  In that case, use the recursive algorithm of Burnikel and
+# Ziegler, whose cost is dominated by Karatsuba multiplications.
+# See rpython/rlib/test/bench_rbigint.py for the crossover measurements.
+
+BURNIKEL_ZIEGLER_CUTOFF = 4 * KARATSUBA_CUTOFF
+
+# For converting strings in a base that is not a power of two, combine
+# the digit groups by divide-and-conquer as soon as the result grows
+# larger than PARSE_DC_CUTOFF digits.  This turns the quadratic loop of
+# _muladd1() calls into a tree of Karatsuba multiplications.
+
+PARSE_DC_CUTOFF = 8 * KARATSUBA_CUTOFF
+
 # For exponentiation, use the binary left-to-right algorithm
 # unless the exponent contains more than FIVEARY_CUTOFF digits.
 # In that case, do 5 bits at a time.  The potential drawback is that
@@ -712,16 +736,18 @@ class rbigint(object):
                     return rbigint([_store_digit(res & MASK)], self.sign * other.sign, 1)
 
             result = _x_mul(self, other, self.digit(0))
+        elif self is other:
+            result = _square(self)
         elif USE_KARATSUBA:
-            if self is other:
-                i = KARATSUBA_SQUARE_CUTOFF
-            else:
-                i = KARATSUBA_CUTOFF
-
-            if selfsize <= i:
+            if selfsize <= KARATSUBA_CUTOFF:
                 result = _x_mul(self, other)
                 """elif 2 * selfsize <= othersize:
                     result = _k_lopsided_mul(self, other)"""
+            elif (USE_TOOM_COOK and selfsize > TOOM_COOK_CUTOFF and
+                    3 * selfsize > 2 * othersize):
+                # only when the operands are balanced enough for the
+                # 3-way split not to produce an empty top part
+                result = _tc_mul(self, other)
             else:
                 result = _k_mul(self, other)
         else:
@@ -1017,7 +1043,7 @@ class rbigint(object):
                 bi = other.digit(size_b)
                 j = 1 << (SHIFT-1)
                 while j != 0:
-                    z = _help_mult(z, z, modulus)
+                    z = _help_square(z, modulus)
                     if bi & j:
                         z = _help_mult(z, self, modulus)
                     j >>= 1
@@ -1064,7 +1090,7 @@ class rbigint(object):
                     j += SHIFT
                 #
                 for k in range(5):
-                    z = _help_mult(z, z, modulus)
+                    z = _help_square(z, modulus)
                 if index:
                     z = _help_mult(z, table[index], modulus)
             #
@@ -1148,7 +1174,7 @@ class rbigint(object):
         j = 1 << (SHIFT-1)
 
         while j != 0:
-            z = _help_mult(z, z, modulus)
+            z = _help_square(z, modulus)
             if iother & j:
                 z = _help_mult(z, self, modulus)
             j >>= 1
@@ -1473,6 +1499,17 @@ def _help_mult(x, y, c):
 
     return res
 
+def _help_square(x, c):
+    """
+    Square a value, then reduce the result:
+    result = X*X % c.  If c is None, skip the mod.
+    """
+    res = _square(x)
+    if c is not None:
+        res = res.mod(c)
+
+    return res
+
 @specialize.argtype(0)
 def digits_from_nonneg_long(l):
     digits = []
@@ -1889,6 +1926,108 @@ def _k_mul(a, b):
     ret._normalize()
     return ret
 
+def _square(a):
+    """
+    Squaring, dispatching on the size of the operand like mul() does, but
+    with the cutoffs of the squaring variants.  Ignores the input sign, and
+    returns the absolute value of the square.
+    """
+    size_a = a.numdigits()
+    if a.sign == 0:
+        return NULLRBIGINT
+    if size_a == 1:
+        res = a.uwidedigit(0) * a.udigit(0)
+        carry = res >> SHIFT
+        if carry:
+            return rbigint([_store_digit(res & MASK), _store_digit(carry)], 1, 2)
+        return rbigint([_store_digit(res & MASK)], 1, 1)
+    if not USE_KARATSUBA or size_a <= KARATSUBA_SQUARE_CUTOFF:
+        return _x_mul(a, a)
+    if USE_TOOM_COOK and size_a > TOOM_COOK_SQUARE_CUTOFF:
+        return _tc_mul(a, a)
+    return _k_mul(a, a)
+
+def _tc_split(n, size):
+    """
+    A helper for Toom-Cook multiplication (tc_mul).
+    Splits the bigint "n" in three pieces of "size" digits such that
+    abs(n) == (hi << 2*size) + (mid << size) + lo, viewing the shift as
+    being by digits.  The sign bit is ignored, and the return values are
+    >= 0.
+    """
+    hi, lo = _kmul_split(n, size)
+    hi, mid = _kmul_split(hi, size)
+    return hi, mid, lo
+
+def _tc_mul(a, b):
+    """
+    Toom-Cook 3-way multiplication.  Ignores the input signs, and returns
+    the absolute value of the product.  "b" must be the larger operand.
+    Uses the evaluation points 0, 1, -1, -2 and infinity, with the
+    interpolation sequence of M. Bodrato and A. Zanoni, "Integer and
+    Polynomial Multiplication: Towards Optimal Toom-Cook Matrices" (2007).
+    """
+    asize = a.numdigits()
+    bsize = b.numdigits()
+
+    # Split a & b into three pieces of k digits: a == a2*X*X + a1*X + a0.
+    # The product is the polynomial r4*X**4 + ... + r0, which is found
+    # from its values at five points, each requiring one multiplication
+    # of numbers a third of the size.
+    k = (bsize + 2) // 3
+    a2, a1, a0 = _tc_split(a, k)
+
+    # Evaluate a at 1, -1 and -2.  The last two values may be negative.
+    t = _x_add(a0, a2)
+    pa1 = t.add(a1)
+    pam1 = t.sub(a1)
+    pam2 = pam1.add(a2).lshift(1).sub(a0)
+
+    if a is b:
+        r0 = _square(a0)
+        r1 = _square(pa1)
+        rm1 = _square(pam1)
+        rm2 = _square(pam2)
+        rinf = _square(a2)
+    else:
+        b2, b1, b0 = _tc_split(b, k)
+        t = _x_add(b0, b2)
+        pb1 = t.add(b1)
+        pbm1 = t.sub(b1)
+        pbm2 = pbm1.add(b2).lshift(1).sub(b0)
+
+        r0 = a0.mul(b0)
+        r1 = pa1.mul(pb1)
+        rm1 = pam1.mul(pbm1)
+        rm2 = pam2.mul(pbm2)
+        rinf = a2.mul(b2)
+
+    # Interpolate.  The divisions are exact.
+    r3 = rm2.sub(r1).int_floordiv(3)
+    r1 = r1.sub(rm1).rshift(1)
+    r2 = rm1.sub(r0)
+    r3 = r2.sub(r3).rshift(1).add(rinf.lshift(1))
+    r2 = r2.add(r1).sub(rinf)
+    r1 = r1.sub(r3)
+
+    # The coefficients are now all >= 0, and coefficient i is at most
+    # abs(a*b) >> (i*k) digits, so adding them at their offsets fits in
+    # asize + bsize digits.
+    ret = rbigint([NULLDIGIT] * (asize + bsize), 1)
+    _tc_add_at(ret, r0, 0)
+    _tc_add_at(ret, r1, k)
+    _tc_add_at(ret, r2, 2 * k)
+    _tc_add_at(ret, r3, 3 * k)
+    _tc_add_at(ret, rinf, 4 * k)
+    ret._normalize()
+    return ret
+
+def _tc_add_at(ret, x, ofs):
+    if x.sign == 0:
+        return
+    assert x.sign > 0
+    _v_iadd(ret, ofs, ret.numdigits() - ofs, x, x.numdigits())
+
 def _inplace_divrem1(pout, pin, n):
     """
     Divide bigint pin by non-zero digit n, storing quotient
@@ -2139,6 +2278,9 @@ def _divrem(a, b):
     if size_b == 1:
         z, urem = _divrem1(a, b.digit(0))
         rem = rbigint([_store_digit(urem)], int(urem != 0), 1)
+    elif (size_b > BURNIKEL_ZIEGLER_CUTOFF and
+          size_a - size_b > BURNIKEL_ZIEGLER_CUTOFF):
+        z, rem = _bz_divrem(a, b)
     else:
         z, rem = _x_divrem(a, b)
     # Set the signs.
@@ -2151,6 +2293,112 @@ def _divrem(a, b):
         rem.sign = - rem.sign
     return z, rem
 
+def _bz_extract(a, start, n):
+    """ Return the non-negative bigint made of the digits a[start:start+n],
+    ignoring the sign of a. """
+    stop = min(start + n, a.numdigits())
+    if start >= stop:
+        return NULLRBIGINT
+    assert start >= 0
+    z = rbigint(a._digits[start:stop], 1, stop - start)
+    z._normalize()
+    return z
+
+def _bz_concat(hi, lo, n):
+    """ Return hi * BASE**n + lo, for non-negative hi and 0 <= lo < BASE**n.
+    """
+    if hi.sign == 0:
+        return lo
+    size_lo = lo.numdigits()
+    size_hi = hi.numdigits()
+    assert size_lo <= n
+    digits = [NULLDIGIT] * (n + size_hi)
+    for i in range(size_lo):
+        digits[i] = lo._digits[i]
+    for i in range(size_hi):
+        digits[n + i] = hi._digits[i]
+    return rbigint(digits, 1, n + size_hi)
+
+def _bz_divrem_small(a, b):
+    """ Schoolbook division of non-negative bigints, for the leaves of the
+    Burnikel-Ziegler recursion. """
+    if a.lt(b):
+        return NULLRBIGINT, a
+    if b.numdigits() == 1:
+        z, urem = _divrem1(a, b.digit(0))
+        return z, rbigint([_store_digit(urem)], int(urem != 0), 1)
+    return _x_divrem(a, b)
+
+def _bz_div2n1n(a, b, n):
+    """ Divide the non-negative bigint a by the n-digit bigint b, whose top
+    digit must be normalized (see _x_divrem).  Requires a < BASE**n * b,
+    so that the quotient fits in n digits.  Returns (q, r). """
+    if n <= BURNIKEL_ZIEGLER_CUTOFF or a.numdigits() - n <= BURNIKEL_ZIEGLER_CUTOFF:
+        return _bz_divrem_small(a, b)
+    pad = n & 1
+    if pad:
+        a = a.lshift(SHIFT)
+        b = b.lshift(SHIFT)
+        n += 1
+    half_n = n >> 1
+    b1 = _bz_extract(b, half_n, half_n)
+    b2 = _bz_extract(b, 0, half_n)
+    q1, r = _bz_div3n2n(_bz_extract(a, n, a.numdigits()),
+                        _bz_extract(a, half_n, half_n), b, b1, b2, half_n)
+    q2, r = _bz_div3n2n(r, _bz_extract(a, 0, half_n), b, b1, b2, half_n)
+    if pad:
+        r = r.rshift(SHIFT)
+    return _bz_concat(q1, q2, half_n), r
+
+def _bz_div3n2n(a12, a3, b, b1, b2, n):
+    """ Helper for _bz_div2n1n: divide (a12 * BASE**n + a3) by the 2n-digit
+    bigint b == b1 * BASE**n + b2. """
+    if _bz_extract(a12, n, a12.numdigits()).eq(b1):
+        q = rbigint([_store_digit(MASK)] * n, 1, n)
+        r = a12.sub(b1.lshift(n * SHIFT)).add(b1)
+    else:
+        q, r = _bz_div2n1n(a12, b1, n)
+    r = _bz_concat(r, a3, n).sub(q.mul(b2))
+    while r.sign < 0:
+        q = q.int_sub(1)
+        r = r.add(b)
+    return q, r
+
+def _bz_divrem(v1, w1):
+    """ Unsigned bigint division with remainder, using the recursive
+    algorithm of Burnikel and Ziegler ("Fast Recursive Division", 1998).
+    The dividend is cut into chunks of the size of the divisor, and each
+    chunk is divided by recursively halving the problem, so that most of
+    the work is done by Karatsuba multiplication. """
+    size_w = w1.numdigits()
+    assert size_w > 1
+
+    # normalize, as in _x_divrem(), so that the quotient digit estimates
+    # in _bz_div3n2n() are off by at most two
+    d = SHIFT - bits_in_digit(w1.digit(abs(size_w-1)))
+    v = v1.abs().lshift(d)
+    w = w1.abs().lshift(d)
+
+    nchunks = (v.numdigits() + size_w - 1) // size_w
+    digits = [NULLDIGIT] * (nchunks * size_w)
+    r = NULLRBIGINT
+    i = nchunks - 1
+    while i >= 0:
+        chunk = _bz_extract(v, i * size_w, size_w)
+        q, r = _bz_div2n1n(_bz_concat(r, chunk, size_w), w, size_w)
+        if q.sign != 0:
+            for j in range(q.numdigits()):
+                digits[i * size_w + j] = q._digits[j]
+        i -= 1
+
+    z = rbigint(digits, 1, nchunks * size_w)
+    z._normalize()
+    r = r.rshift(d)
+    # return a fresh remainder, as the caller may change its sign
+    size_r = r.numdigits()
+    rem = rbigint(r._digits[:size_r], r.sign, size_r)
+    return z, rem
+
 def _x_int_lt(a, b, eq=False):
     """ Compare bigint a with int b for less than or less than or equal """
     osign = 1
@@ -2916,6 +3164,9 @@ def parse_digit_string(parser):
             a = _muladd1(a, tens, dig)
             if digit < 0:
                 break
+            if a.numdigits() > PARSE_DC_CUTOFF:
+                a = _parse_digit_string_dc(parser, a, digit)
+                break
             dig = digit
             tens = base
         else:
@@ -2924,6 +3175,60 @@ def parse_digit_string(parser):
     a.sign *= parser.sign
     return a
 
+def _parse_digit_string_dc(parser, a, digit):
+    # helper for parse_digit_string, called when the string turns out to
+    # be long: 'a' holds the value of the digits parsed so far and 'digit'
+    # is the next one.  Collects the remaining digits in groups of
+    # 'digitmax' and combines them by divide-and-conquer.
+    base = parser.base
+    digitmax = BASE_MAX[base]
+    groups = []
+    tens, dig = base, digit
+    while True:
+        digit = parser.next_digit()
+        if digit < 0:
+            break
+        if tens == digitmax:
+            groups.append(dig)
+            tens, dig = base, digit
+        else:
+            dig = dig * base + digit
+            tens *= base
+    powers = {}
+    ngroups = len(groups)
+    if ngroups > 0:
+        b = _digit_groups_to_bigint(groups, 0, ngroups, digitmax, powers)
+        a = a.mul(_digitmax_pow(digitmax, ngroups, powers)).add(b)
+    return _muladd1(a, tens, dig)
+
+def _digit_groups_to_bigint(groups, start, stop, digitmax, powers):
+    # value of groups[start:stop], read as digits in base 'digitmax'
+    if stop - start <= PARSE_DC_CUTOFF:
+        a = NULLRBIGINT
+        for i in range(start, stop):
+            a = _muladd1(a, digitmax, groups[i])
+        return a
+    mid = (start + stop) // 2
+    hi = _digit_groups_to_bigint(groups, start, mid, digitmax, powers)
+    lo = _digit_groups_to_bigint(groups, mid, stop, digitmax, powers)
+    return hi.mul(_digitmax_pow(digitmax, stop - mid, powers)).add(lo)
+
+def _digitmax_pow(digitmax, n, powers):
+    # digitmax ** n, memoized in the dict 'powers'
+    try:
+        return powers[n]
+    except KeyError:
+        pass
+    if n == 1:
+        p = rbigint.fromint(digitmax)
+    else:
+        p = _digitmax_pow(digitmax, n >> 1, powers)
+        p = p.mul(p)
+        if n & 1:
+            p = p.int_mul(digitmax)
+    powers[n] = p
+    return p
+
 def parse_string_from_binary_base(parser):
     # The point to this routine is that it takes time linear in the number of
     # string characters.
@@ -0,0 +1,429 @@
+"""
+Linux io_uring: operations are queued in a submission ring shared with the
+kernel, submitted in batches with a single io_uring_enter() call, and their
+results are read from a completion ring without any system call.
+
+This talks to the kernel directly (io_uring_setup(), io_uring_enter(),
+io_uring_register()) and does not need liburing.  IS_SUPPORTED tells if
+the kernel headers of the build host are recent enough.
+"""
+
+import errno
+import sys
+
+from rpython.rlib import jit
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rposix import get_saved_errno
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.rtyper.tool import rffi_platform as platform
+from rpython.translator.platform import CompilationError
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+
+# everything used below from the kernel headers: linux/io_uring.h must be
+# recent enough (Linux 5.6 or later)
+probe_source = """
+#include <linux/io_uring.h>
+#include <sys/syscall.h>
+#include <sys/eventfd.h>
+
+int pypy_uring_probe(void)
+{
+    struct io_uring_params p;
+    struct io_uring_sqe sqe;
+    return __NR_io_uring_setup + __NR_io_uring_enter +
+           __NR_io_uring_register + IORING_OP_NOP + IORING_OP_READ +
+           IORING_OP_WRITE + IORING_OP_RECV + IORING_OP_SEND +
+           IORING_OP_ACCEPT + IORING_OP_ASYNC_CANCEL +
+           IORING_FEAT_SINGLE_MMAP +
+           (int)IORING_OFF_SQ_RING + (int)IORING_OFF_CQ_RING +
+           (int)IORING_OFF_SQES + IORING_ENTER_GETEVENTS +
+           IORING_REGISTER_EVENTFD + EFD_NONBLOCK +
+           (int)sizeof(p.features) + (int)sizeof(sqe.rw_flags);
+}
+"""
+
+def check_support():
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        platform.verify_eci(ExternalCompilationInfo(
+            post_include_bits=[probe_source]))
+    except CompilationError:
+        return False
+    return True
+
+IS_SUPPORTED = check_support()
+
+
+separate_module_source = """
+#include <linux/io_uring.h>
+#include <sys/syscall.h>
+#include <sys/mman.h>
+#include <sys/eventfd.h>
+#include <unistd.h>
+#include <stdlib.h>
+#include <string.h>
+#include <errno.h>
+
+struct pypy_uring_s {
+    int fd;
+    int eventfd;
+    unsigned *sq_head, *sq_tail, *sq_mask, *sq_array;
+    unsigned *cq_head, *cq_tail, *cq_mask;
+    struct io_uring_sqe *sqes;
+    struct io_uring_cqe *cqes;
+    unsigned sq_entries, cq_entries;
+    unsigned sq_local_tail;
+    void *sq_ring, *cq_ring;
+    size_t sq_ring_size, cq_ring_size, sqes_size;
+};
+
+RPY_EXTERN
+void pypy_uring_free(pypy_uring_t *r)
+{
+    if (r->sqes != NULL && r->sqes != MAP_FAILED)
+        munmap(r->sqes, r->sqes_size);
+    if (r->cq_ring != NULL && r->cq_ring != MAP_FAILED &&
+            r->cq_ring != r->sq_ring)
+        munmap(r->cq_ring, r->cq_ring_size);
+    if (r->sq_ring != NULL && r->sq_ring != MAP_FAILED)
+        munmap(r->sq_ring, r->sq_ring_size);
+    if (r->eventfd >= 0)
+        close(r->eventfd);
+    if (r->fd >= 0)
+        close(r->fd);
+    free(r);
+}
+
+RPY_EXTERN
+pypy_uring_t *pypy_uring_create(unsigned entries)
+{
+    struct io_uring_params p;
+    pypy_uring_t *r;
+    char *sq, *cq;
+    int saved_errno;
+
+    r = (pypy_uring_t *)calloc(1, sizeof(pypy_uring_t));
+    if (r == NULL) {
+        errno = ENOMEM;
+        return NULL;
+    }
+    r->eventfd = -1;
+    memset(&p, 0, sizeof(p));
+    r->fd = syscall(__NR_io_uring_setup, entries, &p);
+    if (r->fd < 0)
+        goto error;
+
+    r->sq_ring_size = p.sq_off.array + p.sq_entries * sizeof(unsigned);
+    r->cq_ring_size = p.cq_off.cqes +
+                      p.cq_entries * sizeof(struct io_uring_cqe);
+    if (p.features & IORING_FEAT_SINGLE_MMAP) {
+        if (r->cq_ring_size > r->sq_ring_size)
+            r->sq_ring_size = r->cq_ring_size;
+        r->cq_ring_size = r->sq_ring_size;
+    }
+    r->sq_ring = mmap(NULL, r->sq_ring_size, PROT_READ | PROT_WRITE,
+                      MAP_SHARED | MAP_POPULATE, r->fd, IORING_OFF_SQ_RING);
+    if (r->sq_ring == MAP_FAILED)
+        goto error;
+    if (p.features & IORING_FEAT_SINGLE_MMAP)
+        r->cq_ring = r->sq_ring;
+    else {
+        r->cq_ring = mmap(NULL, r->cq_ring_size, PROT_READ | PROT_WRITE,
+                          MAP_SHARED | MAP_POPULATE, r->fd,
+                          IORING_OFF_CQ_RING);
+        if (r->cq_ring == MAP_FAILED)
+            goto error;
+    }
+    r->sqes_size = p.sq_entries * sizeof(struct io_uring_sqe);
+    r->sqes = (struct io_uring_sqe *)mmap(NULL, r->sqes_size,
+                      PROT_READ | PROT_WRITE, MAP_SHARED | MAP_POPULATE,
+                      r->fd, IORING_OFF_SQES);
+    if (r->sqes == MAP_FAILED)
+        goto error;
+
+    sq = (char *)r->sq_ring;
+    cq = (char *)r->cq_ring;
+    r->sq_head = (unsigned *)(sq + p.sq_off.head);
+    r->sq_tail = (unsigned *)(sq + p.sq_off.tail);
+    r->sq_mask = (unsigned *)(sq + p.sq_off.ring_mask);
+    r->sq_array = (unsigned *)(sq + p.sq_off.array);
+    r->cq_head = (unsigned *)(cq + p.cq_off.head);
+    r->cq_tail = (unsigned *)(cq + p.cq_off.tail);
+    r->cq_mask = (unsigned *)(cq + p.cq_off.ring_mask);
+    r->cqes = (struct io_uring_cqe *)(cq + p.cq_off.cqes);
+    r->sq_entries = p.sq_entries;
+    r->cq_entries = p.cq_entries;
+    r->sq_local_tail = *r->sq_tail;
+    return r;
+
+ error:
+    saved_errno = errno;
+    pypy_uring_free(r);
+    errno = saved_errno;
+    return NULL;
+}
+
+RPY_EXTERN
+int pypy_uring_fd(pypy_uring_t *r)
+{
+    return r->fd;
+}
+
+RPY_EXTERN
+unsigned pypy_uring_cq_entries(pypy_uring_t *r)
+{
+    return r->cq_entries;
+}
+
+/* Queue one operation.  Returns -1 with errno = EBUSY if the submission
+   ring is full. */
+RPY_EXTERN
+int pypy_uring_prep(pypy_uring_t *r, int opcode, int fd, char *addr,
+                    unsigned len, long long offset, int op_flags,
+                    long long user_data)
+{
+    unsigned tail = r->sq_local_tail;
+    unsigned index;
+    struct io_uring_sqe *sqe;
+
+    if (tail - __atomic_load_n(r->sq_head, __ATOMIC_ACQUIRE) >=
+            r->sq_entries) {
+        errno = EBUSY;
+        return -1;
+    }
+    index = tail & *r->sq_mask;
+    sqe = &r->sqes[index];
+    memset(sqe, 0, sizeof(*sqe));
+    sqe->opcode = opcode;
+    sqe->fd = fd;
+    sqe->addr = (unsigned long)addr;
+    sqe->len = len;
+    sqe->off = offset;
+    sqe->rw_flags = op_flags;
+    sqe->user_data = user_data;
+    r->sq_array[index] = index;
+    r->sq_local_tail = tail + 1;
+    __atomic_store_n(r->sq_tail, tail + 1, __ATOMIC_RELEASE);
+    return 0;
+}
+
+/* Submit the queued operations, and wait until at least 'min_complete'
+   operations have completed.  Returns the number submitted. */
+RPY_EXTERN
+int pypy_uring_submit(pypy_uring_t *r, unsigned min_complete)
+{
+    unsigned to_submit = r->sq_local_tail -
+                         __atomic_load_n(r->sq_head, __ATOMIC_ACQUIRE);
+    unsigned flags = min_complete > 0 ? IORING_ENTER_GETEVENTS : 0;
+
+    if (to_submit == 0 && min_complete == 0)
+        return 0;
+    return syscall(__NR_io_uring_enter, r->fd, to_submit, min_complete,
+                   flags, NULL, 0);
+}
+
+/* Copy out up to 'max' completions, without any system call. */
+RPY_EXTERN
+int pypy_uring_reap(pypy_uring_t *r, long long *user_data, int *res,
+                    int max)
+{
+    unsigned head = *r->cq_head;
+    unsigned tail = __atomic_load_n(r->cq_tail, __ATOMIC_ACQUIRE);
+    int n = 0;
+
+    while (head != tail && n < max) {
+        struct io_uring_cqe *cqe = &r->cqes[head & *r->cq_mask];
+        user_data[n] = cqe->user_data;
+        res[n] = cqe->res;
+        n++;
+        head++;
+    }
+    __atomic_store_n(r->cq_head, head, __ATOMIC_RELEASE);
+    return n;
+}
+
+/* Returns an eventfd, created on the first call, that becomes readable
+   when operations complete.  pypy_uring_reap() does not reset it. */
+RPY_EXTERN
+int pypy_uring_eventfd(pypy_uring_t *r)
+{
+    int efd;
+
+    if (r->eventfd >= 0)
+        return r->eventfd;
+    efd = eventfd(0, EFD_CLOEXEC | EFD_NONBLOCK);
+    if (efd < 0)
+        return -1;
+    if (syscall(__NR_io_uring_register, r->fd, IORING_REGISTER_EVENTFD,
+                &efd, 1) < 0) {
+        int saved_errno = errno;
+        close(efd);
+        errno = saved_errno;
+        return -1;
+    }
+    r->eventfd = efd;
+    return efd;
+}
+
+RPY_EXTERN
+void pypy_uring_clear_eventfd(pypy_uring_t *r)
+{
+    eventfd_t value;
+
+    if (r->eventfd >= 0)
+        eventfd_read(r->eventfd, &value);
+}
+"""
+
+eci = ExternalCompilationInfo(
+    includes=['linux/io_uring.h'],
+    post_include_bits=["""
+typedef struct pypy_uring_s pypy_uring_t;
+RPY_EXTERN pypy_uring_t *pypy_uring_create(unsigned);
+RPY_EXTERN void pypy_uring_free(pypy_uring_t *);
+RPY_EXTERN int pypy_uring_fd(pypy_uring_t *);
+RPY_EXTERN unsigned pypy_uring_cq_entries(pypy_uring_t *);
+RPY_EXTERN int pypy_uring_prep(pypy_uring_t *, int, int, char *, unsigned,
+                               long long, int, long long);
+RPY_EXTERN int pypy_uring_submit(pypy_uring_t *, unsigned);
+RPY_EXTERN int pypy_uring_reap(pypy_uring_t *, long long *, int *, int);
+RPY_EXTERN int pypy_uring_eventfd(pypy_uring_t *);
+RPY_EXTERN void pypy_uring_clear_eventfd(pypy_uring_t *);
+"""],
+    separate_module_sources=[separate_module_source],
+)
+
+
+class CConfig:
+    _compilation_info_ = ExternalCompilationInfo(includes=['linux/io_uring.h'])
+
+    IORING_OP_NOP = platform.ConstantInteger('IORING_OP_NOP')
+    IORING_OP_READ = platform.ConstantInteger('IORING_OP_READ')
+    IORING_OP_WRITE = platform.ConstantInteger('IORING_OP_WRITE')
+    IORING_OP_RECV = platform.ConstantInteger('IORING_OP_RECV')
+    IORING_OP_SEND = platform.ConstantInteger('IORING_OP_SEND')
+    IORING_OP_ACCEPT = platform.ConstantInteger('IORING_OP_ACCEPT')
+    IORING_OP_ASYNC_CANCEL = platform.ConstantInteger(
+        'IORING_OP_ASYNC_CANCEL')
+
+if IS_SUPPORTED:
+    globals().update(platform.configure(CConfig))
+
+
+URINGP = rffi.COpaquePtr(typedef='pypy_uring_t', compilation_info=eci)
+
+def llexternal(name, args, result, **kwds):
+    return rffi.llexternal(name, args, result, compilation_info=eci, **kwds)
+
+c_create = llexternal('pypy_uring_create', [rffi.UINT], URINGP,
+                      save_err=rffi.RFFI_SAVE_ERRNO)
+c_free = llexternal('pypy_uring_free', [URINGP], lltype.Void,
+                    releasegil=False)
+c_fd = llexternal('pypy_uring_fd', [URINGP], rffi.INT, releasegil=False)
+c_cq_entries = llexternal('pypy_uring_cq_entries', [URINGP], rffi.UINT,
+                          releasegil=False)
+c_prep = llexternal('pypy_uring_prep',
+                    [URINGP, rffi.INT, rffi.INT, rffi.CCHARP, rffi.UINT,
+                     rffi.LONGLONG, rffi.INT, rffi.LONGLONG], rffi.INT,
+                    releasegil=False)
+# the only call that may block: it releases the GIL
+c_submit = llexternal('pypy_uring_submit', [URINGP, rffi.UINT], rffi.INT,
+                      save_err=rffi.RFFI_SAVE_ERRNO)
+c_reap = llexternal('pypy_uring_reap',
+                    [URINGP, rffi.LONGLONGP, rffi.INTP, rffi.INT], rffi.INT,
+                    releasegil=False)
+c_eventfd = llexternal('pypy_uring_eventfd', [URINGP], rffi.INT,
+                       save_err=rffi.RFFI_SAVE_ERRNO, releasegil=False)
+c_clear_eventfd = llexternal('pypy_uring_clear_eventfd', [URINGP],
+                             lltype.Void, releasegil=False)
+
+
+class IOUring(object):
+    """An io_uring instance with rings of 'entries' submissions.  Raises
+    OSError if the kernel does not support io_uring.
+
+    prep() queues an operation on raw memory that must stay valid until
+    the operation completes; submit() hands the queued operations to the
+    kernel; reap() returns the number of completions copied into
+    'self.user_data' and 'self.results'.
+    """
+
+    def __init__(self, entries):
+        if entries <= 0:
+            raise ValueError("entries must be positive")
+        ll_uring = c_create(rffi.cast(rffi.UINT, entries))
+        if not ll_uring:
+            raise OSError(get_saved_errno(), "io_uring_setup failed")
+        self.ll_uring = ll_uring
+        self.fd = intmask(c_fd(ll_uring))
+        self.cq_entries = intmask(c_cq_entries(ll_uring))
+        self.user_data = lltype.malloc(rffi.LONGLONGP.TO, self.cq_entries,
+                                       flavor='raw')
+        self.results = lltype.malloc(rffi.INTP.TO, self.cq_entries,
+                                     flavor='raw')
+
+    def close(self):
+        if self.ll_uring:
+            c_free(self.ll_uring)
+            self.ll_uring = lltype.nullptr(URINGP.TO)
+            lltype.free(self.user_data, flavor='raw')
+            lltype.free(self.results, flavor='raw')
+            self.fd = -1
+
+    def closed(self):
+        return not self.ll_uring
+
+    @jit.dont_look_inside
+    def prep(self, opcode, fd, addr, length, offset, op_flags, user_data):
+        """Queue an operation.  If the submission ring is full, the
+        operations already queued are submitted first."""
+        for i in range(2):
+            res = c_prep(self.ll_uring, rffi.cast(rffi.INT, opcode),
+                         rffi.cast(rffi.INT, fd), addr,
+                         rffi.cast(rffi.UINT, length),
+                         rffi.cast(rffi.LONGLONG, offset),
+                         rffi.cast(rffi.INT, op_flags),
+                         rffi.cast(rffi.LONGLONG, user_data))
+            if intmask(res) == 0:
+                return
+            self.submit(0)
+        raise OSError(errno.EBUSY, "io_uring submission queue full")
+
+    @jit.dont_look_inside
+    def submit(self, min_complete=0, signal_checker=None):
+        """Submit the queued operations and wait for at least
+        'min_complete' completions.  Returns the number submitted."""
+        while True:
+            res = intmask(c_submit(self.ll_uring,
+                                   rffi.cast(rffi.UINT, min_complete)))
+            if res >= 0:
+                return res
+            err = get_saved_errno()
+            if err != errno.EINTR:
+                raise OSError(err, "io_uring_enter failed")
+            if signal_checker is not None:
+                signal_checker()
+
+    @jit.dont_look_inside
+    def reap(self):
+        """Copy out the available completions, up to 'self.cq_entries'.
+        Returns their number."""
+        c_clear_eventfd(self.ll_uring)
+        return intmask(c_reap(self.ll_uring, self.user_data, self.results,
+                              rffi.cast(rffi.INT, self.cq_entries)))
+
+    def get_user_data(self, i):
+        return intmask(self.user_data[i])
+
+    def get_result(self, i):
+        return intmask(self.results[i])
+
+    def eventfd(self):
+        """An eventfd which is readable when there are completions to
+        reap, for use with select() or epoll."""
+        res = intmask(c_eventfd(self.ll_uring))
+        if res < 0:
+            raise OSError(get_saved_errno(), "eventfd")
+        return res
@@ -466,6 +466,9 @@ if HAS_AF_NETLINK:
 
 # ____________________________________________________________
 
+# the largest count given to one sendfile() call
+SENDFILE_CHUNK_SIZE = 0x40000000
+
 HAVE_SOCK_NONBLOCK = "SOCK_NONBLOCK" in constants
 HAVE_SOCK_CLOEXEC = "SOCK_CLOEXEC" in constants
 
@@ -1073,6 +1076,111 @@ class RSocket(object):
                     "ancillary data")
             raise last_error()
 
+    if _c.HAVE_MMSG:
+        @jit.dont_look_inside
+        def recvmmsg_into(self, rwbuffer, itemsize, count, flags=0):
+            """Receive up to 'count' datagrams with a single recvmmsg()
+            call, the i-th one into 'rwbuffer' at offset i * itemsize.
+            Only waits for the first datagram.  Returns a list of
+            (nbytes, address) pairs, one per datagram received, where
+            'address' is None if the sender's address is unknown."""
+            if (itemsize <= 0 or count <= 0 or
+                    count > rwbuffer.getlength() // itemsize):
+                raise RSocketError("invalid item size or count")
+            self.wait_for_data(False)
+            addrsize = familyclass(self.family).maxlen
+            addresses = lltype.malloc(rffi.CCHARP.TO, count * addrsize,
+                                      flavor='raw')
+            lengths = lltype.malloc(rffi.INTP.TO, count, flavor='raw')
+            addrlens = lltype.malloc(rffi.INTP.TO, count, flavor='raw')
+            try:
+                raw = rwbuffer.get_raw_address()
+                res = _c.recvmmsg_into(self.fd, raw, itemsize, count, flags,
+                                       addresses, addrsize, lengths, addrlens)
+                keepalive_until_here(rwbuffer)
+                res = rffi.cast(lltype.Signed, res)
+                if res < 0:
+                    raise self.error_handler()
+                result = []
+                for i in range(res):
+                    addrlen = rffi.cast(lltype.Signed, addrlens[i])
+                    if addrlen > 0:
+                        addr_p = rffi.ptradd(addresses, i * addrsize)
+                        address = make_address(
+                            rffi.cast(_c.sockaddr_ptr, addr_p), addrlen)
+                    else:
+                        address = None
+                    result.append((rffi.cast(lltype.Signed, lengths[i]),
+                                   address))
+                return result
+            finally:
+                lltype.free(addrlens, flavor='raw')
+                lltype.free(lengths, flavor='raw')
+                lltype.free(addresses, flavor='raw')
+
+        @jit.dont_look_inside
+        def sendmmsg(self, messages, flags=0, address=None):
+            """Send each string of the list 'messages' as one datagram,
+            with a single sendmmsg() call, to 'address' or else to the
+            connected peer.  Returns the number of datagrams sent, which
+            may be less than len(messages)."""
+            count = len(messages)
+            if count == 0:
+                return 0
+            self.wait_for_data(True)
+            data = ''.join(messages)
+            lengths = lltype.malloc(rffi.LONGP.TO, count, flavor='raw')
+            try:
+                for i in range(count):
+                    lengths[i] = rffi.cast(rffi.LONG, len(messages[i]))
+                if address is not None:
+                    addr = address.lock()
+                    addrlen = address.addrlen
+                else:
+                    addr = lltype.nullptr(_c.sockaddr)
+                    addrlen = 0
+                try:
+                    with rffi.scoped_nonmovingbuffer(data) as dataptr:
+                        res = _c.sendmmsg(self.fd, dataptr, lengths, count,
+                                          flags, addr, addrlen)
+                finally:
+                    if address is not None:
+                        address.unlock()
+            finally:
+                lltype.free(lengths, flavor='raw')
+            res = rffi.cast(lltype.Signed, res)
+            if res < 0:
+                raise self.error_handler()
+            return res
+
+    if _c.HAVE_SENDFILE:
+        def sendfile(self, in_fd, offset, count=-1, signal_checker=None):
+            """Send the file 'in_fd' from 'offset' to the socket with the
+            sendfile() system call, without copying it through user space:
+            'count' bytes, or up to the end of the file if 'count' is
+            negative.  Returns the number of bytes sent, less than 'count'
+            only if the end of the file was reached."""
+            total = 0
+            with lltype.scoped_alloc(rposix._OFF_PTR_T.TO, 1) as p_offset:
+                while count < 0 or total < count:
+                    chunk = SENDFILE_CHUNK_SIZE
+                    if count >= 0 and count - total < chunk:
+                        chunk = count - total
+                    self.wait_for_data(True)
+                    p_offset[0] = rffi.cast(rposix.OFF_T, offset + total)
+                    res = rffi.cast(lltype.Signed, rposix.c_sendfile(
+                        self.fd, in_fd, p_offset, chunk))
+                    if res < 0:
+                        if _c.geterrno() != _c.EINTR:
+                            raise self.error_handler()
+                    elif res == 0:
+                        break     # end of the file
+                    else:
+                        total += res
+                    if signal_checker is not None:
+                        signal_checker()
+            return total
+
     def send_raw(self, dataptr, length, flags=0):
         """Send data from a CCHARP buffer."""
         self.wait_for_data(True)
@@ -4,7 +4,7 @@ from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.rsre import rsre_char, rsre_constants as consts
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.objectmodel import we_are_translated, not_rpython
-from rpython.rlib import jit
+from rpython.rlib import jit, rstring
 from rpython.rlib.rsre.rsre_jit import install_jitdriver, install_jitdriver_spec
 
 _seen_specname = {}
@@ -62,6 +62,8 @@ class CompiledPattern(object):
         # when CODESIZE is 2
         if not we_are_translated() and rsre_char.CODESIZE != 2:
             assert 65535 not in pattern
+        self._prefix = None       # see literal_prefix()
+        self._charset_map = None  # see charset_map()
 
     def pat(self, index):
         jit.promote(self)
@@ -74,6 +76,43 @@ class CompiledPattern(object):
         assert result >= 0
         return result
 
+    @jit.elidable
+    def literal_prefix(self):
+        """The literal prefix from the INFO block, as a byte string.
+        Returns '' if there is none, or if it contains characters that
+        cannot be in a byte string."""
+        if self._prefix is None:
+            prefix = ''
+            if (self.pattern[0] == consts.OPCODE_INFO and
+                    self.pattern[2] & consts.SRE_INFO_PREFIX):
+                prefix_len = self.pattern[5]
+                if 7 + prefix_len > 1 + self.pattern[1]:
+                    prefix_len = 0      # malformed INFO block
+                chars = [chr(0)] * prefix_len
+                for i in range(prefix_len):
+                    c = self.pattern[7 + i]
+                    if not (0 <= c < 256):
+                        chars = []
+                        break
+                    chars[i] = chr(c)
+                prefix = ''.join(chars)
+            self._prefix = prefix
+        return self._prefix
+
+    @jit.elidable
+    def charset_map(self):
+        """For a pattern whose INFO block has a charset: a string of 256
+        characters, '\\x01' for the characters in the charset and '\\x00'
+        for the others.  Not for SRE_FLAG_LOCALE patterns: the result is
+        cached, but their charset depends on the current locale."""
+        if self._charset_map is None:
+            chars = ['\x00'] * 256
+            for c in range(256):
+                if rsre_char.check_charset(None, self, 5, c):
+                    chars[c] = '\x01'
+            self._charset_map = ''.join(chars)
+        return self._charset_map
+
 class AbstractMatchContext(object):
     """Abstract base class"""
     _immutable_fields_ = ['end']
@@ -118,6 +157,9 @@ class AbstractMatchContext(object):
     # calling the methods xxx_indirect() instead of xxx(), or if
     # applicable add the @specializectx decorator.
     ZERO = 0
+    # True in the contexts that match a byte string, which provide the
+    # find_literal() method; see literal_search() and friends
+    FAST_SKIP = False
     @not_rpython
     def next(self, position):
         raise NotImplementedError
@@ -244,6 +286,16 @@ class BufMatchContext(FixedMatchContext):
         return BufMatchContext(self._buffer, start,
                                self.end)
 
+    FAST_SKIP = True
+
+    @jit.dont_look_inside
+    def find_literal(self, literal, start):
+        # Horspool-style search, see rstring._search()
+        result = rstring.find(self._buffer, literal, start, self.end)
+        if result < 0:
+            result = self.end
+        return result
+
     def get_single_byte(self, base_position, index):
         return self.str(base_position + index)
 
@@ -269,6 +321,17 @@ class StrMatchContext(FixedMatchContext):
         return StrMatchContext(self._string, start,
                                self.end)
 
+    FAST_SKIP = True
+
+    @jit.dont_look_inside
+    def find_literal(self, literal, start):
+        """Return the position of the first occurrence of 'literal' at or
+        after 'start', or self.end.  Uses the fast search of str.find()."""
+        result = self._string.find(literal, start, self.end)
+        if result < 0:
+            result = self.end
+        return result
+
     def get_single_byte(self, base_position, index):
         return self.str(base_position + index)
 
@@ -1197,9 +1260,15 @@ def literal_search(ctx, pattern, base):
     character = pattern.pat(base + 1)
     base += 2
     start = ctx.match_start
+    if ctx.FAST_SKIP and character > 255:
+        return False
     while start < ctx.end:
         ctx.jitdriver_LiteralSearch.jit_merge_point(ctx=ctx, start=start,
                                           base=base, character=character, pattern=pattern)
+        if ctx.FAST_SKIP:
+            start = ctx.find_literal(chr(character), start)
+            if start >= ctx.end:
+                break
         start1 = ctx.next(start)
         if ctx.str(start) == character:
             if sre_match(ctx, pattern, base, start1, None) is not None:
@@ -1219,13 +1288,57 @@ def charset_search(ctx, pattern, base):
     while start < ctx.end:
         ctx.jitdriver_CharsetSearch.jit_merge_point(ctx=ctx, start=start,
                                                     base=base, pattern=pattern)
-        if rsre_char.check_charset(ctx, pattern, 5, ctx.str(start)):
+        if ctx.FAST_SKIP and not (pattern.flags & consts.SRE_FLAG_LOCALE):
+            start = skip_to_charset(ctx, pattern.charset_map(), start)
+            if start >= ctx.end:
+                break
+            found = True
+        else:
+            found = rsre_char.check_charset(ctx, pattern, 5, ctx.str(start))
+        if found:
             if sre_match(ctx, pattern, base, start, None) is not None:
                 ctx.match_start = start
                 return True
         start = ctx.next(start)
     return False
 
+@specializectx
+@jit.dont_look_inside
+def skip_to_charset(ctx, charset_map, start):
+    # skip the characters that are not in the charset, using the
+    # table from pattern.charset_map()
+    end = ctx.end
+    while start < end and charset_map[ctx.str(start)] == '\x00':
+        start = ctx.next(start)
+    return start
+
+install_jitdriver_spec("PrefixSearch",
+                       greens=['base', 'prefix_skip', 'pattern'],
+                       reds=['start', 'ctx'],
+                       debugprint=(2, 0))
+@specializectx
+def prefix_search(ctx, pattern):
+    # pattern starts with a literal prefix.  For byte strings, the
+    # candidate positions are found with ctx.find_literal(); it is
+    # much faster than the character-by-character loop of fast_search()
+    # <INFO> <1=skip> <2=flags> <3=min> <4=...>
+    #        <5=length> <6=skip> <7=prefix data> <overlap data>
+    prefix_skip = pattern.pat(6)
+    base = pattern.pat(1) + 1 + 2 * prefix_skip
+    start = ctx.match_start
+    while start < ctx.end:
+        ctx.jitdriver_PrefixSearch.jit_merge_point(ctx=ctx, start=start,
+                base=base, prefix_skip=prefix_skip, pattern=pattern)
+        start = ctx.find_literal(pattern.literal_prefix(), start)
+        if start >= ctx.end:
+            break
+        ptr = ctx.next_n(start, prefix_skip, ctx.end)
+        if sre_match(ctx, pattern, base, ptr, None) is not None:
+            ctx.match_start = start
+            return True
+        start = ctx.next(start)
+    return False
+
 install_jitdriver_spec('FastSearch',
                        greens=['i', 'prefix_len', 'pattern'],
                        reds=['string_position', 'ctx'],
@@ -1239,6 +1352,8 @@ def fast_search(ctx, pattern):
     string_position = ctx.match_start
     if string_position >= ctx.end:
         return False
+    if ctx.FAST_SKIP and pattern.literal_prefix():
+        return prefix_search(ctx, pattern)
     prefix_len = pattern.pat(5)
     assert prefix_len >= 0
     i = 0
@@ -0,0 +1,448 @@
+"""
+A lazily-built DFA for the patterns without backreferences, lookarounds
+or assertions (apart from a leading '^').  It answers the question "is
+there a match starting here?" in time linear in the length of the string,
+without any backtracking.  It does not know where the groups are, nor
+which match the backtracking engine would pick, so it is only used to
+skip the positions where there is no match and to fail early; sre_match()
+is then called only at the position where a match is known to start.
+
+The SRE bytecode is first turned into an NFA.  The DFA states are sets of
+NFA nodes, built the first time a transition is needed.  If there are too
+many of them, the cache is flushed; if this happens too often, the DFA is
+disabled and the backtracking engine is used alone.
+"""
+
+from rpython.rlib import jit
+from rpython.rlib.listsort import TimSort
+from rpython.rlib.rsre import rsre_char, rsre_core, rsre_constants as consts
+from rpython.rlib.rsre.rsre_core import specializectx, sre_match
+
+MAX_NFA_NODES = 2000
+MAX_DFA_STATES = 500
+MAX_FLUSHES = 10
+
+NFA_CHAR = 0        # matches one character, then goes to 'out'
+NFA_SPLIT = 1       # goes to 'out' and 'out2' without consuming anything
+NFA_ACCEPT = 2
+
+# results of can_match_at()
+NO = 0
+YES = 1
+GAVE_UP = 2
+
+CHAR_OPCODES = [consts.OPCODE_ANY, consts.OPCODE_ANY_ALL,
+                consts.OPCODE_CATEGORY, consts.OPCODE_IN,
+                consts.OPCODE_IN_IGNORE, consts.OPCODE_LITERAL,
+                consts.OPCODE_LITERAL_IGNORE, consts.OPCODE_NOT_LITERAL,
+                consts.OPCODE_NOT_LITERAL_IGNORE]
+
+
+class Unsupported(Exception):
+    pass
+
+
+class NFA(object):
+    """The NFA for a CompiledPattern.  Node 0 is the accepting node."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.anchored = False     # the pattern starts with '^'
+        self.kinds = []
+        self.ops = []             # NFA_CHAR: the opcode
+        self.args = []            # NFA_CHAR: the position of the opcode
+        self.outs = []
+        self.outs2 = []
+        self.seen = []            # for closure()
+        self.seen_stamp = 0
+        self.start = 0
+
+    def pat(self, index):
+        return self.pattern.pattern[index]
+
+    def new_node(self, kind, op, arg, out, out2):
+        if len(self.kinds) >= MAX_NFA_NODES:
+            raise Unsupported
+        self.kinds.append(kind)
+        self.ops.append(op)
+        self.args.append(arg)
+        self.outs.append(out)
+        self.outs2.append(out2)
+        self.seen.append(0)
+        return len(self.kinds) - 1
+
+    def new_split(self, out, out2):
+        return self.new_node(NFA_SPLIT, 0, 0, out, out2)
+
+    def compile(self):
+        accept = self.new_node(NFA_ACCEPT, 0, 0, -1, -1)
+        ppos = 0
+        if self.pat(ppos) == consts.OPCODE_INFO:
+            ppos += 1 + self.pat(ppos + 1)
+        if self.pat(ppos) == consts.OPCODE_AT:
+            atcode = self.pat(ppos + 1)
+            if (atcode == consts.AT_BEGINNING or
+                    atcode == consts.AT_BEGINNING_STRING):
+                self.anchored = True
+                ppos += 2
+        self.start = self.compile_seq(ppos, len(self.pattern.pattern),
+                                      accept)
+
+    def compile_seq(self, ppos, end, follow):
+        # compile the opcodes from 'ppos' to 'end' (or to SUCCESS),
+        # followed by the node 'follow'
+        items = []
+        while ppos < end:
+            op = self.pat(ppos)
+            if op == consts.OPCODE_SUCCESS:
+                break
+            elif op == consts.OPCODE_MARK:
+                ppos += 2
+                continue
+            elif op == consts.OPCODE_INFO:
+                ppos += 1 + self.pat(ppos + 1)
+                continue
+            items.append(ppos)
+            ppos = self.skip_op(ppos)
+        i = len(items) - 1
+        while i >= 0:
+            follow = self.compile_op(items[i], follow)
+            i -= 1
+        return follow
+
+    def skip_op(self, ppos):
+        op = self.pat(ppos)
+        if (op == consts.OPCODE_ANY or
+                op == consts.OPCODE_ANY_ALL):
+            return ppos + 1
+        elif (op == consts.OPCODE_LITERAL or
+                op == consts.OPCODE_LITERAL_IGNORE or
+                op == consts.OPCODE_NOT_LITERAL or
+                op == consts.OPCODE_NOT_LITERAL_IGNORE or
+                op == consts.OPCODE_CATEGORY):
+            return ppos + 2
+        elif (op == consts.OPCODE_IN or
+                op == consts.OPCODE_IN_IGNORE or
+                op == consts.OPCODE_REPEAT_ONE or
+                op == consts.OPCODE_MIN_REPEAT_ONE):
+            return ppos + 1 + self.pat(ppos + 1)
+        elif op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <min> <max> item <UNTIL> tail
+            return ppos + 2 + self.pat(ppos + 1)
+        elif op == consts.OPCODE_BRANCH:
+            # <BRANCH> <skip> code <JUMP> <skip> ... <NULL>
+            ppos += 1
+            while self.pat(ppos):
+                ppos += self.pat(ppos)
+            return ppos + 1
+        raise Unsupported
+
+    def compile_op(self, ppos, follow):
+        op = self.pat(ppos)
+        if op in CHAR_OPCODES:
+            return self.new_node(NFA_CHAR, op, ppos, follow, -1)
+        elif (op == consts.OPCODE_REPEAT_ONE or
+                op == consts.OPCODE_MIN_REPEAT_ONE):
+            # <REPEAT_ONE> <skip> <min> <max> item <SUCCESS> tail
+            return self.compile_repeat(ppos + 4, ppos + self.pat(ppos + 1),
+                                       self.pat(ppos + 2),
+                                       self.pat(ppos + 3), follow)
+        elif op == consts.OPCODE_REPEAT:
+            untilppos = ppos + 1 + self.pat(ppos + 1)
+            return self.compile_repeat(ppos + 4, untilppos,
+                                       self.pat(ppos + 2),
+                                       self.pat(ppos + 3), follow)
+        elif op == consts.OPCODE_BRANCH:
+            entries = []
+            ppos += 1
+            while self.pat(ppos):
+                skip = self.pat(ppos)
+                if self.pat(ppos + skip - 2) != consts.OPCODE_JUMP:
+                    raise Unsupported
+                entries.append(self.compile_seq(ppos + 1, ppos + skip - 2,
+                                                follow))
+                ppos += skip
+            if not entries:
+                raise Unsupported
+            node = entries[-1]
+            i = len(entries) - 2
+            while i >= 0:
+                node = self.new_split(entries[i], node)
+                i -= 1
+            return node
+        raise Unsupported
+
+    def compile_repeat(self, ppos, end, min, max, follow):
+        if max == rsre_char.MAXREPEAT:
+            loop = self.new_split(-1, follow)
+            self.outs[loop] = self.compile_seq(ppos, end, loop)
+            follow = loop
+        else:
+            if max < min:
+                raise Unsupported
+            for i in range(max - min):
+                body = self.compile_seq(ppos, end, follow)
+                if body == follow:
+                    break       # empty item
+                follow = self.new_split(body, follow)
+        for i in range(min):
+            body = self.compile_seq(ppos, end, follow)
+            if body == follow:
+                break
+            follow = body
+        return follow
+
+    def closure(self, nodes):
+        """Return the sorted list of the NFA_CHAR and NFA_ACCEPT nodes
+        reachable from 'nodes' without consuming any character."""
+        self.seen_stamp += 1
+        stamp = self.seen_stamp
+        result = []
+        pending = nodes
+        while pending:
+            node = pending.pop()
+            if self.seen[node] == stamp:
+                continue
+            self.seen[node] = stamp
+            if self.kinds[node] == NFA_SPLIT:
+                pending.append(self.outs2[node])
+                pending.append(self.outs[node])
+            else:
+                result.append(node)
+        TimSort(result).sort()
+        return result
+
+    def match_char(self, node, c):
+        op = self.ops[node]
+        ppos = self.args[node]
+        flags = self.pattern.flags
+        if op == consts.OPCODE_LITERAL:
+            return c == self.pat(ppos + 1)
+        elif op == consts.OPCODE_NOT_LITERAL:
+            return c != self.pat(ppos + 1)
+        elif op == consts.OPCODE_LITERAL_IGNORE:
+            return rsre_char.getlower(c, flags) == self.pat(ppos + 1)
+        elif op == consts.OPCODE_NOT_LITERAL_IGNORE:
+            return rsre_char.getlower(c, flags) != self.pat(ppos + 1)
+        elif op == consts.OPCODE_ANY:
+            return not rsre_char.is_linebreak(c)
+        elif op == consts.OPCODE_ANY_ALL:
+            return True
+        elif op == consts.OPCODE_IN:
+            return rsre_char.check_charset(None, self.pattern, ppos + 2, c)
+        elif op == consts.OPCODE_IN_IGNORE:
+            return rsre_char.check_charset(None, self.pattern, ppos + 2,
+                                           rsre_char.getlower(c, flags))
+        elif op == consts.OPCODE_CATEGORY:
+            return rsre_char.category_dispatch(self.pat(ppos + 1), c)
+        return False
+
+
+class DFAState(object):
+    def __init__(self, nodes, accepting):
+        self.nodes = nodes
+        self.accepting = accepting
+        self.dead = len(nodes) == 0
+        self.trans = [None] * 256       # for the characters < 256
+        self.bigtrans = {}              # for the other characters
+
+
+class LazyDFA(object):
+    """The DFA built from an NFA.  If 'unanchored', a match may start at
+    any position: the NFA start is added back after every character."""
+
+    def __init__(self, nfa, unanchored):
+        self.nfa = nfa
+        self.unanchored = unanchored
+        self.disabled = False
+        self.flushes = 0
+        self.flush()
+
+    def flush(self):
+        self.states = {}
+        self.num_states = 0
+        self.start = self.intern(self.nfa.closure([self.nfa.start]))
+
+    def intern(self, nodes):
+        key = ','.join([str(node) for node in nodes])
+        try:
+            return self.states[key]
+        except KeyError:
+            pass
+        accepting = len(nodes) > 0 and nodes[0] == 0    # node 0 is ACCEPT
+        state = DFAState(nodes, accepting)
+        self.states[key] = state
+        self.num_states += 1
+        return state
+
+    def step(self, state, c):
+        """Return the state after the character 'c', or None if the DFA
+        gave up."""
+        if c < 256:
+            nextstate = state.trans[c]
+            if nextstate is None:
+                nextstate = self.compute(state, c)
+                state.trans[c] = nextstate
+        else:
+            nextstate = state.bigtrans.get(c, None)
+            if nextstate is None:
+                nextstate = self.compute(state, c)
+                state.bigtrans[c] = nextstate
+        return nextstate
+
+    def compute(self, state, c):
+        if self.num_states >= MAX_DFA_STATES:
+            # The old states are still correct, and stay alive as long as
+            # they are in use, but they are not found any more.
+            self.flushes += 1
+            if self.flushes > MAX_FLUSHES:
+                self.disabled = True
+            self.flush()
+        nfa = self.nfa
+        targets = []
+        for node in state.nodes:
+            if nfa.kinds[node] == NFA_CHAR and nfa.match_char(node, c):
+                targets.append(nfa.outs[node])
+        if self.unanchored:
+            targets.append(nfa.start)
+        return self.intern(nfa.closure(targets))
+
+
+class PatternDFA(object):
+    """The two DFAs for a CompiledPattern."""
+
+    def __init__(self, nfa):
+        self.anchored = nfa.anchored
+        self.dfa = LazyDFA(nfa, False)
+        self.search_dfa = LazyDFA(nfa, True)
+
+    def is_disabled(self):
+        return self.dfa.disabled or self.search_dfa.disabled
+
+
+def worth_a_dfa(nfa):
+    """Only the patterns that can backtrack more than a little use a DFA;
+    the others are fast enough with sre_match() and the JIT."""
+    repeats = 0
+    ppos = 0
+    end = len(nfa.pattern.pattern)
+    while ppos < end:
+        op = nfa.pat(ppos)
+        if op == consts.OPCODE_SUCCESS:
+            break
+        elif op == consts.OPCODE_BRANCH or op == consts.OPCODE_REPEAT:
+            return True
+        elif (op == consts.OPCODE_REPEAT_ONE or
+                op == consts.OPCODE_MIN_REPEAT_ONE):
+            repeats += 1
+        if op == consts.OPCODE_MARK or op == consts.OPCODE_AT:
+            ppos += 2
+        elif op == consts.OPCODE_INFO:
+            ppos += 1 + nfa.pat(ppos + 1)
+        else:
+            ppos = nfa.skip_op(ppos)
+    # a REPEAT_ONE followed by something else can backtrack too
+    return repeats > 1
+
+def compile_dfa(pattern, force=False):
+    """Return a PatternDFA for the CompiledPattern, or None if the pattern
+    is not supported or would not benefit from it."""
+    if pattern.flags & consts.SRE_FLAG_LOCALE:
+        return None     # the result would depend on the current locale
+    nfa = NFA(pattern)
+    try:
+        if not force and not worth_a_dfa(nfa):
+            return None
+        nfa.compile()
+    except Unsupported:
+        return None
+    except IndexError:
+        return None     # malformed bytecode
+    return PatternDFA(nfa)
+
+# ____________________________________________________________
+
+@specializectx
+@jit.dont_look_inside
+def can_match_at(ctx, dfa, ptr):
+    """Is there a match starting at 'ptr'?  Returns NO, YES or GAVE_UP."""
+    if dfa.anchored and ptr != ctx.ZERO:
+        return NO
+    state = dfa.dfa.start
+    fullmatch = ctx.fullmatch_only
+    while True:
+        if state.accepting and (not fullmatch or ptr == ctx.end):
+            return YES
+        if ptr >= ctx.end:
+            return NO
+        state = dfa.dfa.step(state, ctx.str(ptr))
+        if state.dead:
+            return NO
+        if dfa.dfa.disabled:
+            return GAVE_UP
+        ptr = ctx.next(ptr)
+
+@specializectx
+@jit.dont_look_inside
+def find_first_end(ctx, dfa, ptr):
+    """Where does the first match starting at 'ptr' or later end?
+    Returns (NO, ptr), (YES, end position) or (GAVE_UP, ptr)."""
+    state = dfa.search_dfa.start
+    while True:
+        if state.accepting:
+            return YES, ptr
+        if ptr >= ctx.end:
+            return NO, ptr
+        state = dfa.search_dfa.step(state, ctx.str(ptr))
+        if dfa.search_dfa.disabled:
+            return GAVE_UP, ptr
+        ptr = ctx.next(ptr)
+
+
+def match_context(ctx, pattern, dfa):
+    """Like rsre_core.match_context(), but first checks with the DFA that
+    there is a match."""
+    if dfa.is_disabled():
+        return rsre_core.match_context(ctx, pattern)
+    ctx.original_pos = ctx.match_start
+    if ctx.end < ctx.match_start:
+        return False
+    if can_match_at(ctx, dfa, ctx.match_start) == NO:
+        return False
+    return rsre_core.match_context(ctx, pattern)
+
+def search_context(ctx, pattern, dfa):
+    """Like rsre_core.search_context(), but only calls sre_match() at the
+    first position where the DFA says that a match starts."""
+    if dfa.is_disabled():
+        return rsre_core.search_context(ctx, pattern)
+    ctx.original_pos = ctx.match_start
+    if ctx.end < ctx.match_start:
+        return False
+    start = ctx.match_start
+    if dfa.anchored:
+        last = start
+    else:
+        result, last = find_first_end(ctx, dfa, start)
+        if result == NO:
+            return False
+        if result == GAVE_UP:
+            return rsre_core.search_context(ctx, pattern)
+    # the first match starts between 'start' and 'last'
+    while True:
+        result = can_match_at(ctx, dfa, start)
+        if result == GAVE_UP:
+            break
+        if result == YES:
+            if sre_match(ctx, pattern, 0, start, None) is not None:
+                ctx.match_start = start
+                return True
+            break       # should not occur
+        if start >= last:
+            if dfa.anchored:
+                return False
+            break       # should not occur either
+        start = ctx.next_indirect(start)
+    # let the backtracking engine continue from here
+    ctx.match_start = start
+    return rsre_core.search_context(ctx, pattern)
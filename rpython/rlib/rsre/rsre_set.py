@@ -0,0 +1,176 @@
+"""
+Matching a string against many patterns at once.
+
+The patterns that start with a literal prefix (from their INFO block)
+are found with a single Aho-Corasick scan over the string: sre_match()
+is only called at the positions where the prefix of a pattern ends.
+The other patterns are searched one by one with search_context().
+"""
+
+from rpython.rlib import jit
+from rpython.rlib.rsre import rsre_core, rsre_dfa
+from rpython.rlib.rsre.rsre_core import specializectx, sre_match
+
+
+class PrefixAutomaton(object):
+    """Aho-Corasick automaton over the literal prefixes."""
+
+    def __init__(self):
+        self.goto = [{}]          # node -> {character: node}
+        self.fail = [0]
+        self.outputs = [None]     # node -> list of pattern indexes, or None
+        self.root = [0] * 256     # transitions from the root, for speed
+
+    def add(self, prefix, index):
+        node = 0
+        for c in prefix:
+            char_ord = ord(c)
+            nextnode = self.goto[node].get(char_ord, -1)
+            if nextnode < 0:
+                nextnode = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append(None)
+                self.goto[node][char_ord] = nextnode
+            node = nextnode
+        outputs = self.outputs[node]
+        if outputs is None:
+            outputs = []
+            self.outputs[node] = outputs
+        outputs.append(index)
+
+    def build(self):
+        """Compute the failure links, breadth-first."""
+        queue = []
+        for char_ord, node in self.goto[0].items():
+            if char_ord < 256:
+                self.root[char_ord] = node
+            queue.append(node)
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for char_ord, child in self.goto[node].items():
+                queue.append(child)
+                fail = self.fail[node]
+                while fail != 0 and char_ord not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char_ord, 0)
+                self.fail[child] = fail
+                # the prefixes that end here include those that end
+                # at the failure node
+                extra = self.outputs[fail]
+                if extra is not None:
+                    outputs = self.outputs[child]
+                    if outputs is None:
+                        outputs = []
+                        self.outputs[child] = outputs
+                    outputs.extend(extra)
+
+    def step(self, node, char_ord):
+        while node != 0:
+            nextnode = self.goto[node].get(char_ord, -1)
+            if nextnode >= 0:
+                return nextnode
+            node = self.fail[node]
+        if char_ord < 256:
+            return self.root[char_ord]
+        return self.goto[0].get(char_ord, 0)
+
+
+class PatternSet(object):
+    """A list of CompiledPatterns, searched together.  'dfas' is an
+    optional list of the same length, with a rsre_dfa.PatternDFA or None
+    for each pattern."""
+
+    def __init__(self, patterns, dfas=None):
+        self.patterns = patterns
+        if dfas is None:
+            dfas = [None] * len(patterns)
+        assert len(dfas) == len(patterns)
+        self.dfas = dfas
+        self.automaton = PrefixAutomaton()
+        self.prefix_lengths = [0] * len(patterns)
+        self.others = []          # the indexes of the patterns without prefix
+        for i in range(len(patterns)):
+            prefix = patterns[i].literal_prefix()
+            if prefix:
+                self.automaton.add(prefix, i)
+                self.prefix_lengths[i] = len(prefix)
+            else:
+                self.others.append(i)
+        self.automaton.build()
+        self.num_prefixed = len(patterns) - len(self.others)
+
+
+@specializectx
+def _match_after_prefix(ctx, patternset, index, ptr):
+    # the prefix of the pattern number 'index' ends at 'ptr' (included);
+    # check if the rest of the pattern matches, like fast_search()
+    pattern = patternset.patterns[index]
+    prefix_len = patternset.prefix_lengths[index]
+    prefix_skip = pattern.pat(6)
+    if prefix_skip == prefix_len:
+        ptr = ctx.next(ptr)
+    else:
+        assert prefix_skip < prefix_len
+        ptr = ctx.prev_n(ptr, prefix_len - 1 - prefix_skip, ctx.ZERO)
+    ppos_start = pattern.pat(1) + 1 + 2 * prefix_skip
+    return sre_match(ctx, pattern, ppos_start, ptr, None) is not None
+
+@specializectx
+@jit.dont_look_inside
+def _scan_prefixes(ctx, patternset, found):
+    remaining = patternset.num_prefixed
+    if remaining == 0:
+        return
+    automaton = patternset.automaton
+    node = 0
+    ptr = ctx.match_start
+    while ptr < ctx.end:
+        node = automaton.step(node, ctx.str(ptr))
+        outputs = automaton.outputs[node]
+        if outputs is not None:
+            for index in outputs:
+                if (not found[index] and
+                        _match_after_prefix(ctx, patternset, index, ptr)):
+                    found[index] = True
+                    remaining -= 1
+            if remaining == 0:
+                return
+        ptr = ctx.next(ptr)
+
+def search(ctx, patternset):
+    """Return a list of booleans: True for the patterns that match
+    somewhere between ctx.match_start and ctx.end."""
+    start = ctx.match_start
+    found = [False] * len(patternset.patterns)
+    if ctx.end < start:
+        return found
+    _scan_prefixes(ctx, patternset, found)
+    for index in patternset.others:
+        ctx.reset(start)
+        pattern = patternset.patterns[index]
+        dfa = patternset.dfas[index]
+        if dfa is not None:
+            found[index] = rsre_dfa.search_context(ctx, pattern, dfa)
+        else:
+            found[index] = rsre_core.search_context(ctx, pattern)
+    ctx.reset(start)
+    return found
+
+def match(ctx, patternset):
+    """Return a list of booleans: True for the patterns that match at
+    ctx.match_start."""
+    start = ctx.match_start
+    found = [False] * len(patternset.patterns)
+    for index in range(len(patternset.patterns)):
+        ctx.reset(start)
+        pattern = patternset.patterns[index]
+        dfa = patternset.dfas[index]
+        if dfa is not None:
+            found[index] = rsre_dfa.match_context(ctx, pattern, dfa)
+        else:
+            found[index] = rsre_core.match_context(ctx, pattern)
+    ctx.reset(start)
+    return found
@@ -76,6 +76,14 @@ class MatchContextForTests(StrMatchContext):
     def debug_check_pos(self, position):
         assert isinstance(position, Position)
 
+    def find_literal(self, literal, start):
+        assert isinstance(start, Position)
+        assert isinstance(literal, str)
+        result = self._string.find(literal, start._p, self.end._p)
+        if result < 0:
+            return self.end
+        return Position(result)
+
     #def minimum_distance(self, position_low, position_high):
     #    """Return an estimate.  The real value may be higher."""
     #    assert isinstance(position_low, Position)
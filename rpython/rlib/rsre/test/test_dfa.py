@@ -0,0 +1,139 @@
+# encoding: utf-8
+import re, sys, random
+from rpython.rlib.rsre.test.test_match import get_code
+from rpython.rlib.rsre.test import support
+from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_char, rsre_dfa
+from rpython.rlib.rsre.rsre_core import _adjust
+
+
+def setup_module(mod):
+    from rpython.rlib.unicodedata import unicodedb
+    rsre_char.set_unicode_db(unicodedb)
+
+def make_ctx(string, start=0, end=sys.maxint):
+    start, end = _adjust(start, end, len(string))
+    return support.MatchContextForTests(string, support.Position(start),
+                                        support.Position(end))
+
+def dfa_search(r, dfa, string, start=0, end=sys.maxint):
+    ctx = make_ctx(string, start, end)
+    if rsre_dfa.search_context(ctx, r, dfa):
+        return ctx
+    return None
+
+def dfa_match(r, dfa, string, start=0, end=sys.maxint, fullmatch=False):
+    ctx = make_ctx(string, start, end)
+    ctx.fullmatch_only = fullmatch
+    if rsre_dfa.match_context(ctx, r, dfa):
+        return ctx
+    return None
+
+def span(ctx):
+    if ctx is None:
+        return None
+    start, end = ctx.span()
+    return start._p, end._p
+
+
+def test_unsupported():
+    for regexp in [r'(a)\1', r'a(?=b)', r'a(?!b)', r'(?<=a)b', r'a$',
+                   r'\bfoo', r'(?m)^a|b', r'(a)?(?(1)b|c)']:
+        assert rsre_dfa.compile_dfa(get_code(regexp), force=True) is None
+
+def test_not_worth_it():
+    for regexp in [r'abc', r'a+', r'[ab]*c', r'<.*>', r'^x?y']:
+        assert rsre_dfa.compile_dfa(get_code(regexp)) is None
+    for regexp in [r'ab|cd', r'(ab)+', r'a*b+', r'(?:xy|z)w']:
+        assert rsre_dfa.compile_dfa(get_code(regexp)) is not None
+
+def test_nfa_limit():
+    r = get_code(r'(?:ab|cd){1,5000}')
+    assert rsre_dfa.compile_dfa(r, force=True) is None
+
+def test_same_results_as_backtracking():
+    regexps = [r'a|bc|def', r'(a|aa)*b', r'(?:x+x+)+y', r'^(ab|a)(bc|c)',
+               r'agggtaaa|tttaccct', r'[cgt]gggtaaa|tttaccc[acg]',
+               r'tHa[Nt]', r'aND|caN|Ha[DS]|WaS', r'>.*\n|\n',
+               r'(?i)foo|BAR', r'[^a]b{2,3}?c*', r'(\w+)\s(\d+)|\W{2}',
+               r'x(?:y|z){3}', r'(?s)a.b|c', r'(?:a*)*b', r'a{0}b|c',
+               r'(a|b)*?c', r'(?:[0-9]+\.)+[0-9]+']
+    strings = ['', 'a', 'b', 'aab', 'aaaaaaaaaaaa', 'abc',
+               'xxxxxxxxy', 'xxxxxxxx', 'def',
+               'ggggtaaatttacccg', 'tHaN caN WaS', '> foo\nbar\n', 'FoO',
+               'bbbc abbbc', 'hello 42', '!!', 'xyzyz', 'a\nb', 'cab',
+               'ccc', 'abab c', '1.2.3 4', 'zzzz']
+    for regexp in regexps:
+        r = get_code(regexp)
+        dfa = rsre_dfa.compile_dfa(r, force=True)
+        assert dfa is not None, regexp
+        for string in strings:
+            for start in range(len(string) + 1):
+                expected = span(support.search(r, string, start))
+                assert span(dfa_search(r, dfa, string, start)) == expected
+                expected = span(support.match(r, string, start))
+                assert span(dfa_match(r, dfa, string, start)) == expected
+            expected = span(support.fullmatch(r, string))
+            assert span(dfa_match(r, dfa, string, fullmatch=True)) == expected
+
+def test_groups():
+    r = get_code(r'(\d+)-(\d+)|(x)')
+    dfa = rsre_dfa.compile_dfa(r)
+    ctx = dfa_search(r, dfa, "abc 12-34 x")
+    assert span(ctx) == (4, 9)
+    expected = support.search(r, "abc 12-34 x")
+    assert ctx.flatten_marks() == expected.flatten_marks()
+
+def test_pathological():
+    # would take forever with backtracking alone
+    r = get_code(r'(?:a|aa)*b')
+    dfa = rsre_dfa.compile_dfa(r)
+    assert dfa_search(r, dfa, 'a' * 5000) is None
+    assert dfa_match(r, dfa, 'a' * 5000) is None
+
+def test_unicode():
+    r = get_code(u'(?:é|ü)+\\w', re.U)
+    dfa = rsre_dfa.compile_dfa(r)
+    ctx = rsre_core.UnicodeMatchContext(u'abc ééüx', 0, 8)
+    assert rsre_dfa.search_context(ctx, r, dfa)
+    assert ctx.span() == (4, 8)
+    s = u'abc ééüx'.encode('utf-8')
+    ctx = rsre_utf8.make_utf8_ctx(s, 0, len(s))
+    assert rsre_dfa.search_context(ctx, r, dfa)
+    assert ctx.span() == (4, len(s))
+
+def test_flush_and_give_up(monkeypatch):
+    # many DFA states: the cache is flushed and finally the DFA gives up
+    monkeypatch.setattr(rsre_dfa, 'MAX_DFA_STATES', 10)
+    monkeypatch.setattr(rsre_dfa, 'MAX_FLUSHES', 3)
+    r = get_code(r'(?:a|b)*a(?:a|b){4}c')
+    dfa = rsre_dfa.compile_dfa(r)
+    string = 'ab' * 20 + 'abbbbc' + 'ba' * 10
+    expected = span(support.search(r, string))
+    assert expected is not None
+    assert span(dfa_search(r, dfa, string)) == expected
+    rnd = random.Random(42)
+    for i in range(10):
+        string1 = ''.join([rnd.choice('ab') for j in range(40)]) + 'c'
+        expected1 = span(support.search(r, string1))
+        assert span(dfa_search(r, dfa, string1)) == expected1
+    assert dfa.is_disabled()
+    assert span(dfa_search(r, dfa, string)) == expected
+
+def test_translates():
+    from rpython.rtyper.test.test_llinterp import interpret
+    r = get_code(r'(?:a|aa)*b|c{2,3}')
+    dfa = rsre_dfa.compile_dfa(r)
+    def f(i):
+        s = 'a' * i + 'b'
+        ctx = rsre_core.StrMatchContext(s, 0, len(s))
+        if not rsre_dfa.search_context(ctx, r, dfa):
+            return -1
+        u = u'x' * i + u'ccc'
+        ctx1 = rsre_core.UnicodeMatchContext(u, 0, len(u))
+        if not rsre_dfa.search_context(ctx1, r, dfa):
+            return -2
+        ctx2 = rsre_core.StrMatchContext(s, 1, len(s))
+        if not rsre_dfa.match_context(ctx2, r, dfa):
+            return -3
+        return ctx.match_end * 100 + ctx1.match_start
+    assert interpret(f, [5]) == 605
@@ -1,5 +1,6 @@
 # encoding: utf-8
-import re, py
+import re, py, sys
+from rpython.rlib.buffer import StringBuffer
 from rpython.rlib.rsre.test.test_match import get_code, get_code_and_re
 from rpython.rlib.rsre.test import support
 from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_char
@@ -230,6 +231,58 @@ class BaseTestSearch:
                     assert match is None
                     assert res is None
 
+    def test_skip_search(self):
+        # the prefix, literal and charset cases of search_context(),
+        # which skip quickly over a byte string in the FAST_SKIP contexts
+        string = 'xx-foobar- fooba foobaz foobar!barfoo [x2] 7'
+        for regexp in [r'foobar', r'fooba[rz]', r'o+b', r'b(a)r!',
+                       r'[0-9]', r'[a-c]\w+', r'\[x\d\]', r'\d|!',
+                       r'\x80', r'(?:az|ar)!', r'x?']:
+            r_code, r = get_code_and_re(regexp)
+            for start in range(len(string) + 1):
+                for end in [len(string), len(string) - 3, start + 5]:
+                    match = r.search(string, start, end)
+                    res = self.search(r_code, string, start, end)
+                    if match is None:
+                        assert res is None
+                    else:
+                        assert res is not None
+                        assert res.span() == (self.P(match.start()),
+                                              self.P(match.end()))
+
+    def test_charset_search_locale(self, monkeypatch):
+        # the charset of a LOCALE pattern follows the current locale, so
+        # it must not come from the charset_map() cached by a first search
+        r_code = get_code(r'\w\d', re.LOCALE)
+        string = '-@1 y2'
+        res = self.search(r_code, string)
+        assert res.span() == (self.P(4), self.P(6))
+        # switch to a made-up locale in which '@' is a letter
+        isalnum = rsre_char.isalnum
+        monkeypatch.setattr(rsre_char, 'isalnum',
+                            lambda c: c == ord('@') or isalnum(c))
+        res = self.search(r_code, string)
+        assert res.span() == (self.P(1), self.P(3))
+        monkeypatch.undo()
+        res = self.search(r_code, string)
+        assert res.span() == (self.P(4), self.P(6))
+
+
+def buf_search(pattern, string, start=0, end=sys.maxint):
+    start, end = rsre_core._adjust(start, end, len(string))
+    ctx = rsre_core.BufMatchContext(StringBuffer(string), start, end)
+    if rsre_core.search_context(ctx, pattern):
+        return ctx
+    return None
+
+def buf_match(pattern, string, start=0, end=sys.maxint, fullmatch=False):
+    start, end = rsre_core._adjust(start, end, len(string))
+    ctx = rsre_core.BufMatchContext(StringBuffer(string), start, end)
+    ctx.fullmatch_only = fullmatch
+    if rsre_core.match_context(ctx, pattern):
+        return ctx
+    return None
+
 
 class TestSearchCustom(BaseTestSearch):
     search = staticmethod(support.search)
@@ -241,6 +294,11 @@ class TestSearchStr(BaseTestSearch):
     match = staticmethod(rsre_core.match)
     P = staticmethod(lambda n: n)
 
+class TestSearchBuf(BaseTestSearch):
+    search = staticmethod(buf_search)
+    match = staticmethod(buf_match)
+    P = staticmethod(lambda n: n)
+
 class TestSearchUtf8(BaseTestSearch):
     search = staticmethod(rsre_utf8.utf8search)
     match = staticmethod(rsre_utf8.utf8match)
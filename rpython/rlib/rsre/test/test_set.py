@@ -0,0 +1,86 @@
+import re, sys
+from rpython.rlib.rsre.test.test_match import get_code
+from rpython.rlib.rsre.test import support
+from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_dfa, rsre_set
+from rpython.rlib.rsre.rsre_core import _adjust
+
+
+def make_set(regexps, with_dfas=False):
+    patterns = [get_code(regexp) for regexp in regexps]
+    dfas = None
+    if with_dfas:
+        dfas = [rsre_dfa.compile_dfa(pattern) for pattern in patterns]
+    return rsre_set.PatternSet(patterns, dfas)
+
+def set_search(patternset, string, start=0, end=sys.maxint):
+    start, end = _adjust(start, end, len(string))
+    ctx = support.MatchContextForTests(string, support.Position(start),
+                                       support.Position(end))
+    return rsre_set.search(ctx, patternset)
+
+def set_match(patternset, string, start=0, end=sys.maxint):
+    start, end = _adjust(start, end, len(string))
+    ctx = support.MatchContextForTests(string, support.Position(start),
+                                       support.Position(end))
+    return rsre_set.match(ctx, patternset)
+
+
+def test_automaton():
+    automaton = rsre_set.PrefixAutomaton()
+    for i, word in enumerate(['he', 'she', 'his', 'hers']):
+        automaton.add(word, i)
+    automaton.build()
+    node = 0
+    seen = []
+    for c in 'ushers':
+        node = automaton.step(node, ord(c))
+        seen.append(sorted(automaton.outputs[node] or []))
+    assert seen == [[], [], [], [0, 1], [], [3]]
+
+def test_prefixes():
+    s = make_set([r'foo\d', r'bar', r'[ab]c', r'(?i)foo', r'foobar'])
+    assert s.others == [2, 3]
+    assert s.prefix_lengths == [3, 3, 0, 0, 6]
+
+REGEXPS = [r'GET /api/\w+', r'POST /api/(\d+)', r'GET /static/', r'ERROR',
+           r'timeout after \d+ ms', r'[A-Z]{3} /', r'(?i)warn', r'api/',
+           r'^GET', r'a(?:b|cd)*e', r'\d\d:\d\d', r'i/u', r'pi/users$']
+
+STRINGS = ['GET /api/users HTTP/1.1', 'POST /api/42 12:30',
+           'ERROR timeout after 300 ms', 'Warning: GET /static/x.png',
+           'abcdcde', '', 'nothing here', 'PUT /api/', 'xapi/users']
+
+def test_same_results_as_separate_searches():
+    for with_dfas in [False, True]:
+        s = make_set(REGEXPS, with_dfas)
+        for string in STRINGS:
+            for start in range(len(string) + 1):
+                for end in [len(string), start + 4]:
+                    expected = [support.search(pattern, string, start, end)
+                                    is not None for pattern in s.patterns]
+                    assert set_search(s, string, start, end) == expected
+                expected = [support.match(pattern, string, start)
+                                is not None for pattern in s.patterns]
+                assert set_match(s, string, start) == expected
+
+def test_utf8():
+    s = make_set([u'caf\xe9 (\\w+)', r'au lait', u'\u1234+'])
+    string = u'un caf\xe9 cr\xe8me au lait'.encode('utf-8')
+    ctx = rsre_utf8.make_utf8_ctx(string, 0, len(string))
+    assert rsre_set.search(ctx, s) == [True, True, False]
+    ctx = rsre_utf8.make_utf8_ctx(string, 3, len(string))
+    assert rsre_set.match(ctx, s) == [True, False, False]
+
+def test_translates():
+    from rpython.rtyper.test.test_llinterp import interpret
+    s = make_set([r'foo\d', r'bar', r'[ab]c', r'(?i)foo', r'x(?:yz)+'],
+                 with_dfas=True)
+    def f(i):
+        string = 'x' * i + 'foo4 xyzyz'
+        ctx = rsre_core.StrMatchContext(string, 0, len(string))
+        found = rsre_set.search(ctx, s)
+        res = 0
+        for flag in found:
+            res = res * 10 + flag
+        return res
+    assert interpret(f, [3]) == 10011
@@ -56,3 +56,19 @@ def test_translates():
         for x in rsre_re.split("a{2}", s):      print x
         return 0
     interpret(f, [3])  # assert does not crash
+
+def test_translates_buffer_search():
+    from rpython.rlib.buffer import StringBuffer
+    from rpython.rlib.rsre.test.test_match import get_code
+    r1 = get_code("foo(ba)r")
+    r2 = get_code("[0-9]x")
+    r3 = get_code("b(a)r")
+    def f(i):
+        s = "foo " * i + "foobar 7x"
+        res = 0
+        for r in [r1, r2, r3]:
+            ctx = rsre_core.BufMatchContext(StringBuffer(s), 0, len(s))
+            assert rsre_core.search_context(ctx, r)
+            res = res * 100 + ctx.match_start
+        return res
+    assert interpret(f, [3]) == 121915
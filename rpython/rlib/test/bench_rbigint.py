@@ -0,0 +1,101 @@
+""" Compare the schoolbook and the divide-and-conquer algorithms of rbigint
+for division and for string parsing, and Karatsuba with Toom-Cook for
+multiplication and squaring, to find the crossover points used for
+BURNIKEL_ZIEGLER_CUTOFF, PARSE_DC_CUTOFF and TOOM_COOK_(SQUARE_)CUTOFF.
+
+Run it untranslated with "python bench_rbigint.py [maxdigits]".  The
+absolute numbers are meaningless, but the ratios are close to the ones of
+a translated pypy, because both algorithms spend their time in the same
+digit loops.
+"""
+
+import sys, time, random
+
+from rpython.rlib import rbigint as lobj
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstring import NumberStringParser
+
+NEVER = sys.maxint
+
+def timeit(func, *args):
+    # best of three, to hide the warmup of the first call
+    best = sys.float_info.max
+    for i in range(3):
+        t0 = time.time()
+        func(*args)
+        best = min(best, time.time() - t0)
+    return best
+
+def random_bigint(ndigits):
+    return rbigint.fromlong(random.getrandbits(ndigits * lobj.SHIFT) |
+                            (1 << (ndigits * lobj.SHIFT - 1)))
+
+def compare(name, attr, func, args, labels=("schoolbook", "d&c")):
+    saved = getattr(lobj, attr)
+    try:
+        setattr(lobj, attr, NEVER)
+        t_old = timeit(func, *args)
+        setattr(lobj, attr, saved)
+        t_new = timeit(func, *args)
+    finally:
+        setattr(lobj, attr, saved)
+    print "%-40s %s: %8.4f  %s: %8.4f  ratio: %5.2f" % (
+        name, labels[0], t_old, labels[1], t_new, t_old / max(t_new, 1e-9))
+
+def bench_divmod(ndigits):
+    a = random_bigint(2 * ndigits)
+    b = random_bigint(ndigits)
+    compare("divmod %d / %d digits" % (2 * ndigits, ndigits),
+            "BURNIKEL_ZIEGLER_CUTOFF", a.divmod, (b,))
+
+def bench_str(ndigits):
+    a = random_bigint(ndigits)
+    compare("str() of %d digits" % ndigits,
+            "BURNIKEL_ZIEGLER_CUTOFF", a.str, ())
+
+def bench_parse(nchars):
+    s = ''.join([random.choice('0123456789') for i in range(nchars)])
+    def parse():
+        lobj.parse_digit_string(NumberStringParser(s, s, 10, 'long'))
+    compare("parse %d decimal chars" % nchars, "PARSE_DC_CUTOFF", parse, ())
+
+def bench_mul(ndigits):
+    a = random_bigint(ndigits)
+    b = random_bigint(ndigits)
+    compare("mul %d x %d digits" % (ndigits, ndigits),
+            "TOOM_COOK_CUTOFF", a.mul, (b,), ("karatsuba", "toom-3"))
+
+def bench_square(ndigits):
+    a = random_bigint(ndigits)
+    compare("square of %d digits" % ndigits,
+            "TOOM_COOK_SQUARE_CUTOFF", a.mul, (a,), ("karatsuba", "toom-3"))
+
+def main(maxdigits):
+    random.seed(42)
+    print ("BURNIKEL_ZIEGLER_CUTOFF = %d, PARSE_DC_CUTOFF = %d, "
+           "TOOM_COOK_CUTOFF = %d, TOOM_COOK_SQUARE_CUTOFF = %d digits" % (
+        lobj.BURNIKEL_ZIEGLER_CUTOFF, lobj.PARSE_DC_CUTOFF,
+        lobj.TOOM_COOK_CUTOFF, lobj.TOOM_COOK_SQUARE_CUTOFF))
+    ndigits = 16
+    while ndigits <= maxdigits:
+        bench_divmod(ndigits)
+        ndigits *= 2
+    ndigits = 16
+    while ndigits <= maxdigits:
+        bench_str(ndigits)
+        ndigits *= 2
+    ndigits = 64
+    while ndigits <= maxdigits * 4:
+        bench_mul(ndigits)
+        bench_square(ndigits)
+        ndigits *= 2
+    nchars = 256
+    while nchars <= maxdigits * 19:
+        bench_parse(nchars)
+        nchars *= 2
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(512)
@@ -1006,6 +1006,37 @@ class TestInternalFunctions(object):
         assert div.tolong() == _div
         assert rem.tolong() == _rem
 
+    def test__bz_divrem(self, monkeypatch):
+        monkeypatch.setattr(lobj, "BURNIKEL_ZIEGLER_CUTOFF", 2)
+        for i in range(100):
+            x = long(randint(0, 1 << 3000))
+            y = long(randint(1, 1 << randint(100, 2000)))
+            if i % 10 == 0:
+                # divisor made of all ones, to exercise the case where the
+                # top half of the dividend equals the top half of the divisor
+                y = (1 << randint(200, 1000)) - 1
+                x = y * y * (1 << 100) - 1
+            if y > x:
+                continue
+            f1 = rbigint.fromlong(x)
+            f2 = rbigint.fromlong(y)
+            div, rem = lobj._bz_divrem(f1, f2)
+            _div, _rem = divmod(x, y)
+            assert div.tolong() == _div
+            assert rem.tolong() == _rem
+
+    def test_divmod_big(self, monkeypatch):
+        monkeypatch.setattr(lobj, "BURNIKEL_ZIEGLER_CUTOFF", 3)
+        x = 3 ** 2000 + 12345
+        y = 7 ** 500 - 1
+        for sx, sy in (1, 1), (1, -1), (-1, -1), (-1, 1):
+            sx *= x
+            sy *= y
+            div, rem = rbigint.fromlong(sx).divmod(rbigint.fromlong(sy))
+            _div, _rem = divmod(sx, sy)
+            assert div.tolong() == _div
+            assert rem.tolong() == _rem
+        assert rbigint.fromlong(-x).str() == str(-x)
 
     def test_int_divmod(self):
         for x in long_vals:
@@ -1060,6 +1091,37 @@ class TestInternalFunctions(object):
         ret = lobj._k_mul(f1, f2)
         assert ret.tolong() == f1.tolong() * f2.tolong()
 
+    def test__tc_mul(self):
+        digs = KARATSUBA_CUTOFF * 5
+        f1 = bigint([lobj.MASK] * digs, 1)
+        f2 = lobj._x_add(f1, bigint([1], 1))
+        ret = lobj._tc_mul(f1, f2)
+        assert ret.tolong() == f1.tolong() * f2.tolong()
+        ret = lobj._tc_mul(f1, f1)
+        assert ret.tolong() == f1.tolong() ** 2
+        for i in range(20):
+            x = long(randint(0, 1 << 2000))
+            y = long(randint(1 << 1000, 1 << 3000))
+            ret = lobj._tc_mul(rbigint.fromlong(x), rbigint.fromlong(y))
+            assert ret.tolong() == x * y
+
+    def test_mul_toom_cook(self, monkeypatch):
+        monkeypatch.setattr(lobj, "TOOM_COOK_CUTOFF", 2 * KARATSUBA_CUTOFF)
+        monkeypatch.setattr(lobj, "TOOM_COOK_SQUARE_CUTOFF", 2 * KARATSUBA_CUTOFF)
+        x = 3 ** 10000 - 1
+        for y in [x, -x, 5 ** 7000, -(7 ** 5000)]:
+            f1 = rbigint.fromlong(x)
+            f2 = rbigint.fromlong(y)
+            assert f1.mul(f2).tolong() == x * y
+            assert f2.mul(f2).tolong() == y * y
+        f1 = rbigint.fromlong(x)
+        assert f1.pow(rbigint.fromint(3)).tolong() == x ** 3
+        assert f1.int_pow(3).tolong() == x ** 3
+
+    def test__square(self):
+        for x in [0, 1, -1, lobj.MASK, -(1 << 100), 3 ** 1000, -(3 ** 3000)]:
+            assert lobj._square(rbigint.fromlong(x)).tolong() == x * x
+
     def test_longlong(self):
         max = 1L << (r_longlong.BITS-1)
         f1 = rbigint.fromlong(max-1)    # fits in r_longlong
@@ -1141,6 +1203,18 @@ class TestInternalFunctions(object):
                           for i in range(len(inp)))
                 assert x.eq(rbigint.fromlong(-num))
 
+    def test_parse_digit_string_dc(self, monkeypatch):
+        from rpython.rlib.rbigint import parse_digit_string
+        from rpython.rlib.rstring import NumberStringParser
+        monkeypatch.setattr(lobj, "PARSE_DC_CUTOFF", 2)
+        for base in [3, 7, 10, 36]:
+            for length in [1, 20, 99, 500, 1234]:
+                s = ''.join(['0123456789abcdefghijklmnopqrstuvwxyz'[randint(0, base-1)]
+                             for i in range(length)])
+                parser = NumberStringParser('-' + s, s, base, 'long')
+                x = parse_digit_string(parser)
+                assert x.tolong() == -long(s, base)
+
 
 BASE = 2 ** SHIFT
 
@@ -0,0 +1,80 @@
+import os
+import select
+
+import pytest
+
+from rpython.rlib import rio_uring
+from rpython.rtyper.lltypesystem import lltype, rffi
+
+if not rio_uring.IS_SUPPORTED:
+    pytest.skip("io_uring is Linux only, with headers from Linux 5.6 or later")
+
+
+def make_uring(entries):
+    try:
+        return rio_uring.IOUring(entries)
+    except OSError as e:
+        pytest.skip("io_uring not available: %s" % (e,))
+
+def test_nop():
+    uring = make_uring(4)
+    try:
+        for i in range(3):
+            uring.prep(rio_uring.IORING_OP_NOP, -1, lltype.nullptr(rffi.CCHARP.TO),
+                       0, 0, 0, 100 + i)
+        assert uring.reap() == 0
+        assert uring.submit(3) == 3
+        n = uring.reap()
+        assert n == 3
+        assert sorted([uring.get_user_data(i) for i in range(n)]) == [
+            100, 101, 102]
+        assert [uring.get_result(i) for i in range(n)] == [0, 0, 0]
+        assert uring.reap() == 0
+    finally:
+        uring.close()
+    assert uring.closed()
+    uring.close()
+
+def test_read_write(tmpdir):
+    path = str(tmpdir.join('test_read_write'))
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0666)
+    uring = make_uring(2)
+    data = rffi.str2charp('hello world')
+    buf = lltype.malloc(rffi.CCHARP.TO, 20, flavor='raw')
+    try:
+        uring.prep(rio_uring.IORING_OP_WRITE, fd, data, 11, 0, 0, 1)
+        assert uring.submit(1) == 1
+        assert uring.reap() == 1
+        assert (uring.get_user_data(0), uring.get_result(0)) == (1, 11)
+        uring.prep(rio_uring.IORING_OP_READ, fd, buf, 20, 6, 0, 2)
+        uring.prep(rio_uring.IORING_OP_READ, 9999, buf, 20, 0, 0, 3)
+        # a third operation does not fit: the first two are submitted
+        uring.prep(rio_uring.IORING_OP_NOP, -1, lltype.nullptr(rffi.CCHARP.TO),
+                   0, 0, 0, 4)
+        uring.submit(3)
+        results = {}
+        while len(results) < 3:
+            for i in range(uring.reap()):
+                results[uring.get_user_data(i)] = uring.get_result(i)
+        assert results == {2: 5, 3: -9, 4: 0}     # EBADF
+        assert rffi.charpsize2str(buf, 5) == 'world'
+    finally:
+        uring.close()
+        lltype.free(buf, flavor='raw')
+        rffi.free_charp(data)
+        os.close(fd)
+
+def test_eventfd():
+    uring = make_uring(2)
+    try:
+        efd = uring.eventfd()
+        assert uring.eventfd() == efd
+        assert select.select([efd], [], [], 0)[0] == []
+        uring.prep(rio_uring.IORING_OP_NOP, -1, lltype.nullptr(rffi.CCHARP.TO),
+                   0, 0, 0, 7)
+        uring.submit()
+        assert select.select([efd], [], [], 5)[0] == [efd]
+        assert uring.reap() == 1
+        assert select.select([efd], [], [], 0)[0] == []
+    finally:
+        uring.close()
@@ -323,6 +323,63 @@ def test_simple_udp(do_recv):
     s1.close()
     s2.close()
 
+@pytest.mark.skipif(not rsocket._c.HAVE_MMSG,
+                    reason='no recvmmsg() and sendmmsg()')
+def test_mmsg_udp():
+    s1 = RSocket(AF_INET, SOCK_DGRAM)
+    s1.bind(INETAddress('127.0.0.1', INADDR_ANY))
+    addr1 = s1.getsockname()
+    s2 = RSocket(AF_INET, SOCK_DGRAM)
+    s2.settimeout(10.0)
+    s2.bind(INETAddress('127.0.0.1', INADDR_ANY))
+    addr2 = s2.getsockname()
+
+    assert s2.sendmmsg([]) == 0
+    assert s2.sendmmsg(['a', 'bc', '', 'def'], 0, addr1) == 4
+    buf = RawByteBuffer(50)
+    result = s1.recvmmsg_into(buf, 10, 5)
+    assert [n for n, addr in result] == [1, 2, 0, 3]
+    for n, addr in result:
+        assert addr.get_port() == addr2.get_port()
+    data = buf.as_str()
+    assert [data[i * 10:i * 10 + n] for i, (n, addr) in enumerate(result)] == [
+        'a', 'bc', '', 'def']
+    s2.connect(addr1)
+    assert s2.sendmmsg(['x' * 20, 'y']) == 2
+    result = s1.recvmmsg_into(buf, 8, 6)
+    assert [n for n, addr in result] == [8, 1]
+    assert buf.as_str()[:9] == 'x' * 8 + 'y'
+    pytest.raises(RSocketError, s1.recvmmsg_into, buf, 10, 6)
+    pytest.raises(RSocketError, s1.recvmmsg_into, buf, 0, 1)
+    s1.settimeout(0.0)
+    err = pytest.raises(CSocketError, s1.recvmmsg_into, buf, 10, 5)
+    assert err.value.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+    s1.close()
+    s2.close()
+
+@pytest.mark.skipif(not rsocket._c.HAVE_SENDFILE, reason='no sendfile()')
+def test_sendfile(tmpdir):
+    data = ''.join([chr(i % 256) for i in range(5000)])
+    path = tmpdir.join('sendfile')
+    path.write(data, mode='wb')
+    fd = os.open(str(path), os.O_RDONLY)
+    s1, s2 = socketpair()
+    try:
+        assert s1.sendfile(fd, 10, 100) == 100
+        assert s2.recv(1000) == data[10:110]
+        assert s1.sendfile(fd, 4000) == 1000
+        got = ''
+        while len(got) < 1000:
+            got += s2.recv(1000)
+        assert got == data[4000:]
+        assert s1.sendfile(fd, 4990, 100) == 10
+        assert s2.recv(100) == data[4990:]
+        assert s1.sendfile(fd, 6000) == 0
+    finally:
+        os.close(fd)
+        s1.close()
+        s2.close()
+
 def test_nonblocking(do_recv):
     sock = RSocket()
     sock.setblocking(False)
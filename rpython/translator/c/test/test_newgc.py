@@ -1950,6 +1950,46 @@ class TestIncrementalMiniMarkGC(TestMiniMarkGC):
         res = self.run("increase_root_stack_depth", 200000, runner=myrunner)
         assert res == 42
 
+    def define_parallel_mark(cls):
+        class Node(object):
+            def __init__(self, value, left, right):
+                self.value = value
+                self.left = left
+                self.right = right
+                self.name = str(value)
+        def build(depth, value):
+            if depth == 0:
+                return None
+            return Node(value, build(depth - 1, value * 2),
+                        build(depth - 1, value * 2 + 1))
+        def check(node, value):
+            if node is None:
+                return 0
+            assert node.value == value
+            assert node.name == str(value)
+            return (1 + check(node.left, value * 2) +
+                    check(node.right, value * 2 + 1))
+        def f():
+            trees = [build(14, 1) for i in range(8)]
+            total = 0
+            for i in range(5):
+                garbage = [build(10, 1) for j in range(20)]
+                rgc.collect()
+                for j in range(200):     # incremental steps
+                    garbage = build(8, 1)
+                for tree in trees:
+                    total += check(tree, 1)
+            return total
+        return f
+
+    def test_parallel_mark(self):
+        def myrunner(args):
+            env = os.environ.copy()
+            env['PYPY_GC_MARK_THREADS'] = '4'
+            return subprocess.check_output(args, env=env)
+        res = self.run("parallel_mark", runner=myrunner)
+        assert res == 5 * 8 * (2**14 - 1)
+
 
 # ____________________________________________________________________
 